@@ -7,8 +7,8 @@ Discord Botと統合したFlaskアプリケーション
 
 import os
 import threading
+import click
 from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
-from flask_migrate import Migrate
 from flask_login import LoginManager, login_required, current_user
 from datetime import datetime
 import logging
@@ -29,8 +29,11 @@ from models import (
     Notification
 )
 
+from extensions import cache
+from static_assets import init_static_assets
+from profiling import init_request_profiling
+
 # Global extensions
-migrate = Migrate()
 login_manager = LoginManager()
 
 
@@ -53,8 +56,9 @@ def create_app(config_name: Optional[str] = None) -> Flask:
     
     # Extensions の初期化
     db.init_app(app)
-    migrate.init_app(app, db)
+    init_migrate(app)
     login_manager.init_app(app)
+    cache.init_app(app)
     
     # ログイン設定
     login_manager.login_view = 'auth.login'  # type: ignore
@@ -73,34 +77,14 @@ def create_app(config_name: Optional[str] = None) -> Flask:
     # エラーハンドラーの登録
     register_error_handlers(app)
     
-    # データベースディレクトリの作成
-    ensure_database_directory(app)
+    # ハッシュ付き静的ファイル（flask build-assets でビルド済みの場合）
+    init_static_assets(app)
     
-    with app.app_context():
-        try:
-            # データベースの初期化をスキップ（make create-dbを使用）
-            database_uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
-            if database_uri.startswith('sqlite:///'):
-                db_path = database_uri.replace('sqlite:///', '')
-                if not os.path.isabs(db_path):
-                    db_path = os.path.join(app.root_path, db_path)
-                
-                # データベースファイルが存在しない場合は警告
-                if not os.path.exists(db_path):
-                    app.logger.warning(f"データベースファイルが見つかりません: {db_path}")
-                    app.logger.warning("'make create-db' を実行してデータベースを作成してください")
-                else:
-                    app.logger.info(f"データベースファイルが見つかりました: {db_path}")
-                    
-                    # ファイルの権限とアクセス性をチェック
-                    if os.access(db_path, os.R_OK | os.W_OK):
-                        app.logger.info("データベースファイルへの読み書きアクセスが確認できました")
-                    else:
-                        app.logger.error("データベースファイルへのアクセス権限がありません")
-                        
-        except Exception as e:
-            app.logger.error(f"データベース確認エラー: {e}")
-            # アプリケーション起動は継続（データベースなしでも起動可能）
+    # リクエストのプロファイリング（X-Profile ヘッダー・抽出）
+    init_request_profiling(app)
+    
+    # データベースディレクトリの作成（SQLiteの場合）
+    ensure_database_directory(app)
     
     # CLIコマンドの登録
     from cli_commands import register_commands
@@ -109,6 +93,23 @@ def create_app(config_name: Optional[str] = None) -> Flask:
     return app
 
 
+def init_migrate(app: Flask) -> None:
+    """
+    マイグレーション（flask db）の登録
+    
+    Flask-Migrate（alembic）の読み込みには時間がかかるため、flask コマンドから
+    起動した場合のみ登録し、Webワーカー（gunicorn など）の起動では読み込みません。
+    
+    Args:
+        app: Flaskアプリケーションインスタンス
+    """
+    if click.get_current_context(silent=True) is None:
+        return
+    
+    from flask_migrate import Migrate
+    Migrate(app, db)
+
+
 def setup_logging(app: Flask) -> None:
     """
     ログ設定のセットアップ
@@ -137,41 +138,38 @@ def ensure_database_directory(app: Flask) -> None:
     """
     データベースディレクトリの存在確認と作成
     
+    起動のたびに実行されるため、ログはディレクトリの作成時とデータベースファイルがない場合のみ出力します
+    （データベースの作成は make create-db を使用）。
+    
     Args:
         app: Flaskアプリケーションインスタンス
     """
     database_uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
     
     # SQLiteデータベースの場合のみ処理
-    if database_uri.startswith('sqlite:///'):
-        # sqlite:/// の後のパスを取得
-        db_path = database_uri.replace('sqlite:///', '')
-        
-        # 絶対パスに変換
-        if not os.path.isabs(db_path):
-            db_path = os.path.join(app.root_path, db_path)
-        
-        # データベースファイルのディレクトリを取得
-        db_dir = os.path.dirname(db_path)
-        
-        # ディレクトリが存在しない場合は作成（空文字の場合も考慮）
-        if db_dir and not os.path.exists(db_dir):
-            try:
-                os.makedirs(db_dir, exist_ok=True)
-                app.logger.info(f"データベースディレクトリを作成しました: {db_dir}")
-            except Exception as e:
-                app.logger.error(f"データベースディレクトリ作成エラー: {e}")
-                raise
-        
-        app.logger.info(f"データベースパス: {db_path}")
-        app.logger.info(f"設定URI: {database_uri}")
-        app.logger.info(f"ディレクトリ: {db_dir}")
-        
-        # ディレクトリが存在するか最終確認
-        if db_dir and os.path.exists(db_dir):
-            app.logger.info(f"データベースディレクトリが存在します: {db_dir}")
-        elif not db_dir:
-            app.logger.info("データベースファイルはカレントディレクトリに作成されます")
+    if not database_uri.startswith('sqlite:///'):
+        return
+    
+    # sqlite:/// の後のパスを絶対パスに変換
+    db_path = database_uri.replace('sqlite:///', '')
+    if not os.path.isabs(db_path):
+        db_path = os.path.join(app.root_path, db_path)
+    
+    if os.path.exists(db_path):
+        return
+    
+    # ディレクトリが存在しない場合は作成（空文字の場合はカレントディレクトリ）
+    db_dir = os.path.dirname(db_path)
+    if db_dir and not os.path.isdir(db_dir):
+        try:
+            os.makedirs(db_dir, exist_ok=True)
+            app.logger.info(f"データベースディレクトリを作成しました: {db_dir}")
+        except Exception as e:
+            app.logger.error(f"データベースディレクトリ作成エラー: {e}")
+            raise
+    
+    app.logger.warning(f"データベースファイルが見つかりません: {db_path}")
+    app.logger.warning("'make create-db' を実行してデータベースを作成してください")
 
 
 def register_models(app: Flask) -> None:
@@ -181,14 +179,14 @@ def register_models(app: Flask) -> None:
     Args:
         app: Flaskアプリケーションインスタンス
     """
-    # modelsパッケージから作成済みのモデルをインポート
-    from models import User
+    # 認証済みユーザーは共有キャッシュのスナップショットから復元（ユーザー更新時に無効化）
+    from services.identity_cache import load_identity
     
     # ユーザーローダーの設定
     @login_manager.user_loader
     def load_user(user_id: str):
         """Flask-Login用ユーザーローダー"""
-        return db.session.get(User, int(user_id))
+        return load_identity(user_id)
 
 
 def register_blueprints(app: Flask) -> None:
@@ -2,15 +2,21 @@
 """CLI Commands
 
 Flask CLIコマンドの定義
+サービス（pandas・Steam APIクライアントなど）はコマンドの実行時に読み込み、
+アプリケーションの起動（すべての flask コマンド・Webワーカー）では読み込みません。
 """
 
+import functools
+import time
+
 import click
 from flask import current_app
 from flask.cli import with_appcontext
 
-from services.game_search_service import GameSearchService
-from repositories.game_repository import GameRepository
-from services.price_change_detector import PriceChangeDetector
+from models import db
+
+from models.price_outbox import OUTBOX_CONSUMERS
+from profiling import LAZY_IMPORTS, Profiler, measure_import_time, report_options
 
 
 
@@ -161,6 +167,7 @@ def search_steam(query, limit, save_to_db):
             click.echo('検索結果をデータベースに保存中...')
             from services.game_search_service import GameSearchService
             search_service = GameSearchService()
+            from repositories.game_repository import GameRepository
             game_repository = GameRepository()
             
             
@@ -200,6 +207,7 @@ def search_games(query, page, per_page, min_price, max_price, genre, sort):
     
     try:
         # ゲーム検索サービスを使用
+        from services.game_search_service import GameSearchService
         search_service = GameSearchService()
         result = search_service.search_games(
             query=query,
@@ -436,6 +444,7 @@ def recent_games(limit):
     click.echo(f'最近追加されたゲーム (上位{limit}件)')
     
     try:
+        from services.game_search_service import GameSearchService
         search_service = GameSearchService()
         games = search_service.get_recent_games(limit)
         
@@ -472,6 +481,7 @@ def popular_games(limit):
     click.echo(f'人気ゲーム (上位{limit}件)')
     
     try:
+        from services.game_search_service import GameSearchService
         search_service = GameSearchService()
         games = search_service.get_popular_games(limit)
         
@@ -608,8 +618,10 @@ def db_init():
 @click.command()
 @click.option('--dry-run', is_flag=True, help='実際の更新は行わず、検出のみ実行')
 @click.option('--verbose', '-v', is_flag=True, help='詳細ログを表示')
+@click.option('--chunk-size', default=100, help='1回のコミットで処理するゲーム数 (デフォルト: 100)')
+@click.option('--resume', is_flag=True, help='前回中断した実行のチェックポイントから再開')
 @with_appcontext
-def detect_price_changes(dry_run, verbose):
+def detect_price_changes(dry_run, verbose, chunk_size, resume):
     """価格変動を検出し、価格データを更新"""
     click.echo('価格変動検出を開始...')
     
@@ -621,6 +633,7 @@ def detect_price_changes(dry_run, verbose):
         click.echo('[VERBOSE] 詳細ログを有効にしました')
     
     try:
+        from services.price_change_detector import PriceChangeDetector
         detector = PriceChangeDetector()
         
         if dry_run:
@@ -641,8 +654,8 @@ def detect_price_changes(dry_run, verbose):
             else:
                 click.echo('価格変動は検出されませんでした')
         else:
-            detector.process_price_changes()
-            click.echo('価格変動検出・処理が完了しました')
+            counters = detector.process_price_changes(chunk_size=chunk_size, resume=resume)
+            click.echo(f"価格変動検出・処理が完了しました: {counters['games']}件確認 / 価格 {counters['prices']}件")
         
     except Exception as e:
         click.echo(f'価格変動検出エラー: {e}')
@@ -650,6 +663,383 @@ def detect_price_changes(dry_run, verbose):
         click.echo(traceback.format_exc())
 
 
+@click.command()
+@click.option('--worker-id', help='ワーカーID (デフォルト: ホスト名:プロセスID)')
+@click.option('--max-shards', type=int, help='巡回する最大シャード数')
+@click.option('--interval', type=float, help='指定した秒数ごとに巡回を繰り返す（省略時は1回のみ）')
+@with_appcontext
+def sweep_prices(worker_id, max_shards, interval):
+    """Steam価格をシャード単位で巡回（複数のプロセス・ノードで並行実行可能）"""
+    from services.price_sweep import run_price_sweep
+    
+    click.echo('価格巡回を開始...')
+    
+    while True:
+        try:
+            stats = run_price_sweep(worker_id=worker_id, max_shards=max_shards)
+            click.echo(
+                f"価格巡回が完了しました: シャード {stats['shards']}件 / ゲーム {stats['games']}件 / "
+                f"価格変更 {stats['updated']}件 / 中断 {stats['lost']}件"
+            )
+        except Exception as e:
+            db.session.rollback()
+            click.echo(f'価格巡回エラー: {e}', err=True)
+        finally:
+            db.session.remove()
+        
+        if not interval:
+            break
+        time.sleep(interval)
+
+
+@click.command()
+@click.option('--batch-size', default=500, help='1回のコミットで処理する件数 (デフォルト: 500)')
+@with_appcontext
+def rebuild_title_index(batch_size):
+    """タイトルの正規化とバイグラム検索索引を再作成"""
+    click.echo('タイトル検索索引の再作成を開始...')
+    
+    try:
+        from repositories.game_repository import GameRepository
+        game_repository = GameRepository()
+        processed = game_repository.rebuild_title_index(batch_size=batch_size)
+        click.echo(f'タイトル検索索引の再作成が完了しました: {processed}件')
+        
+    except Exception as e:
+        click.echo(f'タイトル検索索引の再作成エラー: {e}', err=True)
+
+
+@click.command()
+@click.option('--batch-size', default=500, help='1回に集計するゲーム数 (デフォルト: 500)')
+@click.option('--resume', is_flag=True, help='前回中断した実行のチェックポイントから再開')
+@with_appcontext
+def compute_price_stats(batch_size, resume):
+    """価格履歴からゲームごとの価格統計（過去最安値・割引率・セール頻度）を集計"""
+    click.echo('価格統計の集計を開始...')
+    
+    try:
+        from services.price_stats import compute_price_stats as compute_price_stats_job
+        written = compute_price_stats_job(batch_size=batch_size, resume=resume)
+        click.echo(f'価格統計の集計が完了しました: {written}件')
+        
+    except Exception as e:
+        click.echo(f'価格統計の集計エラー: {e}', err=True)
+
+
+@click.command()
+@click.option('--size', type=int, help='スコープごとの件数 (デフォルト: DEAL_RANKING_SIZE)')
+@with_appcontext
+def rebuild_deal_rankings(size):
+    """セール中のゲームのお得度ランキング（全体・ジャンル別）を再作成"""
+    click.echo('セールランキングの作成を開始...')
+    
+    try:
+        from services.deal_ranking import rebuild_deal_rankings as rebuild_deal_rankings_job
+        counts = rebuild_deal_rankings_job(size=size)
+        for scope, count in counts.items():
+            click.echo(f'  {scope}: {count}件')
+        click.echo(f'セールランキングの作成が完了しました: {len(counts)}スコープ')
+        
+    except Exception as e:
+        click.echo(f'セールランキングの作成エラー: {e}', err=True)
+
+
+@click.command()
+@click.option('--batch-size', default=1000, help='1回に再集計するユーザー数 (デフォルト: 1000)')
+@click.option('--resume', is_flag=True, help='前回中断した実行のチェックポイントから再開')
+@with_appcontext
+def backfill_user_stats(batch_size, resume):
+    """全ユーザーの節約額・セール発見数・最終アクティビティ（user_stats）を再作成"""
+    click.echo('ユーザー統計の再作成を開始...')
+    
+    try:
+        from services.user_stats import backfill_user_stats as backfill_user_stats_job
+        written = backfill_user_stats_job(batch_size=batch_size, resume=resume)
+        click.echo(f'ユーザー統計の再作成が完了しました: {written}件')
+        
+    except Exception as e:
+        click.echo(f'ユーザー統計の再作成エラー: {e}', err=True)
+
+
+@click.command()
+@click.option('--batch-size', type=int, help='1回に配信する通知の最大件数 (デフォルト: DISCORD_DELIVERY_BATCH_SIZE)')
+@click.option('--interval', type=float, help='指定した秒数ごとに配信を繰り返す（省略時は1回のみ）')
+@with_appcontext
+def deliver_notifications(batch_size, interval):
+    """未送信の通知をDiscordのWebhookへ配信"""
+    from services.discord_delivery import deliver_pending_notifications
+    
+    click.echo('Discord通知の配信を開始...')
+    
+    while True:
+        try:
+            stats = deliver_pending_notifications(batch_size=batch_size)
+            click.echo(
+                f"配信完了: 送信 {stats['sent']}件 / 失敗 {stats['failed']}件 / 送信先なし {stats['unroutable']}件 "
+                f"({stats['messages']}メッセージ)"
+            )
+        except Exception as e:
+            db.session.rollback()
+            click.echo(f'Discord通知の配信エラー: {e}', err=True)
+        finally:
+            db.session.remove()
+        
+        if not interval:
+            break
+        time.sleep(interval)
+
+
+@click.command()
+@click.option('--batch-size', type=int, default=500, help='1回に処理するユーザー数')
+@with_appcontext
+def build_digests(batch_size):
+    """配信時期に達したユーザーの価格変動ダイジェストを作成"""
+    click.echo('価格変動ダイジェストの作成を開始...')
+    
+    try:
+        from services.price_digest import build_price_digests
+        stats = build_price_digests(batch_size=batch_size)
+        click.echo(
+            f"ダイジェストの作成が完了しました: 対象 {stats['users']}人 / 通知 {stats['digests']}件 "
+            f"(値下がり {stats['items']}件)"
+        )
+        
+    except Exception as e:
+        db.session.rollback()
+        click.echo(f'ダイジェストの作成エラー: {e}', err=True)
+
+
+@click.command()
+@click.option('--consumer', '-c', type=click.Choice(['all', *OUTBOX_CONSUMERS]), default='all',
+              help='処理する購読側')
+@click.option('--batch-size', type=int, help='1回に確保するイベント数 (デフォルト: PRICE_OUTBOX_BATCH_SIZE)')
+@click.option('--interval', type=float, help='指定した秒数ごとに処理を繰り返す（省略時は1回のみ）')
+@with_appcontext
+def process_outbox(consumer, batch_size, interval):
+    """価格変更アウトボックスの未処理イベントを処理（複数のワーカーで並行実行可能）"""
+    from services.price_outbox import drain_outbox, purge_processed_events
+    
+    consumers = OUTBOX_CONSUMERS if consumer == 'all' else (consumer,)
+    click.echo(f"価格変更イベントの処理を開始... ({', '.join(consumers)})")
+    
+    while True:
+        for name in consumers:
+            try:
+                stats = drain_outbox(name, batch_size=batch_size)
+                click.echo(
+                    f"{name}: 処理 {stats['processed']}件 / 失敗 {stats['failed']}件 / 取り消し {stats['lost']}件 / "
+                    f"デッドレター {stats['dead']}件"
+                )
+            except Exception as e:
+                click.echo(f'価格変更イベントの処理エラー ({name}): {e}', err=True)
+        try:
+            purge_processed_events()
+        except Exception as e:
+            click.echo(f'処理済みイベントの削除エラー: {e}', err=True)
+        
+        if not interval:
+            break
+        time.sleep(interval)
+
+
+@click.command()
+@click.option('--limit', '-l', type=int, help='取得件数 (デフォルト: HOME_SEED_LIMIT)')
+@click.option('--force', is_flag=True, help='登録済みのゲーム数に関わらず取り込む')
+@with_appcontext
+def seed_home_games(limit, force):
+    """トップページ用にSteam APIから最近のゲームを取り込む"""
+    click.echo('トップページ用ゲームの取り込みを開始...')
+    
+    try:
+        from services.home_seed import seed_home_games as seed_home_games_job
+        saved_count = seed_home_games_job(limit=limit, force=force)
+        if saved_count:
+            click.echo(f'取り込みが完了しました: {saved_count}件')
+        else:
+            click.echo('取り込んだゲームはありません（登録済みのゲームが十分にあるか、取得できませんでした）')
+        
+    except Exception as e:
+        click.echo(f'トップページ用ゲームの取り込みエラー: {e}', err=True)
+
+
+@click.command()
+@with_appcontext
+def build_assets():
+    """静的ファイルのハッシュ付きコピー・圧縮版（gzip / brotli）・対応表を作成"""
+    click.echo('静的ファイルのビルドを開始...')
+    
+    try:
+        from static_assets import build_assets as build_static_assets
+        manifest = build_static_assets(current_app.static_folder)
+        for source, target in sorted(manifest.items()):
+            click.echo(f'  {source} -> {target}')
+        click.echo(f'静的ファイルのビルドが完了しました: {len(manifest)}件')
+        
+    except Exception as e:
+        click.echo(f'静的ファイルのビルドエラー: {e}', err=True)
+        raise SystemExit(1)
+
+
+@click.command()
+@click.option('--output', '-o', required=True, help='出力先ファイル（例: catalog.ndjson.gz）')
+@click.option('--updated-since', help='この日時（ISO 8601）以降に更新されたゲームのみ')
+@click.option('--no-gzip', is_flag=True, help='gzip圧縮せずに出力')
+@click.option('--batch-size', default=1000, help='サーバーサイドカーソルの読み込み行数 (デフォルト: 1000)')
+@with_appcontext
+def export_catalog(output, updated_since, no_gzip, batch_size):
+    """アクティブなゲームと現在価格をNDJSONでエクスポート"""
+    try:
+        from services.catalog_export import export_catalog as export_catalog_file, parse_updated_since
+        since = parse_updated_since(updated_since)
+    except ValueError:
+        click.echo(f'日時の形式が正しくありません: {updated_since}', err=True)
+        return
+    
+    click.echo('カタログのエクスポートを開始...')
+    
+    try:
+        count = export_catalog_file(output, updated_since=since, compress=not no_gzip, batch_size=batch_size)
+        click.echo(f'カタログのエクスポートが完了しました: {count}件 -> {output}')
+        
+    except Exception as e:
+        click.echo(f'カタログのエクスポートエラー: {e}', err=True)
+
+
+@click.command()
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['ndjson', 'csv']), help='入力形式 (デフォルト: 拡張子から判定)')
+@click.option('--workers', '-w', default=1, help='解析に使うプロセス数 (デフォルト: 1)')
+@click.option('--batch-size', default=1000, help='ステージングテーブルへ1回に書き込む件数 (デフォルト: 1000)')
+@with_appcontext
+def import_catalog(path, fmt, workers, batch_size):
+    """Steam appdetails のダンプ（NDJSON / CSV）をゲーム・価格へ一括取り込み"""
+    click.echo(f'カタログの取り込みを開始: {path}')
+    
+    def report(stage, count, elapsed):
+        rate = count / elapsed if elapsed > 0 else 0
+        label = '読み込み' if stage == 'read' else '反映'
+        click.echo(f'  {label}: {count}件 ({rate:.0f}件/秒, {elapsed:.1f}秒)')
+    
+    try:
+        from services.catalog_import import import_catalog as import_catalog_file
+        stats = import_catalog_file(path, fmt=fmt, workers=workers, batch_size=batch_size, progress=report)
+        rate = stats['staged'] / stats['elapsed'] if stats['elapsed'] > 0 else 0
+        click.echo(
+            f"カタログの取り込みが完了しました: {stats['staged']}件 ({rate:.0f}件/秒)\n"
+            f"  ゲーム: 追加 {stats['games_inserted']}件 / 更新 {stats['games_updated']}件\n"
+            f"  価格: 追加 {stats['prices_inserted']}件 / 更新 {stats['prices_updated']}件\n"
+            f"  スキップ: {stats['skipped']}件 / 重複: {stats['duplicates']}件"
+        )
+        
+    except Exception as e:
+        click.echo(f'カタログの取り込みエラー: {e}', err=True)
+        raise SystemExit(1)
+
+
+@click.command()
+@click.argument('directory', type=click.Path(file_okay=False))
+@click.option('--batch-size', default=10000, help='1回に書き出す行数 (デフォルト: 10000)')
+@with_appcontext
+def export_snapshot(directory, batch_size):
+    """全テーブルを Parquet スナップショットとして書き出す"""
+    click.echo(f'スナップショットの書き出しを開始: {directory}')
+    
+    try:
+        from services.db_snapshot import export_snapshot as export_snapshot_files
+        counts = export_snapshot_files(directory, batch_size=batch_size)
+        for name, count in counts.items():
+            click.echo(f'  {name}: {count}行')
+        click.echo(f'スナップショットの書き出しが完了しました: {sum(counts.values())}行')
+        
+    except Exception as e:
+        click.echo(f'スナップショットの書き出しエラー: {e}', err=True)
+        raise SystemExit(1)
+
+
+@click.command()
+@click.argument('directory', type=click.Path(exists=True, file_okay=False))
+@click.option('--batch-size', default=10000, help='1回に挿入する行数 (デフォルト: 10000)')
+@click.confirmation_option(prompt='既存のデータをすべて削除してスナップショットから復元しますか？')
+@with_appcontext
+def import_snapshot(directory, batch_size):
+    """Parquet スナップショットからデータベースを復元（IDを保持）"""
+    click.echo(f'スナップショットの復元を開始: {directory}')
+    
+    try:
+        from services.db_snapshot import import_snapshot as import_snapshot_files
+        counts = import_snapshot_files(directory, batch_size=batch_size)
+        for name, count in counts.items():
+            click.echo(f'  {name}: {count}行')
+        click.echo(f'スナップショットの復元が完了しました: {sum(counts.values())}行')
+        
+    except Exception as e:
+        click.echo(f'スナップショットの復元エラー: {e}', err=True)
+        raise SystemExit(1)
+
+
+@click.command()
+@click.option('--budget', type=int, help='読み込み時間の上限（ミリ秒） (デフォルト: STARTUP_IMPORT_BUDGET_MS)')
+@click.option('--runs', default=3, help='計測回数（最も速い回を採用） (デフォルト: 3)')
+@click.option('--top', default=15, help='表示する読み込みの遅いモジュール数 (デフォルト: 15)')
+@with_appcontext
+def check_startup(budget, runs, top):
+    """アプリケーションの起動時間（import app）を計測し、予算と遅延読み込みを確認"""
+    budget = budget or current_app.config.get('STARTUP_IMPORT_BUDGET_MS', 500)
+    total, modules = measure_import_time('app', runs=runs)
+    
+    click.echo(f'起動時間（import app）: {total:.0f}ms / 予算 {budget}ms')
+    click.echo('読み込みの遅いモジュール（依存を含む）:')
+    top_level = sorted(((name, ms) for name, ms in modules.items() if '.' not in name and name != 'app'),
+                       key=lambda item: item[1], reverse=True)
+    for name, ms in top_level[:top]:
+        click.echo(f'  {ms:8.1f}ms  {name}')
+    
+    eager = [name for name in LAZY_IMPORTS if name in modules]
+    if eager:
+        click.echo(f"起動時に読み込まれた遅延読み込みの対象: {', '.join(eager)}", err=True)
+    if total > budget:
+        click.echo(f'起動時間が予算を超えています: {total:.0f}ms > {budget}ms', err=True)
+    if eager or total > budget:
+        raise SystemExit(1)
+
+
+def add_profile_option(command):
+    """
+    コマンドに --profile オプションを追加
+
+    指定時はコマンド全体をプロファイルし、終了時（中断・エラーを含む）にレポートを書き出します。
+
+    Args:
+        command: click のコマンド
+    """
+    if any(param.name == 'profile' for param in command.params):
+        return
+
+    callback = command.callback
+
+    @functools.wraps(callback)
+    def run(*args, profile=False, **kwargs):
+        if not profile:
+            return callback(*args, **kwargs)
+
+        profiler = Profiler(command.name)
+        profiler.start()
+        try:
+            return callback(*args, **kwargs)
+        finally:
+            profiler.stop()
+            paths = profiler.write_report(*report_options())
+            click.echo(f'プロファイル（{profiler.elapsed:.2f}秒）:', err=True)
+            for path in paths.values():
+                click.echo(f'  {path}', err=True)
+
+    command.callback = with_appcontext(run)
+    command.params.append(click.Option(
+        ['--profile'], is_flag=True,
+        help='実行をプロファイルして pstats・flamegraph・サマリーを PROFILE_OUTPUT_DIR に書き出す',
+    ))
+
+
 def register_commands(app):
     """CLIコマンドを登録"""
     # ゲーム検索 - 統合版（自動切り替え）
@@ -670,6 +1060,35 @@ def register_commands(app):
     # データベースデバッグと初期化
     app.cli.add_command(db_debug)
     app.cli.add_command(db_init)
+    app.cli.add_command(rebuild_title_index)
     
     # 価格変動検出
     app.cli.add_command(detect_price_changes)
+    app.cli.add_command(compute_price_stats)
+    app.cli.add_command(rebuild_deal_rankings)
+    app.cli.add_command(backfill_user_stats)
+    app.cli.add_command(build_digests)
+    app.cli.add_command(deliver_notifications)
+    app.cli.add_command(process_outbox)
+    app.cli.add_command(sweep_prices)
+    
+    # トップページ用ゲームの取り込み
+    app.cli.add_command(seed_home_games)
+    
+    # 静的ファイルのビルド
+    app.cli.add_command(build_assets)
+    
+    # 起動時間の確認
+    app.cli.add_command(check_startup)
+    
+    # カタログのエクスポート・取り込み
+    app.cli.add_command(export_catalog)
+    app.cli.add_command(import_catalog)
+    
+    # データベース全体のスナップショット（Parquet）
+    app.cli.add_command(export_snapshot)
+    app.cli.add_command(import_snapshot)
+    
+    # すべてのコマンドにプロファイリングオプションを追加
+    for command in app.cli.commands.values():
+        add_profile_option(command)
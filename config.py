@@ -69,6 +69,24 @@ class Config:
     DISCORD_CLIENT_SECRET = os.environ.get('DISCORD_CLIENT_SECRET')
     DISCORD_REDIRECT_URI = os.environ.get('DISCORD_REDIRECT_URI') or 'http://localhost:8000/auth/discord/callback'
     
+    # Discord通知の配信（Webhook）
+    DISCORD_WEBHOOK_URL = os.environ.get('DISCORD_WEBHOOK_URL')  # ユーザー宛て（メンション付き）の通知の送信先
+    DISCORD_CHANNEL_WEBHOOKS = os.environ.get('DISCORD_CHANNEL_WEBHOOKS', '')  # "チャンネルID=Webhook URL" のカンマ区切り
+    DISCORD_DELIVERY_WORKERS = int(os.environ.get('DISCORD_DELIVERY_WORKERS', 8))  # 並行して送信する送信先の数
+    DISCORD_DELIVERY_BATCH_SIZE = int(os.environ.get('DISCORD_DELIVERY_BATCH_SIZE', 1000))  # 1回に配信する通知の最大件数
+    NOTIFICATION_MAX_RETRIES = int(os.environ.get('NOTIFICATION_MAX_RETRIES', 3))
+    
+    # 価格変動ダイジェスト（ユーザーの preferences の notification_frequency が未設定の場合の頻度）
+    DIGEST_DEFAULT_FREQUENCY = os.environ.get('DIGEST_DEFAULT_FREQUENCY', 'daily')  # hourly / daily / weekly / off
+    DIGEST_WINDOWS = {'hourly': 60, 'daily': 1440, 'weekly': 10080}  # 頻度ごとの集計期間（分）
+    DIGEST_MAX_ITEMS = int(os.environ.get('DIGEST_MAX_ITEMS', 10))  # 1件のダイジェストに載せる最大ゲーム数
+    
+    # 価格変更アウトボックス（flask process-outbox）
+    PRICE_OUTBOX_BATCH_SIZE = int(os.environ.get('PRICE_OUTBOX_BATCH_SIZE', 500))  # 1回に確保するイベント数
+    PRICE_OUTBOX_LEASE_SECONDS = int(os.environ.get('PRICE_OUTBOX_LEASE_SECONDS', 60))  # 確保したイベントを他のワーカーに渡さない時間
+    PRICE_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('PRICE_OUTBOX_MAX_ATTEMPTS', 5))  # これ以上失敗したイベントはデッドレター（failed_at）にする
+    PRICE_OUTBOX_RETENTION_HOURS = int(os.environ.get('PRICE_OUTBOX_RETENTION_HOURS', 24))  # 処理済みイベントの保持期間
+    
     # メール設定
     MAIL_SERVER = os.environ.get('MAIL_SERVER') or 'smtp.gmail.com'
     MAIL_PORT = int(os.environ.get('MAIL_PORT') or 587)
@@ -78,6 +96,9 @@ class Config:
     
     # アプリケーション固有設定
     PRICE_UPDATE_INTERVAL = int(os.environ.get('PRICE_UPDATE_INTERVAL', 3600))  # 1時間
+    PRICE_SWEEP_SHARDS = int(os.environ.get('PRICE_SWEEP_SHARDS', 64))  # 価格巡回のシャード数（変更時は全ワーカーを停止）
+    PRICE_SWEEP_LEASE_SECONDS = int(os.environ.get('PRICE_SWEEP_LEASE_SECONDS', 120))  # シャードのリース期限（1バッチの処理時間より長く）
+    PRICE_SWEEP_BATCH_SIZE = int(os.environ.get('PRICE_SWEEP_BATCH_SIZE', 50))  # 1回のコミットで巡回するゲーム数
     PRICE_CACHE_MAX_AGE_HOURS = int(os.environ.get('PRICE_CACHE_MAX_AGE_HOURS', 1))  # 価格キャッシュの最大経過時間（時間）
     MAX_FAVORITES_PER_USER = int(os.environ.get('MAX_FAVORITES_PER_USER', 100))
     NOTIFICATION_BATCH_SIZE = int(os.environ.get('NOTIFICATION_BATCH_SIZE', 50))
@@ -90,9 +111,68 @@ class Config:
     STEAM_API_RATE_LIMIT = int(os.environ.get('STEAM_API_RATE_LIMIT', 10))  # requests per second
     EPIC_API_RATE_LIMIT = int(os.environ.get('EPIC_API_RATE_LIMIT', 5))
     
+    # 外部HTTPクライアント設定
+    HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', 20))  # ホストあたりの最大コネクション数
+    HTTP_MAX_RETRIES = int(os.environ.get('HTTP_MAX_RETRIES', 2))
+    HTTP_BACKOFF_FACTOR = float(os.environ.get('HTTP_BACKOFF_FACTOR', 0.5))  # 秒
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(os.environ.get('CIRCUIT_BREAKER_FAILURE_THRESHOLD', 5))
+    CIRCUIT_BREAKER_RESET_TIMEOUT = int(os.environ.get('CIRCUIT_BREAKER_RESET_TIMEOUT', 30))  # 秒
+    
     # キャッシュ設定
-    CACHE_TYPE = os.environ.get('CACHE_TYPE', 'simple')
+    # SimpleCache はプロセス内のみ。複数プロセスで動かす場合は RedisCache にすること
+    # （検索キャッシュ・カタログスナップショットの無効化、Steam追加検索の状態がプロセス間で共有されない）
+    CACHE_TYPE = os.environ.get('CACHE_TYPE', 'SimpleCache')
     CACHE_DEFAULT_TIMEOUT = int(os.environ.get('CACHE_DEFAULT_TIMEOUT', 300))  # 5分
+    CACHE_REDIS_URL = REDIS_URL
+    SEARCH_CACHE_TIMEOUT = int(os.environ.get('SEARCH_CACHE_TIMEOUT', 300))  # 検索結果キャッシュ（秒）
+    IDENTITY_CACHE_TIMEOUT = int(os.environ.get('IDENTITY_CACHE_TIMEOUT', 60))  # 認証済みユーザーのキャッシュ（秒）
+    STEAM_FALLBACK_NEGATIVE_TTL = int(os.environ.get('STEAM_FALLBACK_NEGATIVE_TTL', 3600))  # 新規なしの検索を抑止する秒数
+    STEAM_FALLBACK_KNOWN_TTL = int(os.environ.get('STEAM_FALLBACK_KNOWN_TTL', 86400))  # 取り込み済みの検索を抑止する秒数
+    STEAM_FALLBACK_WAIT_TIMEOUT = int(os.environ.get('STEAM_FALLBACK_WAIT_TIMEOUT', 30))  # 同一検索の完了待ち（秒）
+    SEARCH_ENRICHMENT_STATUS_TTL = int(os.environ.get('SEARCH_ENRICHMENT_STATUS_TTL', 300))  # 追加検索の状態保持（秒）
+    
+    # カタログスナップショット（検索語なしの一覧の絞り込み・ソート）
+    CATALOG_SNAPSHOT_ENABLED = os.environ.get('CATALOG_SNAPSHOT_ENABLED', 'true').lower() in ['true', 'on', '1']
+    CATALOG_SNAPSHOT_MAX_AGE = int(os.environ.get('CATALOG_SNAPSHOT_MAX_AGE', 600))  # 再構築までの最大保持時間（秒）
+    
+    # 静的ファイル（flask build-assets によるハッシュ付きファイルの配信）
+    STATIC_ASSETS_ENABLED = os.environ.get('STATIC_ASSETS_ENABLED', 'true').lower() in ['true', 'on', '1']
+    STATIC_IMMUTABLE_MAX_AGE = int(os.environ.get('STATIC_IMMUTABLE_MAX_AGE', 31536000))  # 1年
+    
+    # カタログエクスポート（NDJSON）
+    EXPORT_API_TOKEN = os.environ.get('EXPORT_API_TOKEN')  # Bearerトークン（未設定の場合はエクスポートAPIを無効にする）
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 1000))  # サーバーサイドカーソルの読み込み行数
+    
+    # フラグメントキャッシュ（描画済みHTML）
+    GAME_CARD_FRAGMENT_TTL = int(os.environ.get('GAME_CARD_FRAGMENT_TTL', 600))  # ゲームカード（秒）
+    HOME_FRAGMENT_TTL = int(os.environ.get('HOME_FRAGMENT_TTL', 300))  # トップページのセクション（秒）
+    
+    # トップページ用ゲームの取り込み（Steam API、バックグラウンド実行）
+    HOME_SEED_ENABLED = os.environ.get('HOME_SEED_ENABLED', 'true').lower() in ['true', 'on', '1']
+    HOME_SEED_MIN_GAMES = int(os.environ.get('HOME_SEED_MIN_GAMES', 3))  # これ未満の場合に取り込む
+    HOME_SEED_LIMIT = int(os.environ.get('HOME_SEED_LIMIT', 10))  # 取り込み件数
+    HOME_SEED_RETRY_INTERVAL = int(os.environ.get('HOME_SEED_RETRY_INTERVAL', 600))  # 再実行までの間隔（秒）
+    
+    # セールランキング（価格の巡回後に全体・ジャンル別の上位を作成）
+    DEAL_RANKING_SIZE = int(os.environ.get('DEAL_RANKING_SIZE', 50))  # スコープごとの件数
+    HOME_SALE_GAMES = int(os.environ.get('HOME_SALE_GAMES', 6))  # トップページのセール欄の件数
+    
+    # プロファイリング（CLIの --profile、Webリクエストの X-Profile ヘッダー・抽出）
+    PROFILE_OUTPUT_DIR = os.environ.get('PROFILE_OUTPUT_DIR', 'logs/profiles')  # pstats・flamegraph・サマリーの出力先
+    PROFILE_TOP_N = int(os.environ.get('PROFILE_TOP_N', 30))  # サマリーに載せる関数・SQLの件数
+    PROFILE_SAMPLE_INTERVAL = float(os.environ.get('PROFILE_SAMPLE_INTERVAL', 0.005))  # スタックのサンプリング間隔（秒）
+    PROFILE_REQUEST_TOKEN = os.environ.get('PROFILE_REQUEST_TOKEN')  # 設定時は X-Profile ヘッダーで要求できる
+    PROFILE_REQUEST_SAMPLE_RATE = float(os.environ.get('PROFILE_REQUEST_SAMPLE_RATE', 0.0))  # 抽出するリクエストの割合（0〜1）
+    STARTUP_IMPORT_BUDGET_MS = int(os.environ.get('STARTUP_IMPORT_BUDGET_MS', 500))  # import app の読み込み時間の上限（flask check-startup）
+    
+    # バックグラウンドタスク設定
+    BACKGROUND_MAX_WORKERS = int(os.environ.get('BACKGROUND_MAX_WORKERS', 4))
+    
+    # 価格ライブ配信（SSE）設定
+    PRICE_STREAM_HEARTBEAT = int(os.environ.get('PRICE_STREAM_HEARTBEAT', 15))  # ハートビート間隔（秒）
+    PRICE_STREAM_MAX_DURATION = int(os.environ.get('PRICE_STREAM_MAX_DURATION', 300))  # 1接続の最大保持時間（秒）
+    PRICE_STREAM_MAX_GAMES = int(os.environ.get('PRICE_STREAM_MAX_GAMES', 50))  # 1接続で購読できるゲーム数
+    PRICE_EVENTS_REDIS_URL = os.environ.get('PRICE_EVENTS_REDIS_URL')  # 設定時は価格変更をRedisのPub/Subでプロセス間に中継
 
 
 class DevelopmentConfig(Config):
@@ -135,7 +215,10 @@ class TestingConfig(Config):
     # SQLiteのテスト用データベースファイルを使用
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///test_gamebargain.db'
     WTF_CSRF_ENABLED = False
-    CACHE_TYPE = 'null'  # キャッシュを無効化
+    CACHE_TYPE = 'NullCache'  # キャッシュを無効化
+    CACHE_NO_NULL_WARNING = True
+    
+    HOME_SEED_ENABLED = False  # テスト中に外部APIを呼ばない
     
     # テスト用の設定
     CELERY_BROKER_URL = 'memory://'
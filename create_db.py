@@ -77,6 +77,8 @@ def create_database():
             genres TEXT,
             release_date DATE,
             platforms TEXT,
+            genre_mask INTEGER NOT NULL DEFAULT 0,
+            platform_mask INTEGER NOT NULL DEFAULT 0,
             steam_rating DECIMAL(3, 2),
             metacritic_score INTEGER,
             current_price DECIMAL(10, 2),
@@ -142,6 +144,16 @@ def create_database():
         )
         ''')
         
+        # タイトルバイグラム索引テーブル
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS game_title_bigrams (
+            gram VARCHAR(2) NOT NULL,
+            game_id INTEGER NOT NULL,
+            PRIMARY KEY (gram, game_id),
+            FOREIGN KEY (game_id) REFERENCES games (id) ON DELETE CASCADE
+        )
+        ''')
+        
         # インデックス作成
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_discord_id ON users (discord_id)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_games_title ON games (title)')
@@ -153,6 +165,7 @@ def create_database():
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_favorites_user_game ON user_favorites (user_id, game_id)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_favorites_notification_enabled ON user_favorites (notification_enabled)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_notifications_user ON notifications (user_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_game_title_bigrams_game_id ON game_title_bigrams (game_id)')
         
         # コミット
         conn.commit()
@@ -0,0 +1,11 @@
+"""
+Flask Extensions
+
+アプリケーション全体で共有するFlask拡張のインスタンス
+循環インポートを避けるため、app.py ではなくこのモジュールで生成します。
+"""
+
+from flask_caching import Cache
+
+# キャッシュ（CACHE_TYPE に応じて simple / redis / null を切り替え）
+cache = Cache()
@@ -0,0 +1,37 @@
+"""Add game title bigram index
+
+Revision ID: 5c2d7e91a3f0
+Revises: 4b61c512c1d8
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c2d7e91a3f0'
+down_revision = '4b61c512c1d8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'game_title_bigrams',
+        sa.Column('gram', sa.String(length=2), nullable=False, comment='正規化タイトルの文字バイグラム'),
+        sa.Column('game_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['game_id'], ['games.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('gram', 'game_id')
+    )
+    with op.batch_alter_table('game_title_bigrams', schema=None) as batch_op:
+        batch_op.create_index('idx_game_title_bigrams_game_id', ['game_id'], unique=False)
+
+    # 既存タイトルの正規化と索引作成は `flask rebuild-title-index` で行う
+
+
+def downgrade():
+    with op.batch_alter_table('game_title_bigrams', schema=None) as batch_op:
+        batch_op.drop_index('idx_game_title_bigrams_game_id')
+
+    op.drop_table('game_title_bigrams')
@@ -0,0 +1,54 @@
+"""Add genre and platform bitmask columns to games
+
+Revision ID: 6a8f3b2c4d15
+Revises: 5c2d7e91a3f0
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from models.taxonomy import genre_mask, platform_mask
+
+
+# revision identifiers, used by Alembic.
+revision = '6a8f3b2c4d15'
+down_revision = '5c2d7e91a3f0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('games', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('genre_mask', sa.Integer(), server_default='0', nullable=False, comment='ジャンルビットマスク'))
+        batch_op.add_column(sa.Column('platform_mask', sa.Integer(), server_default='0', nullable=False, comment='プラットフォームビットマスク'))
+
+    # 既存データのジャンル・プラットフォーム文字列からビットマスクを作成
+    bind = op.get_bind()
+    games = sa.table(
+        'games',
+        sa.column('id', sa.Integer),
+        sa.column('genres', sa.Text),
+        sa.column('platforms', sa.Text),
+        sa.column('genre_mask', sa.Integer),
+        sa.column('platform_mask', sa.Integer),
+    )
+    rows = bind.execute(sa.select(games.c.id, games.c.genres, games.c.platforms)).fetchall()
+    updates = [
+        {'game_id': row.id, 'g_mask': genre_mask(row.genres), 'p_mask': platform_mask(row.platforms)}
+        for row in rows
+        if row.genres or row.platforms
+    ]
+    if updates:
+        bind.execute(
+            games.update()
+            .where(games.c.id == sa.bindparam('game_id'))
+            .values(genre_mask=sa.bindparam('g_mask'), platform_mask=sa.bindparam('p_mask')),
+            updates
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('games', schema=None) as batch_op:
+        batch_op.drop_column('platform_mask')
+        batch_op.drop_column('genre_mask')
@@ -0,0 +1,67 @@
+"""Add price history and per-game price stats
+
+Revision ID: 9e4a1c7b2d30
+Revises: 6a8f3b2c4d15
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e4a1c7b2d30'
+down_revision = '6a8f3b2c4d15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'price_history',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('game_id', sa.Integer(), nullable=False),
+        sa.Column('store', sa.String(length=20), nullable=False),
+        sa.Column('regular_price', sa.DECIMAL(precision=10, scale=2), nullable=True),
+        sa.Column('sale_price', sa.DECIMAL(precision=10, scale=2), nullable=True),
+        sa.Column('discount_rate', sa.Integer(), nullable=True),
+        sa.Column('is_on_sale', sa.Boolean(), nullable=True),
+        sa.Column('recorded_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['game_id'], ['games.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('price_history', schema=None) as batch_op:
+        batch_op.create_index('idx_price_history_game_store_recorded', ['game_id', 'store', 'recorded_at'], unique=False)
+
+    op.create_table(
+        'game_price_stats',
+        sa.Column('game_id', sa.Integer(), nullable=False),
+        sa.Column('store', sa.String(length=20), nullable=False),
+        sa.Column('lowest_price', sa.DECIMAL(precision=10, scale=2), nullable=True, comment='過去最安値'),
+        sa.Column('lowest_price_at', sa.DateTime(timezone=True), nullable=True, comment='過去最安値を最初に記録した日時'),
+        sa.Column('mean_discount', sa.Float(), nullable=True, comment='平均割引率（期間加重）'),
+        sa.Column('max_discount', sa.Integer(), nullable=True, comment='最大割引率'),
+        sa.Column('last_on_sale_at', sa.DateTime(timezone=True), nullable=True, comment='最後にセール中だった日時'),
+        sa.Column('sale_count', sa.Integer(), nullable=True, comment='セール回数'),
+        sa.Column('sales_per_year', sa.Float(), nullable=True, comment='年間セール回数'),
+        sa.Column('observation_count', sa.Integer(), nullable=True, comment='集計した履歴の件数'),
+        sa.Column('first_observed_at', sa.DateTime(timezone=True), nullable=True, comment='最初の履歴の日時'),
+        sa.Column('computed_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['game_id'], ['games.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('game_id', 'store')
+    )
+
+    # 既存の現在価格を最初の履歴として登録（統計は `flask compute-price-stats` で集計）
+    op.execute(
+        "INSERT INTO price_history (game_id, store, regular_price, sale_price, discount_rate, is_on_sale, recorded_at) "
+        "SELECT game_id, store, regular_price, sale_price, discount_rate, is_on_sale, updated_at FROM prices"
+    )
+
+
+def downgrade():
+    op.drop_table('game_price_stats')
+
+    with op.batch_alter_table('price_history', schema=None) as batch_op:
+        batch_op.drop_index('idx_price_history_game_store_recorded')
+
+    op.drop_table('price_history')
@@ -0,0 +1,42 @@
+"""Add dead letters to the price change outbox
+
+Revision ID: a8c0e2f4b6d7
+Revises: f7b9d1e3a5c6
+Create Date: 2026-10-24 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8c0e2f4b6d7'
+down_revision = 'f7b9d1e3a5c6'
+branch_labels = None
+depends_on = None
+
+
+def _recreate_pending_indexes(batch_op, condition):
+    batch_op.drop_index('uq_price_outbox_pending_dedup')
+    batch_op.drop_index('idx_price_outbox_pending')
+    batch_op.create_index('idx_price_outbox_pending', ['consumer', 'id'], unique=False,
+                          postgresql_where=sa.text(condition),
+                          sqlite_where=sa.text(condition))
+    batch_op.create_index('uq_price_outbox_pending_dedup', ['consumer', 'dedup_key'], unique=True,
+                          postgresql_where=sa.text(condition),
+                          sqlite_where=sa.text(condition))
+
+
+def upgrade():
+    with op.batch_alter_table('price_outbox', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('failed_at', sa.DateTime(timezone=True), nullable=True,
+                                      comment='確保の上限回数に達して処理を諦めた日時（デッドレター）'))
+        _recreate_pending_indexes(batch_op, 'processed_at IS NULL AND failed_at IS NULL')
+
+
+def downgrade():
+    # デッドレターは未処理の一意制約と重複しうるため削除する
+    op.execute("DELETE FROM price_outbox WHERE failed_at IS NOT NULL")
+    with op.batch_alter_table('price_outbox', schema=None) as batch_op:
+        _recreate_pending_indexes(batch_op, 'processed_at IS NULL')
+        batch_op.drop_column('failed_at')
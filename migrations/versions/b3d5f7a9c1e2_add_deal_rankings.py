@@ -0,0 +1,45 @@
+"""Add deal rankings and sale/discount price index
+
+Revision ID: b3d5f7a9c1e2
+Revises: 9e4a1c7b2d30
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3d5f7a9c1e2'
+down_revision = '9e4a1c7b2d30'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'deal_rankings',
+        sa.Column('scope', sa.String(length=30), nullable=False, comment="'all' またはジャンルコード"),
+        sa.Column('rank', sa.Integer(), nullable=False, comment='順位（1始まり）'),
+        sa.Column('game_id', sa.Integer(), nullable=False),
+        sa.Column('store', sa.String(length=20), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False, comment='お得度スコア（0-1）'),
+        sa.Column('current_price', sa.DECIMAL(precision=10, scale=2), nullable=True),
+        sa.Column('regular_price', sa.DECIMAL(precision=10, scale=2), nullable=True),
+        sa.Column('discount_rate', sa.Integer(), nullable=True),
+        sa.Column('computed_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['game_id'], ['games.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('scope', 'rank')
+    )
+
+    with op.batch_alter_table('prices', schema=None) as batch_op:
+        batch_op.create_index('idx_prices_sale_discount', ['is_on_sale', 'discount_rate'], unique=False)
+
+    # ランキングは `flask rebuild-deal-rankings`（または次回の価格巡回）で作成
+
+
+def downgrade():
+    with op.batch_alter_table('prices', schema=None) as batch_op:
+        batch_op.drop_index('idx_prices_sale_discount')
+
+    op.drop_table('deal_rankings')
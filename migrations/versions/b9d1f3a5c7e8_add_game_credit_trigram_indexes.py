@@ -0,0 +1,33 @@
+"""Add trigram indexes for developer/publisher search
+
+Revision ID: b9d1f3a5c7e8
+Revises: a8c0e2f4b6d7
+Create Date: 2026-10-25 12:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b9d1f3a5c7e8'
+down_revision = 'a8c0e2f4b6d7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 部分一致（ILIKE '%...%'）に使えるのは PostgreSQL の pg_trgm のみ
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('idx_games_developer_trgm', 'games', ['developer'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'developer': 'gin_trgm_ops'})
+    op.create_index('idx_games_publisher_trgm', 'games', ['publisher'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'publisher': 'gin_trgm_ops'})
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('idx_games_publisher_trgm', table_name='games')
+    op.drop_index('idx_games_developer_trgm', table_name='games')
@@ -0,0 +1,33 @@
+"""Add the price digest watermark to users
+
+Revision ID: c0e2a4b6d8f1
+Revises: b9d1f3a5c7e8
+Create Date: 2026-10-26 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c0e2a4b6d8f1'
+down_revision = 'b9d1f3a5c7e8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('last_digest_at', sa.DateTime(timezone=True), nullable=True))
+
+    # 既存ユーザーは最後に作成したダイジェスト通知の日時から続ける
+    op.execute(
+        "UPDATE users SET last_digest_at = ("
+        "SELECT MAX(notifications.created_at) FROM notifications "
+        "WHERE notifications.user_id = users.id AND notifications.notification_type = 'price_digest')"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('last_digest_at')
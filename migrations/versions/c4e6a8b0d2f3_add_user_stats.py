@@ -0,0 +1,36 @@
+"""Add user stats rollup
+
+Revision ID: c4e6a8b0d2f3
+Revises: b3d5f7a9c1e2
+Create Date: 2026-10-20 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e6a8b0d2f3'
+down_revision = 'b3d5f7a9c1e2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'user_stats',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('favorites_count', sa.Integer(), nullable=False, comment='お気に入り件数'),
+        sa.Column('total_savings', sa.DECIMAL(precision=12, scale=2), nullable=False, comment='お気に入りの通常価格と現在の最安値の差額の合計'),
+        sa.Column('deals_found', sa.Integer(), nullable=False, comment='通常価格より安く買えるお気に入りの件数'),
+        sa.Column('last_activity_at', sa.DateTime(timezone=True), nullable=True, comment='最後にお気に入り・価格アラートを登録した日時'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+
+    # 既存ユーザーの統計は `flask backfill-user-stats` で作成
+
+
+def downgrade():
+    op.drop_table('user_stats')
@@ -0,0 +1,52 @@
+"""Add price change outbox
+
+Revision ID: d5f7b9c1e3a4
+Revises: c4e6a8b0d2f3
+Create Date: 2026-10-21 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5f7b9c1e3a4'
+down_revision = 'c4e6a8b0d2f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'price_outbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('consumer', sa.String(length=20), nullable=False, comment='購読側（notifier / cache / stats）'),
+        sa.Column('dedup_key', sa.String(length=64), nullable=False, comment='イベント内容のSHA-256'),
+        sa.Column('game_id', sa.Integer(), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False, comment='イベント内容（JSON）'),
+        sa.Column('attempts', sa.Integer(), nullable=False, comment='確保された回数'),
+        sa.Column('lease_token', sa.String(length=32), nullable=True, comment='処理中のワーカーの確保トークン'),
+        sa.Column('leased_until', sa.DateTime(timezone=True), nullable=True, comment='確保の期限（過ぎると他のワーカーが確保できる）'),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('processed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['game_id'], ['games.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('price_outbox', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_price_outbox_processed_at'), ['processed_at'], unique=False)
+        batch_op.create_index('idx_price_outbox_pending', ['consumer', 'id'], unique=False,
+                              postgresql_where=sa.text('processed_at IS NULL'),
+                              sqlite_where=sa.text('processed_at IS NULL'))
+        batch_op.create_index('uq_price_outbox_pending_dedup', ['consumer', 'dedup_key'], unique=True,
+                              postgresql_where=sa.text('processed_at IS NULL'),
+                              sqlite_where=sa.text('processed_at IS NULL'))
+
+
+def downgrade():
+    with op.batch_alter_table('price_outbox', schema=None) as batch_op:
+        batch_op.drop_index('uq_price_outbox_pending_dedup')
+        batch_op.drop_index('idx_price_outbox_pending')
+        batch_op.drop_index(batch_op.f('ix_price_outbox_processed_at'))
+
+    op.drop_table('price_outbox')
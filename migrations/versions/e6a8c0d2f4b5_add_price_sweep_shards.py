@@ -0,0 +1,40 @@
+"""Add price sweep shards
+
+Revision ID: e6a8c0d2f4b5
+Revises: d5f7b9c1e3a4
+Create Date: 2026-10-22 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6a8c0d2f4b5'
+down_revision = 'd5f7b9c1e3a4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'price_sweep_shards',
+        sa.Column('shard', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('hash_start', sa.BigInteger(), nullable=False, comment='担当するハッシュ値の下限（含む）'),
+        sa.Column('hash_end', sa.BigInteger(), nullable=False, comment='担当するハッシュ値の上限（含まない）'),
+        sa.Column('lease_owner', sa.String(length=100), nullable=True, comment='リースを持つワーカー'),
+        sa.Column('lease_token', sa.String(length=32), nullable=True, comment='リースの確保トークン'),
+        sa.Column('leased_until', sa.DateTime(timezone=True), nullable=True, comment='リースの期限'),
+        sa.Column('cursor_game_id', sa.Integer(), nullable=False, comment='今回の巡回で処理済みの最大ゲームID'),
+        sa.Column('last_swept_at', sa.DateTime(timezone=True), nullable=True, comment='最後に巡回を完了した日時'),
+        sa.Column('games_swept', sa.Integer(), nullable=False, comment='最後の巡回で処理したゲーム数'),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('shard')
+    )
+
+    # シャードの行は最初の `flask sweep-prices` が PRICE_SWEEP_SHARDS に合わせて作成
+
+
+def downgrade():
+    op.drop_table('price_sweep_shards')
@@ -0,0 +1,41 @@
+"""Add job runs for checkpointed batch jobs
+
+Revision ID: f7b9d1e3a5c6
+Revises: e6a8c0d2f4b5
+Create Date: 2026-10-23 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7b9d1e3a5c6'
+down_revision = 'e6a8c0d2f4b5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'job_runs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('job_name', sa.String(length=50), nullable=False, comment='ジョブ名（CLIコマンド名）'),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('cursor', sa.String(length=100), nullable=True, comment='最後にコミットしたチャンクの位置（ゲームID・ユーザーIDなど）'),
+        sa.Column('counters', sa.Text(), nullable=True, comment='処理件数などの集計（JSON）'),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('job_runs', schema=None) as batch_op:
+        batch_op.create_index('idx_job_runs_name_id', ['job_name', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('job_runs', schema=None) as batch_op:
+        batch_op.drop_index('idx_job_runs_name_id')
+
+    op.drop_table('job_runs')
@@ -18,6 +18,14 @@ from .game import Game
 from .price import Price
 from .favorite import Favorite
 from .notification import Notification, NotificationType
+from .game_title_bigram import GameTitleBigram
+from .price_history import PriceHistory
+from .game_price_stats import GamePriceStats
+from .deal_ranking import DealRanking
+from .user_stats import UserStats
+from .price_outbox import PriceOutboxEvent
+from .price_sweep_shard import PriceSweepShard
+from .job_run import JobRun, JobStatus
 from typing import Any, List, Optional, TYPE_CHECKING
 
 
@@ -33,4 +41,13 @@ __all__ = [
     'Favorite',
     'Notification',
     'NotificationType',
+    'GameTitleBigram',
+    'PriceHistory',
+    'GamePriceStats',
+    'DealRanking',
+    'UserStats',
+    'PriceOutboxEvent',
+    'PriceSweepShard',
+    'JobRun',
+    'JobStatus',
 ]
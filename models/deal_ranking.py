@@ -0,0 +1,56 @@
+"""
+Deal Ranking Model
+
+お得なセールのランキングモデル
+価格の巡回後にバッチ処理（services.deal_ranking）で全体・ジャンル別の上位を書き出し、
+トップページのセール欄などは (scope, rank) の主キー順に読むだけで表示できます。
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, DECIMAL, Float
+from models import db
+
+
+# 全体ランキングのスコープ名（ジャンル別は models.taxonomy のジャンルコード）
+OVERALL_SCOPE = 'all'
+
+
+class DealRanking(db.Model):
+    """
+    セールランキングモデル
+
+    `flask rebuild-deal-rankings` または価格の巡回後に丸ごと再作成されます。
+    """
+    __tablename__ = 'deal_rankings'
+
+    scope = Column(String(30), primary_key=True, comment="'all' またはジャンルコード")
+    rank = Column(Integer, primary_key=True, comment='順位（1始まり）')
+    game_id = Column(Integer, ForeignKey('games.id', ondelete='CASCADE'), nullable=False)
+    store = Column(String(20), nullable=False)
+    score = Column(Float, nullable=False, comment='お得度スコア（0-1）')
+    current_price = Column(DECIMAL(10, 2))
+    regular_price = Column(DECIMAL(10, 2))
+    discount_rate = Column(Integer, default=0)
+    computed_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    def __repr__(self) -> str:
+        return f'<DealRanking {self.scope}#{self.rank} game={self.game_id} score={self.score:.3f}>'
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        辞書形式に変換
+
+        Returns:
+            Dict[str, Any]: ランキング情報
+        """
+        return {
+            'rank': self.rank,
+            'game_id': self.game_id,
+            'store': self.store,
+            'score': round(self.score, 4),
+            'current_price': float(self.current_price) if self.current_price is not None else None,
+            'regular_price': float(self.regular_price) if self.regular_price is not None else None,
+            'discount_rate': self.discount_rate or 0,
+        }
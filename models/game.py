@@ -6,11 +6,13 @@ Flask-SQLAlchemyパターン
 """
 
 from datetime import datetime, timezone
-from sqlalchemy import Column, String, Text, Date, Boolean, DECIMAL, Integer, DateTime
+from typing import List
+from sqlalchemy import Column, String, Text, Date, Boolean, DECIMAL, Integer, DateTime, DDL, Index, event
 from sqlalchemy.orm import relationship
 
 # modelsパッケージからdbインスタンスをインポート
 from . import db
+from .taxonomy import genre_mask, platform_mask, split_values
 
 
 class Game(db.Model):
@@ -46,6 +48,10 @@ class Game(db.Model):
     release_date = Column(Date, nullable=True, comment='リリース日')
     platforms = Column(Text, nullable=True, comment='対応プラットフォーム（カンマ区切り）')
     
+    # 絞り込み・ファセット集計用（genres / platforms から自動導出、ビット割り当ては models.taxonomy）
+    genre_mask = Column(Integer, default=0, server_default='0', nullable=False, comment='ジャンルビットマスク')
+    platform_mask = Column(Integer, default=0, server_default='0', nullable=False, comment='プラットフォームビットマスク')
+    
     # 評価情報
     steam_rating: Column[DECIMAL] = Column(DECIMAL(3, 2), nullable=True, comment='Steam評価（0-100）')
     metacritic_score = Column(Integer, nullable=True, comment='Metacriticスコア')
@@ -57,6 +63,14 @@ class Game(db.Model):
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
     updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc), nullable=False)
     
+    __table_args__ = (
+        # 開発者・パブリッシャーの部分一致検索用（PostgreSQL の pg_trgm、他のDBでは作成しない）
+        Index('idx_games_developer_trgm', 'developer', postgresql_using='gin',
+              postgresql_ops={'developer': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+        Index('idx_games_publisher_trgm', 'publisher', postgresql_using='gin',
+              postgresql_ops={'publisher': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+    )
+    
     # リレーションシップ
     prices = relationship('Price', back_populates='game', cascade='all, delete-orphan')
     favorites = relationship('Favorite', back_populates='game', cascade='all, delete-orphan')
@@ -64,6 +78,14 @@ class Game(db.Model):
     def __repr__(self):
         return f'<Game {self.title}>'
     
+    def get_genres(self) -> List[str]:
+        """ジャンルのリストを取得"""
+        return split_values(self.genres)
+    
+    def get_platforms(self) -> List[str]:
+        """対応プラットフォームのリストを取得"""
+        return split_values(self.platforms)
+    
     def to_dict(self):
         """辞書形式に変換"""
         return {
@@ -85,3 +107,18 @@ class Game(db.Model):
             'created_at': getattr(self, 'created_at').isoformat() if getattr(self, 'created_at') else None,
             'updated_at': getattr(self, 'updated_at').isoformat() if getattr(self, 'updated_at') else None
         }
+
+
+@event.listens_for(Game, 'before_insert')
+@event.listens_for(Game, 'before_update')
+def _derive_taxonomy_masks(mapper, connection, target) -> None:
+    """ジャンル・プラットフォームの保存値からビットマスクを導出"""
+    target.genre_mask = genre_mask(target.genres)
+    target.platform_mask = platform_mask(target.platforms)
+
+
+# トライグラム索引に必要な拡張（db.create_all 用、マイグレーションでも作成する）
+event.listen(
+    Game.__table__, 'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql')
+)
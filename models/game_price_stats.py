@@ -0,0 +1,76 @@
+"""
+Game Price Stats Model
+
+ゲーム・ストアごとの価格統計モデル
+価格履歴からバッチ処理（services.price_stats）で集計し、
+詳細ページなどは主キーで1行読むだけで参照できます。
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, DECIMAL, Float
+from models import db
+
+
+class GamePriceStats(db.Model):
+    """
+    価格統計モデル
+
+    `flask compute-price-stats` で再集計されます。
+    """
+    __tablename__ = 'game_price_stats'
+
+    game_id = Column(Integer, ForeignKey('games.id', ondelete='CASCADE'), primary_key=True)
+    store = Column(String(20), primary_key=True)
+
+    lowest_price = Column(DECIMAL(10, 2), comment='過去最安値')
+    lowest_price_at = Column(DateTime(timezone=True), comment='過去最安値を最初に記録した日時')
+    mean_discount = Column(Float, default=0.0, comment='平均割引率（期間加重）')
+    max_discount = Column(Integer, default=0, comment='最大割引率')
+    last_on_sale_at = Column(DateTime(timezone=True), comment='最後にセール中だった日時')
+    sale_count = Column(Integer, default=0, comment='セール回数')
+    sales_per_year = Column(Float, default=0.0, comment='年間セール回数')
+    observation_count = Column(Integer, default=0, comment='集計した履歴の件数')
+    first_observed_at = Column(DateTime(timezone=True), comment='最初の履歴の日時')
+    computed_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    def __repr__(self) -> str:
+        return f'<GamePriceStats {self.game_id} {self.store} low={self.lowest_price}>'
+
+    def days_since_last_sale(self, now: Optional[datetime] = None) -> Optional[int]:
+        """
+        最後のセールからの経過日数
+
+        Args:
+            now: 基準日時（省略時は現在）
+
+        Returns:
+            Optional[int]: 経過日数（セール中は0、セールの記録がない場合はNone）
+        """
+        last_on_sale_at = self.last_on_sale_at
+        if last_on_sale_at is None:
+            return None
+        if last_on_sale_at.tzinfo is None:
+            last_on_sale_at = last_on_sale_at.replace(tzinfo=timezone.utc)
+        now = now or datetime.now(timezone.utc)
+        return max((now - last_on_sale_at).days, 0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        辞書形式に変換
+
+        Returns:
+            Dict[str, Any]: 価格統計
+        """
+        return {
+            'store': self.store,
+            'lowest_price': float(self.lowest_price) if self.lowest_price is not None else None,
+            'lowest_price_at': self.lowest_price_at.isoformat() if self.lowest_price_at else None,
+            'mean_discount': round(self.mean_discount or 0.0, 1),
+            'max_discount': self.max_discount or 0,
+            'days_since_last_sale': self.days_since_last_sale(),
+            'sale_count': self.sale_count or 0,
+            'sales_per_year': round(self.sales_per_year or 0.0, 1),
+            'computed_at': self.computed_at.isoformat() if self.computed_at else None,
+        }
@@ -0,0 +1,72 @@
+"""
+Game Title Bigram Model
+
+ゲームタイトルの文字バイグラム転置索引
+正規化済みタイトルの2文字ずつの組をゲームIDに対応付け、
+日本語の部分一致検索を索引で絞り込めるようにします。
+"""
+
+from typing import Optional
+
+from sqlalchemy import Column, String, Integer, ForeignKey, Index, event, inspect
+from sqlalchemy.engine import Connection
+from models import db
+from .game import Game
+from text_normalizer import normalize_text, title_bigrams
+
+
+class GameTitleBigram(db.Model):
+    """
+    タイトルバイグラム索引モデル
+
+    ゲームの追加・タイトル変更時にORMイベントで自動的に再作成されます。
+    """
+    __tablename__ = 'game_title_bigrams'
+
+    gram = Column(String(2), primary_key=True, comment='正規化タイトルの文字バイグラム')
+    game_id = Column(Integer, ForeignKey('games.id', ondelete='CASCADE'), primary_key=True)
+
+    __table_args__ = (
+        Index('idx_game_title_bigrams_game_id', 'game_id'),
+    )
+
+    def __repr__(self) -> str:
+        return f'<GameTitleBigram {self.gram!r} -> {self.game_id}>'
+
+
+def index_game_title(connection: Connection, game_id: int, normalized_title: Optional[str]) -> None:
+    """
+    ゲーム1件のバイグラム索引を再作成（呼び出し側のトランザクション内で実行）
+
+    Args:
+        connection: DB接続
+        game_id: ゲームID
+        normalized_title: 正規化済みタイトル
+    """
+    table = GameTitleBigram.__table__
+    connection.execute(table.delete().where(table.c.game_id == game_id))
+
+    grams = title_bigrams(normalized_title or '')
+    if grams:
+        connection.execute(table.insert(), [{'gram': gram, 'game_id': game_id} for gram in grams])
+
+
+@event.listens_for(Game, 'before_insert')
+@event.listens_for(Game, 'before_update')
+def _normalize_game_title(mapper, connection, target) -> None:
+    """タイトルから検索用の正規化タイトルを導出"""
+    if target.title:
+        target.normalized_title = normalize_text(target.title)
+
+
+@event.listens_for(Game, 'after_insert')
+def _index_inserted_game(mapper, connection, target) -> None:
+    """追加したゲームのタイトルを索引に登録"""
+    index_game_title(connection, target.id, target.normalized_title)
+
+
+@event.listens_for(Game, 'after_update')
+def _index_updated_game(mapper, connection, target) -> None:
+    """正規化タイトルが変わった場合のみ索引を再作成"""
+    if inspect(target).attrs.normalized_title.history.has_changes():
+        index_game_title(connection, target.id, target.normalized_title)
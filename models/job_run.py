@@ -0,0 +1,70 @@
+"""
+Job Run Model
+
+長時間かかるバッチジョブの実行状態モデル
+ジョブはチャンクごとのコミットと同じトランザクションで、処理済みの位置（カーソル）と件数を記録します
+（services.job_checkpoint）。途中で停止したジョブは `--resume` で最後のチェックポイントから再開できます。
+"""
+
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index
+from models import db
+
+
+class JobStatus:
+    """ジョブの状態"""
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+
+
+class JobRun(db.Model):
+    """
+    ジョブ実行モデル
+
+    1回の実行（再開した場合は再開前の実行を引き継ぐ）ごとに1行です。
+    """
+    __tablename__ = 'job_runs'
+
+    id = Column(Integer, primary_key=True)
+    job_name = Column(String(50), nullable=False, comment='ジョブ名（CLIコマンド名）')
+    status = Column(String(20), nullable=False, default=JobStatus.RUNNING)
+    cursor = Column(String(100), comment='最後にコミットしたチャンクの位置（ゲームID・ユーザーIDなど）')
+    counters = Column(Text, comment='処理件数などの集計（JSON）')
+    error = Column(Text)
+    started_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+    finished_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index('idx_job_runs_name_id', 'job_name', 'id'),
+    )
+
+    def __repr__(self) -> str:
+        return f'<JobRun {self.job_name} {self.status} cursor={self.cursor}>'
+
+    def get_counters(self) -> Dict[str, Any]:
+        """集計を取得"""
+        return json.loads(self.counters) if self.counters else {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        辞書形式に変換
+
+        Returns:
+            Dict[str, Any]: 実行状態
+        """
+        return {
+            'id': self.id,
+            'job_name': self.job_name,
+            'status': self.status,
+            'cursor': self.cursor,
+            'counters': self.get_counters(),
+            'error': self.error,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
@@ -27,6 +27,7 @@ class NotificationType(Enum):
     FREE_GAME = "free_game"
     THRESHOLD_MET = "threshold_met"
     RECOMMENDATION = "recommendation"
+    PRICE_DIGEST = "price_digest"
 
 
 class Notification(db.Model):
@@ -106,6 +107,16 @@ class Notification(db.Model):
         setattr(self, 'retry_count', retry_count + 1)
         setattr(self, 'last_retry_at', datetime.now(timezone.utc))
     
+    def mark_as_failed(self, max_retries: int = 3) -> None:
+        """
+        再送しても送信できない通知を失敗としてマーク（リトライ回数を上限にする）
+        
+        Args:
+            max_retries: 最大リトライ回数
+        """
+        setattr(self, 'retry_count', max(getattr(self, 'retry_count', 0) or 0, max_retries))
+        setattr(self, 'last_retry_at', datetime.now(timezone.utc))
+    
     def can_retry(self, max_retries: int = 3) -> bool:
         """
         リトライ可能かチェック
@@ -150,6 +161,7 @@ class Notification(db.Model):
             NotificationType.FREE_GAME.value: 0x9900ff,   # 紫
             NotificationType.THRESHOLD_MET.value: 0x00ff00, # 緑
             NotificationType.RECOMMENDATION.value: 0x0099ff, # 青
+            NotificationType.PRICE_DIGEST.value: 0x00ff00, # 緑
         }
         
         embed = {
@@ -9,7 +9,7 @@ from datetime import datetime, timezone
 from decimal import Decimal
 from typing import Optional, TYPE_CHECKING, Any
 
-from sqlalchemy import Column, String, Integer, ForeignKey, Boolean, DateTime, DECIMAL, Index
+from sqlalchemy import Column, String, Integer, ForeignKey, Boolean, DateTime, DECIMAL, Index, and_, case
 from sqlalchemy.orm import relationship
 from models import db
 
@@ -45,6 +45,8 @@ class Price(db.Model):
     
     __table_args__ = (
         Index('idx_prices_game_store', 'game_id', 'store'),
+        # セール中の価格を割引率順に読む（セール一覧・ランキング作成）
+        Index('idx_prices_sale_discount', 'is_on_sale', 'discount_rate'),
     )
     
     # リレーションシップ（型チェック時のみ型注釈）
@@ -183,3 +185,17 @@ class Price(db.Model):
         return f'<Price {store}: {formatted_price}>'
 
 
+def current_price_expression(table: Any):
+    """
+    SQL上の現在の有効価格（get_current_price と同じ規則）
+
+    Args:
+        table: Price または PriceHistory（同名の価格列を持つモデル・エイリアス）
+
+    Returns:
+        セール中ならセール価格、それ以外は通常価格を返すCASE式
+    """
+    return case(
+        (and_(table.is_on_sale == True, table.sale_price.isnot(None)), table.sale_price),
+        else_=table.regular_price,
+    )
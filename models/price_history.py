@@ -0,0 +1,92 @@
+"""
+Price History Model
+
+価格の変更履歴モデル
+現在価格（prices）の価格・割引・セール状態が変わるたびに1行追加され、
+価格統計（game_price_stats）の集計に使用します。
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+from sqlalchemy import Column, String, Integer, ForeignKey, Boolean, DateTime, DECIMAL, Index, event, inspect
+from sqlalchemy.engine import Connection
+from models import db
+from .price import Price
+
+
+# 変更時に履歴を残す列
+TRACKED_PRICE_FIELDS = ('regular_price', 'sale_price', 'discount_rate', 'is_on_sale')
+
+
+class PriceHistory(db.Model):
+    """
+    価格履歴モデル
+
+    Priceの追加・価格変更時にORMイベントで自動的に記録されます。
+    """
+    __tablename__ = 'price_history'
+
+    id = Column(Integer, primary_key=True)
+    game_id = Column(Integer, ForeignKey('games.id', ondelete='CASCADE'), nullable=False)
+    store = Column(String(20), nullable=False)
+    regular_price = Column(DECIMAL(10, 2))
+    sale_price = Column(DECIMAL(10, 2))
+    discount_rate = Column(Integer, default=0)
+    is_on_sale = Column(Boolean, default=False)
+    recorded_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    __table_args__ = (
+        Index('idx_price_history_game_store_recorded', 'game_id', 'store', 'recorded_at'),
+    )
+
+    def __repr__(self) -> str:
+        return f'<PriceHistory {self.game_id} {self.store} {self.regular_price}/{self.sale_price}>'
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        辞書形式に変換（price は記録時点の有効価格）
+
+        Returns:
+            Dict[str, Any]: 価格履歴
+        """
+        price = self.sale_price if self.is_on_sale and self.sale_price is not None else self.regular_price
+        return {
+            'store': self.store,
+            'date': self.recorded_at.isoformat() if self.recorded_at else None,
+            'price': float(price) if price is not None else None,
+            'regular_price': float(self.regular_price) if self.regular_price is not None else None,
+            'discount_rate': self.discount_rate or 0,
+            'is_on_sale': bool(self.is_on_sale),
+        }
+
+
+def record_price_history(connection: Connection, price: Any) -> None:
+    """
+    価格1件の現在の状態を履歴に記録（呼び出し側のトランザクション内で実行）
+
+    Args:
+        connection: DB接続
+        price: 価格情報（Priceモデル）
+    """
+    values: Dict[str, Any] = {name: getattr(price, name, None) for name in TRACKED_PRICE_FIELDS}
+    connection.execute(PriceHistory.__table__.insert().values(
+        game_id=price.game_id,
+        store=price.store,
+        recorded_at=getattr(price, 'updated_at', None) or datetime.now(timezone.utc),
+        **values,
+    ))
+
+
+@event.listens_for(Price, 'after_insert')
+def _record_inserted_price(mapper, connection, target) -> None:
+    """追加した価格を履歴に記録"""
+    record_price_history(connection, target)
+
+
+@event.listens_for(Price, 'after_update')
+def _record_updated_price(mapper, connection, target) -> None:
+    """価格・割引・セール状態が変わった場合のみ履歴に記録"""
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in TRACKED_PRICE_FIELDS):
+        record_price_history(connection, target)
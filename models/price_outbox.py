@@ -0,0 +1,170 @@
+"""
+Price Outbox Model
+
+価格変更イベントのアウトボックスモデル
+価格の追加・変更と同じトランザクションで、購読側（通知・キャッシュ無効化・統計更新）ごとに1行ずつ記録します。
+各購読側のワーカーは未処理の行をリースで確保して処理し（services.price_outbox）、
+処理済みの印を処理結果と同じトランザクションで付けるため、各イベントは購読側ごとに1回だけ処理されます。
+"""
+
+import hashlib
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, Text, Index, event, insert, inspect, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from models import db
+from .price import Price
+from .price_history import TRACKED_PRICE_FIELDS
+
+
+# イベントを受け取る購読側
+OUTBOX_CONSUMERS = ('notifier', 'cache', 'stats')
+
+# 未処理（処理済みでもデッドレターでもない）のイベント
+PENDING_CONDITION = 'processed_at IS NULL AND failed_at IS NULL'
+
+
+class PriceOutboxEvent(db.Model):
+    """
+    価格変更イベントのアウトボックスモデル
+
+    Priceの追加・価格変更時にORMイベントで自動的に記録されます（一括取り込みは services.catalog_import が記録）。
+    未処理のイベントは (consumer, dedup_key) で一意で、同じ内容の変更は処理されるまで1件にまとめられます。
+    確保の上限回数に達したイベントは failed_at を記録したデッドレターとなり、一意制約の対象から外れます。
+    """
+    __tablename__ = 'price_outbox'
+
+    id = Column(Integer, primary_key=True)
+    consumer = Column(String(20), nullable=False, comment='購読側（notifier / cache / stats）')
+    dedup_key = Column(String(64), nullable=False, comment='イベント内容のSHA-256')
+    game_id = Column(Integer, ForeignKey('games.id', ondelete='CASCADE'), nullable=False)
+    payload = Column(Text, nullable=False, comment='イベント内容（JSON）')
+    attempts = Column(Integer, default=0, nullable=False, comment='確保された回数')
+    lease_token = Column(String(32), comment='処理中のワーカーの確保トークン')
+    leased_until = Column(DateTime(timezone=True), comment='確保の期限（過ぎると他のワーカーが確保できる）')
+    last_error = Column(Text)
+    processed_at = Column(DateTime(timezone=True), index=True)
+    failed_at = Column(DateTime(timezone=True), comment='確保の上限回数に達して処理を諦めた日時（デッドレター）')
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    __table_args__ = (
+        Index('idx_price_outbox_pending', 'consumer', 'id', postgresql_where=text(PENDING_CONDITION),
+              sqlite_where=text(PENDING_CONDITION)),
+        Index('uq_price_outbox_pending_dedup', 'consumer', 'dedup_key', unique=True,
+              postgresql_where=text(PENDING_CONDITION), sqlite_where=text(PENDING_CONDITION)),
+    )
+
+    def __repr__(self) -> str:
+        return (f'<PriceOutboxEvent {self.consumer} {self.game_id} processed={self.processed_at is not None} '
+                f'failed={self.failed_at is not None}>')
+
+    def get_payload(self) -> Dict[str, Any]:
+        """イベント内容を取得"""
+        return json.loads(self.payload)
+
+
+def _effective_price(values: Dict[str, Any]) -> Optional[float]:
+    """get_current_price と同じ規則の有効価格"""
+    price = values['sale_price'] if values.get('is_on_sale') and values.get('sale_price') is not None \
+        else values.get('regular_price')
+    return float(price) if price is not None else None
+
+
+def _number(value: Any) -> Any:
+    return float(value) if isinstance(value, Decimal) else value
+
+
+def build_outbox_payload(game_id: int, store: str, values: Dict[str, Any],
+                         previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    価格の変更前後の状態からイベント内容を作成
+
+    Args:
+        game_id: ゲームID
+        store: ストア
+        values: 変更後の価格列（TRACKED_PRICE_FIELDS）
+        previous: 変更前の価格列（新規の場合はNone）
+
+    Returns:
+        Dict[str, Any]: イベント内容
+    """
+    return {
+        'game_id': game_id,
+        'store': store,
+        'price': _effective_price(values),
+        'previous_price': _effective_price(previous) if previous else None,
+        **{name: _number(values.get(name)) for name in TRACKED_PRICE_FIELDS},
+    }
+
+
+def outbox_dedup_key(payload: Dict[str, Any]) -> str:
+    """イベント内容のハッシュ（同じ変更の二重記録を防ぐキー）"""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def enqueue_price_events(connection: Connection, payloads: Iterable[Dict[str, Any]]) -> None:
+    """
+    価格変更イベントを購読側ごとにアウトボックスへ記録（呼び出し側のトランザクション内で実行）
+
+    同じ内容の未処理イベントがある場合は記録しません。
+
+    Args:
+        connection: DB接続
+        payloads: build_outbox_payload で作成したイベント内容
+    """
+    now = datetime.now(timezone.utc)
+    rows: List[Dict[str, Any]] = []
+    for payload in payloads:
+        body = json.dumps(payload, sort_keys=True)
+        dedup_key = outbox_dedup_key(payload)
+        rows.extend(
+            {'consumer': consumer, 'dedup_key': dedup_key, 'game_id': payload['game_id'],
+             'payload': body, 'attempts': 0, 'created_at': now}
+            for consumer in OUTBOX_CONSUMERS
+        )
+    if not rows:
+        return
+
+    table = PriceOutboxEvent.__table__
+    if connection.dialect.name == 'postgresql':
+        statement = postgresql.insert(table).on_conflict_do_nothing()
+    elif connection.dialect.name == 'sqlite':
+        statement = sqlite.insert(table).on_conflict_do_nothing()
+    else:
+        statement = insert(table)
+    connection.execute(statement, rows)
+
+
+@event.listens_for(Price, 'after_insert')
+def _enqueue_inserted_price(mapper, connection, target) -> None:
+    """追加した価格のイベントを記録"""
+    values = {name: getattr(target, name, None) for name in TRACKED_PRICE_FIELDS}
+    enqueue_price_events(connection, [build_outbox_payload(target.game_id, target.store, values)])
+
+
+@event.listens_for(Price, 'before_update')
+def _enqueue_updated_price(mapper, connection, target) -> None:
+    """価格・割引・セール状態が変わった場合のみイベントを記録（変更前の値を読めるよう更新前に実行）"""
+    state = inspect(target)
+    histories = {name: state.attrs[name].history for name in TRACKED_PRICE_FIELDS}
+    if not any(history.has_changes() for history in histories.values()):
+        return
+    values = {name: getattr(target, name, None) for name in TRACKED_PRICE_FIELDS}
+    if all(history.deleted or not history.has_changes() for history in histories.values()):
+        previous = {
+            name: history.deleted[0] if history.deleted else values[name]
+            for name, history in histories.items()
+        }
+    else:
+        # コミット後に失効した属性は変更前の値を持たないため、更新前の行から読む
+        table = Price.__table__
+        previous = dict(connection.execute(
+            select(*(table.c[name] for name in TRACKED_PRICE_FIELDS)).where(table.c.id == target.id)
+        ).mappings().one())
+    if all(_number(previous[name]) == _number(values[name]) for name in TRACKED_PRICE_FIELDS):
+        return
+    enqueue_price_events(connection, [build_outbox_payload(target.game_id, target.store, values, previous)])
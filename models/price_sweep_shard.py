@@ -0,0 +1,56 @@
+"""
+Price Sweep Shard Model
+
+価格巡回のシャード（担当範囲）モデル
+Steam App ID のハッシュ値の範囲ごとに1行で、巡回するワーカーが期限付きのリースを取り、
+処理済みのゲームID（カーソル）を記録しながら巡回します（services.price_sweep）。
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Text
+from models import db
+
+
+class PriceSweepShard(db.Model):
+    """
+    価格巡回シャードモデル
+
+    リースの期限が切れたシャードは他のワーカーがカーソルの続きから引き継ぎます。
+    """
+    __tablename__ = 'price_sweep_shards'
+
+    shard = Column(Integer, primary_key=True, autoincrement=False)
+    hash_start = Column(BigInteger, nullable=False, comment='担当するハッシュ値の下限（含む）')
+    hash_end = Column(BigInteger, nullable=False, comment='担当するハッシュ値の上限（含まない）')
+    lease_owner = Column(String(100), comment='リースを持つワーカー')
+    lease_token = Column(String(32), comment='リースの確保トークン')
+    leased_until = Column(DateTime(timezone=True), comment='リースの期限')
+    cursor_game_id = Column(Integer, nullable=False, default=0, comment='今回の巡回で処理済みの最大ゲームID')
+    last_swept_at = Column(DateTime(timezone=True), comment='最後に巡回を完了した日時')
+    games_swept = Column(Integer, nullable=False, default=0, comment='最後の巡回で処理したゲーム数')
+    last_error = Column(Text)
+    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    def __repr__(self) -> str:
+        return f'<PriceSweepShard {self.shard} [{self.hash_start}, {self.hash_end}) owner={self.lease_owner}>'
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        辞書形式に変換
+
+        Returns:
+            Dict[str, Any]: シャードの状態
+        """
+        return {
+            'shard': self.shard,
+            'hash_start': self.hash_start,
+            'hash_end': self.hash_end,
+            'lease_owner': self.lease_owner,
+            'leased_until': self.leased_until.isoformat() if self.leased_until else None,
+            'cursor_game_id': self.cursor_game_id,
+            'last_swept_at': self.last_swept_at.isoformat() if self.last_swept_at else None,
+            'games_swept': self.games_swept,
+            'last_error': self.last_error,
+        }
@@ -0,0 +1,155 @@
+"""
+Taxonomy
+
+ジャンル・プラットフォームの語彙とビットマスク変換
+Steam APIのジャンル名（日本語・英語）やプラットフォーム名を固定のコードに対応付け、
+games テーブルの genre_mask / platform_mask 列に1ビットずつ割り当てます。
+
+ビット位置は保存済みデータの意味を決めるため、既存項目の順序は変更せず末尾に追加してください。
+"""
+
+import json
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# (コード, 表示名, 別名) - リストの位置がビット位置
+GENRES: List[Tuple[str, str, Tuple[str, ...]]] = [
+    ('action', 'アクション', ('action',)),
+    ('rpg', 'RPG', ('rpg', 'ロールプレイング')),
+    ('strategy', 'ストラテジー', ('strategy', '戦略')),
+    ('simulation', 'シミュレーション', ('simulation',)),
+    ('sports', 'スポーツ', ('sports',)),
+    ('racing', 'レーシング', ('racing', 'レース')),
+    ('puzzle', 'パズル', ('puzzle',)),
+    ('adventure', 'アドベンチャー', ('adventure',)),
+    ('casual', 'カジュアル', ('casual',)),
+    ('indie', 'インディー', ('indie',)),
+    ('mmo', '大規模マルチプレイヤー', ('massively multiplayer', 'mmo')),
+    ('free_to_play', '無料プレイ', ('free to play', 'free-to-play', '基本プレイ無料')),
+    ('early_access', '早期アクセス', ('early access',)),
+]
+
+PLATFORMS: List[Tuple[str, str, Tuple[str, ...]]] = [
+    ('windows', 'Windows', ('windows', 'win', 'pc')),
+    ('mac', 'Mac', ('mac', 'macos', 'osx')),
+    ('linux', 'Linux', ('linux', 'steamos')),
+    ('steam_deck', 'Steam Deck', ('steam deck', 'steam_deck', 'deck')),
+]
+
+# 価格帯ファセット (コード, 表示名, 下限, 上限) - 下限以上・上限未満（円）
+PRICE_BANDS: List[Tuple[str, str, Optional[int], Optional[int]]] = [
+    ('free', '無料', 0, 1),
+    ('under_1000', '¥1,000未満', 1, 1000),
+    ('1000_3000', '¥1,000〜¥3,000', 1000, 3000),
+    ('3000_5000', '¥3,000〜¥5,000', 3000, 5000),
+    ('over_5000', '¥5,000以上', 5000, None),
+]
+
+
+def _build_lookup(vocabulary: List[Tuple[str, str, Tuple[str, ...]]]) -> Dict[str, int]:
+    lookup = {}
+    for position, (code, label, aliases) in enumerate(vocabulary):
+        for name in (code, label, *aliases):
+            lookup[name.lower()] = 1 << position
+    return lookup
+
+
+_GENRE_LOOKUP = _build_lookup(GENRES)
+_PLATFORM_LOOKUP = _build_lookup(PLATFORMS)
+
+
+def split_values(value) -> List[str]:
+    """
+    ジャンル・プラットフォームの保存値をリストに変換
+
+    カンマ区切り文字列、JSON配列文字列、リストのいずれにも対応します。
+
+    Args:
+        value: 保存値
+
+    Returns:
+        List[str]: 値のリスト
+    """
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(item).strip() for item in value if str(item).strip()]
+
+    text = str(value).strip()
+    if text.startswith('['):
+        try:
+            return [str(item).strip() for item in json.loads(text) if str(item).strip()]
+        except ValueError:
+            pass
+    return [item.strip() for item in text.split(',') if item.strip()]
+
+
+def genre_bit(name: Optional[str]) -> int:
+    """
+    ジャンル名・コードのビットを取得
+
+    Args:
+        name: ジャンルのコード、表示名、またはSteamのジャンル名
+
+    Returns:
+        int: ビット値（語彙にない場合は0）
+    """
+    return _GENRE_LOOKUP.get((name or '').strip().lower(), 0)
+
+
+def platform_bit(name: Optional[str]) -> int:
+    """
+    プラットフォーム名・コードのビットを取得
+
+    Args:
+        name: プラットフォームのコードまたは名称
+
+    Returns:
+        int: ビット値（語彙にない場合は0）
+    """
+    return _PLATFORM_LOOKUP.get((name or '').strip().lower(), 0)
+
+
+def genre_mask(value) -> int:
+    """
+    ジャンルの保存値からビットマスクを作成
+
+    Args:
+        value: カンマ区切り・JSON配列文字列またはリスト
+
+    Returns:
+        int: ジャンルビットマスク
+    """
+    mask = 0
+    for name in split_values(value):
+        mask |= genre_bit(name)
+    return mask
+
+
+def platform_mask(value) -> int:
+    """
+    プラットフォームの保存値からビットマスクを作成
+
+    Args:
+        value: カンマ区切り・JSON配列文字列またはリスト
+
+    Returns:
+        int: プラットフォームビットマスク
+    """
+    mask = 0
+    for name in split_values(value):
+        mask |= platform_bit(name)
+    return mask
+
+
+def decode_mask(mask: int, vocabulary: Iterable[Tuple[str, str, Tuple[str, ...]]]) -> List[str]:
+    """
+    ビットマスクをコードのリストに変換
+
+    Args:
+        mask: ビットマスク
+        vocabulary: GENRES または PLATFORMS
+
+    Returns:
+        List[str]: コードのリスト
+    """
+    return [code for position, (code, _, _) in enumerate(vocabulary) if mask & (1 << position)]
@@ -45,6 +45,7 @@ class User(UserMixin, db.Model):
     is_active = Column(Boolean, default=True, index=True)
     last_login_at = Column(DateTime, index=True)
     preferences = Column(Text)  # JSON文字列として保存
+    last_digest_at = Column(DateTime(timezone=True))  # 価格ダイジェストを前回集計した日時（送信しなかった場合も記録）
     
     # タイムスタンプ
     created_at = Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
@@ -0,0 +1,47 @@
+"""
+User Stats Model
+
+ユーザーごとの節約額・セール発見数の集計モデル
+お気に入りの価格が変わるたびに該当ユーザーの行だけを再集計し（services.user_stats）、
+プロフィール・アクティビティ画面は主キーで1行読むだけで参照できます。
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, DECIMAL
+from models import db
+
+
+class UserStats(db.Model):
+    """
+    ユーザー統計モデル
+
+    価格のコミット時・お気に入りの追加削除時に更新され、
+    `flask backfill-user-stats` で全ユーザー分を再作成できます。
+    """
+    __tablename__ = 'user_stats'
+
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    favorites_count = Column(Integer, default=0, nullable=False, comment='お気に入り件数')
+    total_savings = Column(DECIMAL(12, 2), default=0, nullable=False, comment='お気に入りの通常価格と現在の最安値の差額の合計')
+    deals_found = Column(Integer, default=0, nullable=False, comment='通常価格より安く買えるお気に入りの件数')
+    last_activity_at = Column(DateTime(timezone=True), comment='最後にお気に入り・価格アラートを登録した日時')
+    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    def __repr__(self) -> str:
+        return f'<UserStats {self.user_id} savings={self.total_savings} deals={self.deals_found}>'
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        辞書形式に変換
+
+        Returns:
+            Dict[str, Any]: 統計情報
+        """
+        return {
+            'favorites_count': self.favorites_count or 0,
+            'total_savings': float(self.total_savings or 0),
+            'deals_found': self.deals_found or 0,
+            'last_activity_at': self.last_activity_at.isoformat() if self.last_activity_at else None,
+        }
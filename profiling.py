@@ -0,0 +1,371 @@
+"""
+Profiling
+
+CLIコマンドとWebリクエストのプロファイリング
+コードを変更せずに本番環境で遅いコマンド・ページのボトルネックを調べるためのものです。
+
+- CLI: register_commands で登録したすべてのコマンドに `--profile` オプションを追加します。
+- Web: `X-Profile` ヘッダーに PROFILE_REQUEST_TOKEN を指定したリクエスト、または
+  PROFILE_REQUEST_SAMPLE_RATE の割合で抽出したリクエストをプロファイルします。
+
+プロファイル中のスレッドについて、スタックのサンプリング（および指定時は cProfile）と
+SQLの実行時間を記録し、PROFILE_OUTPUT_DIR に次のファイルを書き出します。
+
+- <名前>.pstats: cProfile の結果（`python -m pstats` や snakeviz で開く。cProfile 使用時のみ）
+- <名前>.collapsed: スタックのサンプル（collapsed stack 形式。flamegraph.pl や speedscope で開く）
+- <名前>.txt: 関数・SQLの上位N件のサマリー
+
+起動時間（`import app` のモジュール読み込み時間）の計測と予算の確認も行います（flask check-startup）。
+"""
+
+import cProfile
+import hmac
+import io
+import logging
+import os
+import pstats
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from flask import Flask, current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+
+# プロファイルを要求するリクエストヘッダー（値は PROFILE_REQUEST_TOKEN）
+PROFILE_HEADER = 'X-Profile'
+# 要求されたプロファイルのレポート名を返すレスポンスヘッダー
+PROFILE_REPORT_HEADER = 'X-Profile-Report'
+
+DEFAULT_OUTPUT_DIR = 'logs/profiles'
+DEFAULT_TOP_N = 30
+DEFAULT_SAMPLE_INTERVAL = 0.005  # 秒
+DEFAULT_IMPORT_BUDGET_MS = 500
+
+# 起動時（import app）に読み込まないモジュール（コマンド・処理の実行時に遅延読み込み）
+LAZY_IMPORTS = (
+    'pandas',  # 価格統計・ランキング・ダイジェスト
+    'alembic',  # flask db
+    'requests',  # Steam API・Discord
+    'services.steam_service',
+    'services.price_change_detector',
+    'services.price_sweep',
+    'services.catalog_import',
+    'services.db_snapshot',
+)
+
+_PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# プロファイル中のスレッド（スレッドID -> Profiler）
+_active: Dict[int, 'Profiler'] = {}
+
+
+class Profiler:
+    """1スレッドの処理をプロファイルするクラス"""
+
+    def __init__(self, label: str, use_cprofile: bool = True,
+                 sample_interval: float = DEFAULT_SAMPLE_INTERVAL):
+        """
+        初期化
+
+        Args:
+            label: レポートのファイル名に使う名前（コマンド名・エンドポイント名）
+            use_cprofile: Trueの場合はサンプリングに加えて cProfile で全関数呼び出しを記録
+                （オーバーヘッドが大きいため、抽出したリクエストではサンプリングのみ）
+            sample_interval: スタックのサンプリング間隔（秒）
+        """
+        self.label = label
+        self.use_cprofile = use_cprofile
+        self.sample_interval = sample_interval
+        self.name = f"{_safe_name(label)}-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.samples: Counter = Counter()
+        self.queries: Dict[str, List[float]] = {}  # SQL -> [回数, 合計秒, 最大秒]
+        self.elapsed = 0.0
+        self._thread_id: Optional[int] = None
+        self._profile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._started = 0.0
+
+    def start(self) -> None:
+        """現在のスレッドのプロファイルを開始"""
+        self._thread_id = threading.get_ident()
+        self._started = time.perf_counter()
+        _active[self._thread_id] = self
+
+        self._sampler = threading.Thread(target=self._sample, name=f'profiler-{self.name}', daemon=True)
+        self._sampler.start()
+
+        if self.use_cprofile:
+            self._profile = cProfile.Profile()
+            try:
+                self._profile.enable()
+            except ValueError as e:
+                # 別のスレッドで cProfile を使用中（Python 3.12 以降）はサンプリングのみ
+                logger.warning(f"cProfile を開始できないためサンプリングのみ行います: {e}")
+                self._profile = None
+
+    def stop(self) -> None:
+        """プロファイルを終了（start と同じスレッドで呼び出すこと）"""
+        if self._profile is not None:
+            self._profile.disable()
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        _active.pop(self._thread_id, None)
+        self.elapsed = time.perf_counter() - self._started
+
+    def _sample(self) -> None:
+        """対象スレッドのスタックを一定間隔で記録"""
+        while not self._stop.wait(self.sample_interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.samples[tuple(reversed(stack))] += 1
+
+    def record_query(self, statement: str, duration: float) -> None:
+        """
+        SQLの実行時間を記録
+
+        Args:
+            statement: SQL（パラメータはプレースホルダのまま）
+            duration: 実行時間（秒）
+        """
+        key = ' '.join(statement.split())
+        stats = self.queries.setdefault(key, [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += duration
+        stats[2] = max(stats[2], duration)
+
+    def write_report(self, output_dir: str, top_n: int = DEFAULT_TOP_N) -> Dict[str, str]:
+        """
+        レポートを書き出す
+
+        Args:
+            output_dir: 出力先ディレクトリ
+            top_n: サマリーに載せる関数・SQLの件数
+
+        Returns:
+            Dict[str, str]: 種類（pstats / collapsed / summary）ごとの書き出したファイルのパス
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        base = os.path.join(output_dir, self.name)
+        paths = {}
+
+        if self._profile is not None:
+            paths['pstats'] = f'{base}.pstats'
+            self._profile.dump_stats(paths['pstats'])
+
+        paths['collapsed'] = f'{base}.collapsed'
+        with open(paths['collapsed'], 'w', encoding='utf-8') as f:
+            for stack, count in sorted(self.samples.items()):
+                f.write(f"{';'.join(stack)} {count}\n")
+
+        paths['summary'] = f'{base}.txt'
+        with open(paths['summary'], 'w', encoding='utf-8') as f:
+            f.write(self.summary(top_n))
+
+        logger.info(f"プロファイルを書き出しました: {base} ({self.elapsed:.2f}秒)")
+        return paths
+
+    def summary(self, top_n: int = DEFAULT_TOP_N) -> str:
+        """
+        上位N件のサマリーを作成
+
+        Args:
+            top_n: 関数・SQLの件数
+
+        Returns:
+            str: サマリー（テキスト）
+        """
+        total_samples = sum(self.samples.values())
+        query_count = sum(int(stats[0]) for stats in self.queries.values())
+        query_time = sum(stats[1] for stats in self.queries.values())
+        lines = [
+            f'{self.label}',
+            f'実行時間: {self.elapsed:.3f}秒 / サンプル: {total_samples}件（{self.sample_interval * 1000:g}ms間隔）',
+            f'SQL: {query_count}件 / {query_time:.3f}秒',
+            '',
+        ]
+
+        if total_samples:
+            self_counts: Counter = Counter()
+            total_counts: Counter = Counter()
+            for stack, count in self.samples.items():
+                self_counts[stack[-1]] += count
+                for frame in set(stack):
+                    total_counts[frame] += count
+            lines.append(f'== 関数（サンプル・自身の時間順 上位{top_n}件） ==')
+            lines.append(f"{'自身':>7} {'累計':>7}  関数")
+            for frame, count in self_counts.most_common(top_n):
+                lines.append(f'{count / total_samples:7.1%} {total_counts[frame] / total_samples:7.1%}  {frame}')
+            lines.append('')
+
+        if self.queries:
+            lines.append(f'== SQL（合計時間順 上位{top_n}件） ==')
+            lines.append(f"{'回数':>6} {'合計(ms)':>10} {'最大(ms)':>10}  SQL")
+            ranked = sorted(self.queries.items(), key=lambda item: item[1][1], reverse=True)
+            for statement, (count, total, longest) in ranked[:top_n]:
+                lines.append(f'{int(count):6d} {total * 1000:10.1f} {longest * 1000:10.1f}  {statement[:300]}')
+            lines.append('')
+
+        if self._profile is not None:
+            stream = io.StringIO()
+            stats = pstats.Stats(self._profile, stream=stream)
+            stats.sort_stats('cumulative').print_stats(top_n)
+            lines.append(f'== cProfile（累計時間順 上位{top_n}件） ==')
+            lines.append(stream.getvalue().strip())
+            lines.append('')
+
+        return '\n'.join(lines)
+
+
+def _safe_name(label: str) -> str:
+    """ファイル名に使えない文字を置き換える"""
+    return re.sub(r'[^A-Za-z0-9_.-]+', '-', label).strip('-') or 'profile'
+
+
+def _short_path(filename: str) -> str:
+    """プロジェクト内はプロジェクトからの相対パス、ライブラリは site-packages からの相対パスにする"""
+    if filename.startswith(_PROJECT_ROOT + os.sep):
+        return os.path.relpath(filename, _PROJECT_ROOT)
+    marker = f'site-packages{os.sep}'
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    return os.path.basename(filename)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    """プロファイル中のスレッドのSQL実行開始時刻を記録"""
+    if _active and threading.get_ident() in _active and context is not None:
+        context._profile_started_at = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _record_query_time(conn, cursor, statement, parameters, context, executemany):
+    """プロファイル中のスレッドのSQL実行時間を記録"""
+    started_at = getattr(context, '_profile_started_at', None)
+    if started_at is None:
+        return
+    profiler = _active.get(threading.get_ident())
+    if profiler is not None:
+        profiler.record_query(statement, time.perf_counter() - started_at)
+
+
+def report_options() -> Tuple[str, int]:
+    """
+    設定からレポートの出力先と件数を取得（アプリケーションコンテキスト内で呼び出すこと）
+
+    Returns:
+        Tuple[str, int]: 出力先ディレクトリ、上位N件の件数
+    """
+    return (current_app.config.get('PROFILE_OUTPUT_DIR', DEFAULT_OUTPUT_DIR),
+            current_app.config.get('PROFILE_TOP_N', DEFAULT_TOP_N))
+
+
+def init_request_profiling(app: Flask) -> None:
+    """
+    Webリクエストのプロファイルを設定
+
+    PROFILE_REQUEST_TOKEN と一致する `X-Profile` ヘッダーのリクエストは cProfile も使用し、
+    レスポンスの `X-Profile-Report` ヘッダーでレポート名を返します。
+    PROFILE_REQUEST_SAMPLE_RATE で抽出したリクエストはサンプリングのみ行います。
+    ストリーミングレスポンス（SSE）はビュー関数がレスポンスを返すまでが対象です。
+
+    Args:
+        app: Flaskアプリケーションインスタンス
+    """
+
+    @app.before_request
+    def start_request_profile():
+        """要求または抽出されたリクエストのプロファイルを開始"""
+        token = current_app.config.get('PROFILE_REQUEST_TOKEN')
+        rate = current_app.config.get('PROFILE_REQUEST_SAMPLE_RATE', 0.0)
+        # 非ASCIIのヘッダーでも例外にならないよう bytes で比較する
+        requested = bool(token) and hmac.compare_digest(
+            request.headers.get(PROFILE_HEADER, '').encode('utf-8'), token.encode('utf-8')
+        )
+        if not requested and not (rate > 0 and random.random() < rate):
+            return
+
+        profiler = Profiler(
+            f"request-{request.endpoint or 'unknown'}",
+            use_cprofile=requested,
+            sample_interval=current_app.config.get('PROFILE_SAMPLE_INTERVAL', DEFAULT_SAMPLE_INTERVAL),
+        )
+        profiler.start()
+        g._profiler = profiler
+        g._profile_requested = requested
+
+    @app.after_request
+    def finish_request_profile(response):
+        """プロファイルを終了してレポートを書き出す"""
+        profiler = g.pop('_profiler', None)
+        if profiler is not None:
+            _finish(profiler)
+            if g.pop('_profile_requested', False):
+                response.headers[PROFILE_REPORT_HEADER] = profiler.name
+        return response
+
+    @app.teardown_request
+    def abandon_request_profile(error=None):
+        """例外で after_request が呼ばれなかった場合もプロファイルを終了"""
+        profiler = g.pop('_profiler', None)
+        if profiler is not None:
+            _finish(profiler)
+
+
+def _finish(profiler: Profiler) -> None:
+    profiler.stop()
+    try:
+        profiler.write_report(*report_options())
+    except OSError as e:
+        logger.error(f"プロファイルの書き出しエラー: {e}")
+
+
+def measure_import_time(module: str = 'app', runs: int = 3) -> Tuple[float, Dict[str, float]]:
+    """
+    新しいプロセスでモジュールの読み込み時間を計測（python -X importtime）
+
+    Webワーカーの起動と同じく、flask コマンドを経由せずに読み込みます。
+
+    Args:
+        module: 読み込むモジュール
+        runs: 計測回数（最も速い回を採用）
+
+    Returns:
+        Tuple[float, Dict[str, float]]: 合計時間（ミリ秒）、モジュールごとの読み込み時間（ミリ秒、依存を含む）
+    """
+    best: Optional[Tuple[float, Dict[str, float]]] = None
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            cwd=_PROJECT_ROOT, capture_output=True, text=True, check=True,
+        )
+        modules: Dict[str, float] = {}
+        for line in result.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            if not line.startswith('import time:') or line.endswith('imported package'):
+                continue
+            _, cumulative, name = line[len('import time:'):].split('|')
+            modules[name.strip()] = int(cumulative) / 1000
+        total = modules.get(module, 0.0)
+        if best is None or total < best[0]:
+            best = (total, modules)
+    return best
+
@@ -7,11 +7,16 @@ Game Repository
 
 from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, timezone
-from sqlalchemy import and_, or_, asc, desc, func
+from sqlalchemy import and_, or_, asc, desc, func, select, case, false, union
 from sqlalchemy.orm import Session
 
-from models import db, Game, Price
+from models import db, Game, Price, GameTitleBigram, DealRanking
+from models.deal_ranking import OVERALL_SCOPE
+from models.game_title_bigram import index_game_title
 from models.game import Game as GameModel
+from models.taxonomy import GENRES, PLATFORMS, PRICE_BANDS, genre_bit, platform_bit
+from repositories.search_cache import search_result_cache
+from text_normalizer import normalize_text, title_bigrams
 
 
 class GameRepository:
@@ -25,6 +30,8 @@ class GameRepository:
             session: SQLAlchemyセッション（指定しない場合はdb.sessionを使用）
         """
         self.session = session or db.session
+        # コミット後に検索キャッシュを無効化するゲーム
+        self._pending_search_invalidations: List[GameModel] = []
     
     def search_games(self, query: Optional[str] = None, filters: Optional[Dict[str, Any]] = None, 
                     page: int = 1, per_page: int = 20) -> Tuple[List[GameModel], int]:
@@ -40,22 +47,7 @@ class GameRepository:
         Returns:
             Tuple[List[GameModel], int]: (ゲーム一覧, 総件数)
         """
-        # ベースクエリの作成
-        base_query = self.session.query(Game)
-        
-        # テキスト検索
-        if query:
-            search_conditions = [
-                Game.title.ilike(f'%{query}%'),
-                Game.normalized_title.ilike(f'%{query}%'),
-                Game.developer.ilike(f'%{query}%'),
-                Game.publisher.ilike(f'%{query}%')
-            ]
-            base_query = base_query.filter(or_(*search_conditions))
-        
-        # フィルター適用
-        if filters:
-            base_query = self._apply_filters(base_query, filters)
+        base_query = self._build_search_query(query, filters)
         
         # ソート処理
         sort = filters.get('sort', 'relevance') if filters else 'relevance'
@@ -70,6 +62,172 @@ class GameRepository:
         
         return games, total_count
     
+    def _build_search_query(self, query: Optional[str], filters: Optional[Dict[str, Any]]):
+        """
+        検索条件・フィルターを適用したクエリを作成（ソート・ページネーションなし）
+        
+        Args:
+            query: 検索クエリ
+            filters: フィルター条件
+            
+        Returns:
+            SQLAlchemyクエリ
+        """
+        # ベースクエリの作成（カタログスナップショットと同じくアクティブなゲームのみ）
+        base_query = self.session.query(Game).filter(Game.is_active == True)
+        
+        # テキスト検索（タイトルはバイグラム索引、開発者・パブリッシャーはトライグラム索引で
+        # それぞれ絞り込めるよう、ORではなく条件ごとのゲームIDのUNIONにする）
+        if query:
+            pattern = f'%{query}%'
+            matched_ids = union(
+                select(Game.id).where(self.title_search_condition(query)),
+                select(Game.id).where(Game.developer.ilike(pattern)),
+                select(Game.id).where(Game.publisher.ilike(pattern)),
+            )
+            base_query = base_query.filter(Game.id.in_(matched_ids))
+        
+        # フィルター適用
+        if filters:
+            base_query = self._apply_filters(base_query, filters)
+        
+        return base_query
+    
+    def get_search_facets(self, query: Optional[str] = None,
+                          filters: Optional[Dict[str, Any]] = None) -> Dict[str, Dict[str, int]]:
+        """
+        検索結果全体のファセット件数を取得（集計クエリ1回）
+        
+        Args:
+            query: 検索クエリ
+            filters: フィルター条件
+            
+        Returns:
+            Dict[str, Dict[str, int]]: genre / platform / price_band ごとのコード別件数
+        """
+        matched = self._build_search_query(query, filters).with_entities(
+            Game.id.label('game_id'), Game.genre_mask, Game.platform_mask
+        ).subquery()
+        prices = self._current_price_subquery()
+        price = prices.c.current_price
+        
+        def count_if(condition):
+            return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+        
+        columns = []
+        for position, _ in enumerate(GENRES):
+            columns.append(count_if(matched.c.genre_mask.op('&')(1 << position) != 0))
+        for position, _ in enumerate(PLATFORMS):
+            columns.append(count_if(matched.c.platform_mask.op('&')(1 << position) != 0))
+        for _, _, low, high in PRICE_BANDS:
+            condition = price >= low if high is None else and_(price >= low, price < high)
+            columns.append(count_if(condition))
+        
+        row = self.session.execute(
+            select(*columns).select_from(matched.outerjoin(prices, prices.c.game_id == matched.c.game_id))
+        ).one()
+        counts = iter(int(value) for value in row)
+        
+        return {
+            'genre': {code: next(counts) for code, _, _ in GENRES},
+            'platform': {code: next(counts) for code, _, _ in PLATFORMS},
+            'price_band': {code: next(counts) for code, _, _, _ in PRICE_BANDS},
+        }
+    
+    def _current_price_subquery(self, game_ids: Optional[List[int]] = None):
+        """
+        ゲームごとの現在の最安値（セール中はセール価格）と最大割引率のサブクエリ
+        
+        Args:
+            game_ids: 対象のゲームID（指定しない場合は全ゲーム）
+        
+        Returns:
+            サブクエリ（game_id, current_price, max_discount）
+        """
+        on_sale = and_(Price.is_on_sale == True, Price.sale_price.isnot(None))
+        effective_price = case((on_sale, Price.sale_price), else_=Price.regular_price)
+        discount = case((Price.is_on_sale == True, Price.discount_rate), else_=0)
+        
+        stmt = select(
+            Price.game_id.label('game_id'),
+            func.min(effective_price).label('current_price'),
+            func.coalesce(func.max(discount), 0).label('max_discount')
+        )
+        if game_ids is not None:
+            stmt = stmt.where(Price.game_id.in_(game_ids))
+        return stmt.group_by(Price.game_id).subquery()
+    
+    def get_catalog_rows(self) -> List[Tuple]:
+        """
+        アクティブなゲーム全件の一覧・絞り込み用の列を取得（カタログスナップショット用）
+        
+        Returns:
+            List[Tuple]: (id, title, steam_rating, release_date, updated_at,
+                          genre_mask, platform_mask, current_price, max_discount) のリスト（ID順）
+        """
+        prices = self._current_price_subquery()
+        stmt = (
+            select(
+                Game.id, Game.title, Game.steam_rating, Game.release_date, Game.updated_at,
+                Game.genre_mask, Game.platform_mask,
+                prices.c.current_price, prices.c.max_discount
+            )
+            .outerjoin(prices, prices.c.game_id == Game.id)
+            .where(Game.is_active == True)
+            .order_by(Game.id)
+        )
+        return [tuple(row) for row in self.session.execute(stmt)]
+    
+    def get_current_prices(self, game_ids: List[int]) -> Dict[int, Tuple[Any, Any]]:
+        """
+        指定ゲームの現在の最安値と最大割引率を取得
+        
+        Args:
+            game_ids: ゲームIDのリスト
+            
+        Returns:
+            Dict[int, Tuple[Any, Any]]: ゲームIDごとの (current_price, max_discount)（価格がないゲームは含まない）
+        """
+        if not game_ids:
+            return {}
+        prices = self._current_price_subquery(list(game_ids))
+        rows = self.session.execute(select(prices.c.game_id, prices.c.current_price, prices.c.max_discount))
+        return {game_id: (price, discount) for game_id, price, discount in rows}
+    
+    def title_search_condition(self, query: str):
+        """
+        タイトル部分一致の検索条件を作成
+        
+        クエリを正規化してバイグラム索引で候補を絞り込み、正規化タイトルの部分一致で確定します。
+        バイグラムを作れない1文字のクエリのみ、索引を使わない部分一致にフォールバックします。
+        
+        Args:
+            query: 検索クエリ
+            
+        Returns:
+            SQLAlchemyの検索条件
+        """
+        normalized = normalize_text(query)
+        grams = title_bigrams(normalized)
+        
+        if not grams:
+            return or_(
+                Game.title.ilike(f'%{query}%'),
+                Game.normalized_title.contains(normalized, autoescape=True)
+            ) if normalized else Game.title.ilike(f'%{query}%')
+        
+        # 全てのバイグラムを含むゲーム（索引のみで評価）
+        candidates = (
+            select(GameTitleBigram.game_id)
+            .where(GameTitleBigram.gram.in_(grams))
+            .group_by(GameTitleBigram.game_id)
+            .having(func.count(GameTitleBigram.gram) == len(grams))
+        )
+        return and_(
+            Game.id.in_(candidates),
+            Game.normalized_title.contains(normalized, autoescape=True)
+        )
+    
     def _apply_filters(self, query, filters: Dict[str, Any]):
         """
         フィルター条件をクエリに適用
@@ -81,20 +239,38 @@ class GameRepository:
         Returns:
             フィルター適用後のクエリ
         """
-        # 価格フィルターは現在のところ無効化（Priceテーブルとの結合が必要）
-        # TODO: 価格フィルターを実装する場合はPriceテーブルとの結合を追加
+        # 価格フィルター（ゲームごとの現在の最安値で判定）
+        min_price = self._parse_price(filters.get('min_price'))
+        max_price = self._parse_price(filters.get('max_price'))
+        if min_price is not None or max_price is not None:
+            prices = self._current_price_subquery()
+            query = query.join(prices, prices.c.game_id == Game.id)
+            if min_price is not None:
+                query = query.filter(prices.c.current_price >= min_price)
+            if max_price is not None:
+                query = query.filter(prices.c.current_price <= max_price)
         
-        # ジャンルフィルター
+        # ジャンルフィルター（ビットマスク、語彙にないジャンルは該当なし）
         if filters.get('genre'):
-            query = query.filter(Game.genres.ilike(f'%{filters["genre"]}%'))
+            bit = genre_bit(filters['genre'])
+            query = query.filter(Game.genre_mask.op('&')(bit) != 0 if bit else false())
         
-        # プラットフォームフィルター（必要に応じて実装）
+        # プラットフォームフィルター
         if filters.get('platform'):
-            # プラットフォーム情報が追加されたら実装
-            pass
+            bit = platform_bit(filters['platform'])
+            query = query.filter(Game.platform_mask.op('&')(bit) != 0 if bit else false())
         
         return query
     
+    def _parse_price(self, value: Any) -> Optional[float]:
+        """価格フィルター値を数値に変換（空・不正な値はNone）"""
+        if value in (None, ''):
+            return None
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+    
     def _apply_sort(self, query, sort: str):
         """
         ソート条件をクエリに適用
@@ -106,22 +282,27 @@ class GameRepository:
         Returns:
             ソート適用後のクエリ
         """
-        # 価格ソートは現在のところ無効化（Priceテーブルとの結合が必要）
-        # TODO: 価格ソートを実装する場合はPriceテーブルとの結合を追加
+        # 価格ソートはゲームごとの現在の最安値で並べる（価格のないゲームは末尾）
         if sort == 'price_asc' or sort == 'price_desc':
-            # 価格ソートは無効化し、関連度順にフォールバック
-            return query.order_by(
-                desc(Game.steam_rating),
-                desc(Game.updated_at)
+            prices = self._current_price_subquery()
+            order = asc if sort == 'price_asc' else desc
+            return query.outerjoin(prices, prices.c.game_id == Game.id).order_by(
+                prices.c.current_price.is_(None),
+                order(prices.c.current_price),
+                asc(Game.id)
             )
+        # 値のないゲームはカタログスナップショットと同じく末尾（PostgreSQLの降順はNULLが先頭になるため明示）
         elif sort == 'release_date':
-            return query.order_by(desc(Game.release_date))
+            return query.order_by(desc(Game.release_date).nulls_last(), asc(Game.id))
         elif sort == 'title':
-            return query.order_by(asc(Game.title))
+            return query.order_by(asc(Game.title), asc(Game.id))
+        elif sort == 'title_desc':
+            return query.order_by(desc(Game.title), desc(Game.id))
         else:  # relevance (default)
             return query.order_by(
-                desc(Game.steam_rating),
-                desc(Game.updated_at)
+                desc(Game.steam_rating).nulls_last(),
+                desc(Game.updated_at).nulls_last(),
+                asc(Game.id)
             )
     
     def get_by_id(self, game_id: int) -> Optional[GameModel]:
@@ -136,6 +317,49 @@ class GameRepository:
         """
         return self.session.query(Game).filter_by(id=game_id).first()
     
+    def get_by_ids(self, game_ids: List[int]) -> List[GameModel]:
+        """
+        ID一覧でゲームを取得（主キーIN検索1回、指定順を維持）
+        
+        Args:
+            game_ids: ゲームIDのリスト
+            
+        Returns:
+            List[GameModel]: ゲーム一覧（存在しないIDは除外）
+        """
+        if not game_ids:
+            return []
+        
+        games = self.session.query(Game).filter(Game.id.in_(game_ids)).all()
+        games_by_id = {game.id: game for game in games}
+        return [games_by_id[game_id] for game_id in game_ids if game_id in games_by_id]
+    
+    def get_card_versions(self, game_ids: List[int]) -> Dict[int, str]:
+        """
+        ゲームカード表示のバージョンを取得（ゲーム・価格の最終更新日時から作成、集計クエリ1回）
+        
+        Args:
+            game_ids: ゲームIDのリスト
+            
+        Returns:
+            Dict[int, str]: ゲームIDごとのバージョン文字列（存在しないIDは含まない）
+        """
+        if not game_ids:
+            return {}
+        
+        rows = self.session.execute(
+            select(Game.id, Game.updated_at, func.max(Price.updated_at))
+            .outerjoin(Price, Price.game_id == Game.id)
+            .where(Game.id.in_(game_ids))
+            .group_by(Game.id, Game.updated_at)
+        )
+        versions = {}
+        for game_id, game_updated_at, price_updated_at in rows:
+            game_part = game_updated_at.timestamp() if game_updated_at else 0
+            price_part = price_updated_at.timestamp() if price_updated_at else 0
+            versions[game_id] = f'{game_part:.6f}-{price_part:.6f}'
+        return versions
+    
     def get_by_steam_appid(self, steam_appid: str) -> Optional[GameModel]:
         """
         Steam App IDでゲームを取得
@@ -148,6 +372,23 @@ class GameRepository:
         """
         return self.session.query(Game).filter_by(steam_appid=steam_appid).first()
     
+    def get_existing_steam_appids(self, steam_appids: List[Any]) -> set:
+        """
+        データベースに登録済みのSteam App IDを取得
+        
+        Args:
+            steam_appids: 確認するSteam App IDのリスト
+            
+        Returns:
+            set: 登録済みのSteam App ID（文字列）
+        """
+        appids = [str(appid) for appid in steam_appids if appid]
+        if not appids:
+            return set()
+        
+        rows = self.session.query(Game.steam_appid).filter(Game.steam_appid.in_(appids)).all()
+        return {steam_appid for (steam_appid,) in rows}
+    
     def save(self, game: GameModel) -> GameModel:
         """
         ゲーム情報を保存
@@ -160,6 +401,7 @@ class GameRepository:
         """
         self.session.add(game)
         self.session.flush()  # IDを取得するため
+        self._pending_search_invalidations.append(game)
         return game
     
     def update(self, game: GameModel, **kwargs) -> GameModel:
@@ -178,8 +420,46 @@ class GameRepository:
                 setattr(game, key, value)
         
         self.session.flush()
+        self._pending_search_invalidations.append(game)
         return game
     
+    def rebuild_title_index(self, batch_size: int = 500) -> int:
+        """
+        全ゲームの正規化タイトルとバイグラム索引を再作成
+        
+        通常の追加・更新ではORMイベントで索引が保守されるため、
+        正規化ルールの変更後や索引テーブル追加時の移行に使用します。
+        
+        Args:
+            batch_size: 1回のコミットで処理するゲーム数
+            
+        Returns:
+            int: 処理したゲーム数
+        """
+        processed = 0
+        last_id = 0
+        
+        while True:
+            games = self.session.query(Game).filter(Game.id > last_id).order_by(Game.id).limit(batch_size).all()
+            if not games:
+                break
+            
+            connection = self.session.connection()
+            for game in games:
+                normalized = self._normalize_title(game.title)
+                if game.normalized_title != normalized:
+                    # flush時にORMイベントで索引も再作成される
+                    game.normalized_title = normalized
+                else:
+                    index_game_title(connection, game.id, normalized)
+            
+            processed += len(games)
+            last_id = games[-1].id
+            self.session.commit()
+        
+        search_result_cache.clear()
+        return processed
+    
     def get_recent_games(self, limit: int = 10) -> List[GameModel]:
         """
         最近追加されたゲーム一覧を取得
@@ -195,6 +475,43 @@ class GameRepository:
         ).limit(limit).all()
     
 
+    def get_deal_rankings(self, scope: str = OVERALL_SCOPE, limit: int = 10) -> List[Tuple[DealRanking, GameModel]]:
+        """
+        作成済みのセールランキングを取得（(scope, rank) の主キー順に読むのみ）
+        
+        Args:
+            scope: 'all' またはジャンルコード
+            limit: 取得件数
+            
+        Returns:
+            List[Tuple[DealRanking, GameModel]]: 順位とゲームの組（順位順）
+        """
+        return self.session.query(DealRanking, Game).join(Game, Game.id == DealRanking.game_id).filter(
+            DealRanking.scope == scope
+        ).order_by(DealRanking.rank).limit(limit).all()
+    
+    def get_on_sale_games(self, limit: int = 10, min_discount: int = 1) -> List[GameModel]:
+        """
+        セール中のゲームを割引率の高い順に取得（ランキング未作成時・条件付きの一覧用）
+        
+        Args:
+            limit: 取得件数
+            min_discount: 最低割引率
+            
+        Returns:
+            List[GameModel]: ゲーム一覧
+        """
+        # (is_on_sale, discount_rate) の索引で該当する価格のみを読む
+        best_discounts = select(
+            Price.game_id, func.max(Price.discount_rate).label('discount_rate')
+        ).where(
+            Price.is_on_sale == True, Price.discount_rate >= min_discount
+        ).group_by(Price.game_id).subquery()
+        
+        return self.session.query(Game).join(best_discounts, best_discounts.c.game_id == Game.id).filter(
+            Game.is_active == True
+        ).order_by(desc(best_discounts.c.discount_rate), Game.id).limit(limit).all()
+    
     def save_steam_games_from_api(self, steam_games: List[Dict[str, Any]]) -> List[GameModel]:
         """
         Steam APIから取得したゲーム情報を一括保存
@@ -214,11 +531,11 @@ class GameRepository:
                     saved_games.append(saved_game)
             
             # 一括でコミット
-            self.session.commit()
+            self.commit()
             return saved_games
             
         except Exception as e:
-            self.session.rollback()
+            self.rollback()
             raise e
     
     def _save_single_steam_game(self, steam_game: Dict[str, Any]) -> Optional[GameModel]:
@@ -242,6 +559,11 @@ class GameRepository:
             # 既存チェック
             existing_game = self.get_by_steam_appid(steam_appid)
             
+            genres = steam_game.get('genres', [])
+            genres_str = ','.join(genres) if isinstance(genres, list) else str(genres) if genres else ''
+            platforms = steam_game.get('platforms', [])
+            platforms_str = ','.join(platforms) if isinstance(platforms, list) else str(platforms) if platforms else ''
+            
             if existing_game:
                 # 既存ゲームの更新
                 update_data = {
@@ -253,15 +575,14 @@ class GameRepository:
                     'steam_url': steam_game.get('steam_url') or f"https://store.steampowered.com/app/{steam_appid}/",
                     'steam_rating': steam_game.get('steam_rating') or existing_game.steam_rating,
                     'metacritic_score': steam_game.get('metacritic_score') or existing_game.metacritic_score,
+                    'genres': genres_str or existing_game.genres,
+                    'platforms': platforms_str or existing_game.platforms,
                     'updated_at': datetime.now(timezone.utc)
                 }
                 
                 return self.update(existing_game, **update_data)
             else:
                 # 新規ゲームの作成
-                genres = steam_game.get('genres', [])
-                genres_str = ','.join(genres) if isinstance(genres, list) else str(genres) if genres else ''
-                
                 # 必須フィールドのデフォルト値設定
                 title = steam_game.get('title')
                 if not title:
@@ -276,6 +597,7 @@ class GameRepository:
                     'developer': steam_game.get('developer') or '不明',
                     'publisher': steam_game.get('publisher') or '不明',
                     'genres': genres_str,
+                    'platforms': platforms_str,
                     'image_url': steam_game.get('image_url') or f"https://cdn.akamai.steamstatic.com/steam/apps/{steam_appid}/header.jpg",
                     'steam_url': steam_game.get('steam_url') or f"https://store.steampowered.com/app/{steam_appid}/",
                     'steam_rating': steam_game.get('steam_rating'),
@@ -299,18 +621,29 @@ class GameRepository:
         Returns:
             str: 正規化されたタイトル
         """
-        import re
-        # 英数字以外を除去し、小文字に変換
-        normalized = re.sub(r'[^\w\s]', '', title.lower())
-        return ' '.join(normalized.split())
+        # 全角・半角、カタカナ・ひらがなの表記ゆれを畳み込み、記号を除去
+        return normalize_text(title)
 
     def commit(self):
         """トランザクションをコミット"""
         self.session.commit()
+        self._flush_search_invalidations()
     
     def rollback(self):
         """トランザクションをロールバック"""
         self.session.rollback()
+        self._pending_search_invalidations = []
+    
+    def _flush_search_invalidations(self) -> None:
+        """
+        コミット済みの追加・更新ゲームにマッチする検索キャッシュを無効化
+        
+        コミット前に無効化すると、並行リクエストが古い結果を再キャッシュし得るため
+        コミット後に実行します。
+        """
+        games, self._pending_search_invalidations = self._pending_search_invalidations, []
+        for game in games:
+            search_result_cache.invalidate_for_game(game)
 
     def format_game_for_web_template(self, game_data, price_repository=None) -> Dict[str, Any]:
         """
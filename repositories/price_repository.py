@@ -1,11 +1,12 @@
 
 DEFAULT_MAX_AGE_HOURS = 1
+DEFAULT_HISTORY_DAYS = 365
 
 from typing import Optional, List, Dict, Any
 from datetime import datetime, timezone, timedelta
 from decimal import Decimal
 from sqlalchemy.orm import Session
-from models import db, Price, User, Game
+from models import db, Price, PriceHistory, User, Game, GamePriceStats
 
 class PriceRepository:
     """
@@ -15,6 +16,8 @@ class PriceRepository:
         self.session = session or db.session
         # Steam APIサービスの遅延インポート（循環参照回避）
         self._steam_service = None
+        # コミット後にライブ配信する価格（コミット前に配信すると未確定の価格が流れるため）
+        self._pending_price_events: List[Price] = []
 
     @property
     def steam_service(self):
@@ -99,6 +102,7 @@ class PriceRepository:
                             setattr(steam_price, 'discount_rate', price_data.get('discount_percent', 0))
                             setattr(steam_price, 'is_on_sale', price_data.get('discount_percent', 0) > 0)
                             setattr(steam_price, 'updated_at', datetime.now(timezone.utc))
+                            self._pending_price_events.append(steam_price)
                             print(f"[DEBUG] Steam価格データ更新: game_id={game_id}, price=¥{price_data.get('price')}")
                         else:
                             # 新規データを作成
@@ -113,17 +117,18 @@ class PriceRepository:
                             
                             self.session.add(new_price)
                             existing_prices.append(new_price)
+                            self._pending_price_events.append(new_price)
                             print(f"[DEBUG] Steam価格データ新規作成: game_id={game_id}, price=¥{price_data.get('price')}")
                         
                         # 変更をコミット
-                        self.session.commit()
+                        self.commit()
                         
                     else:
                         print(f"[DEBUG] Steam APIから有効な価格データを取得できませんでした: game_id={game_id}")
                         
                 except Exception as e:
                     print(f"[DEBUG] Steam価格取得エラー: game_id={game_id}, error={e}")
-                    self.session.rollback()
+                    self.rollback()
             else:
                 print(f"[DEBUG] Steam App IDが設定されていません: game_id={game_id}")
         else:
@@ -202,9 +207,41 @@ class PriceRepository:
         lowest_price = min(formatted_prices, key=lambda p: p['price'])
         return lowest_price
 
+    def get_price_stats(self, game_id: int) -> List[Dict[str, Any]]:
+        """
+        ゲームのストアごとの価格統計を取得（`flask compute-price-stats` で集計済みのもの）
+        
+        Args:
+            game_id: ゲームID
+            
+        Returns:
+            List[Dict[str, Any]]: ストアごとの価格統計（未集計の場合は空リスト）
+        """
+        stats = self.session.query(GamePriceStats).filter_by(game_id=game_id).order_by(GamePriceStats.store).all()
+        return [stat.to_dict() for stat in stats]
+
+    def get_price_history(self, game_id: int, days: int = DEFAULT_HISTORY_DAYS) -> List[Dict[str, Any]]:
+        """
+        ゲームの記録済みの価格履歴を取得（全ストア、記録日時順）
+        
+        Args:
+            game_id: ゲームID
+            days: 取得する期間（日数）
+            
+        Returns:
+            List[Dict[str, Any]]: 価格履歴（記録がない場合は空リスト）
+        """
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+        history = self.session.query(PriceHistory).filter(
+            PriceHistory.game_id == game_id,
+            PriceHistory.recorded_at >= since
+        ).order_by(PriceHistory.recorded_at, PriceHistory.id).all()
+        return [row.to_dict() for row in history]
+
     def save(self, price: Price) -> Price:
         self.session.add(price)
         self.session.flush()
+        self._pending_price_events.append(price)
         print(f"[DEBUG] save: store={price.store}, price={price.get_current_price()}, game_id={price.game_id}")
         return price
 
@@ -218,9 +255,32 @@ class PriceRepository:
         return users
 
     def commit(self):
+        # コミットで属性が失効する前にイベント内容を確定させる（再読み込みのSELECTを避ける）
+        from services.price_events import build_price_event
+        events = [build_price_event(price) for price in self._pending_price_events]
+        self._pending_price_events = []
+        # ユーザー統計・価格統計の再集計はアウトボックスの stats 購読側（refresh_price_rollups）が行う
         self.session.commit()
         print("[DEBUG] commit: transaction committed")
+        self._publish_price_events(events)
 
     def rollback(self):
         self.session.rollback()
-        print("[DEBUG] rollback: transaction rolled back") 
\ No newline at end of file
+        self._pending_price_events = []
+        print("[DEBUG] rollback: transaction rolled back")
+
+    def _publish_price_events(self, events: List[Dict[str, Any]]) -> None:
+        """
+        コミット済みの価格変更をライブ配信用のPub/Subに発行（中継が有効であれば他のプロセスにも流す）し、
+        価格に依存する検索キャッシュを無効化
+
+        Args:
+            events: 価格変更イベント
+        """
+        if not events:
+            return
+        from repositories.search_cache import search_result_cache
+        from services.price_events import price_event_relay
+        # 価格で絞り込む・並べ替える検索結果とファセットを失効させる
+        search_result_cache.invalidate_prices()
+        price_event_relay.publish(events) 
\ No newline at end of file
@@ -0,0 +1,261 @@
+"""
+Search Result Cache
+
+ゲーム検索結果のキャッシュ
+正規化したクエリ・フィルター・ソート・ページをキーに、
+並び順付きのゲームIDと総件数のみを保存します（整形済みデータは保存しない）。
+
+無効化は検索語ごとのバージョン番号で行います。ゲームが追加・更新されると、
+そのゲームのタイトル等に含まれる検索語のバージョンを進め、古いエントリを参照不能にします。
+価格で絞り込む・並べ替えるエントリとファセットは、価格の変更で進む共通の価格バージョンもキーに含めます。
+"""
+
+import hashlib
+import json
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from extensions import cache
+from text_normalizer import fold_text
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_TIMEOUT = 300
+
+# 検索語レジストリに保持する最大語数
+MAX_TRACKED_TERMS = 2000
+
+_TERMS_KEY = 'search:terms'
+_VERSION_KEY = 'search:ver:{digest}'
+_PRICE_VERSION_KEY = 'search:ver:prices'
+_ENTRY_KEY = 'search:res:{digest}'
+
+
+def normalize_query(query: Optional[str]) -> str:
+    """
+    検索クエリを正規化（キャッシュキー・無効化判定用）
+
+    Args:
+        query: 検索クエリ
+
+    Returns:
+        str: 表記ゆれ（全角・半角、カタカナ・ひらがな、大文字・小文字）を畳み込み、空白正規化したクエリ
+    """
+    if not query:
+        return ''
+    return ' '.join(fold_text(query).split())
+
+
+def _version_key(term: str) -> str:
+    """検索語のバージョン番号を保持するキー（キャッシュバックエンドに安全な形式）"""
+    return _VERSION_KEY.format(digest=hashlib.sha1(term.encode('utf-8')).hexdigest())
+
+
+def _normalize_filters(filters: Optional[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    """空の値を除いたフィルターをキー順に並べる"""
+    if not filters:
+        return []
+    return sorted((str(k), str(v).strip()) for k, v in filters.items() if v not in (None, ''))
+
+
+def _depends_on_prices(filters: Optional[Dict[str, Any]]) -> bool:
+    """価格による絞り込み・並べ替え、またはファセット（価格帯の件数）のエントリか"""
+    if not filters:
+        return False
+    if filters.get('__facets__') or filters.get('min_price') not in (None, '') \
+            or filters.get('max_price') not in (None, ''):
+        return True
+    return str(filters.get('sort') or '').startswith('price')
+
+
+def _facet_filters(filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """ファセット用のキー（ソートを除き、結果エントリと衝突しない印を付ける）"""
+    facet_filters = {k: v for k, v in (filters or {}).items() if k != 'sort'}
+    facet_filters['__facets__'] = 1
+    return facet_filters
+
+
+class SearchResultCache:
+    """検索結果キャッシュ"""
+
+    def __init__(self, timeout: Optional[int] = None):
+        """
+        初期化
+
+        Args:
+            timeout: エントリの有効期間（秒）、Noneの場合は設定ファイルから取得
+        """
+        self.timeout = timeout
+
+    def _get_timeout(self) -> int:
+        if self.timeout is not None:
+            return self.timeout
+        try:
+            from flask import current_app
+            return int(current_app.config.get('SEARCH_CACHE_TIMEOUT', DEFAULT_TIMEOUT))
+        except RuntimeError:
+            return DEFAULT_TIMEOUT
+
+    def _make_key(self, term: str, filters: Optional[Dict[str, Any]], page: int, per_page: int) -> str:
+        version = cache.get(_version_key(term)) or 0
+        price_version = cache.get(_PRICE_VERSION_KEY) or 0 if _depends_on_prices(filters) else None
+        payload = json.dumps([term, version, price_version, _normalize_filters(filters), page, per_page],
+                             ensure_ascii=False)
+        digest = hashlib.sha1(payload.encode('utf-8')).hexdigest()
+        return _ENTRY_KEY.format(digest=digest)
+
+    def get(self, query: Optional[str], filters: Optional[Dict[str, Any]],
+            page: int, per_page: int) -> Optional[Tuple[List[int], int]]:
+        """
+        キャッシュ済みの検索結果を取得
+
+        Args:
+            query: 検索クエリ
+            filters: フィルター条件（sortを含む）
+            page: ページ番号
+            per_page: 1ページあたりの件数
+
+        Returns:
+            Optional[Tuple[List[int], int]]: (ゲームID一覧, 総件数)、未キャッシュの場合はNone
+        """
+        try:
+            entry = cache.get(self._make_key(normalize_query(query), filters, page, per_page))
+        except Exception as e:
+            logger.warning(f"検索キャッシュ取得エラー: {e}")
+            return None
+
+        if not entry:
+            return None
+        return entry['ids'], entry['total']
+
+    def set(self, query: Optional[str], filters: Optional[Dict[str, Any]], page: int, per_page: int,
+            game_ids: List[int], total_count: int) -> None:
+        """
+        検索結果をキャッシュに保存
+
+        Args:
+            query: 検索クエリ
+            filters: フィルター条件（sortを含む）
+            page: ページ番号
+            per_page: 1ページあたりの件数
+            game_ids: 並び順付きゲームID一覧
+            total_count: 総件数
+        """
+        term = normalize_query(query)
+        try:
+            self._track_term(term)
+            cache.set(
+                self._make_key(term, filters, page, per_page),
+                {'ids': list(game_ids), 'total': total_count},
+                timeout=self._get_timeout()
+            )
+        except Exception as e:
+            logger.warning(f"検索キャッシュ保存エラー: {e}")
+
+    def get_facets(self, query: Optional[str], filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Dict[str, int]]]:
+        """
+        キャッシュ済みのファセット件数を取得（ページ・ソートに依存しない）
+        
+        Args:
+            query: 検索クエリ
+            filters: フィルター条件
+            
+        Returns:
+            Optional[Dict[str, Dict[str, int]]]: ファセット件数、未キャッシュの場合はNone
+        """
+        try:
+            return cache.get(self._make_key(normalize_query(query), _facet_filters(filters), 0, 0))
+        except Exception as e:
+            logger.warning(f"検索キャッシュ取得エラー: {e}")
+            return None
+    
+    def set_facets(self, query: Optional[str], filters: Optional[Dict[str, Any]],
+                   facets: Dict[str, Dict[str, int]]) -> None:
+        """
+        ファセット件数をキャッシュに保存
+        
+        Args:
+            query: 検索クエリ
+            filters: フィルター条件
+            facets: ファセット件数
+        """
+        term = normalize_query(query)
+        try:
+            self._track_term(term)
+            cache.set(self._make_key(term, _facet_filters(filters), 0, 0), facets, timeout=self._get_timeout())
+        except Exception as e:
+            logger.warning(f"検索キャッシュ保存エラー: {e}")
+    
+    def invalidate_for_texts(self, texts: Iterable[Optional[str]]) -> int:
+        """
+        指定テキスト（タイトル・開発者等）にマッチする検索語のキャッシュを無効化
+
+        検索語が空（フィルターのみの検索）のエントリは常に無効化されます。
+
+        Args:
+            texts: 追加・更新されたゲームの検索対象テキスト
+
+        Returns:
+            int: 無効化した検索語の数
+        """
+        haystack = '\n'.join(normalize_query(text) for text in texts if text)
+        try:
+            terms = cache.get(_TERMS_KEY) or []
+            matched = [term for term in terms if term in haystack]
+            for term in matched:
+                self._bump_version(term)
+        except Exception as e:
+            logger.warning(f"検索キャッシュ無効化エラー: {e}")
+            return 0
+
+        if matched:
+            logger.debug(f"検索キャッシュ無効化: {matched}")
+        return len(matched)
+
+    def invalidate_for_game(self, game: Any) -> int:
+        """
+        ゲームの追加・更新に伴う無効化
+
+        Args:
+            game: ゲーム情報
+
+        Returns:
+            int: 無効化した検索語の数
+        """
+        return self.invalidate_for_texts([
+            getattr(game, 'title', None),
+            getattr(game, 'normalized_title', None),
+            getattr(game, 'developer', None),
+            getattr(game, 'publisher', None),
+        ])
+
+    def invalidate_prices(self) -> None:
+        """価格の変更に伴い、価格に依存するエントリ（価格の絞り込み・並べ替え・ファセット）を無効化"""
+        try:
+            cache.set(_PRICE_VERSION_KEY, (cache.get(_PRICE_VERSION_KEY) or 0) + 1, timeout=0)
+        except Exception as e:
+            logger.warning(f"検索キャッシュ無効化エラー: {e}")
+
+    def clear(self) -> None:
+        """全ての検索語のキャッシュを無効化"""
+        for term in cache.get(_TERMS_KEY) or []:
+            self._bump_version(term)
+
+    def _track_term(self, term: str) -> None:
+        terms = cache.get(_TERMS_KEY) or []
+        if term in terms:
+            return
+        terms.append(term)
+        # 上限を超えた古い検索語は、追跡を外す前にバージョンを進めて確実に失効させる
+        while len(terms) > MAX_TRACKED_TERMS:
+            self._bump_version(terms.pop(0))
+        cache.set(_TERMS_KEY, terms, timeout=0)
+
+    def _bump_version(self, term: str) -> None:
+        key = _version_key(term)
+        cache.set(key, (cache.get(key) or 0) + 1, timeout=0)
+
+
+# プロセス共通インスタンス
+search_result_cache = SearchResultCache()
@@ -1,6 +1,30 @@
 from typing import Optional, List
-from sqlalchemy.orm import Session
-from models import db, User, Favorite, Game
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import and_, func, select
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session, joinedload
+from models import db, User, Favorite, Game, Price, PriceHistory, UserStats
+from models.price import current_price_expression
+
+# 価格変動の比較対象（何日前の価格と比べるか）
+PRICE_DELTA_DAYS = 7
+
+
+def price_change_percent(current_price, previous_price) -> Optional[float]:
+    """
+    過去の価格からの変動率（%）を計算
+    
+    Args:
+        current_price: 現在の価格
+        previous_price: 比較する過去の価格
+        
+    Returns:
+        Optional[float]: 変動率（小数第1位まで、比較できない・変動なしの場合はNone）
+    """
+    if current_price is None or not previous_price or current_price == previous_price:
+        return None
+    return round(float((current_price - previous_price) / previous_price) * 100, 1)
+
 
 class UserRepository:
     """ユーザー情報のリポジトリクラス"""
@@ -42,6 +66,126 @@ class UserRepository:
             Favorite.user_id == user_id
         ).order_by(db.desc(Favorite.created_at)).all()
 
+    def count_user_favorites(self, user_id: int) -> int:
+        """
+        ユーザーのお気に入り件数を取得
+        
+        Args:
+            user_id: ユーザーID
+            
+        Returns:
+            int: お気に入り件数
+        """
+        return self.session.query(func.count(Favorite.id)).filter(Favorite.user_id == user_id).scalar() or 0
+
+    def get_favorites_with_prices(
+        self,
+        user_id: int,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        delta_days: int = PRICE_DELTA_DAYS
+    ) -> List[Row]:
+        """
+        お気に入りをゲーム・現在の最安値・価格変動と合わせて1回のクエリで取得
+        
+        現在の最安値は prices をゲームごとの ROW_NUMBER で、
+        delta_days 日前の最安値は price_history のストアごとの最終記録から求めます。
+        
+        Args:
+            user_id: ユーザーID
+            limit: 取得件数（Noneの場合は全件）
+            offset: 取得開始位置
+            delta_days: 比較する過去の日数
+            
+        Returns:
+            List[Row]: Favorite, Game, lowest_price, lowest_store, regular_price,
+                discount_rate, is_on_sale, previous_price を持つ行（お気に入り登録の新しい順）
+        """
+        favorite_game_ids = select(Favorite.game_id).where(Favorite.user_id == user_id)
+        cutoff = datetime.now(timezone.utc) - timedelta(days=delta_days)
+
+        # 現在の最安値（ゲームごとに有効価格の安い順で1行目）
+        current_price = current_price_expression(Price)
+        ranked_prices = select(
+            Price.game_id,
+            Price.store,
+            Price.regular_price,
+            Price.discount_rate,
+            Price.is_on_sale,
+            current_price.label('price'),
+            func.row_number().over(
+                partition_by=Price.game_id, order_by=(current_price.asc(), Price.store)
+            ).label('position'),
+        ).where(Price.game_id.in_(favorite_game_ids), current_price.isnot(None)).subquery()
+
+        # delta_days 日前の最安値（ストアごとに基準日以前の最終記録を取り、その最安値）
+        ranked_history = select(
+            PriceHistory.game_id,
+            current_price_expression(PriceHistory).label('price'),
+            func.row_number().over(
+                partition_by=(PriceHistory.game_id, PriceHistory.store),
+                order_by=(PriceHistory.recorded_at.desc(), PriceHistory.id.desc())
+            ).label('position'),
+        ).where(PriceHistory.game_id.in_(favorite_game_ids), PriceHistory.recorded_at <= cutoff).subquery()
+        previous_prices = select(
+            ranked_history.c.game_id, func.min(ranked_history.c.price).label('price')
+        ).where(ranked_history.c.position == 1).group_by(ranked_history.c.game_id).subquery()
+
+        query = self.session.query(
+            Favorite,
+            Game,
+            ranked_prices.c.price.label('lowest_price'),
+            ranked_prices.c.store.label('lowest_store'),
+            ranked_prices.c.regular_price,
+            ranked_prices.c.discount_rate,
+            ranked_prices.c.is_on_sale,
+            previous_prices.c.price.label('previous_price'),
+        ).join(Game, Game.id == Favorite.game_id).outerjoin(
+            ranked_prices, and_(ranked_prices.c.game_id == Favorite.game_id, ranked_prices.c.position == 1)
+        ).outerjoin(
+            previous_prices, previous_prices.c.game_id == Favorite.game_id
+        ).filter(
+            Favorite.user_id == user_id
+        ).order_by(db.desc(Favorite.created_at), db.desc(Favorite.id))
+
+        if offset:
+            query = query.offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+
+    def get_user_stats(self, user_id: int) -> UserStats:
+        """
+        ユーザー統計（user_stats）を取得
+        
+        Args:
+            user_id: ユーザーID
+            
+        Returns:
+            UserStats: ユーザー統計（未集計の場合はセッションに追加しない0件の統計）
+        """
+        stats = self.session.get(UserStats, user_id)
+        if stats is None:
+            stats = UserStats(user_id=user_id, favorites_count=0, total_savings=0, deals_found=0)
+        return stats
+
+    def get_recent_favorites(self, user_id: int, since: datetime, limit: int) -> List[Favorite]:
+        """
+        指定日時以降に追加したお気に入りをゲームと合わせて取得
+        
+        Args:
+            user_id: ユーザーID
+            since: この日時以降に追加したもの
+            limit: 最大取得件数
+            
+        Returns:
+            List[Favorite]: お気に入り一覧（新しい順）
+        """
+        return self.session.query(Favorite).options(joinedload(Favorite.game)).filter(
+            Favorite.user_id == user_id,
+            Favorite.created_at >= since
+        ).order_by(db.desc(Favorite.created_at)).limit(limit).all()
+
     def is_game_favorited(self, user_id: int, game_id: int) -> bool:
         """
         ゲームがユーザーのお気に入りに追加されているかチェック
@@ -80,6 +224,7 @@ class UserRepository:
         )
         self.session.add(favorite)
         self.session.flush()
+        self.refresh_user_stats(user_id)
         return favorite
 
     def remove_favorite(self, user_id: int, game_id: int) -> bool:
@@ -101,9 +246,15 @@ class UserRepository:
         if favorite:
             self.session.delete(favorite)
             self.session.flush()
+            self.refresh_user_stats(user_id)
             return True
         return False
 
+    def refresh_user_stats(self, user_id: int) -> None:
+        """お気に入り・価格アラートの変更をユーザー統計に反映（同じトランザクション内）"""
+        from services.user_stats import refresh_user_stats
+        refresh_user_stats(self.session.connection(), [user_id])
+
     def commit(self):
         self.session.commit()
 
@@ -9,8 +9,6 @@ from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timezone
 
-# サービスクラス
-from .game_search_service import GameSearchService
 import logging
 from flask import current_app
 from sqlalchemy.exc import SQLAlchemyError
@@ -337,6 +335,19 @@ def sanitize_string(text: str, max_length: int = None) -> str:
     return sanitized
 
 
+def __getattr__(name: str) -> Any:
+    """
+    サービスクラスの遅延読み込み
+
+    `from services import GameSearchService` の場合のみ読み込み、
+    `services.price_sweep` などのサブモジュールの読み込みで検索サービス（Steam APIクライアントなど）を読み込まないようにします。
+    """
+    if name == 'GameSearchService':
+        from .game_search_service import GameSearchService
+        return GameSearchService
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 __all__ = [
     'BaseService',
     'GameSearchService',
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Background Tasks
+
+リクエスト処理から切り離して実行するプロセス内バックグラウンドタスク。
+スレッドプールで実行し、タスク内ではアプリケーションコンテキストを再現します。
+"""
+
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_MAX_WORKERS = 4
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """プロセス共通のスレッドプールを取得（初回呼び出し時に生成）"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                max_workers = int(current_app.config.get('BACKGROUND_MAX_WORKERS', DEFAULT_MAX_WORKERS))
+                _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='gamebargain-bg')
+    return _executor
+
+
+def submit_background_task(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+    """
+    バックグラウンドでタスクを実行
+
+    アプリケーションコンテキスト内から呼び出してください。
+    タスクは同じアプリケーションの新しいアプリケーションコンテキストで実行され、
+    終了時にDBセッションは破棄されます。
+
+    Args:
+        fn: 実行する関数
+        *args: 関数に渡す位置引数
+        **kwargs: 関数に渡すキーワード引数
+
+    Returns:
+        Future: 実行結果
+    """
+    app = current_app._get_current_object()
+
+    def run() -> Any:
+        with app.app_context():
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                logger.error(f"バックグラウンドタスクエラー ({getattr(fn, '__name__', fn)}): {e}")
+                raise
+
+    return _get_executor().submit(run)
+
+
+def shutdown_background_tasks(wait: bool = True) -> None:
+    """スレッドプールを停止（テストやプロセス終了時用）"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+        _executor = None
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""Catalog Export
+
+アクティブなゲームと現在価格のNDJSONエクスポート。
+ゲームと価格を結合した1本のクエリをサーバーサイドカーソルで少しずつ読み、
+ゲーム単位にまとめて1行ずつ出力するため、件数に関わらずメモリ使用量は一定です。
+"""
+
+import gzip
+import json
+import logging
+import zlib
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from itertools import groupby
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from sqlalchemy import or_, select
+
+from models import db, Game, Price
+from models.taxonomy import split_values
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_BATCH_SIZE = 1000
+
+# 圧縮済みデータをこのサイズ以上たまったら出力する
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_GAME_COLUMNS = (
+    Game.id, Game.title, Game.steam_appid, Game.epic_game_id, Game.developer, Game.publisher,
+    Game.release_date, Game.genres, Game.platforms, Game.steam_rating, Game.metacritic_score,
+    Game.image_url, Game.steam_url, Game.updated_at,
+)
+_PRICE_COLUMNS = (
+    Price.store, Price.regular_price, Price.sale_price, Price.discount_rate,
+    Price.currency, Price.is_on_sale, Price.updated_at.label('price_updated_at'),
+)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def parse_updated_since(value: Optional[str]) -> Optional[datetime]:
+    """
+    差分取得の基準日時（ISO 8601）を解析
+
+    Args:
+        value: ISO 8601形式の日時文字列（タイムゾーンなしはUTCとみなす）
+
+    Returns:
+        Optional[datetime]: UTCのタイムゾーンなし日時（未指定の場合はNone）
+
+    Raises:
+        ValueError: 日時として解析できない場合
+    """
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _build_export_query(updated_since: Optional[datetime]):
+    """ゲームと価格を結合したエクスポート用クエリ（ゲームID順）"""
+    stmt = (
+        select(*_GAME_COLUMNS, *_PRICE_COLUMNS)
+        .outerjoin(Price, Price.game_id == Game.id)
+        .where(Game.is_active == True)
+        .order_by(Game.id, Price.store)
+    )
+    if updated_since is not None:
+        # ゲーム自体または価格のいずれかが更新されたゲーム（価格は全ストア分を出力）
+        updated_prices = select(Price.game_id).where(Price.updated_at >= updated_since)
+        stmt = stmt.where(or_(Game.updated_at >= updated_since, Game.id.in_(updated_prices)))
+    return stmt
+
+
+def _build_record(rows: list) -> Dict[str, Any]:
+    """同一ゲームの行（価格ごと）から1件分のレコードを作成"""
+    game = rows[0]
+    prices = []
+    for row in rows:
+        if row.store is None:
+            continue
+        on_sale = bool(row.is_on_sale) and row.sale_price is not None
+        prices.append({
+            'store': row.store,
+            'current_price': row.sale_price if on_sale else row.regular_price,
+            'regular_price': row.regular_price,
+            'sale_price': row.sale_price,
+            'discount_rate': row.discount_rate or 0,
+            'is_on_sale': bool(row.is_on_sale),
+            'currency': row.currency or 'JPY',
+            'updated_at': row.price_updated_at,
+        })
+
+    priced = [price for price in prices if price['current_price'] is not None]
+    lowest = min(priced, key=lambda price: price['current_price']) if priced else None
+
+    return {
+        'id': game.id,
+        'title': game.title,
+        'steam_appid': game.steam_appid,
+        'epic_game_id': game.epic_game_id,
+        'developer': game.developer,
+        'publisher': game.publisher,
+        'release_date': game.release_date,
+        'genres': split_values(game.genres),
+        'platforms': split_values(game.platforms),
+        'steam_rating': game.steam_rating,
+        'metacritic_score': game.metacritic_score,
+        'image_url': game.image_url,
+        'steam_url': game.steam_url,
+        'updated_at': game.updated_at,
+        'lowest_price': lowest['current_price'] if lowest else None,
+        'lowest_store': lowest['store'] if lowest else None,
+        'prices': prices,
+    }
+
+
+def iter_catalog_records(updated_since: Optional[datetime] = None,
+                         batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    アクティブなゲームと価格をゲーム単位で順に取得
+
+    Args:
+        updated_since: 指定した日時以降にゲームまたは価格が更新されたゲームのみ（差分取得用）
+        batch_size: サーバーサイドカーソルから一度に読み込む行数
+
+    Returns:
+        Iterator[Dict[str, Any]]: ゲームごとのレコード（ゲームID順）
+    """
+    result = db.session.execute(
+        _build_export_query(updated_since).execution_options(stream_results=True, yield_per=batch_size)
+    )
+    try:
+        for _, rows in groupby(result, key=lambda row: row.id):
+            yield _build_record(list(rows))
+    finally:
+        result.close()
+
+
+def iter_ndjson(records: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """
+    レコードをNDJSON（1行1レコード）に変換
+
+    Args:
+        records: レコード
+
+    Returns:
+        Iterator[bytes]: 改行付きのJSON行
+    """
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False, default=_json_default).encode('utf-8') + b'\n'
+
+
+def iter_gzip(chunks: Iterable[bytes], level: int = 6, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    バイト列をgzip形式で逐次圧縮
+
+    Args:
+        chunks: 圧縮前のバイト列
+        level: 圧縮レベル
+        chunk_size: 圧縮済みデータをまとめて出力するサイズ
+
+    Returns:
+        Iterator[bytes]: gzip形式の圧縮データ
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += compressor.compress(chunk)
+        if len(buffer) >= chunk_size:
+            yield bytes(buffer)
+            buffer.clear()
+    buffer += compressor.flush()
+    if buffer:
+        yield bytes(buffer)
+
+
+def export_catalog(path: str, updated_since: Optional[datetime] = None, compress: bool = True,
+                   batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """
+    カタログをNDJSONファイルに書き出す
+
+    Args:
+        path: 出力先のパス
+        updated_since: 指定した日時以降に更新されたゲームのみ
+        compress: Trueの場合gzip圧縮する
+        batch_size: サーバーサイドカーソルから一度に読み込む行数
+
+    Returns:
+        int: 書き出したゲーム数
+    """
+    count = 0
+    opener = gzip.open if compress else open
+    with opener(path, 'wb') as f:
+        for line in iter_ndjson(iter_catalog_records(updated_since, batch_size)):
+            f.write(line)
+            count += 1
+    logger.info(f"カタログをエクスポートしました: {count}件 -> {path}")
+    return count
@@ -0,0 +1,558 @@
+# -*- coding: utf-8 -*-
+"""Catalog Import
+
+Steam appdetails のダンプ（NDJSON / CSV）の一括取り込み。
+解析はプロセスプールで並列に行い、結果を一時的なステージングテーブルへ
+executemany（PostgreSQL では COPY）で書き込んだ後、games / prices へ
+集合演算の UPDATE / INSERT ... SELECT でまとめて反映します。
+1件ずつORMで保存する場合と異なり、行数に関わらず反映のSQLは数回で済みます。
+"""
+
+import csv
+import gzip
+import io
+import json
+import logging
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import (
+    Boolean, Column, Date, DECIMAL, Integer, MetaData, String, Table, Text,
+    and_, exists, func, insert, literal, or_, select, update,
+)
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import Select
+
+from models import db, Game, Price, GameTitleBigram, PriceHistory
+from models.price_history import TRACKED_PRICE_FIELDS
+from models.price_outbox import build_outbox_payload, enqueue_price_events
+from models.taxonomy import genre_mask, platform_mask, split_values
+from text_normalizer import normalize_text, title_bigrams
+from services.user_stats import refresh_user_stats_for_games
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_BATCH_SIZE = 1000
+
+# プロセスプールへ1回に渡す行数
+DEFAULT_CHUNK_SIZE = 500
+
+FORMATS = ('ndjson', 'csv')
+
+# 読み込み中の進捗を通知する間隔（秒）
+PROGRESS_INTERVAL = 1.0
+
+# Steam APIのリリース日の表記（steam_service と同じ）
+_RELEASE_DATE_FORMATS = ('%d %b, %Y', '%b %d, %Y', '%b %Y', '%Y')
+
+# games へ反映する列（ステージングテーブルと同名）
+_GAME_FIELDS = (
+    'title', 'normalized_title', 'developer', 'publisher', 'description', 'genres', 'platforms',
+    'genre_mask', 'platform_mask', 'release_date', 'image_url', 'steam_url', 'metacritic_score',
+)
+_PRICE_FIELDS = ('regular_price', 'sale_price', 'discount_rate', 'is_on_sale', 'currency')
+
+_STAGING_COLUMNS = (
+    ('steam_appid', String(20)),
+    ('title', String(200)),
+    ('normalized_title', String(200)),
+    ('developer', String(100)),
+    ('publisher', String(100)),
+    ('description', Text),
+    ('genres', Text),
+    ('platforms', Text),
+    ('genre_mask', Integer),
+    ('platform_mask', Integer),
+    ('release_date', Date),
+    ('image_url', String(255)),
+    ('steam_url', String(500)),
+    ('metacritic_score', Integer),
+    ('regular_price', DECIMAL(10, 2)),
+    ('sale_price', DECIMAL(10, 2)),
+    ('discount_rate', Integer),
+    ('is_on_sale', Boolean),
+    ('currency', String(3)),
+)
+STAGING_FIELDS = tuple(name for name, _ in _STAGING_COLUMNS)
+
+
+ProgressCallback = Callable[[str, int, float], None]
+
+
+def _parse_release_date(release_data: Any) -> Optional[date]:
+    """リリース日（{"date": "10 Dec, 2020"} または文字列）を日付に変換"""
+    value = release_data.get('date') if isinstance(release_data, dict) else release_data
+    if not value:
+        return None
+    value = str(value).strip()
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        pass
+    for fmt in _RELEASE_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _cents(value: Any) -> Optional[Decimal]:
+    """Steam APIの価格（最小通貨単位の整数）を金額に変換"""
+    if value in (None, ''):
+        return None
+    return Decimal(int(value)) / 100
+
+
+def _names(value: Any, key: str = 'description') -> List[str]:
+    """[{"description": ...}] / リスト / カンマ区切り文字列から名前の一覧を取得"""
+    if isinstance(value, list):
+        return [str(item.get(key) if isinstance(item, dict) else item).strip() for item in value if item]
+    return split_values(value)
+
+
+def _platform_names(value: Any) -> List[str]:
+    """{"windows": true, ...} または名前の一覧から対応プラットフォームを取得"""
+    if isinstance(value, dict):
+        return [name for name, supported in value.items() if supported]
+    return _names(value)
+
+
+def _truncate(value: Optional[str], length: int) -> Optional[str]:
+    return value[:length] if value else None
+
+
+def _unwrap(record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """appdetails の応答形式（{"<appid>": {"success": ..., "data": {...}}}）からデータ部分を取り出す"""
+    if len(record) == 1:
+        (wrapper,) = record.values()
+        if isinstance(wrapper, dict) and 'success' in wrapper:
+            return wrapper.get('data') if wrapper.get('success') else None
+    if isinstance(record.get('data'), dict):
+        return record['data']
+    return record
+
+
+def _csv_to_appdetails(row: Dict[str, Any]) -> Dict[str, Any]:
+    """CSVの1行（appdetails の主要項目を平坦化した列）を appdetails 形式に変換"""
+    row = {key.strip(): (value.strip() if isinstance(value, str) else value) for key, value in row.items() if key}
+    data: Dict[str, Any] = {
+        'steam_appid': row.get('steam_appid') or row.get('appid'),
+        'name': row.get('name') or row.get('title'),
+        'type': row.get('type') or None,
+        'short_description': row.get('short_description') or row.get('description'),
+        'developers': split_values(row.get('developers') or row.get('developer')),
+        'publishers': split_values(row.get('publishers') or row.get('publisher')),
+        'genres': split_values(row.get('genres')),
+        'platforms': split_values(row.get('platforms')),
+        'release_date': row.get('release_date'),
+        'header_image': row.get('header_image') or row.get('image_url'),
+        'is_free': (row.get('is_free') or '').lower() in ['true', '1', 'yes'],
+    }
+    if row.get('metacritic_score'):
+        data['metacritic'] = {'score': row['metacritic_score']}
+    if row.get('initial') or row.get('final'):
+        data['price_overview'] = {
+            'currency': row.get('currency') or None,
+            'initial': row.get('initial') or row.get('final'),
+            'final': row.get('final') or row.get('initial'),
+            'discount_percent': row.get('discount_percent') or 0,
+        }
+    return data
+
+
+def parse_appdetails(record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    appdetails の1件をステージングテーブルの行に変換
+
+    Args:
+        record: appdetails のデータ（応答全体の形式も可）
+
+    Returns:
+        Optional[Dict[str, Any]]: ステージングテーブルの行（ゲーム以外・取得失敗・必須項目なしの場合はNone）
+    """
+    data = _unwrap(record)
+    if not data or data.get('type') not in (None, 'game'):
+        return None
+
+    appid = data.get('steam_appid')
+    title = (data.get('name') or '').strip()
+    if not appid or not title:
+        return None
+    appid = str(appid)
+
+    genres = _names(data.get('genres'))
+    platforms = _platform_names(data.get('platforms'))
+    developers = _names(data.get('developers'))
+    publishers = _names(data.get('publishers'))
+    metacritic = data.get('metacritic') or {}
+
+    row: Dict[str, Any] = {
+        'steam_appid': appid,
+        'title': title[:200],
+        'normalized_title': normalize_text(title)[:200],
+        'developer': _truncate(developers[0] if developers else '不明', 100),
+        'publisher': _truncate(publishers[0] if publishers else '不明', 100),
+        'description': data.get('short_description') or f"Steam App ID: {appid}",
+        'genres': ','.join(genres) if genres else None,
+        'platforms': ','.join(platforms) if platforms else None,
+        'genre_mask': genre_mask(genres) if genres else None,
+        'platform_mask': platform_mask(platforms) if platforms else None,
+        'release_date': _parse_release_date(data.get('release_date')),
+        'image_url': _truncate(data.get('header_image'), 255)
+        or f"https://cdn.akamai.steamstatic.com/steam/apps/{appid}/header.jpg",
+        'steam_url': f"https://store.steampowered.com/app/{appid}/",
+        'metacritic_score': int(metacritic['score']) if metacritic.get('score') not in (None, '') else None,
+        'regular_price': None,
+        'sale_price': None,
+        'discount_rate': None,
+        'is_on_sale': None,
+        'currency': None,
+    }
+
+    overview = data.get('price_overview')
+    if overview:
+        regular = _cents(overview.get('initial'))
+        final = _cents(overview.get('final'))
+        discount = int(overview.get('discount_percent') or 0)
+        row.update({
+            'regular_price': regular if regular is not None else final,
+            'sale_price': final if discount > 0 else None,
+            'discount_rate': discount,
+            'is_on_sale': discount > 0,
+            'currency': overview.get('currency') or 'JPY',
+        })
+    elif data.get('is_free'):
+        row.update({'regular_price': Decimal('0'), 'discount_rate': 0, 'is_on_sale': False, 'currency': 'JPY'})
+    return row
+
+
+def parse_chunk(items: List[Any], fmt: str = 'ndjson') -> List[Optional[Dict[str, Any]]]:
+    """
+    入力の1チャンクを解析（プロセスプールのワーカーで実行）
+
+    Args:
+        items: NDJSONの行（文字列）またはCSVの行（辞書）
+        fmt: 入力形式（'ndjson' / 'csv'）
+
+    Returns:
+        List[Optional[Dict[str, Any]]]: 行ごとの解析結果（解析できない行はNone）
+    """
+    rows = []
+    for item in items:
+        try:
+            record = _csv_to_appdetails(item) if fmt == 'csv' else json.loads(item)
+            rows.append(parse_appdetails(record) if isinstance(record, dict) else None)
+        except (ValueError, TypeError, AttributeError, ArithmeticError):
+            rows.append(None)
+    return rows
+
+
+def detect_format(path: str) -> str:
+    """ファイル名の拡張子から入力形式を判定（.gz は除いて判定）"""
+    name = path[:-3] if path.endswith('.gz') else path
+    return 'csv' if name.lower().endswith('.csv') else 'ndjson'
+
+
+def _iter_chunks(path: str, fmt: str, chunk_size: int) -> Iterator[List[Any]]:
+    """入力ファイルをチャンクごとに読み込む（.gz は展開しながら読む）"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8', newline='') as f:
+        items: Iterable[Any] = csv.DictReader(f) if fmt == 'csv' else (line for line in f if line.strip())
+        chunk: List[Any] = []
+        for item in items:
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def _parse_parallel(chunks: Iterator[List[Any]], fmt: str, workers: int) -> Iterator[List[Optional[Dict]]]:
+    """チャンクをプロセスプールで解析（入力順を保ち、投入済みのチャンク数を制限する）"""
+    if workers <= 1:
+        for chunk in chunks:
+            yield parse_chunk(chunk, fmt)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: deque = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(parse_chunk, chunk, fmt))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _create_staging_table(connection: Connection) -> Table:
+    """一時的なステージングテーブルを作成"""
+    table = Table(
+        'catalog_import_staging', MetaData(),
+        *(Column(name, type_, primary_key=(name == 'steam_appid')) for name, type_ in _STAGING_COLUMNS),
+        prefixes=['TEMPORARY'],
+    )
+    # 前回の取り込みが異常終了してプール内の接続に残っている場合に備える
+    table.drop(connection, checkfirst=True)
+    table.create(connection)
+    return table
+
+
+def _copy_rows(connection: Connection, table: Table, rows: List[Dict[str, Any]]) -> None:
+    """PostgreSQL の COPY でステージングテーブルへ書き込む"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(['' if row[name] is None else row[name] for name in STAGING_FIELDS])
+    buffer.seek(0)
+
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table.name} ({', '.join(STAGING_FIELDS)}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+    finally:
+        cursor.close()
+
+
+def _write_staging(connection: Connection, table: Table, rows: List[Dict[str, Any]]) -> None:
+    """ステージングテーブルへ1バッチ分を書き込む"""
+    if not rows:
+        return
+    if connection.dialect.name == 'postgresql' and connection.dialect.driver == 'psycopg2':
+        _copy_rows(connection, table, rows)
+    else:
+        connection.execute(table.insert(), rows)
+
+
+def _changed(target, staging: Table, fields: Iterable[str]):
+    """ステージングの値（NULL以外）が既存の値と異なる列があるか"""
+    return or_(*(
+        and_(staging.c[name].isnot(None), target.c[name].is_distinct_from(staging.c[name]))
+        for name in fields
+    ))
+
+
+def _merge_games(connection: Connection, staging: Table, now: datetime) -> Dict[str, int]:
+    """ステージングの内容を games へ反映（steam_appid で照合）"""
+    games = Game.__table__
+
+    updated = connection.execute(
+        update(games)
+        .where(games.c.steam_appid == staging.c.steam_appid)
+        .where(_changed(games, staging, _GAME_FIELDS))
+        .values(
+            **{name: func.coalesce(staging.c[name], games.c[name]) for name in _GAME_FIELDS},
+            updated_at=now,
+        )
+    ).rowcount
+
+    inserted = connection.execute(
+        insert(games).from_select(
+            ['steam_appid', *_GAME_FIELDS, 'is_active', 'created_at', 'updated_at'],
+            select(
+                staging.c.steam_appid,
+                *(
+                    func.coalesce(staging.c[name], 0) if name in ('genre_mask', 'platform_mask')
+                    else staging.c[name]
+                    for name in _GAME_FIELDS
+                ),
+                literal(True), literal(now, Game.created_at.type), literal(now, Game.updated_at.type),
+            ).where(~exists().where(games.c.steam_appid == staging.c.steam_appid))
+        )
+    ).rowcount
+
+    return {'games_inserted': inserted, 'games_updated': updated}
+
+
+def _merge_prices(connection: Connection, staging: Table, now: datetime) -> Dict[str, int]:
+    """ステージングの価格を prices の Steam 価格へ反映"""
+    games = Game.__table__
+    prices = Price.__table__
+    priced = staging.c.regular_price.isnot(None)
+    changed = or_(*(prices.c[name].is_distinct_from(staging.c[name]) for name in _PRICE_FIELDS))
+
+    # アウトボックスのイベント用に、更新前の価格を控えておく
+    previous = {
+        row.game_id: row._asdict()
+        for row in connection.execute(
+            select(prices.c.game_id, *(prices.c[name] for name in TRACKED_PRICE_FIELDS))
+            .where(prices.c.game_id == games.c.id)
+            .where(prices.c.store == 'steam')
+            .where(games.c.steam_appid == staging.c.steam_appid)
+            .where(priced)
+            .where(changed)
+        )
+    }
+
+    updated = connection.execute(
+        update(prices)
+        .where(prices.c.game_id == games.c.id)
+        .where(prices.c.store == 'steam')
+        .where(games.c.steam_appid == staging.c.steam_appid)
+        .where(priced)
+        .where(changed)
+        .values(**{name: staging.c[name] for name in _PRICE_FIELDS}, updated_at=now)
+    ).rowcount
+
+    inserted = connection.execute(
+        insert(prices).from_select(
+            ['game_id', 'store', *_PRICE_FIELDS, 'created_at', 'updated_at'],
+            select(
+                games.c.id, literal('steam'), *(staging.c[name] for name in _PRICE_FIELDS),
+                literal(now, Price.created_at.type), literal(now, Price.updated_at.type),
+            )
+            .select_from(staging.join(games, games.c.steam_appid == staging.c.steam_appid))
+            .where(priced)
+            .where(~exists().where(and_(prices.c.game_id == games.c.id, prices.c.store == 'steam')))
+        )
+    ).rowcount
+
+    # ORMイベントを通らないため、今回追加・更新した価格の履歴とアウトボックスのイベントをまとめて記録
+    merged = (
+        select(prices.c.game_id, prices.c.store, *(prices.c[name] for name in TRACKED_PRICE_FIELDS),
+               prices.c.updated_at)
+        .select_from(prices.join(games, games.c.id == prices.c.game_id)
+                     .join(staging, staging.c.steam_appid == games.c.steam_appid))
+        .where(prices.c.store == 'steam')
+        .where(prices.c.updated_at == literal(now, Price.updated_at.type))
+    )
+    history = PriceHistory.__table__
+    connection.execute(
+        insert(history).from_select(['game_id', 'store', *TRACKED_PRICE_FIELDS, 'recorded_at'], merged)
+    )
+    _enqueue_price_events(connection, merged, previous)
+
+    return {'prices_inserted': inserted, 'prices_updated': updated}
+
+
+def _enqueue_price_events(connection: Connection, merged: Select, previous: Dict[int, Dict[str, Any]],
+                          batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+    """今回追加・更新した価格の変更イベントをアウトボックスに記録"""
+    rows = connection.execute(merged).mappings().all()
+    for start in range(0, len(rows), batch_size):
+        enqueue_price_events(connection, [
+            build_outbox_payload(row['game_id'], row['store'], dict(row), previous.get(row['game_id']))
+            for row in rows[start:start + batch_size]
+        ])
+
+
+def _reindex_titles(connection: Connection, staging: Table, batch_size: int) -> None:
+    """取り込んだゲームのタイトルのバイグラム索引を再作成"""
+    games = Game.__table__
+    bigrams = GameTitleBigram.__table__
+    imported = select(games.c.id).join(staging, games.c.steam_appid == staging.c.steam_appid)
+
+    connection.execute(bigrams.delete().where(bigrams.c.game_id.in_(imported)))
+
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            select(games.c.id, games.c.normalized_title)
+            .where(games.c.id.in_(imported))
+            .where(games.c.id > last_id)
+            .order_by(games.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        entries = [
+            {'gram': gram, 'game_id': row.id}
+            for row in rows for gram in title_bigrams(row.normalized_title or '')
+        ]
+        if entries:
+            connection.execute(bigrams.insert(), entries)
+        last_id = rows[-1].id
+
+
+def _invalidate_caches() -> None:
+    """Core で直接更新したため、カタログスナップショットと検索結果キャッシュを無効化"""
+    from services.catalog_snapshot import get_catalog_snapshot_manager
+    from repositories.search_cache import search_result_cache
+
+    get_catalog_snapshot_manager().record_changes(True, set())
+    search_result_cache.clear()
+
+
+def import_catalog(path: str, fmt: Optional[str] = None, workers: int = 1,
+                   batch_size: int = DEFAULT_BATCH_SIZE, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+    """
+    Steam appdetails のダンプを games / prices へ一括取り込み
+
+    全体を1トランザクションで実行し、途中で失敗した場合は何も反映しません。
+    同じ steam_appid が複数回現れた場合は最初の1件を使用します。
+
+    Args:
+        path: 入力ファイル（.ndjson / .csv、.gz 圧縮も可）
+        fmt: 入力形式（'ndjson' / 'csv'、未指定時は拡張子から判定）
+        workers: 解析に使うプロセス数（1以下の場合は同じプロセスで解析）
+        batch_size: ステージングテーブルへ1回に書き込む行数
+        chunk_size: プロセスプールへ1回に渡す行数
+        progress: 進捗の通知先（段階名, 件数, 経過秒数）
+
+    Returns:
+        Dict[str, Any]: 件数（read / staged / skipped / duplicates / games_* / prices_*）と経過秒数
+    """
+    fmt = fmt or detect_format(path)
+    if fmt not in FORMATS:
+        raise ValueError(f'未対応の入力形式です: {fmt}')
+
+    started = time.monotonic()
+    stats: Dict[str, Any] = {'read': 0, 'staged': 0, 'skipped': 0, 'duplicates': 0}
+    seen: set = set()
+    last_report = [started]
+
+    def report(stage: str, count: int, force: bool = True) -> None:
+        now = time.monotonic()
+        if progress and (force or now - last_report[0] >= PROGRESS_INTERVAL):
+            last_report[0] = now
+            progress(stage, count, now - started)
+
+    with db.engine.begin() as connection:
+        staging = _create_staging_table(connection)
+        batch: List[Dict[str, Any]] = []
+        for rows in _parse_parallel(_iter_chunks(path, fmt, chunk_size), fmt, workers):
+            for row in rows:
+                stats['read'] += 1
+                if row is None:
+                    stats['skipped'] += 1
+                    continue
+                if row['steam_appid'] in seen:
+                    stats['duplicates'] += 1
+                    continue
+                seen.add(row['steam_appid'])
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    _write_staging(connection, staging, batch)
+                    stats['staged'] += len(batch)
+                    batch = []
+            report('read', stats['read'], force=False)
+        _write_staging(connection, staging, batch)
+        stats['staged'] += len(batch)
+        report('read', stats['read'])
+
+        now = datetime.now(timezone.utc)
+        stats.update(_merge_games(connection, staging, now))
+        stats.update(_merge_prices(connection, staging, now))
+        refresh_user_stats_for_games(
+            connection, select(Game.id).where(Game.steam_appid.in_(select(staging.c.steam_appid)))
+        )
+        report('merged', stats['staged'])
+
+        _reindex_titles(connection, staging, batch_size)
+        staging.drop(connection)
+
+    _invalidate_caches()
+    stats['elapsed'] = time.monotonic() - started
+    logger.info(
+        f"カタログを取り込みました: {stats['staged']}件 "
+        f"(追加 {stats['games_inserted']} / 更新 {stats['games_updated']}, {stats['elapsed']:.1f}秒) <- {path}"
+    )
+    return stats
@@ -0,0 +1,456 @@
+# -*- coding: utf-8 -*-
+"""Catalog Snapshot
+
+テキスト検索を伴わないゲーム一覧（/api/games、検索語なしの /search）のための
+プロセス内・読み取り専用の列指向カタログスナップショット。
+
+アクティブなゲームのID・評価・発売日・現在価格・割引率・ジャンル/プラットフォームの
+ビットマスクをNumPy配列で保持し、絞り込み・ソート・ページネーションを配列上で行います。
+DBからは最終ページのゲームIDのみを読み込みます。
+
+更新の伝播:
+    - ゲーム・価格の変更がコミットされると、共有キャッシュ上のカタログバージョンを進めます。
+      他プロセス（価格スイープのCLI等）の変更はバージョンの変化で検知し、次回参照時に再構築します。
+    - 同一プロセス内の価格変更は、変更のあったゲームの価格列のみを差し替えます（パッチ）。
+    - 共有キャッシュが使えない構成に備え、一定時間経過したスナップショットは再構築します。
+
+スナップショットは差し替え式（コピーオンライト）のため、参照中の配列が変更されることはありません。
+"""
+
+import logging
+import threading
+import time
+import uuid
+from datetime import date, datetime
+from itertools import chain
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from extensions import cache
+from models import Game, Price
+from models.taxonomy import GENRES, PLATFORMS, PRICE_BANDS, genre_bit, platform_bit
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_MAX_AGE = 600
+
+# 共有キャッシュ上のカタログバージョン
+_VERSION_KEY = 'catalog:version'
+
+# app.extensions に保持するキー
+_EXTENSION_KEY = 'catalog_snapshot'
+
+_SESSION_INFO_KEY = 'catalog_changes'
+
+_manager_lock = threading.Lock()
+
+
+def _to_float(value: Any) -> float:
+    """数値（Decimal等）をfloatに変換（NoneはNaN）"""
+    return float(value) if value is not None else np.nan
+
+
+def _to_days(value: Optional[date]) -> float:
+    """日付を序数に変換（NoneはNaN）"""
+    return float(value.toordinal()) if value is not None else np.nan
+
+
+def _to_timestamp(value: Optional[datetime]) -> float:
+    """日時をエポック秒に変換（NoneはNaN）"""
+    return value.timestamp() if value is not None else np.nan
+
+
+def _ascending(values: np.ndarray) -> np.ndarray:
+    """昇順ソートキー（NaNは末尾）"""
+    return np.where(np.isnan(values), np.inf, values)
+
+
+def _descending(values: np.ndarray) -> np.ndarray:
+    """降順ソートキー（NaNは末尾）"""
+    return np.where(np.isnan(values), np.inf, -values)
+
+
+def _parse_price(value: Any) -> Optional[float]:
+    """価格フィルター値を数値に変換（空・不正な値はNone）"""
+    if value in (None, ''):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class CatalogSnapshot:
+    """アクティブなゲームの列指向スナップショット（読み取り専用）"""
+
+    def __init__(self, ids: np.ndarray, title_rank: np.ndarray, rating: np.ndarray,
+                 release: np.ndarray, updated: np.ndarray, price: np.ndarray, discount: np.ndarray,
+                 genre_mask: np.ndarray, platform_mask: np.ndarray):
+        """
+        初期化（通常は from_rows を使用）
+
+        Args:
+            ids: ゲームID（昇順）
+            title_rank: タイトル順の順位
+            rating: Steam評価（NaNは未評価）
+            release: 発売日の序数（NaNは不明）
+            updated: 更新日時のエポック秒
+            price: 現在の最安値（NaNは価格なし）
+            discount: セール中の最大割引率
+            genre_mask: ジャンルビットマスク
+            platform_mask: プラットフォームビットマスク
+        """
+        self.ids = ids
+        self.title_rank = title_rank
+        self.rating = rating
+        self.release = release
+        self.updated = updated
+        self.price = price
+        self.discount = discount
+        self.genre_mask = genre_mask
+        self.platform_mask = platform_mask
+        self.built_at = time.monotonic()
+
+        for array in (ids, title_rank, rating, release, updated, price, discount, genre_mask, platform_mask):
+            array.flags.writeable = False
+
+    @classmethod
+    def from_rows(cls, rows: List[Tuple]) -> 'CatalogSnapshot':
+        """
+        GameRepository.get_catalog_rows の結果からスナップショットを作成
+
+        Args:
+            rows: (id, title, steam_rating, release_date, updated_at,
+                   genre_mask, platform_mask, current_price, max_discount) のリスト（ID順）
+
+        Returns:
+            CatalogSnapshot: スナップショット
+        """
+        count = len(rows)
+        titles = [row[1] or '' for row in rows]
+        title_rank = np.empty(count, dtype=np.int64)
+        title_rank[sorted(range(count), key=titles.__getitem__)] = np.arange(count, dtype=np.int64)
+
+        return cls(
+            ids=np.fromiter((row[0] for row in rows), dtype=np.int64, count=count),
+            title_rank=title_rank,
+            rating=np.fromiter((_to_float(row[2]) for row in rows), dtype=np.float64, count=count),
+            release=np.fromiter((_to_days(row[3]) for row in rows), dtype=np.float64, count=count),
+            updated=np.fromiter((_to_timestamp(row[4]) for row in rows), dtype=np.float64, count=count),
+            genre_mask=np.fromiter((row[5] or 0 for row in rows), dtype=np.int64, count=count),
+            platform_mask=np.fromiter((row[6] or 0 for row in rows), dtype=np.int64, count=count),
+            price=np.fromiter((_to_float(row[7]) for row in rows), dtype=np.float64, count=count),
+            discount=np.fromiter((row[8] or 0 for row in rows), dtype=np.int16, count=count),
+        )
+
+    def __len__(self) -> int:
+        return int(self.ids.size)
+
+    def with_prices(self, prices: Dict[int, Tuple[Any, Any]], game_ids: Iterable[int]) -> 'CatalogSnapshot':
+        """
+        指定ゲームの価格列を差し替えた新しいスナップショットを作成
+
+        Args:
+            prices: ゲームIDごとの (current_price, max_discount)
+            game_ids: 差し替え対象のゲームID（prices にないゲームは価格なしになる）
+
+        Returns:
+            CatalogSnapshot: 新しいスナップショット（スナップショットにないゲームは無視）
+        """
+        price = self.price.copy()
+        discount = self.discount.copy()
+
+        for game_id in game_ids:
+            position = int(np.searchsorted(self.ids, game_id))
+            if position >= self.ids.size or self.ids[position] != game_id:
+                continue
+            current_price, max_discount = prices.get(game_id, (None, 0))
+            price[position] = _to_float(current_price)
+            discount[position] = max_discount or 0
+
+        return CatalogSnapshot(
+            ids=self.ids, title_rank=self.title_rank, rating=self.rating, release=self.release,
+            updated=self.updated, price=price, discount=discount,
+            genre_mask=self.genre_mask, platform_mask=self.platform_mask,
+        )
+
+    def _match(self, filters: Optional[Dict[str, Any]]) -> np.ndarray:
+        """フィルター条件に一致する位置（GameRepository._apply_filters と同じ条件）"""
+        matched = np.ones(self.ids.size, dtype=bool)
+        if not filters:
+            return np.flatnonzero(matched)
+
+        # 価格フィルター（価格のないゲームはNaNの比較で除外される）
+        min_price = _parse_price(filters.get('min_price'))
+        max_price = _parse_price(filters.get('max_price'))
+        if min_price is not None:
+            matched &= self.price >= min_price
+        if max_price is not None:
+            matched &= self.price <= max_price
+
+        # ジャンル・プラットフォーム（語彙にない値は該当なし）
+        if filters.get('genre'):
+            matched &= (self.genre_mask & genre_bit(filters['genre'])) != 0
+        if filters.get('platform'):
+            matched &= (self.platform_mask & platform_bit(filters['platform'])) != 0
+
+        return np.flatnonzero(matched)
+
+    def _order(self, positions: np.ndarray, sort: Optional[str]) -> np.ndarray:
+        """位置をソート条件で並べ替え（同順位はID順）"""
+        ids = self.ids[positions]
+        if sort == 'price_asc':
+            keys = (ids, _ascending(self.price[positions]))
+        elif sort == 'price_desc':
+            keys = (ids, _descending(self.price[positions]))
+        elif sort == 'release_date':
+            keys = (ids, _descending(self.release[positions]))
+        elif sort in ('title', 'name_asc'):
+            keys = (self.title_rank[positions],)
+        elif sort == 'name_desc':
+            keys = (-self.title_rank[positions],)
+        else:  # relevance (default)
+            keys = (ids, _descending(self.updated[positions]), _descending(self.rating[positions]))
+        return positions[np.lexsort(keys)]
+
+    def select(self, filters: Optional[Dict[str, Any]] = None, sort: Optional[str] = None,
+               page: int = 1, per_page: int = 20) -> Tuple[List[int], int]:
+        """
+        絞り込み・ソート・ページネーション
+
+        Args:
+            filters: フィルター条件（min_price, max_price, genre, platform）
+            sort: ソート条件（relevance, release_date, title, name_asc, name_desc, price_asc, price_desc）
+            page: ページ番号
+            per_page: 1ページあたりの件数
+
+        Returns:
+            Tuple[List[int], int]: (ページ内のゲームID, 総件数)
+        """
+        positions = self._match(filters)
+        total_count = int(positions.size)
+
+        offset = max(page - 1, 0) * per_page
+        if offset >= total_count:
+            return [], total_count
+
+        ordered = self._order(positions, sort)
+        return self.ids[ordered[offset:offset + per_page]].tolist(), total_count
+
+    def facets(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Dict[str, int]]:
+        """
+        ファセット件数（GameRepository.get_search_facets と同じ形式）
+
+        Args:
+            filters: フィルター条件
+
+        Returns:
+            Dict[str, Dict[str, int]]: genre / platform / price_band ごとのコード別件数
+        """
+        positions = self._match(filters)
+        genre_mask = self.genre_mask[positions]
+        platform_mask = self.platform_mask[positions]
+        price = self.price[positions]
+
+        def count_band(low: int, high: Optional[int]) -> int:
+            in_band = price >= low if high is None else (price >= low) & (price < high)
+            return int(np.count_nonzero(in_band))
+
+        return {
+            'genre': {
+                code: int(np.count_nonzero(genre_mask & (1 << position)))
+                for position, (code, _, _) in enumerate(GENRES)
+            },
+            'platform': {
+                code: int(np.count_nonzero(platform_mask & (1 << position)))
+                for position, (code, _, _) in enumerate(PLATFORMS)
+            },
+            'price_band': {code: count_band(low, high) for code, _, low, high in PRICE_BANDS},
+        }
+
+
+class CatalogSnapshotManager:
+    """アプリケーションごとのスナップショットの保持・再構築・パッチ"""
+
+    def __init__(self, max_age: int = DEFAULT_MAX_AGE):
+        """
+        初期化
+
+        Args:
+            max_age: スナップショットの最大保持時間（秒）
+        """
+        self.max_age = max_age
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._version: Optional[str] = None
+        self._stale = False
+        self._price_changes: Set[int] = set()
+        # 構築・パッチの直列化用と、状態（バージョン・予約）の保護用
+        self._build_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+
+    def get(self) -> CatalogSnapshot:
+        """
+        最新のスナップショットを取得（必要に応じて再構築・パッチ）
+
+        再構築中に他のスレッドから呼ばれた場合は、直前のスナップショットを返します。
+        アプリケーションコンテキスト内から呼び出してください。
+
+        Returns:
+            CatalogSnapshot: スナップショット
+        """
+        shared_version = cache.get(_VERSION_KEY)
+        snapshot = self._snapshot
+
+        if snapshot is not None and not self._needs_rebuild(snapshot, shared_version):
+            if self._price_changes:
+                self._patch_prices()
+            return self._snapshot
+
+        # 初回は構築完了を待ち、以降は構築中のスレッドに任せて古いスナップショットを返す
+        if not self._build_lock.acquire(blocking=snapshot is None):
+            return snapshot
+        try:
+            if self._snapshot is None or self._needs_rebuild(self._snapshot, shared_version):
+                self._rebuild(shared_version)
+            return self._snapshot
+        finally:
+            self._build_lock.release()
+
+    def _needs_rebuild(self, snapshot: CatalogSnapshot, shared_version: Optional[str]) -> bool:
+        if self._stale:
+            return True
+        if shared_version is not None and shared_version != self._version:
+            return True
+        return time.monotonic() - snapshot.built_at > self.max_age
+
+    def _rebuild(self, shared_version: Optional[str]) -> None:
+        """DBから全件を読み込んでスナップショットを再構築（構築ロック取得済みで呼び出す）"""
+        from repositories.game_repository import GameRepository
+
+        # 構築中にコミットされた変更は次回の再構築・パッチに回す
+        with self._state_lock:
+            self._stale = False
+            self._price_changes = set()
+            self._version = shared_version
+
+        started = time.perf_counter()
+        self._snapshot = CatalogSnapshot.from_rows(GameRepository().get_catalog_rows())
+        logger.info(
+            f"カタログスナップショット構築: {len(self._snapshot)}件 "
+            f"({(time.perf_counter() - started) * 1000:.1f}ms)"
+        )
+
+    def _patch_prices(self) -> None:
+        """価格が変更されたゲームの価格列のみを差し替え"""
+        from repositories.game_repository import GameRepository
+
+        # 他のスレッドが構築・パッチ中であれば、そちらの結果に任せる
+        if not self._build_lock.acquire(blocking=False):
+            return
+        try:
+            with self._state_lock:
+                game_ids, self._price_changes = self._price_changes, set()
+            if not game_ids or self._snapshot is None:
+                return
+            prices = GameRepository().get_current_prices(sorted(game_ids))
+            self._snapshot = self._snapshot.with_prices(prices, game_ids)
+            logger.debug(f"カタログスナップショット価格更新: {len(game_ids)}件")
+        finally:
+            self._build_lock.release()
+
+    def invalidate(self) -> None:
+        """次回参照時に再構築"""
+        self._stale = True
+
+    def record_changes(self, games_changed: bool, price_game_ids: Set[int]) -> None:
+        """
+        コミット済みの変更を反映（共有バージョンを進め、自プロセスは再構築またはパッチを予約）
+
+        Args:
+            games_changed: ゲームの追加・更新・削除があったか
+            price_game_ids: 価格が変更されたゲームID
+        """
+        previous = cache.get(_VERSION_KEY)
+        version = uuid.uuid4().hex
+        cache.set(_VERSION_KEY, version, timeout=0)
+
+        with self._state_lock:
+            # 他プロセスの変更を取り込んでいない場合は、自プロセスの変更だけでは追いつけない
+            if games_changed or previous != self._version:
+                self._stale = True
+            else:
+                self._price_changes |= price_game_ids
+            self._version = version
+
+
+def get_catalog_snapshot_manager() -> CatalogSnapshotManager:
+    """
+    現在のアプリケーションのスナップショット管理を取得（初回呼び出し時に生成）
+
+    Returns:
+        CatalogSnapshotManager: スナップショット管理
+    """
+    app = current_app._get_current_object()
+    manager = app.extensions.get(_EXTENSION_KEY)
+    if manager is None:
+        with _manager_lock:
+            manager = app.extensions.get(_EXTENSION_KEY)
+            if manager is None:
+                manager = CatalogSnapshotManager(
+                    max_age=int(app.config.get('CATALOG_SNAPSHOT_MAX_AGE', DEFAULT_MAX_AGE))
+                )
+                app.extensions[_EXTENSION_KEY] = manager
+    return manager
+
+
+def get_catalog_snapshot() -> Optional[CatalogSnapshot]:
+    """
+    カタログスナップショットを取得
+
+    Returns:
+        Optional[CatalogSnapshot]: スナップショット（無効化されている場合はNone）
+    """
+    if not current_app.config.get('CATALOG_SNAPSHOT_ENABLED', True):
+        return None
+    return get_catalog_snapshot_manager().get()
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_catalog_changes(session: Session, flush_context: Any) -> None:
+    """フラッシュされたゲーム・価格の変更をセッションに記録"""
+    changes = session.info.setdefault(_SESSION_INFO_KEY, {'games': False, 'prices': set()})
+    for obj in chain(session.new, session.deleted, session.dirty):
+        if isinstance(obj, Game):
+            if obj in session.new or obj in session.deleted or session.is_modified(obj):
+                changes['games'] = True
+        elif isinstance(obj, Price) and obj.game_id is not None:
+            changes['prices'].add(obj.game_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_catalog_changes(session: Session) -> None:
+    """コミット後に変更をスナップショットへ反映"""
+    changes = session.info.pop(_SESSION_INFO_KEY, None)
+    if not changes or not (changes['games'] or changes['prices']):
+        return
+    try:
+        manager = get_catalog_snapshot_manager()
+    except RuntimeError:
+        # アプリケーションコンテキスト外のセッション
+        return
+    try:
+        manager.record_changes(changes['games'], changes['prices'])
+    except Exception as e:
+        manager.invalidate()
+        logger.warning(f"カタログスナップショットの変更反映に失敗: {e}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_catalog_changes(session: Session) -> None:
+    """ロールバックされた変更を破棄"""
+    session.info.pop(_SESSION_INFO_KEY, None)
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""Database Snapshot
+
+データベース全体の Parquet スナップショットの書き出しと復元。
+テーブルごとに1ファイルを主キー順で書き出すため、同じデータからは同じ内容になります。
+復元時は既存の行を削除してから、ID を保ったままバッチ単位の executemany で挿入します。
+ステージング・ベンチマーク環境を本番のスナップショットから素早く再現するために使用します。
+
+pyarrow は任意の依存関係です（インストールされていない場合は RuntimeError）。
+"""
+
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, Numeric, Table, func, select
+
+from models import db
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_BATCH_SIZE = 10000
+
+MANIFEST_NAME = 'manifest.json'
+SNAPSHOT_FORMAT_VERSION = 1
+
+
+def _require_pyarrow():
+    """pyarrow を読み込む（任意の依存関係のため使用時に読み込む）"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise RuntimeError(f'Parquet スナップショットには pyarrow が必要です: {e}') from e
+    return pyarrow
+
+
+def _arrow_type(pa, column):
+    """SQLAlchemy の列型に対応する Arrow の型"""
+    column_type = column.type
+    if isinstance(column_type, Boolean):
+        return pa.bool_()
+    if isinstance(column_type, Integer):
+        return pa.int64()
+    if isinstance(column_type, Float):
+        return pa.float64()
+    if isinstance(column_type, Numeric):
+        # SQLite は精度を強制しないため、精度は最大にして小数点以下の桁数のみ合わせる
+        return pa.decimal128(38, column_type.scale or 0)
+    if isinstance(column_type, DateTime):
+        return pa.timestamp('us', tz='UTC') if column_type.timezone else pa.timestamp('us')
+    if isinstance(column_type, Date):
+        return pa.date32()
+    return pa.string()
+
+
+def _arrow_schema(pa, table: Table):
+    return pa.schema([pa.field(column.name, _arrow_type(pa, column), nullable=column.nullable)
+                      for column in table.columns])
+
+
+def _to_string(value: Any) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    return str(value)
+
+
+def export_snapshot(directory: str, batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, int]:
+    """
+    全テーブルを Parquet ファイル（テーブルごとに1ファイル）へ書き出す
+
+    Args:
+        directory: 出力先のディレクトリ（なければ作成）
+        batch_size: 1回に読み込んで書き出す行数（Parquet の行グループの大きさ）
+
+    Returns:
+        Dict[str, int]: テーブル名ごとの行数
+    """
+    pa = _require_pyarrow()
+    os.makedirs(directory, exist_ok=True)
+    counts: Dict[str, int] = {}
+
+    with db.engine.connect() as connection:
+        for table in db.metadata.sorted_tables:
+            schema = _arrow_schema(pa, table)
+            string_columns = [field.name for field in schema if pa.types.is_string(field.type)]
+            stmt = select(table).order_by(*table.primary_key.columns)
+            result = connection.execution_options(stream_results=True).execute(stmt)
+
+            count = 0
+            with pa.parquet.ParquetWriter(os.path.join(directory, f'{table.name}.parquet'),
+                                          schema, compression='zstd') as writer:
+                for partition in result.partitions(batch_size):
+                    rows = [dict(row._mapping) for row in partition]
+                    for row in rows:
+                        for name in string_columns:
+                            row[name] = _to_string(row[name])
+                    writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+                    count += len(rows)
+            counts[table.name] = count
+
+    manifest = {
+        'format_version': SNAPSHOT_FORMAT_VERSION,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'tables': [{'name': name, 'rows': rows} for name, rows in counts.items()],
+    }
+    with open(os.path.join(directory, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    logger.info(f"スナップショットを書き出しました: {sum(counts.values())}行 -> {directory}")
+    return counts
+
+
+def _reset_sequences(connection, tables: List[Table]) -> None:
+    """PostgreSQL の連番を復元したIDの最大値に合わせる"""
+    if connection.dialect.name != 'postgresql':
+        return
+    for table in tables:
+        column = table.autoincrement_column
+        if column is None:
+            continue
+        max_id = connection.execute(select(func.max(column))).scalar()
+        if max_id is not None:
+            connection.execute(select(func.setval(func.pg_get_serial_sequence(table.name, column.name), max_id)))
+
+
+def _invalidate_caches() -> None:
+    """データを丸ごと置き換えたため、カタログスナップショットとキャッシュを無効化"""
+    from extensions import cache
+    from services.catalog_snapshot import get_catalog_snapshot_manager
+
+    get_catalog_snapshot_manager().record_changes(True, set())
+    cache.clear()
+
+
+def import_snapshot(directory: str, batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Parquet スナップショットからデータベースを復元（既存の行は削除）
+
+    全体を1トランザクションで実行し、途中で失敗した場合は何も反映しません。
+    スナップショットにないテーブルは空になり、現在のテーブルにない列は無視します。
+
+    Args:
+        directory: export_snapshot で書き出したディレクトリ
+        batch_size: 1回の executemany で挿入する行数
+
+    Returns:
+        Dict[str, int]: テーブル名ごとの行数
+
+    Raises:
+        FileNotFoundError: manifest.json がない場合
+    """
+    pa = _require_pyarrow()
+    with open(os.path.join(directory, MANIFEST_NAME), encoding='utf-8') as f:
+        manifest = json.load(f)
+    available = {entry['name'] for entry in manifest.get('tables', [])}
+    tables = db.metadata.sorted_tables
+    counts: Dict[str, int] = {}
+
+    with db.engine.begin() as connection:
+        for table in reversed(tables):
+            connection.execute(table.delete())
+
+        for table in tables:
+            if table.name not in available:
+                logger.warning(f"スナップショットにテーブルがありません: {table.name}")
+                continue
+            parquet_file = pa.parquet.ParquetFile(os.path.join(directory, f'{table.name}.parquet'))
+            columns = [name for name in parquet_file.schema_arrow.names if name in table.columns]
+
+            count = 0
+            for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+                rows = batch.to_pylist()
+                if rows:
+                    connection.execute(table.insert(), rows)
+                    count += len(rows)
+            counts[table.name] = count
+
+        _reset_sequences(connection, tables)
+
+    _invalidate_caches()
+    logger.info(f"スナップショットを復元しました: {sum(counts.values())}行 <- {directory}")
+    return counts
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""Deal Ranking
+
+セール中のゲームのお得度ランキングを作成するバッチ処理。
+セール中の価格を (is_on_sale, discount_rate) の索引から読み込み、
+割引率・過去最安値との近さ・評価・人気（お気に入り登録数）からスコアを計算して、
+全体とジャンルごとの上位を deal_rankings に書き出します。
+"""
+
+import logging
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from flask import current_app
+from sqlalchemy import and_, func, select
+
+from models import db, Favorite, Game, GamePriceStats, Price, DealRanking
+from models.deal_ranking import OVERALL_SCOPE
+from models.taxonomy import GENRES
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_RANKING_SIZE = 50
+
+# スコアの重み（合計1.0）
+SCORE_WEIGHTS = {
+    'discount': 0.4,
+    'low_proximity': 0.25,
+    'rating': 0.2,
+    'popularity': 0.15,
+}
+
+# 過去最安値・評価が不明な場合の値
+NEUTRAL_SCORE = 0.5
+
+
+def _candidates_query():
+    """セール中の価格とスコア計算に使う項目を取得するクエリ"""
+    favorites = (
+        select(Favorite.game_id, func.count().label('favorites'))
+        .group_by(Favorite.game_id)
+        .subquery()
+    )
+    return (
+        select(
+            Price.game_id, Price.store, Price.regular_price, Price.sale_price, Price.discount_rate,
+            Game.genre_mask, Game.steam_rating, Game.metacritic_score,
+            GamePriceStats.lowest_price,
+            func.coalesce(favorites.c.favorites, 0).label('favorites'),
+        )
+        .join(Game, Game.id == Price.game_id)
+        .outerjoin(GamePriceStats, and_(GamePriceStats.game_id == Price.game_id, GamePriceStats.store == Price.store))
+        .outerjoin(favorites, favorites.c.game_id == Price.game_id)
+        .where(Price.is_on_sale == True, Price.discount_rate > 0, Game.is_active == True)
+    )
+
+
+def score_deals(candidates: pd.DataFrame) -> pd.DataFrame:
+    """
+    セール中の価格ごとにお得度スコアを計算し、ゲームごとに最もお得なストアを残す
+
+    Args:
+        candidates: セール中の価格（_candidates_query の列）
+
+    Returns:
+        pd.DataFrame: ゲームごとの最もお得な価格とスコア（スコアの高い順）
+    """
+    df = candidates.copy()
+    for column in ('regular_price', 'sale_price', 'lowest_price', 'steam_rating', 'metacritic_score',
+                   'discount_rate', 'favorites'):
+        df[column] = pd.to_numeric(df[column], errors='coerce').astype('float64')
+    df['genre_mask'] = pd.to_numeric(df['genre_mask'], errors='coerce').fillna(0).astype('int64')
+
+    discount = (df['discount_rate'] / 100).clip(0, 1)
+    df['current_price'] = df['sale_price'].fillna(df['regular_price'] * (1 - discount))
+
+    # 現在価格が過去最安値と同じなら1（過去最安値の記録がなければ中間値）
+    low_proximity = (df['lowest_price'] / df['current_price'].where(df['current_price'] > 0)).clip(0, 1)
+    low_proximity = low_proximity.where(df['current_price'] > 0, 1.0).fillna(NEUTRAL_SCORE)
+
+    # Metacritic（0-100）を優先し、なければSteam評価（0-1 または 0-100）
+    steam_rating = df['steam_rating'].where(df['steam_rating'] <= 1, df['steam_rating'] / 100)
+    rating = (df['metacritic_score'] / 100).fillna(steam_rating).clip(0, 1).fillna(NEUTRAL_SCORE)
+
+    favorites = np.log1p(df['favorites'].fillna(0))
+    max_favorites = favorites.max() if len(favorites) else 0
+    popularity = favorites / max_favorites if max_favorites > 0 else favorites * 0
+
+    df['score'] = (
+        SCORE_WEIGHTS['discount'] * discount
+        + SCORE_WEIGHTS['low_proximity'] * low_proximity
+        + SCORE_WEIGHTS['rating'] * rating
+        + SCORE_WEIGHTS['popularity'] * popularity
+    )
+    return (
+        df.sort_values(['score', 'discount_rate', 'game_id'], ascending=[False, False, True], kind='stable')
+        .drop_duplicates('game_id')
+        .reset_index(drop=True)
+    )
+
+
+def _ranking_rows(scope: str, deals: pd.DataFrame, computed_at: datetime) -> List[Dict[str, Any]]:
+    def money(value: float) -> Optional[Decimal]:
+        return None if pd.isna(value) else Decimal(str(round(value, 2)))
+
+    return [
+        {
+            'scope': scope,
+            'rank': rank,
+            'game_id': int(row.game_id),
+            'store': row.store,
+            'score': float(row.score),
+            'current_price': money(row.current_price),
+            'regular_price': money(row.regular_price),
+            'discount_rate': int(row.discount_rate),
+            'computed_at': computed_at,
+        }
+        for rank, row in enumerate(deals.itertuples(index=False), start=1)
+    ]
+
+
+def rebuild_deal_rankings(size: Optional[int] = None) -> Dict[str, int]:
+    """
+    全体・ジャンルごとのセールランキングを再作成
+
+    Args:
+        size: スコープごとの件数（省略時は DEAL_RANKING_SIZE）
+
+    Returns:
+        Dict[str, int]: スコープごとの件数（件数0のスコープは含まない）
+    """
+    size = size or current_app.config.get('DEAL_RANKING_SIZE', DEFAULT_RANKING_SIZE)
+    computed_at = datetime.now(timezone.utc)
+    table = DealRanking.__table__
+
+    with db.engine.begin() as connection:
+        candidates = pd.read_sql(_candidates_query(), connection)
+        deals = score_deals(candidates)
+
+        rows = _ranking_rows(OVERALL_SCOPE, deals.head(size), computed_at)
+        for position, (code, _label, _aliases) in enumerate(GENRES):
+            in_genre = deals[(deals['genre_mask'] & (1 << position)) != 0]
+            rows.extend(_ranking_rows(code, in_genre.head(size), computed_at))
+
+        connection.execute(table.delete())
+        if rows:
+            connection.execute(table.insert(), rows)
+
+    counts: Dict[str, int] = {}
+    for row in rows:
+        counts[row['scope']] = counts.get(row['scope'], 0) + 1
+    logger.info(f"セールランキングを作成しました: 候補{len(deals)}件, {len(counts)}スコープ")
+    return counts
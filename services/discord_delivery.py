@@ -0,0 +1,532 @@
+# -*- coding: utf-8 -*-
+"""Discord Delivery
+
+未送信の通知を Discord の Webhook へ配信するエンジン。
+通知を送信先（チャンネルのWebhook、またはユーザーへのメンション付きの既定Webhook）ごとにまとめ、
+1メッセージあたり最大10件の Embed に詰めて送信します。
+
+Discord のレート制限はWebhook（ルートの主要パラメータ）ごとのバケットとして
+X-RateLimit-* ヘッダーから追跡し、残数がなくなればリセットまで待機します。
+429 応答では retry_after（グローバル制限の場合は全送信先）だけ待って再送します。
+送信先ごとの送信は順番に、異なる送信先はスレッドプールで並行に行います。
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from flask import current_app
+from sqlalchemy.orm import joinedload
+
+from models import db, Notification
+
+logger = logging.getLogger(__name__)
+
+
+# Discord の制限
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+
+DEFAULT_WORKERS = 8
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_TIMEOUT = 10
+
+# バケットの情報（ヘッダー）が得られるまでの同時送信数
+_UNKNOWN_BUCKET_LIMIT = 1
+
+
+def embed_size(embed: Dict[str, Any]) -> int:
+    """
+    Discord の文字数制限の対象となる Embed の文字数
+
+    Args:
+        embed: Discord Embed
+
+    Returns:
+        int: タイトル・説明・フッター・作成者・フィールドの文字数の合計
+    """
+    size = len(embed.get('title') or '') + len(embed.get('description') or '')
+    size += len((embed.get('footer') or {}).get('text') or '')
+    size += len((embed.get('author') or {}).get('name') or '')
+    for field in embed.get('fields') or []:
+        size += len(field.get('name') or '') + len(field.get('value') or '')
+    return size
+
+
+def pack_embeds(items: Iterable[Tuple[int, Dict[str, Any]]],
+                max_embeds: int = MAX_EMBEDS_PER_MESSAGE,
+                max_chars: int = MAX_EMBED_CHARS_PER_MESSAGE) -> List[List[Tuple[int, Dict[str, Any]]]]:
+    """
+    Embed を1メッセージあたりの件数・文字数の上限に収まるように分割
+
+    Args:
+        items: (通知ID, Embed) の一覧（送信順）
+        max_embeds: 1メッセージの最大 Embed 数
+        max_chars: 1メッセージの Embed の最大合計文字数
+
+    Returns:
+        List[List[Tuple[int, Dict[str, Any]]]]: メッセージごとの (通知ID, Embed)
+    """
+    messages: List[List[Tuple[int, Dict[str, Any]]]] = []
+    current: List[Tuple[int, Dict[str, Any]]] = []
+    current_chars = 0
+    for notification_id, embed in items:
+        size = embed_size(embed)
+        if current and (len(current) >= max_embeds or current_chars + size > max_chars):
+            messages.append(current)
+            current, current_chars = [], 0
+        current.append((notification_id, embed))
+        current_chars += size
+    if current:
+        messages.append(current)
+    return messages
+
+
+def parse_channel_webhooks(value: Any) -> Dict[str, str]:
+    """
+    チャンネルIDとWebhook URLの対応を読み込む
+
+    Args:
+        value: 辞書、または "チャンネルID=URL" のカンマ区切り文字列
+
+    Returns:
+        Dict[str, str]: チャンネルID -> Webhook URL
+    """
+    if not value:
+        return {}
+    if isinstance(value, dict):
+        return {str(k): v for k, v in value.items() if v}
+    webhooks = {}
+    for entry in str(value).split(','):
+        channel_id, sep, url = entry.strip().partition('=')
+        if sep and channel_id and url:
+            webhooks[channel_id.strip()] = url.strip()
+    return webhooks
+
+
+def webhook_bucket_key(url: str) -> str:
+    """
+    Webhook URLのレート制限バケットのキー（Webhook ID が主要パラメータ）
+
+    Args:
+        url: Webhook URL（.../webhooks/{id}/{token}）
+
+    Returns:
+        str: バケットのキー
+    """
+    parts = [part for part in urlsplit(url).path.split('/') if part]
+    if 'webhooks' in parts:
+        index = parts.index('webhooks')
+        if index + 1 < len(parts):
+            return f"webhook:{parts[index + 1]}"
+    return url
+
+
+class WebhookMessage:
+    """送信する1メッセージ（最大10件の Embed）"""
+
+    def __init__(self, payload: Dict[str, Any], notification_ids: List[int]):
+        self.payload = payload
+        self.notification_ids = notification_ids
+
+
+class Destination:
+    """送信先（1つのWebhookへの一連のメッセージ）"""
+
+    def __init__(self, key: str, url: str, messages: List[WebhookMessage]):
+        self.key = key
+        self.url = url
+        self.messages = messages
+
+    def __repr__(self) -> str:
+        return f'<Destination {self.key}: {len(self.messages)} messages>'
+
+
+class _Bucket:
+    """1つのレート制限バケットの状態"""
+
+    def __init__(self):
+        self.limit: Optional[int] = None
+        self.remaining = _UNKNOWN_BUCKET_LIMIT
+        self.reset_at = 0.0
+        self.in_flight = 0
+
+
+class RateLimiter:
+    """
+    Discord のレート制限バケットの追跡
+
+    acquire で送信枠を確保し（残数がなければリセットまで待機）、
+    応答ヘッダーを update に渡して残数・リセット時刻を更新します。
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        """
+        初期化
+
+        Args:
+            clock: 単調増加の時計（テスト用に差し替え可能）
+        """
+        self._clock = clock
+        self._buckets: Dict[str, _Bucket] = {}
+        self._global_reset_at = 0.0
+        self._cond = threading.Condition()
+
+    def _bucket(self, key: str) -> _Bucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket()
+        return bucket
+
+    def acquire(self, key: str) -> None:
+        """
+        バケットの送信枠を1つ確保（枠が空くまで待機）
+
+        Args:
+            key: バケットのキー
+        """
+        with self._cond:
+            bucket = self._bucket(key)
+            while True:
+                now = self._clock()
+                wait = self._global_reset_at - now
+                if wait <= 0:
+                    if bucket.remaining <= 0 and bucket.limit is not None and now >= bucket.reset_at:
+                        # リセット時刻を過ぎたので枠を戻す
+                        bucket.remaining = bucket.limit
+                    if bucket.remaining > 0:
+                        bucket.remaining -= 1
+                        bucket.in_flight += 1
+                        return
+                    # 制限が不明な間は応答（ヘッダー）を待つ
+                    wait = bucket.reset_at - now if bucket.limit is not None else None
+                self._cond.wait(wait)
+
+    def update(self, key: str, headers: Dict[str, str]) -> None:
+        """
+        応答ヘッダーからバケットの状態を更新（ヘッダーが不正な場合はヘッダーのない応答として扱う）
+
+        Args:
+            key: バケットのキー
+            headers: 応答ヘッダー
+        """
+        with self._cond:
+            bucket = self._bucket(key)
+            bucket.in_flight = max(0, bucket.in_flight - 1)
+            limit = headers.get('X-RateLimit-Limit')
+            remaining = headers.get('X-RateLimit-Remaining')
+            reset_after = headers.get('X-RateLimit-Reset-After')
+            parsed = _parse_bucket_headers(limit, remaining, reset_after)
+            if parsed is not None:
+                bucket.limit, remaining_count, reset_seconds = parsed
+                # 送信中のリクエストの分は差し引く
+                bucket.remaining = max(0, remaining_count - bucket.in_flight)
+                bucket.reset_at = self._clock() + reset_seconds
+            elif bucket.limit is None:
+                # 制限ヘッダーのない応答では不明のまま次の1件を許可
+                bucket.remaining = max(bucket.remaining, _UNKNOWN_BUCKET_LIMIT - bucket.in_flight)
+            self._cond.notify_all()
+
+    def release(self, key: str) -> None:
+        """
+        応答が得られなかった送信の枠を解放
+
+        Args:
+            key: バケットのキー
+        """
+        with self._cond:
+            bucket = self._bucket(key)
+            bucket.in_flight = max(0, bucket.in_flight - 1)
+            if bucket.limit is None:
+                bucket.remaining = max(bucket.remaining, _UNKNOWN_BUCKET_LIMIT - bucket.in_flight)
+            self._cond.notify_all()
+
+    def rate_limited(self, key: str, retry_after: float, is_global: bool = False) -> None:
+        """
+        429 応答を記録（バケット、またはグローバルに retry_after 秒待機させる）
+
+        Args:
+            key: バケットのキー
+            retry_after: 待機秒数
+            is_global: グローバル制限の場合True
+        """
+        with self._cond:
+            reset_at = self._clock() + retry_after
+            if is_global:
+                self._global_reset_at = max(self._global_reset_at, reset_at)
+            else:
+                bucket = self._bucket(key)
+                bucket.remaining = 0
+                bucket.reset_at = max(bucket.reset_at, reset_at)
+                if bucket.limit is None:
+                    bucket.limit = _UNKNOWN_BUCKET_LIMIT
+            self._cond.notify_all()
+
+
+class DeliveryResult:
+    """配信結果（送信できた通知ID・失敗した通知ID）"""
+
+    def __init__(self):
+        self.sent: List[int] = []
+        self.failed: List[int] = []
+        self.messages = 0
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+
+    def record(self, message: WebhookMessage, ok: bool, rate_limited: int) -> None:
+        with self._lock:
+            (self.sent if ok else self.failed).extend(message.notification_ids)
+            self.messages += 1 if ok else 0
+            self.rate_limited += rate_limited
+
+
+class DiscordDeliveryEngine:
+    """Discord Webhook 配信エンジン"""
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 timeout: float = DEFAULT_TIMEOUT, session: Optional[requests.Session] = None,
+                 rate_limiter: Optional[RateLimiter] = None):
+        """
+        初期化
+
+        Args:
+            workers: 並行して送信する送信先の数
+            max_attempts: 1メッセージの最大送信回数（429・5xx での再送を含む）
+            timeout: リクエストのタイムアウト（秒）
+            session: HTTPセッション（省略時は再試行なしの専用セッション）
+            rate_limiter: レート制限の追跡（省略時は新規作成）
+        """
+        self.workers = max(1, workers)
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter or RateLimiter()
+        if session is None:
+            # 429 は自前で処理するため、urllib3 の自動再試行は使わない
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=self.workers, max_retries=0)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            session.headers.update({'User-Agent': 'GameBargain/1.0'})
+        self.session = session
+
+    def deliver(self, destinations: List[Destination], result: Optional[DeliveryResult] = None) -> DeliveryResult:
+        """
+        送信先ごとのメッセージを配信（送信先の間は並行）
+
+        1メッセージの送信で予期しないエラーが起きた場合はそのメッセージを失敗として続けます。
+
+        Args:
+            destinations: 送信先の一覧
+            result: 結果を記録する配信結果（省略時は新規作成。例外で中断した場合も記録済みの結果が残る）
+
+        Returns:
+            DeliveryResult: 配信結果
+        """
+        result = result if result is not None else DeliveryResult()
+        if not destinations:
+            return result
+        workers = min(self.workers, len(destinations))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='discord-delivery') as executor:
+            futures = [executor.submit(self._deliver_destination, destination, result) for destination in destinations]
+            for future in futures:
+                future.result()
+        return result
+
+    def _deliver_destination(self, destination: Destination, result: DeliveryResult) -> None:
+        """1つの送信先のメッセージを順番に送信"""
+        key = webhook_bucket_key(destination.url)
+        for message in destination.messages:
+            try:
+                ok, rate_limited = self._post(key, destination.url, message.payload)
+            except Exception as e:
+                logger.error(f"Discord送信エラー ({key}): {e}")
+                ok, rate_limited = False, 0
+            result.record(message, ok, rate_limited)
+
+    def _post(self, key: str, url: str, payload: Dict[str, Any]) -> Tuple[bool, int]:
+        """
+        1メッセージを送信（429・5xx は待機して再送）
+
+        Returns:
+            Tuple[bool, int]: (成功したか, 429 を受けた回数)
+        """
+        rate_limited = 0
+        for attempt in range(self.max_attempts):
+            self.rate_limiter.acquire(key)
+            updated = False
+            try:
+                response = self.session.post(url, json=payload, timeout=self.timeout)
+                self.rate_limiter.update(key, response.headers)
+                updated = True
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"Discord送信エラー ({key}): {e}")
+                return False, rate_limited
+            finally:
+                # 応答で枠を更新できなかった場合は、例外の種類に関わらず確保した枠を解放する
+                if not updated:
+                    self.rate_limiter.release(key)
+
+            if response.status_code == 429:
+                rate_limited += 1
+                retry_after, is_global = _parse_rate_limit(response)
+                logger.info(f"Discordのレート制限 ({key}): {retry_after:.2f}秒待機{' (グローバル)' if is_global else ''}")
+                self.rate_limiter.rate_limited(key, retry_after, is_global)
+                continue
+            if response.status_code >= 500:
+                time.sleep(min(2 ** attempt * 0.5, 5))
+                continue
+            if response.status_code >= 400:
+                logger.error(f"Discord送信失敗 ({key}): HTTP {response.status_code} {response.text[:200]}")
+                return False, rate_limited
+            return True, rate_limited
+
+        logger.error(f"Discord送信失敗 ({key}): 再送回数の上限に達しました")
+        return False, rate_limited
+
+
+def _parse_rate_limit(response: requests.Response) -> Tuple[float, bool]:
+    """429 応答から待機秒数とグローバル制限かどうかを取得"""
+    retry_after: Optional[float] = None
+    is_global = response.headers.get('X-RateLimit-Global', '').lower() == 'true'
+    try:
+        body = response.json()
+        if isinstance(body, dict):
+            retry_after = float(body.get('retry_after')) if body.get('retry_after') is not None else None
+            is_global = is_global or bool(body.get('global'))
+    except (TypeError, ValueError):
+        pass
+    if retry_after is None:
+        try:
+            retry_after = float(response.headers.get('Retry-After') or 1)
+        except ValueError:
+            retry_after = 1.0
+    return retry_after, is_global
+
+
+def _parse_bucket_headers(limit: Optional[str], remaining: Optional[str],
+                          reset_after: Optional[str]) -> Optional[Tuple[int, int, float]]:
+    """X-RateLimit-* ヘッダーの値を (上限, 残数, リセットまでの秒数) に変換（欠けている・不正な場合はNone）"""
+    if limit is None or remaining is None or reset_after is None:
+        return None
+    try:
+        return int(limit), int(remaining), float(reset_after)
+    except ValueError:
+        return None
+
+
+def build_destinations(notifications: Iterable[Notification], channel_webhooks: Dict[str, str],
+                       default_webhook: Optional[str]) -> Tuple[List[Destination], List[int]]:
+    """
+    通知を送信先ごとにまとめ、メッセージに詰める
+
+    チャンネルIDに対応するWebhookがあればそのチャンネルへ、なければ既定のWebhookへ
+    ユーザーごとにメンション付きで送信します。
+
+    Args:
+        notifications: 未送信の通知（優先度順）
+        channel_webhooks: チャンネルID -> Webhook URL
+        default_webhook: ユーザー宛ての通知に使うWebhook URL
+
+    Returns:
+        Tuple[List[Destination], List[int]]: 送信先の一覧と、送信先のない通知ID
+    """
+    groups: Dict[str, Dict[str, Any]] = {}
+    unroutable: List[int] = []
+    for notification in notifications:
+        channel_id = notification.discord_channel_id
+        user = notification.user
+        if channel_id and channel_id in channel_webhooks:
+            key, url, mention = f'channel:{channel_id}', channel_webhooks[channel_id], None
+        elif user is not None and user.discord_id and default_webhook:
+            key, url, mention = f'user:{user.id}', default_webhook, user.discord_id
+        else:
+            unroutable.append(notification.id)
+            continue
+        group = groups.setdefault(key, {'url': url, 'mention': mention, 'items': []})
+        group['items'].append((notification.id, notification.to_discord_embed()))
+
+    destinations = []
+    for key, group in groups.items():
+        messages = []
+        for packed in pack_embeds(group['items']):
+            payload: Dict[str, Any] = {'embeds': [embed for _, embed in packed]}
+            if group['mention']:
+                payload['content'] = f"<@{group['mention']}>"
+                payload['allowed_mentions'] = {'users': [group['mention']]}
+            else:
+                payload['allowed_mentions'] = {'parse': []}
+            messages.append(WebhookMessage(payload, [notification_id for notification_id, _ in packed]))
+        destinations.append(Destination(key, group['url'], messages))
+    return destinations, unroutable
+
+
+def deliver_pending_notifications(batch_size: Optional[int] = None,
+                                  engine: Optional[DiscordDeliveryEngine] = None) -> Dict[str, int]:
+    """
+    未送信の通知を Discord に配信し、送信状態を記録
+
+    送信先のない通知はリトライ回数を上限にして失敗とし、以降のバッチでは選びません。
+
+    Args:
+        batch_size: 1回に読み込む通知の最大件数（省略時は DISCORD_DELIVERY_BATCH_SIZE）
+        engine: 配信エンジン（省略時は設定値から作成）
+
+    Returns:
+        Dict[str, int]: sent / failed / unroutable / messages / rate_limited の件数
+    """
+    config = current_app.config
+    batch_size = batch_size or int(config.get('DISCORD_DELIVERY_BATCH_SIZE', DEFAULT_BATCH_SIZE))
+    max_retries = int(config.get('NOTIFICATION_MAX_RETRIES', DEFAULT_MAX_RETRIES))
+    engine = engine or DiscordDeliveryEngine(workers=int(config.get('DISCORD_DELIVERY_WORKERS', DEFAULT_WORKERS)))
+
+    notifications = (
+        Notification.query
+        .options(joinedload(Notification.user), joinedload(Notification.game))
+        .filter(Notification.is_sent == False, Notification.retry_count < max_retries)
+        .order_by(Notification.priority.desc(), Notification.created_at, Notification.id)
+        .limit(batch_size)
+        .all()
+    )
+    stats = {'sent': 0, 'failed': 0, 'unroutable': 0, 'messages': 0, 'rate_limited': 0}
+    if not notifications:
+        return stats
+
+    destinations, unroutable = build_destinations(
+        notifications,
+        parse_channel_webhooks(config.get('DISCORD_CHANNEL_WEBHOOKS')),
+        config.get('DISCORD_WEBHOOK_URL'),
+    )
+    # 送信中はDBに触れない（結果をまとめて記録。配信が例外で中断しても送信済みの記録は残す）
+    result = DeliveryResult()
+    try:
+        engine.deliver(destinations, result)
+    finally:
+        sent, failed, skipped = set(result.sent), set(result.failed), set(unroutable)
+        for notification in notifications:
+            if notification.id in sent:
+                notification.mark_as_sent()
+            elif notification.id in failed:
+                notification.increment_retry()
+            elif notification.id in skipped:
+                # 送信先がない通知は再送しても届かないため、以降のバッチで選ばない
+                notification.mark_as_failed(max_retries)
+        db.session.commit()
+
+    stats.update(sent=len(sent), failed=len(failed), unroutable=len(unroutable),
+                 messages=result.messages, rate_limited=result.rate_limited)
+    if unroutable:
+        logger.warning(
+            f"送信先のない通知を失敗としました: {len(unroutable)}件（DISCORD_CHANNEL_WEBHOOKS / DISCORD_WEBHOOK_URL を確認）"
+        )
+    logger.info(
+        f"Discord通知を配信しました: 送信 {stats['sent']}件 / 失敗 {stats['failed']}件 "
+        f"({stats['messages']}メッセージ, 送信先 {len(destinations)}件, 429 {stats['rate_limited']}回)"
+    )
+    return stats
@@ -5,19 +5,51 @@ Game Search Service
 検索、フィルタリング、外部API連携などの処理を行います。
 """
 
-from typing import List, Dict, Any, Tuple, Optional
+import hashlib
+from typing import List, Dict, Any, Tuple, Optional, TYPE_CHECKING
 from datetime import datetime
 from flask import current_app
 
+from extensions import cache
 from models.game import Game as GameModel
 from repositories.game_repository import GameRepository
-from services.steam_service import SteamAPIService
+from repositories.search_cache import search_result_cache, normalize_query
+from services.background import submit_background_task
+from services.catalog_snapshot import get_catalog_snapshot, get_catalog_snapshot_manager
+from services.single_flight import SingleFlight
+
+# Steam APIクライアントは Steam を使う検索で初めて読み込む（起動時間の短縮）
+if TYPE_CHECKING:
+    from services.steam_service import SteamAPIService
+
+
+# Steam APIフォールバック検索の結果マーカー
+FALLBACK_EMPTY = 'empty'  # 新規ゲームが見つからなかった（ネガティブキャッシュ）
+FALLBACK_KNOWN = 'known'  # 取り込み済み
+
+# バックグラウンドでのSteam追加検索（エンリッチメント）の状態
+ENRICHMENT_PENDING = 'pending'
+ENRICHMENT_DONE = 'done'
+ENRICHMENT_FAILED = 'failed'
+
+# 同一クエリのフォールバック検索をプロセス内で1回にまとめる
+steam_fallback_flight = SingleFlight()
+
+
+def _fallback_cache_key(term: str) -> str:
+    """フォールバック検索結果マーカーのキャッシュキー"""
+    return f"steam_fallback:{hashlib.sha1(term.encode('utf-8')).hexdigest()}"
+
+
+def _enrichment_cache_key(term: str) -> str:
+    """エンリッチメント状態のキャッシュキー"""
+    return f"steam_enrich:{hashlib.sha1(term.encode('utf-8')).hexdigest()}"
 
 
 class GameSearchService:
     """ゲーム検索サービス"""
     
-    def __init__(self, game_repository: Optional[GameRepository] = None, steam_service: Optional[SteamAPIService] = None):
+    def __init__(self, game_repository: Optional[GameRepository] = None, steam_service: Optional['SteamAPIService'] = None):
         """
         初期化
         
@@ -26,10 +58,18 @@ class GameSearchService:
             steam_service: Steam APIサービス
         """
         self.game_repository = game_repository or GameRepository()
-        self.steam_service = steam_service or SteamAPIService()
+        self._steam_service = steam_service
+    
+    @property
+    def steam_service(self) -> 'SteamAPIService':
+        """Steam APIサービス（初めて使うときに作成）"""
+        if self._steam_service is None:
+            from services.steam_service import SteamAPIService
+            self._steam_service = SteamAPIService()
+        return self._steam_service
     
     def search_games(self, query: Optional[str] = None, filters: Optional[Dict[str, Any]] = None, 
-                    page: int = 1, per_page: int = 20) -> Dict[str, Any]:
+                    page: int = 1, per_page: int = 20, defer_enrichment: bool = False) -> Dict[str, Any]:
         """
         ゲーム検索メイン処理
         
@@ -38,37 +78,32 @@ class GameSearchService:
             filters: フィルター条件
             page: ページ番号
             per_page: 1ページあたりの件数
+            defer_enrichment: Trueの場合、Steam APIからの追加検索をバックグラウンドで実行し、
+                              データベースの検索結果だけを即座に返す
             
         Returns:
-            Dict[str, Any]: 検索結果
+            Dict[str, Any]: 検索結果（facets: ジャンル・プラットフォーム・価格帯ごとの件数、
+                            enrichment_pending: バックグラウンドで追加検索中の場合True）
         """
         try:
             current_app.logger.info(f"ゲーム検索開始: query='{query}', filters={filters}")
             
-            # データベースから検索
-            games, total_count = self.game_repository.search_games(
-                query=query, 
-                filters=filters, 
-                page=page, 
-                per_page=per_page
-            )
+            # データベースから検索（キャッシュ優先）
+            games, total_count = self._search_db(query, filters, page, per_page)
+            enrichment_pending = False
             
             # データベースに十分な結果がない場合、Steam APIから検索
-            if query and len(games) < 5 and page == 1:
-                current_app.logger.info(f"Steam APIから追加検索: '{query}'")
-                steam_games = self._search_from_steam_api(query)
-                
-                if steam_games:
-                    # Steam APIの結果をデータベースに保存（リポジトリ層を使用）
-                    self.game_repository.save_steam_games_from_api(steam_games)
+            if self._should_fallback_to_steam(query, games, page):
+                if defer_enrichment:
+                    enrichment_pending = self.start_steam_enrichment(query)
+                else:
+                    new_count = self._run_steam_fallback(query)
                     
-                    # データベースから再検索
-                    games, total_count = self.game_repository.search_games(
-                        query=query, 
-                        filters=filters, 
-                        page=page, 
-                        per_page=per_page
-                    )
+                    if new_count:
+                        # データベースから再検索（保存時に該当キャッシュは無効化済み）
+                        games, total_count = self._search_db(query, filters, page, per_page)
+            
+            facets = self._get_facets(query, filters)
             
             # レスポンス用に整形
             formatted_games = [self._format_game_for_response(game) for game in games]
@@ -81,13 +116,250 @@ class GameSearchService:
             return {
                 'games': formatted_games,
                 'pagination': pagination,
-                'total_count': total_count
+                'total_count': total_count,
+                'facets': facets,
+                'enrichment_pending': enrichment_pending
             }
             
         except Exception as e:
             current_app.logger.error(f"ゲーム検索エラー: {e}")
             raise
     
+    def start_steam_enrichment(self, query: str) -> bool:
+        """
+        Steam APIからの追加検索をバックグラウンドで開始
+        
+        同じクエリの追加検索が実行中の場合は新たに開始しません。
+        進捗は get_enrichment_status で取得できます。
+        
+        Args:
+            query: 検索クエリ
+            
+        Returns:
+            bool: 追加検索が実行中（開始済みを含む）の場合True
+        """
+        term = normalize_query(query)
+        key = _enrichment_cache_key(term)
+        status = cache.get(key)
+        if (status and status.get('status') == ENRICHMENT_PENDING) or steam_fallback_flight.in_flight(term):
+            return True
+        
+        timeout = current_app.config.get('SEARCH_ENRICHMENT_STATUS_TTL', 300)
+        cache.set(key, {'status': ENRICHMENT_PENDING, 'new_count': 0}, timeout=timeout)
+        
+        try:
+            submit_background_task(_run_steam_enrichment, query, self.steam_service)
+        except Exception as e:
+            current_app.logger.error(f"Steam追加検索の開始エラー: {e}")
+            cache.delete(key)
+            return False
+        
+        current_app.logger.info(f"Steam追加検索をバックグラウンドで開始: '{query}'")
+        return True
+    
+    def get_enrichment_status(self, query: str) -> Dict[str, Any]:
+        """
+        バックグラウンド追加検索の状態を取得
+        
+        状態はキャッシュに保存するため、複数プロセスで状態を共有するには共有キャッシュ（RedisCache）が必要です。
+        実行中の判定（steam_fallback_flight）はこのプロセス内のみのため、別のプロセスで開始された
+        追加検索の状態が見えない場合は none（不明）を返し、完了扱いにはしません。
+        
+        Args:
+            query: 検索クエリ
+            
+        Returns:
+            Dict[str, Any]: status（pending/done/failed/none=不明）と new_count
+        """
+        term = normalize_query(query)
+        status = cache.get(_enrichment_cache_key(term))
+        if status:
+            return status
+        
+        # 状態が失効していても、実行中または結果マーカーがあれば推定できる
+        if steam_fallback_flight.in_flight(term):
+            return {'status': ENRICHMENT_PENDING, 'new_count': 0}
+        if cache.get(_fallback_cache_key(term)):
+            return {'status': ENRICHMENT_DONE, 'new_count': 0}
+        return {'status': 'none', 'new_count': 0}
+    
+    def _search_db(self, query: Optional[str], filters: Optional[Dict[str, Any]],
+                   page: int, per_page: int) -> Tuple[List[GameModel], int]:
+        """
+        データベース検索（検索結果キャッシュ経由）
+        
+        キャッシュにはゲームIDと総件数のみを保存し、ヒット時は主キーIN検索1回で復元します。
+        検索語がない場合はカタログスナップショットで絞り込み・ソートします。
+        
+        Args:
+            query: 検索クエリ
+            filters: フィルター条件
+            page: ページ番号
+            per_page: 1ページあたりの件数
+            
+        Returns:
+            Tuple[List[GameModel], int]: (ゲーム一覧, 総件数)
+        """
+        if not query:
+            result = self._search_catalog_snapshot(filters, page, per_page)
+            if result is not None:
+                return result
+        
+        cached = search_result_cache.get(query, filters, page, per_page)
+        if cached is not None:
+            game_ids, total_count = cached
+            games = self.game_repository.get_by_ids(game_ids)
+            # 削除等で欠けている場合はキャッシュを使わず再検索
+            if len(games) == len(game_ids):
+                current_app.logger.debug(f"検索キャッシュヒット: query='{query}', page={page}")
+                return games, total_count
+        
+        games, total_count = self.game_repository.search_games(
+            query=query, 
+            filters=filters, 
+            page=page, 
+            per_page=per_page
+        )
+        search_result_cache.set(query, filters, page, per_page, [game.id for game in games], total_count)
+        return games, total_count
+    
+    def _search_catalog_snapshot(self, filters: Optional[Dict[str, Any]],
+                                 page: int, per_page: int) -> Optional[Tuple[List[GameModel], int]]:
+        """
+        検索語なしの一覧をカタログスナップショットから取得（DBからは表示ページのゲームのみ読み込む）
+        
+        Args:
+            filters: フィルター条件
+            page: ページ番号
+            per_page: 1ページあたりの件数
+            
+        Returns:
+            Optional[Tuple[List[GameModel], int]]: (ゲーム一覧, 総件数)、スナップショットを使えない場合はNone
+        """
+        snapshot = get_catalog_snapshot()
+        if snapshot is None:
+            return None
+        
+        sort = filters.get('sort', 'relevance') if filters else 'relevance'
+        game_ids, total_count = snapshot.select(filters, sort, page, per_page)
+        games = self.game_repository.get_by_ids(game_ids)
+        # 削除等で欠けている場合はスナップショットを作り直し、今回はDB検索に任せる
+        if len(games) != len(game_ids):
+            get_catalog_snapshot_manager().invalidate()
+            return None
+        return games, total_count
+    
+    def _get_facets(self, query: Optional[str], filters: Optional[Dict[str, Any]]) -> Dict[str, Dict[str, int]]:
+        """
+        検索結果全体のファセット件数を取得（検索語なしはカタログスナップショット、それ以外は検索結果キャッシュ経由）
+        
+        Args:
+            query: 検索クエリ
+            filters: フィルター条件
+            
+        Returns:
+            Dict[str, Dict[str, int]]: genre / platform / price_band ごとの件数
+        """
+        if not query:
+            snapshot = get_catalog_snapshot()
+            if snapshot is not None:
+                return snapshot.facets(filters)
+        
+        facets = search_result_cache.get_facets(query, filters)
+        if facets is None:
+            facets = self.game_repository.get_search_facets(query=query, filters=filters)
+            search_result_cache.set_facets(query, filters, facets)
+        return facets
+    
+    def _should_fallback_to_steam(self, query: Optional[str], games: List[GameModel], page: int) -> bool:
+        """
+        Steam APIフォールバック検索が必要か判定
+        
+        2ページ目以降、DBに十分な結果がある場合、タイトル完全一致がある場合、
+        直近に同じクエリでフォールバック済みの場合はスキップします。
+        
+        Args:
+            query: 検索クエリ
+            games: データベース検索結果
+            page: ページ番号
+            
+        Returns:
+            bool: フォールバックが必要な場合True
+        """
+        if not query or page > 1 or len(games) >= 5:
+            return False
+        
+        term = normalize_query(query)
+        if any(normalize_query(getattr(game, 'title', '')) == term for game in games):
+            return False
+        
+        marker = cache.get(_fallback_cache_key(term))
+        if marker:
+            current_app.logger.debug(f"Steam APIフォールバックをスキップ（{marker}）: '{query}'")
+            return False
+        
+        return True
+    
+    def _run_steam_fallback(self, query: str) -> int:
+        """
+        Steam APIフォールバック検索を実行（同一クエリの同時実行は1回に統合）
+        
+        Args:
+            query: 検索クエリ
+            
+        Returns:
+            int: 新規に取り込んだゲーム数
+        """
+        term = normalize_query(query)
+        wait_timeout = current_app.config.get('STEAM_FALLBACK_WAIT_TIMEOUT', 30)
+        
+        try:
+            new_count, shared = steam_fallback_flight.do(
+                term, lambda: self._fetch_and_save_from_steam(query), timeout=wait_timeout
+            )
+        except TimeoutError:
+            current_app.logger.warning(f"Steam APIフォールバック待機タイムアウト: '{query}'")
+            return 0
+        
+        if shared:
+            current_app.logger.info(f"実行中のSteam APIフォールバック結果を共有: '{query}' (新規 {new_count}件)")
+        return new_count
+    
+    def _fetch_and_save_from_steam(self, query: str) -> int:
+        """
+        Steam APIから検索してデータベースに保存し、結果マーカーを記録
+        
+        Args:
+            query: 検索クエリ
+            
+        Returns:
+            int: 新規に取り込んだゲーム数
+        """
+        current_app.logger.info(f"Steam APIから追加検索: '{query}'")
+        term = normalize_query(query)
+        steam_games = self._search_from_steam_api(query)
+        
+        new_count = 0
+        if steam_games:
+            existing_appids = self.game_repository.get_existing_steam_appids(
+                [game.get('steam_appid') for game in steam_games]
+            )
+            new_count = sum(1 for game in steam_games if str(game.get('steam_appid')) not in existing_appids)
+            
+            # Steam APIの結果をデータベースに保存（リポジトリ層を使用）
+            self.game_repository.save_steam_games_from_api(steam_games)
+        elif not self.steam_service.is_available():
+            # 障害による空振りはネガティブキャッシュしない
+            return 0
+        
+        if new_count:
+            marker, timeout = FALLBACK_KNOWN, current_app.config.get('STEAM_FALLBACK_KNOWN_TTL', 86400)
+        else:
+            marker, timeout = FALLBACK_EMPTY, current_app.config.get('STEAM_FALLBACK_NEGATIVE_TTL', 3600)
+        cache.set(_fallback_cache_key(term), marker, timeout=timeout)
+        
+        return new_count
+    
     def _search_from_steam_api(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
         """
         Steam APIから検索
@@ -237,3 +509,30 @@ class GameSearchService:
         except Exception as e:
             current_app.logger.error(f"人気ゲーム取得エラー: {e}")
             return []
+
+
+def _run_steam_enrichment(query: str, steam_service: 'SteamAPIService') -> int:
+    """
+    バックグラウンドで実行するSteam追加検索
+
+    リクエストとは別スレッドで実行されるため、新しいリポジトリ（DBセッション）を使用します。
+
+    Args:
+        query: 検索クエリ
+        steam_service: Steam APIサービス
+
+    Returns:
+        int: 新規に取り込んだゲーム数
+    """
+    key = _enrichment_cache_key(normalize_query(query))
+    timeout = current_app.config.get('SEARCH_ENRICHMENT_STATUS_TTL', 300)
+
+    try:
+        new_count = GameSearchService(steam_service=steam_service)._run_steam_fallback(query)
+    except Exception:
+        cache.set(key, {'status': ENRICHMENT_FAILED, 'new_count': 0}, timeout=timeout)
+        raise
+
+    cache.set(key, {'status': ENRICHMENT_DONE, 'new_count': new_count}, timeout=timeout)
+    current_app.logger.info(f"Steam追加検索完了: '{query}' (新規 {new_count}件)")
+    return new_count
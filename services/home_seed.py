@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""Home Seed
+
+トップページ用のゲームが少ない場合に、Steam APIから最近のゲームを取り込むジョブ。
+リクエスト処理の中では実行せず、バックグラウンドタスクまたはCLIコマンドから実行します。
+"""
+
+import logging
+from typing import Optional, TYPE_CHECKING
+
+from flask import current_app
+
+from extensions import cache
+from models import db, Game
+from repositories.game_repository import GameRepository
+from services.background import submit_background_task
+from services.single_flight import SingleFlight
+
+# Steam APIクライアントは取り込みの実行時に読み込む（起動時間の短縮）
+if TYPE_CHECKING:
+    from services.steam_service import SteamAPIService
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_MIN_GAMES = 3
+DEFAULT_SEED_LIMIT = 10
+DEFAULT_RETRY_INTERVAL = 600
+
+# 他プロセスも含めて重複実行を抑止するキー
+_SCHEDULED_KEY = 'home_seed:scheduled'
+
+home_seed_flight = SingleFlight()
+
+
+def seed_home_games(steam_service: Optional['SteamAPIService'] = None, limit: Optional[int] = None,
+                    force: bool = False) -> int:
+    """
+    データベースのゲームが少ない場合にSteam APIから最近のゲームを取り込む
+
+    Args:
+        steam_service: Steam APIサービス（指定しない場合は新規作成）
+        limit: 取得件数、Noneの場合は設定ファイルから取得
+        force: Trueの場合、ゲーム数に関わらず取り込む
+
+    Returns:
+        int: 保存したゲーム数
+    """
+    min_games = current_app.config.get('HOME_SEED_MIN_GAMES', DEFAULT_MIN_GAMES)
+    if not force and db.session.query(Game.id).limit(min_games).count() >= min_games:
+        return 0
+
+    limit = limit or current_app.config.get('HOME_SEED_LIMIT', DEFAULT_SEED_LIMIT)
+    if steam_service is None:
+        from services.steam_service import SteamAPIService
+        steam_service = SteamAPIService()
+
+    def run() -> int:
+        recent_games = steam_service.get_recent_games(limit)
+        if not recent_games:
+            return 0
+        saved = GameRepository().save_steam_games_from_api(recent_games)
+        logger.info(f"トップページ用ゲームを取り込みました: {len(saved)}件")
+        return len(saved)
+
+    saved_count, _ = home_seed_flight.do('home_seed', run)
+    return saved_count
+
+
+def schedule_home_seed() -> bool:
+    """
+    トップページ用ゲームの取り込みをバックグラウンドで開始
+
+    実行中、または直近に開始済み（HOME_SEED_RETRY_INTERVAL 秒以内）の場合は開始しません。
+
+    Returns:
+        bool: 新たに開始した場合True
+    """
+    if not current_app.config.get('HOME_SEED_ENABLED', True):
+        return False
+    if home_seed_flight.in_flight('home_seed'):
+        return False
+
+    interval = current_app.config.get('HOME_SEED_RETRY_INTERVAL', DEFAULT_RETRY_INTERVAL)
+    if cache.get(_SCHEDULED_KEY):
+        return False
+    cache.set(_SCHEDULED_KEY, True, timeout=interval)
+
+    try:
+        submit_background_task(seed_home_games)
+    except Exception as e:
+        logger.error(f"トップページ用ゲーム取り込みの開始エラー: {e}")
+        cache.delete(_SCHEDULED_KEY)
+        return False
+
+    logger.info("トップページ用ゲームの取り込みをバックグラウンドで開始")
+    return True
@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+"""HTTP Client
+
+外部API呼び出し用のプロセス共通HTTPクライアント。
+ホスト単位のコネクションプール、Retry-Afterを尊重するジッター付きリトライ、
+上流サービスごとのサーキットブレーカーを提供します。
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+
+# デフォルト設定（Flaskコンテキスト外で使用される場合）
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 20
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_BACKOFF_FACTOR = 0.5
+DEFAULT_BACKOFF_JITTER = 0.3
+DEFAULT_RETRY_AFTER_MAX = 30
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30
+
+# リトライ・サーキットブレーカーの対象とするステータスコード
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """
+    サーキットブレーカーが開いている間の呼び出しで送出される例外
+
+    requests.exceptions.RequestException を継承しているため、
+    既存の例外処理でそのまま捕捉できます。
+    """
+
+    def __init__(self, upstream: str, retry_in: float):
+        super().__init__(f"サーキットブレーカー作動中: {upstream} (再試行まで {retry_in:.1f}秒)")
+        self.upstream = upstream
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    上流サービス単位のサーキットブレーカー
+
+    連続失敗が閾値に達すると open 状態になり、reset_timeout の間は
+    呼び出しを即座に失敗させます。経過後は half-open 状態で1件だけ試行し、
+    成功すれば closed に戻ります。
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout: float = DEFAULT_RESET_TIMEOUT):
+        """
+        初期化
+
+        Args:
+            name: 上流サービス名（ホスト名）
+            failure_threshold: open にする連続失敗回数
+            reset_timeout: open から half-open に移るまでの秒数
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._half_open_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """現在の状態を取得"""
+        with self._lock:
+            return self._state_locked()
+
+    def _state_locked(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def before_call(self) -> None:
+        """
+        呼び出し前のチェック
+
+        Raises:
+            CircuitOpenError: open 状態、または half-open で試行中の場合
+        """
+        with self._lock:
+            state = self._state_locked()
+            if state == self.CLOSED:
+                return
+            if state == self.HALF_OPEN and not self._half_open_in_flight:
+                self._half_open_in_flight = True
+                return
+            retry_in = max(0.0, self.reset_timeout - (time.monotonic() - (self._opened_at or 0)))
+            raise CircuitOpenError(self.name, retry_in)
+
+    def record_success(self) -> None:
+        """成功を記録して closed に戻す"""
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info(f"サーキットブレーカー復旧: {self.name}")
+            self._failures = 0
+            self._opened_at = None
+            self._half_open_in_flight = False
+
+    def record_failure(self) -> None:
+        """失敗を記録し、閾値を超えたら open にする"""
+        with self._lock:
+            self._failures += 1
+            was_half_open = self._half_open_in_flight
+            self._half_open_in_flight = False
+            if was_half_open or self._failures >= self.failure_threshold:
+                if self._opened_at is None or was_half_open:
+                    logger.warning(f"サーキットブレーカー作動: {self.name} (連続失敗 {self._failures}回)")
+                self._opened_at = time.monotonic()
+
+
+class _BoundedRetry(Retry):
+    """Retry-After の待機時間に上限を設けたRetry"""
+
+    retry_after_max = DEFAULT_RETRY_AFTER_MAX
+
+    def parse_retry_after(self, retry_after: str) -> float:
+        return min(super().parse_retry_after(retry_after), self.retry_after_max)
+
+
+class HTTPClient:
+    """
+    プロセス共通HTTPクライアント
+
+    requests.Session を1つだけ保持し、ホストごとのコネクションプールを再利用します。
+    """
+
+    def __init__(self, pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+                 max_retries: int = DEFAULT_MAX_RETRIES,
+                 backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+                 backoff_jitter: float = DEFAULT_BACKOFF_JITTER,
+                 failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout: float = DEFAULT_RESET_TIMEOUT):
+        """
+        初期化
+
+        Args:
+            pool_connections: キャッシュするホスト別プール数
+            pool_maxsize: ホストあたりの最大コネクション数
+            max_retries: 最大リトライ回数
+            backoff_factor: 指数バックオフの係数（秒）
+            backoff_jitter: バックオフに加えるランダムジッターの最大値（秒）
+            failure_threshold: サーキットブレーカーの連続失敗閾値
+            reset_timeout: サーキットブレーカーの復旧待ち秒数
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._breakers_lock = threading.Lock()
+
+        retry = _BoundedRetry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            backoff_factor=backoff_factor,
+            backoff_jitter=backoff_jitter,
+            status_forcelist=RETRY_STATUS_CODES,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': 'GameBargain/1.0'
+        })
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get_breaker(self, url_or_host: str) -> CircuitBreaker:
+        """
+        上流サービスのサーキットブレーカーを取得
+
+        Args:
+            url_or_host: URLまたはホスト名
+
+        Returns:
+            CircuitBreaker: ホスト単位のサーキットブレーカー
+        """
+        host = urlsplit(url_or_host).netloc or url_or_host
+        with self._breakers_lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = CircuitBreaker(host, self.failure_threshold, self.reset_timeout)
+                self._breakers[host] = breaker
+            return breaker
+
+    def is_available(self, url_or_host: str) -> bool:
+        """
+        上流サービスが呼び出し可能か（サーキットが open でないか）
+
+        Args:
+            url_or_host: URLまたはホスト名
+
+        Returns:
+            bool: 呼び出し可能な場合True
+        """
+        return self.get_breaker(url_or_host).state != CircuitBreaker.OPEN
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        HTTPリクエストを送信
+
+        Args:
+            method: HTTPメソッド
+            url: リクエストURL
+            **kwargs: requests.Session.request に渡す引数
+
+        Returns:
+            requests.Response: レスポンス
+
+        Raises:
+            CircuitOpenError: サーキットブレーカーが開いている場合
+            requests.exceptions.RequestException: 通信エラーの場合
+        """
+        breaker = self.get_breaker(url)
+        breaker.before_call()
+
+        kwargs.setdefault('timeout', 10)
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            breaker.record_failure()
+            raise
+
+        if response.status_code in RETRY_STATUS_CODES:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """GETリクエストを送信"""
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """POSTリクエストを送信"""
+        return self.request('POST', url, **kwargs)
+
+
+_http_client: Optional[HTTPClient] = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client() -> HTTPClient:
+    """
+    プロセス共通のHTTPクライアントを取得
+
+    Flaskアプリケーションコンテキスト内で初めて呼ばれた場合は設定値を使用し、
+    コンテキスト外ではデフォルト値で初期化します。
+
+    Returns:
+        HTTPClient: 共有HTTPクライアント
+    """
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                _http_client = HTTPClient(**_load_client_options())
+    return _http_client
+
+
+def reset_http_client() -> None:
+    """共有HTTPクライアントを破棄（テストや設定変更時用）"""
+    global _http_client
+    with _http_client_lock:
+        if _http_client is not None:
+            _http_client.session.close()
+        _http_client = None
+
+
+def _load_client_options() -> Dict[str, float]:
+    """
+    Flask設定からHTTPクライアントの設定値を読み込む
+
+    Returns:
+        Dict[str, float]: HTTPClient のコンストラクタ引数
+    """
+    try:
+        from flask import current_app
+        config = current_app.config
+    except (ImportError, RuntimeError):
+        return {}
+
+    return {
+        'pool_maxsize': int(config.get('HTTP_POOL_MAXSIZE', DEFAULT_POOL_MAXSIZE)),
+        'max_retries': int(config.get('HTTP_MAX_RETRIES', DEFAULT_MAX_RETRIES)),
+        'backoff_factor': float(config.get('HTTP_BACKOFF_FACTOR', DEFAULT_BACKOFF_FACTOR)),
+        'failure_threshold': int(config.get('CIRCUIT_BREAKER_FAILURE_THRESHOLD', DEFAULT_FAILURE_THRESHOLD)),
+        'reset_timeout': float(config.get('CIRCUIT_BREAKER_RESET_TIMEOUT', DEFAULT_RESET_TIMEOUT)),
+    }
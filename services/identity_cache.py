@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""Identity Cache
+
+Flask-Login のユーザーローダー用の認証済みユーザーキャッシュ。
+ID・Discord ID・ユーザー名・アバター、JSONを解析済みのプリファレンス・ギルドIDだけを
+共有キャッシュ（extensions.cache）に短時間保持し、認証済みリクエストごとの
+users テーブルへの問い合わせを省きます。
+
+スナップショットにない属性を参照した場合のみ、そのリクエスト内で1回だけ User を読み込みます。
+User の更新・削除はコミット後にセッションイベントでキャッシュから削除します。
+"""
+
+import copy
+import logging
+from typing import Any, Dict, Optional
+
+from flask import current_app, has_app_context
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from extensions import cache
+from models import db, User
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_TIMEOUT = 60
+
+_IDENTITY_KEY = 'identity:{user_id}'
+_SESSION_INFO_KEY = 'identity_cache_changes'
+
+
+def _identity_key(user_id: Any) -> str:
+    return _IDENTITY_KEY.format(user_id=user_id)
+
+
+def build_identity(user: User) -> Dict[str, Any]:
+    """
+    User からキャッシュするスナップショットを作成
+
+    Args:
+        user: ユーザー
+
+    Returns:
+        Dict[str, Any]: ユーザーのスナップショット
+    """
+    return {
+        'id': user.id,
+        'discord_id': user.discord_id,
+        'username': user.username,
+        'avatar_url': user.avatar_url,
+        'is_active': bool(user.is_active) if user.is_active is not None else True,
+        'preferences': user.get_preferences(),
+        'guild_ids': user.get_guild_ids(),
+    }
+
+
+class CachedUser(UserMixin):
+    """
+    キャッシュしたスナップショットから復元した認証済みユーザー
+
+    スナップショットにない属性（通知設定・トークンなど）の参照・代入は User を読み込んで委譲します。
+    """
+
+    _SNAPSHOT_FIELDS = ('id', 'discord_id', 'username', 'avatar_url')
+
+    def __init__(self, identity: Dict[str, Any], user: Optional[User] = None):
+        """
+        初期化
+
+        Args:
+            identity: build_identity で作成したスナップショット
+            user: 読み込み済みの User（キャッシュミス時）
+        """
+        self._identity = identity
+        self._user = user
+        self.id = identity['id']
+        self.discord_id = identity['discord_id']
+        self.username = identity['username']
+        self.avatar_url = identity['avatar_url']
+
+    @property
+    def is_active(self) -> bool:
+        return self._identity['is_active']
+
+    def get_preferences(self) -> Dict[str, Any]:
+        """プリファレンスを取得（解析済みの値のコピー）"""
+        return copy.deepcopy(self._identity['preferences'])
+
+    def get_guild_ids(self) -> list:
+        """ギルドIDリストを取得（解析済みの値のコピー）"""
+        return list(self._identity['guild_ids'])
+
+    @property
+    def model(self) -> User:
+        """User モデル（初回参照時に読み込み）"""
+        if self._user is None:
+            self._user = db.session.get(User, self.id)
+            if self._user is None:
+                raise LookupError(f"ユーザーが見つかりません: {self.id}")
+        return self._user
+
+    def __getattr__(self, name: str) -> Any:
+        # スナップショットにない属性のみここに来る
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name.startswith('_') or name in self._SNAPSHOT_FIELDS:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.model, name, value)
+
+    def __repr__(self) -> str:
+        return f'<CachedUser {self.username}>'
+
+
+def load_identity(user_id: str) -> Optional[CachedUser]:
+    """
+    ユーザーローダー本体（キャッシュにあれば問い合わせなし）
+
+    Args:
+        user_id: セッションに保存されたユーザーID
+
+    Returns:
+        Optional[CachedUser]: 認証済みユーザー（存在しない場合はNone）
+    """
+    try:
+        user_id_int = int(user_id)
+    except (TypeError, ValueError):
+        return None
+
+    key = _identity_key(user_id_int)
+    try:
+        identity = cache.get(key)
+    except Exception as e:
+        logger.warning(f"ユーザーキャッシュ取得エラー: {e}")
+        identity = None
+    if identity is not None:
+        return CachedUser(identity)
+
+    user = db.session.get(User, user_id_int)
+    if user is None:
+        return None
+    identity = build_identity(user)
+    try:
+        cache.set(key, identity, timeout=current_app.config.get('IDENTITY_CACHE_TIMEOUT', DEFAULT_TIMEOUT))
+    except Exception as e:
+        logger.warning(f"ユーザーキャッシュ保存エラー: {e}")
+    return CachedUser(identity, user)
+
+
+def invalidate_identity(user_id: Any) -> None:
+    """
+    ユーザーのキャッシュを削除
+
+    Args:
+        user_id: ユーザーID
+    """
+    try:
+        cache.delete(_identity_key(user_id))
+    except Exception as e:
+        logger.warning(f"ユーザーキャッシュ削除エラー: {e}")
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_user_changes(session: Session, flush_context: Any) -> None:
+    """フラッシュされたユーザーの更新・削除をセッションに記録"""
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User) and obj.id is not None:
+            session.info.setdefault(_SESSION_INFO_KEY, set()).add(obj.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed_users(session: Session) -> None:
+    """コミット後に変更されたユーザーのキャッシュを削除"""
+    user_ids = session.info.pop(_SESSION_INFO_KEY, None)
+    # アプリケーションコンテキスト外のセッションではキャッシュに触れない
+    if not user_ids or not has_app_context():
+        return
+    for user_id in user_ids:
+        invalidate_identity(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_user_changes(session: Session) -> None:
+    """ロールバックされた変更を破棄"""
+    session.info.pop(_SESSION_INFO_KEY, None)
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""Job Checkpoint
+
+長時間かかるバッチジョブのチェックポイント（job_runs）。
+ジョブはチャンクのデータと同じトランザクションでカーソルと件数を保存するため、
+途中で停止しても最後にコミットしたチャンクまでの結果とチェックポイントは一致し、
+`--resume` で停止したチャンクから再開できます。
+"""
+
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.engine import Connection
+
+from models import db
+from models.job_run import JobRun, JobStatus
+
+logger = logging.getLogger(__name__)
+
+
+class JobCheckpoint:
+    """1回のジョブ実行のチェックポイント"""
+
+    def __init__(self, run_id: int, job_name: str, cursor: Optional[str], counters: Dict[str, Any],
+                 started_at: datetime, resumed: bool = False):
+        """
+        初期化（start で作成すること）
+
+        Args:
+            run_id: job_runs のID
+            job_name: ジョブ名
+            cursor: 最後にコミットしたチャンクの位置
+            counters: 処理件数などの集計
+            started_at: 実行開始日時（再開した場合は最初の開始日時）
+            resumed: 中断した実行を再開した場合True
+        """
+        self.run_id = run_id
+        self.job_name = job_name
+        self.cursor = cursor
+        self.counters = counters
+        self.started_at = started_at
+        self.resumed = resumed
+
+    @classmethod
+    def start(cls, job_name: str, resume: bool = False) -> 'JobCheckpoint':
+        """
+        ジョブの実行を開始
+
+        Args:
+            job_name: ジョブ名
+            resume: Trueの場合、最後の実行が完了していなければそのチェックポイントから再開
+
+        Returns:
+            JobCheckpoint: チェックポイント
+        """
+        table = JobRun.__table__
+        now = datetime.now(timezone.utc)
+        with db.engine.begin() as connection:
+            last = connection.execute(
+                select(table).where(table.c.job_name == job_name).order_by(table.c.id.desc()).limit(1)
+            ).first()
+            if resume and last is not None and last.status != JobStatus.COMPLETED:
+                connection.execute(
+                    update(table).where(table.c.id == last.id)
+                    .values(status=JobStatus.RUNNING, error=None, updated_at=now)
+                )
+                logger.info(f"ジョブを再開します: {job_name} (カーソル {last.cursor})")
+                counters = json.loads(last.counters) if last.counters else {}
+                return cls(last.id, job_name, last.cursor, counters, last.started_at, resumed=True)
+
+            if resume:
+                logger.info(f"再開できる実行がないため最初から実行します: {job_name}")
+            run_id = connection.execute(
+                table.insert().values(job_name=job_name, status=JobStatus.RUNNING, counters='{}',
+                                      started_at=now, updated_at=now)
+            ).inserted_primary_key[0]
+        return cls(run_id, job_name, None, {}, now)
+
+    def save(self, connection: Connection, cursor: Any, **counters: Any) -> None:
+        """
+        チャンクのコミットと同じトランザクションでチェックポイントを保存
+
+        Args:
+            connection: チャンクを書き込んだDB接続（コミット前）
+            cursor: このチャンクで処理済みの位置
+            **counters: 更新する集計（累計値）
+        """
+        self.counters.update(counters)
+        table = JobRun.__table__
+        connection.execute(
+            update(table).where(table.c.id == self.run_id).values(
+                cursor=str(cursor), counters=json.dumps(self.counters, default=str),
+                updated_at=datetime.now(timezone.utc),
+            )
+        )
+        self.cursor = str(cursor)
+
+    def complete(self) -> None:
+        """実行を完了"""
+        self._finish(JobStatus.COMPLETED)
+
+    def fail(self, error: Exception) -> None:
+        """
+        実行を失敗として記録（チェックポイントは残るため --resume で再開できる）
+
+        Args:
+            error: 発生したエラー
+        """
+        self._finish(JobStatus.FAILED, str(error)[:1000])
+
+    def _finish(self, status: str, error: Optional[str] = None) -> None:
+        table = JobRun.__table__
+        now = datetime.now(timezone.utc)
+        with db.engine.begin() as connection:
+            connection.execute(
+                update(table).where(table.c.id == self.run_id).values(
+                    status=status, error=error, updated_at=now,
+                    finished_at=now if status == JobStatus.COMPLETED else None,
+                )
+            )
@@ -4,21 +4,29 @@ Price Change Detector Service
 価格変動を検出し、通知を送信するサービス
 """
 
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional
 from datetime import datetime, timezone
 from decimal import Decimal
 import logging
 
+from sqlalchemy.engine import Connection
+
 from models import db, Game, Price, User
 from repositories.game_repository import GameRepository
 from repositories.price_repository import PriceRepository
 from repositories.user_repository import UserRepository
 from services.steam_service import SteamAPIService
+from services.deal_ranking import rebuild_deal_rankings
+from services.job_checkpoint import JobCheckpoint
 
 
 logger = logging.getLogger(__name__)
 
 
+DETECT_JOB_NAME = 'detect-price-changes'
+DEFAULT_CHUNK_SIZE = 100
+
+
 class PriceChange:
     """価格変動情報を表すクラス"""
     
@@ -54,26 +62,13 @@ class PriceChangeDetector:
         Returns:
             List[PriceChange]: 検出された価格変動のリスト
         """
-        price_changes = []
-        
         try:
             # 1. 価格データが存在しないゲームを検出
             games_without_prices = self._get_games_without_prices()
             logger.info(f"価格データが存在しないゲーム数: {len(games_without_prices)}")
             
             # 2. 価格データが存在しないゲームの価格を取得
-            for game in games_without_prices:
-                new_prices = self._fetch_game_prices(game)
-                for price_data in new_prices:
-                    price_change = PriceChange(
-                        game_id=getattr(game, 'id'),
-                        game_title=getattr(game, 'title'),
-                        store=price_data['store'],
-                        old_price=None,
-                        new_price=price_data['price'],
-                        change_type='new'
-                    )
-                    price_changes.append(price_change)
+            price_changes = self._detect_for_games(games_without_prices)
             
             # 3. 既存の価格データとの比較（将来的に実装）
             # TODO: 既存価格との比較機能を追加
@@ -85,34 +80,68 @@ class PriceChangeDetector:
             logger.error(f"価格変動検出エラー: {e}")
             return []
     
-    def process_price_changes(self) -> None:
+    def process_price_changes(self, chunk_size: int = DEFAULT_CHUNK_SIZE, resume: bool = False) -> Dict[str, int]:
         """
         価格変動を処理（価格更新と通知送信）
+        
+        価格データが存在しないゲームをゲームID順に chunk_size 件ずつ処理し、チャンクごとに
+        価格とチェックポイント（最後のゲームID・件数）を同じトランザクションでコミットします。
+        
+        Args:
+            chunk_size: 1回のコミットで処理するゲーム数
+            resume: Trueの場合、前回中断した実行のチェックポイントから再開
+            
+        Returns:
+            Dict[str, int]: games（確認したゲーム数）/ prices（保存した価格数、再開前の実行分を含む）
         """
+        checkpoint = JobCheckpoint.start(DETECT_JOB_NAME, resume=resume)
+        last_id = int(checkpoint.cursor or 0)
+        counters = {'games': checkpoint.counters.get('games', 0), 'prices': checkpoint.counters.get('prices', 0)}
+        
         try:
-            price_changes = self.detect_price_changes()
-            
-            if not price_changes:
-                logger.info("処理する価格変動がありません")
-                return
+            while True:
+                games = self._get_games_without_prices(after_id=last_id, limit=chunk_size)
+                if not games:
+                    break
+                
+                price_changes = self._detect_for_games(games)
+                last_id = getattr(games[-1], 'id')
+                counters['games'] += len(games)
+                counters['prices'] += len(price_changes)
+                
+                # 価格データとチェックポイントを同じトランザクションで更新
+                self.update_prices(price_changes, checkpoint=lambda connection: checkpoint.save(
+                    connection, last_id, last_appid=getattr(games[-1], 'steam_appid'), **counters
+                ))
+                logger.info(f"価格変動処理: ゲームID {last_id} まで ({counters['games']}件確認)")
             
-            # 価格データを更新
-            self.update_prices(price_changes)
+            # 更新後の価格でセールランキングを再作成
+            if counters['prices']:
+                try:
+                    rebuild_deal_rankings()
+                except Exception as e:
+                    logger.error(f"セールランキング作成エラー: {e}")
             
-            # 通知送信（将来的に実装）
-            # TODO: NotificationServiceを使用した通知機能を追加
+            # 通知・キャッシュ無効化・統計更新は、価格と同じトランザクションで記録した
+            # アウトボックスのイベントから `flask process-outbox` が行う
             
-            logger.info(f"価格変動処理完了: {len(price_changes)}件")
+            checkpoint.complete()
+            logger.info(f"価格変動処理完了: {counters['prices']}件")
             
         except Exception as e:
-            logger.error(f"価格変動処理エラー: {e}")
+            checkpoint.fail(e)
+            logger.error(f"価格変動処理エラー（--resume でゲームID {last_id} の次から再開できます）: {e}")
+        
+        return counters
     
-    def update_prices(self, price_changes: List[PriceChange]) -> None:
+    def update_prices(self, price_changes: List[PriceChange],
+                      checkpoint: Optional[Callable[[Connection], None]] = None) -> None:
         """
         価格データを更新
         
         Args:
             price_changes: 価格変動のリスト
+            checkpoint: コミット直前に同じトランザクションで実行するチェックポイントの保存処理
         """
         try:
             for change in price_changes:
@@ -132,6 +161,8 @@ class PriceChangeDetector:
                 
                 # TODO: 他の変動タイプの処理を追加
             
+            if checkpoint is not None:
+                checkpoint(self.price_repository.session.connection())
             self.price_repository.commit()
             logger.info(f"価格データ更新完了: {len(price_changes)}件")
             
@@ -140,26 +171,50 @@ class PriceChangeDetector:
             logger.error(f"価格データ更新エラー: {e}")
             raise
     
-    def _get_games_without_prices(self) -> List[Game]:
+    def _get_games_without_prices(self, after_id: int = 0, limit: int = 10) -> List[Game]:
         """
         価格データが存在しないゲームを取得
         
+        Args:
+            after_id: このゲームIDより後のゲームのみ（チャンク処理のカーソル）
+            limit: 最大件数
+            
         Returns:
-            List[Game]: 価格データが存在しないゲームのリスト（最大10件）
-        """
-        try:
-            # GameテーブルとPriceテーブルを結合して、価格データが存在しないゲームを取得
-            games_with_prices_subquery = db.session.query(Price.game_id).distinct()
-            games_without_prices = db.session.query(Game).filter(
-                ~Game.id.in_(games_with_prices_subquery),
-                Game.is_active == True
-            ).filter(Game.steam_appid.isnot(None)).limit(10).all()  # Steam App IDが存在するもののみ、最大10件
+            List[Game]: 価格データが存在しないゲームのリスト（ゲームID順）
             
-            return games_without_prices
+        Raises:
+            Exception: DBエラー（空リストと区別できるよう呼び出し側に伝える）
+        """
+        # GameテーブルとPriceテーブルを結合して、価格データが存在しないゲームを取得
+        games_with_prices_subquery = db.session.query(Price.game_id).distinct()
+        return db.session.query(Game).filter(
+            ~Game.id.in_(games_with_prices_subquery),
+            Game.is_active == True,
+            Game.id > after_id
+        ).filter(Game.steam_appid.isnot(None)).order_by(Game.id).limit(limit).all()  # Steam App IDが存在するもののみ
+    
+    def _detect_for_games(self, games: List[Game]) -> List[PriceChange]:
+        """
+        ゲームの価格を外部APIから取得して新規価格の変動に変換
+        
+        Args:
+            games: 価格データが存在しないゲーム
             
-        except Exception as e:
-            logger.error(f"価格データなしゲーム取得エラー: {e}")
-            return []
+        Returns:
+            List[PriceChange]: 価格変動のリスト
+        """
+        price_changes = []
+        for game in games:
+            for price_data in self._fetch_game_prices(game):
+                price_changes.append(PriceChange(
+                    game_id=getattr(game, 'id'),
+                    game_title=getattr(game, 'title'),
+                    store=price_data['store'],
+                    old_price=None,
+                    new_price=price_data['price'],
+                    change_type='new'
+                ))
+        return price_changes
     
     def _fetch_game_prices(self, game: Game) -> List[Dict[str, Any]]:
         """
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""Price Digest
+
+ユーザーごとの価格変動ダイジェストの作成。
+前回の集計以降（初回は頻度ごとの期間内）にお気に入りのゲームで記録された
+価格履歴をまとめ、値下がり・セール開始したゲームを割引率順に並べた通知を
+ユーザーごとに1件だけ作成します。セール時に変動が数百件あっても通知・送信は1件で済みます。
+集計した日時は値下がりがなく送信しなかった場合も users.last_digest_at に記録するため、
+次回の集計は常に前回の続きからになります。
+
+頻度はユーザーの preferences の notification_frequency（hourly / daily / weekly / off）で、
+未設定の場合は DIGEST_DEFAULT_FREQUENCY を使用します。
+"""
+
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+from flask import current_app
+from sqlalchemy import and_, func, or_, select, update
+
+from models import db, Favorite, Game, Notification, NotificationType, PriceHistory, User
+from models.price import current_price_expression
+
+logger = logging.getLogger(__name__)
+
+
+# preferences のキー
+FREQUENCY_PREFERENCE = 'notification_frequency'
+FREQUENCY_OFF = 'off'
+
+# 頻度ごとの集計期間（分）
+DEFAULT_WINDOWS = {'hourly': 60, 'daily': 1440, 'weekly': 10080}
+DEFAULT_FREQUENCY = 'daily'
+DEFAULT_MAX_ITEMS = 10
+DEFAULT_BATCH_SIZE = 500
+
+# 定期実行のずれで1回分飛ばさないための猶予
+DUE_GRACE = timedelta(minutes=5)
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _user_window(user: User, windows: Dict[str, int], default_frequency: str) -> Optional[timedelta]:
+    """ユーザーの頻度設定に対応する集計期間（配信しない場合はNone）"""
+    frequency = user.get_preferences().get(FREQUENCY_PREFERENCE) or default_frequency
+    if frequency == FREQUENCY_OFF or frequency not in windows:
+        return None
+    return timedelta(minutes=windows[frequency])
+
+
+def _events_query(user_ids: List[int], since: datetime):
+    """
+    指定ユーザーのお気に入りの価格履歴（直前の価格付き）を取得するクエリ
+
+    直前の価格は (game_id, store) ごとの LAG で求めるため、
+    期間の最初の変動についても変動前の価格が分かります。
+    LAG の対象は since より後の履歴と、(game_id, store) ごとに since 以前で最後の履歴に限ります
+    （履歴全体を読まないため）。
+    """
+    favorite_games = select(Favorite.game_id).where(
+        Favorite.user_id.in_(user_ids), Favorite.notification_enabled == True
+    ).distinct()
+    anchors = select(
+        PriceHistory.game_id,
+        PriceHistory.store,
+        func.max(PriceHistory.recorded_at).label('recorded_at'),
+    ).where(
+        PriceHistory.game_id.in_(favorite_games), PriceHistory.recorded_at <= since
+    ).group_by(PriceHistory.game_id, PriceHistory.store).subquery()
+    price = current_price_expression(PriceHistory)
+    history = select(
+        PriceHistory.game_id,
+        PriceHistory.store,
+        PriceHistory.regular_price,
+        PriceHistory.discount_rate,
+        PriceHistory.recorded_at,
+        price.label('price'),
+        func.lag(price).over(
+            partition_by=(PriceHistory.game_id, PriceHistory.store),
+            order_by=(PriceHistory.recorded_at, PriceHistory.id),
+        ).label('previous_price'),
+    ).outerjoin(
+        anchors,
+        and_(
+            anchors.c.game_id == PriceHistory.game_id,
+            anchors.c.store == PriceHistory.store,
+            anchors.c.recorded_at == PriceHistory.recorded_at,
+        ),
+    ).where(
+        PriceHistory.game_id.in_(favorite_games),
+        or_(PriceHistory.recorded_at > since, anchors.c.game_id.isnot(None)),
+    ).subquery()
+
+    return select(
+        Favorite.user_id,
+        history.c.game_id,
+        history.c.store,
+        history.c.price,
+        history.c.previous_price,
+        history.c.regular_price,
+        history.c.discount_rate,
+        history.c.recorded_at,
+        Game.title,
+    ).join(
+        history, history.c.game_id == Favorite.game_id
+    ).join(
+        Game, Game.id == Favorite.game_id
+    ).where(
+        Favorite.user_id.in_(user_ids),
+        Favorite.notification_enabled == True,
+        history.c.recorded_at > since,
+    )
+
+
+def rank_price_drops(events: pd.DataFrame, starts: Dict[int, datetime]) -> pd.DataFrame:
+    """
+    ユーザー・ゲームごとに期間内の価格変動をまとめ、値下がりしたものを割引率順に並べる
+
+    (game_id, store) ごとに期間の最初の変動前の価格と最後の価格を比べ、
+    ゲームごとに最も安いストアを残します。
+
+    Args:
+        events: _events_query の結果
+        starts: ユーザーIDごとの期間の開始日時
+
+    Returns:
+        pd.DataFrame: user_id, game_id, title, store, old_price, price, discount_rate, drop_rate の行
+            （ユーザーごとに割引率・値下がり率の高い順）
+    """
+    columns = ['user_id', 'game_id', 'title', 'store', 'old_price', 'price', 'discount_rate', 'drop_rate']
+    if events.empty:
+        return pd.DataFrame(columns=columns)
+
+    df = events.copy()
+    df['recorded_at'] = pd.to_datetime(df['recorded_at'], utc=True)
+    for column in ('price', 'previous_price', 'regular_price', 'discount_rate'):
+        df[column] = pd.to_numeric(df[column], errors='coerce').astype('float64')
+    start = pd.to_datetime(df['user_id'].map(starts), utc=True)
+    df = df[df['recorded_at'] > start].sort_values(['user_id', 'game_id', 'store', 'recorded_at'], kind='stable')
+    if df.empty:
+        return pd.DataFrame(columns=columns)
+
+    grouped = df.groupby(['user_id', 'game_id', 'store'], sort=False)
+    changes = grouped.last()
+    changes['old_price'] = grouped['previous_price'].first()
+    changes = changes.reset_index()
+
+    drops = changes[changes['old_price'].notna() & (changes['price'] < changes['old_price'])].copy()
+    drops['drop_rate'] = (1 - drops['price'] / drops['old_price']) * 100
+    drops['discount_rate'] = drops['discount_rate'].fillna(0)
+    return (
+        drops.sort_values(['user_id', 'game_id', 'price'], kind='stable')
+        .drop_duplicates(['user_id', 'game_id'])
+        .sort_values(['user_id', 'discount_rate', 'drop_rate', 'game_id'],
+                     ascending=[True, False, False, True], kind='stable')
+        [columns]
+        .reset_index(drop=True)
+    )
+
+
+def format_digest(drops: pd.DataFrame, max_items: int = DEFAULT_MAX_ITEMS) -> Dict[str, Any]:
+    """
+    1ユーザー分の値下がり一覧から通知のタイトル・本文を作成
+
+    Args:
+        drops: rank_price_drops の1ユーザー分の行（順位順）
+        max_items: 本文に載せる最大件数
+
+    Returns:
+        Dict[str, Any]: title, message, game_id（先頭のゲーム）
+    """
+    lines = []
+    for row in drops.head(max_items).itertuples(index=False):
+        discount = f" -{int(row.discount_rate)}%" if row.discount_rate else ''
+        lines.append(f"• {row.title}: ¥{int(row.old_price):,} → ¥{int(row.price):,}{discount} ({row.store})")
+    if len(drops) > max_items:
+        lines.append(f"ほか {len(drops) - max_items}件")
+    return {
+        'title': f"お気に入りの{len(drops)}件が値下がりしました",
+        'message': '\n'.join(lines),
+        'game_id': int(drops.iloc[0]['game_id']),
+    }
+
+
+def build_price_digests(now: Optional[datetime] = None, batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, int]:
+    """
+    配信時期に達したユーザーの価格変動ダイジェストを作成
+
+    前回の集計（users.last_digest_at）から頻度ごとの期間が過ぎたユーザーについて、
+    期間内の値下がりを1件の通知にまとめます。ユーザーID順にバッチで処理します。
+
+    Args:
+        now: 基準日時（省略時は現在）
+        batch_size: 1回に処理するユーザー数
+
+    Returns:
+        Dict[str, int]: users（対象ユーザー数）/ digests（作成した通知数）/ items（まとめた値下がり数）
+    """
+    started = time.monotonic()
+    now = now or datetime.now(timezone.utc)
+    config = current_app.config
+    windows = config.get('DIGEST_WINDOWS') or DEFAULT_WINDOWS
+    default_frequency = config.get('DIGEST_DEFAULT_FREQUENCY', DEFAULT_FREQUENCY)
+    max_items = int(config.get('DIGEST_MAX_ITEMS', DEFAULT_MAX_ITEMS))
+    digest_type = NotificationType.PRICE_DIGEST.value
+    stats = {'users': 0, 'digests': 0, 'items': 0}
+    last_id = 0
+
+    while True:
+        users = User.query.filter(
+            User.id > last_id,
+            User.is_active == True,
+            User.id.in_(select(Favorite.user_id).where(Favorite.notification_enabled == True)),
+        ).order_by(User.id).limit(batch_size).all()
+        if not users:
+            break
+        last_id = users[-1].id
+
+        starts: Dict[int, datetime] = {}
+        for user in users:
+            window = _user_window(user, windows, default_frequency)
+            if window is None:
+                continue
+            last_digest = _as_utc(user.last_digest_at)
+            if last_digest is not None and now - last_digest < window - DUE_GRACE:
+                continue
+            starts[user.id] = last_digest or now - window
+        if not starts:
+            continue
+
+        stats['users'] += len(starts)
+        events = pd.read_sql(_events_query(list(starts), min(starts.values())), db.session.connection())
+        drops = rank_price_drops(events, starts)
+        for user_id, user_drops in drops.groupby('user_id', sort=True):
+            digest = format_digest(user_drops, max_items)
+            db.session.add(Notification(
+                digest_type, digest['title'], digest['message'],
+                user_id=int(user_id), game_id=digest['game_id'], priority=2, created_at=now,
+            ))
+            stats['digests'] += 1
+            stats['items'] += len(user_drops)
+        # 値下がりがなかったユーザーも含めて集計済みの日時を進める（updated_at はプロフィールの更新日時のため変えない）
+        db.session.execute(
+            update(User).where(User.id.in_(list(starts))).values(last_digest_at=now, updated_at=User.updated_at),
+            execution_options={'synchronize_session': False},
+        )
+        db.session.commit()
+
+    logger.info(
+        f"価格ダイジェストを作成しました: 対象 {stats['users']}人, 通知 {stats['digests']}件, "
+        f"値下がり {stats['items']}件 ({time.monotonic() - started:.1f}秒)"
+    )
+    return stats
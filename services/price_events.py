@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""Price Events
+
+価格変更イベントのプロセス内Pub/Subと、プロセス間の中継。
+価格の書き込み側（PriceRepository）がコミット後にイベントを発行し、
+ライブ配信エンドポイント（SSE）が購読します。
+
+購読者ごとのキューやスレッドは持たず、直近のイベントを保持するリングバッファと
+1つの条件変数だけで待機するため、アイドル接続はスリープ中のスレッド1本分のコストで済みます。
+
+PRICE_EVENTS_REDIS_URL を設定すると、発行したイベントを Redis の Pub/Sub にも流し、
+各Webプロセスの中継スレッドが自プロセスのPub/Subへ取り込みます（巡回ワーカーなど別プロセスの価格変更も配信されます）。
+"""
+
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+
+# 再接続時の取りこぼし補完のために保持するイベント数
+DEFAULT_BUFFER_SIZE = 1000
+
+# プロセス間中継の Redis チャンネルと、切断時の再接続間隔（秒）
+RELAY_CHANNEL = 'gamebargain:price-events'
+RELAY_RECONNECT_SECONDS = 5
+
+
+class PriceEventBus:
+    """価格変更イベントのプロセス内Pub/Sub"""
+
+    def __init__(self, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        """
+        初期化
+
+        Args:
+            buffer_size: 保持する直近イベント数
+        """
+        self._events: deque = deque(maxlen=buffer_size)
+        self._seq = 0
+        self._cond = threading.Condition()
+        # 通番はプロセスごとのため、SSEのイベントIDには起動ごとのエポックを付ける
+        self.epoch = uuid.uuid4().hex[:8]
+
+    @property
+    def last_seq(self) -> int:
+        """最後に発行したイベントの通番"""
+        with self._cond:
+            return self._seq
+
+    def event_id(self, seq: int) -> str:
+        """SSEのイベントID（エポックと通番）"""
+        return f'{self.epoch}-{seq}'
+
+    def resume_seq(self, last_event_id: Optional[str]) -> int:
+        """
+        再接続時の Last-Event-ID から再開する通番を決定
+
+        他のプロセス・再起動前のプロセスが付けたIDや、現在の通番より先のIDの場合は
+        現在の通番から再開します（そのままでは以降のイベントを受け取れないため）。
+
+        Args:
+            last_event_id: クライアントが受け取った最後のイベントID
+
+        Returns:
+            int: この通番より後のイベントを配信する
+        """
+        epoch, _, seq = (last_event_id or '').rpartition('-')
+        with self._cond:
+            if epoch == self.epoch and seq.isdigit() and int(seq) <= self._seq:
+                return int(seq)
+            return self._seq
+
+    def publish(self, event: Dict[str, Any]) -> int:
+        """
+        イベントを発行
+
+        Args:
+            event: イベント内容（game_id を含むこと）
+
+        Returns:
+            int: 付与したイベント通番
+        """
+        with self._cond:
+            self._seq += 1
+            self._events.append(dict(event, seq=self._seq))
+            self._cond.notify_all()
+            return self._seq
+
+    def publish_many(self, events: Iterable[Dict[str, Any]]) -> None:
+        """
+        複数のイベントをまとめて発行（購読者の起床は1回）
+
+        Args:
+            events: イベント内容のリスト
+        """
+        with self._cond:
+            for event in events:
+                self._seq += 1
+                self._events.append(dict(event, seq=self._seq))
+            self._cond.notify_all()
+
+    def wait_for(self, game_ids: Iterable[int], after_seq: int, timeout: float) -> List[Dict[str, Any]]:
+        """
+        指定ゲームのイベントを待機
+
+        Args:
+            game_ids: 購読するゲームID
+            after_seq: この通番より後のイベントを返す
+            timeout: 最大待機秒数
+
+        Returns:
+            List[Dict[str, Any]]: 該当イベント（タイムアウト時は空リスト）
+        """
+        wanted = set(game_ids)
+        deadline = time.monotonic() + timeout
+
+        with self._cond:
+            # 現在の通番より先を待つと、以降のイベントを受け取れない
+            after_seq = min(after_seq, self._seq)
+            while True:
+                if self._seq > after_seq:
+                    events = [
+                        event for event in self._events
+                        if event['seq'] > after_seq and event.get('game_id') in wanted
+                    ]
+                    if events:
+                        return events
+                    # 無関係なイベントは読み飛ばす
+                    after_seq = self._seq
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                self._cond.wait(remaining)
+
+
+def build_price_event(price: Any) -> Dict[str, Any]:
+    """
+    価格モデルから配信用のイベントを作成
+
+    Args:
+        price: 価格情報（Priceモデル）
+
+    Returns:
+        Dict[str, Any]: 価格変更イベント
+    """
+    current_price = price.get_current_price()
+    regular_price = getattr(price, 'regular_price', None)
+    updated_at: Optional[datetime] = getattr(price, 'updated_at', None)
+
+    return {
+        'game_id': getattr(price, 'game_id', None),
+        'store': getattr(price, 'store', None),
+        'price': float(current_price) if current_price is not None else None,
+        'original_price': float(regular_price) if regular_price is not None else None,
+        'discount_percent': getattr(price, 'discount_rate', 0) or 0,
+        'is_on_sale': bool(getattr(price, 'is_on_sale', False)),
+        'updated_at': updated_at.isoformat() if updated_at else datetime.utcnow().isoformat(),
+    }
+
+
+class PriceEventRelay:
+    """Redis の Pub/Sub によるプロセス間の価格変更イベントの中継"""
+
+    def __init__(self, bus: PriceEventBus, channel: str = RELAY_CHANNEL):
+        """
+        初期化
+
+        Args:
+            bus: 中継先のプロセス内Pub/Sub
+            channel: Redis のチャンネル名
+        """
+        self._bus = bus
+        self._channel = channel
+        # 自プロセスが発行したイベントを二重に取り込まないための識別子
+        self._origin = uuid.uuid4().hex
+        self._clients: Dict[str, Any] = {}
+        self._listener: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _client(self, url: Optional[str]) -> Any:
+        """Redisクライアント（未設定の場合はNone）"""
+        if not url:
+            return None
+        with self._lock:
+            client = self._clients.get(url)
+            if client is None:
+                import redis
+                client = self._clients[url] = redis.Redis.from_url(url)
+            return client
+
+    def _configured_client(self) -> Any:
+        return self._client(current_app.config.get('PRICE_EVENTS_REDIS_URL'))
+
+    def publish(self, events: Iterable[Dict[str, Any]]) -> None:
+        """
+        イベントを自プロセスに発行し、中継が有効であれば他のプロセスにも流す
+
+        Args:
+            events: 価格変更イベント
+        """
+        events = list(events)
+        if not events:
+            return
+        self._bus.publish_many(events)
+        client = self._configured_client()
+        if client is None:
+            return
+        try:
+            client.publish(self._channel, json.dumps({'origin': self._origin, 'events': events}))
+        except Exception as e:
+            logger.warning(f"価格変更イベントの中継に失敗: {e}")
+
+    def ensure_listening(self) -> None:
+        """中継が有効であれば、他のプロセスのイベントを取り込むスレッドを起動（プロセスごとに1本）"""
+        client = self._configured_client()
+        if client is None:
+            return
+        with self._lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(target=self._listen, args=(client,),
+                                              name='price-event-relay', daemon=True)
+            self._listener.start()
+
+    def _listen(self, client: Any) -> None:
+        while True:
+            try:
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self._channel)
+                for message in pubsub.listen():
+                    self.receive(message.get('data'))
+            except Exception as e:
+                logger.warning(f"価格変更イベントの中継が切断されました（{RELAY_RECONNECT_SECONDS}秒後に再接続）: {e}")
+                time.sleep(RELAY_RECONNECT_SECONDS)
+
+    def receive(self, data: Any) -> None:
+        """
+        他のプロセスから中継されたイベントを自プロセスのPub/Subに発行
+
+        Args:
+            data: 中継メッセージ（JSON）
+        """
+        try:
+            body = json.loads(data)
+        except (TypeError, ValueError):
+            return
+        if body.get('origin') == self._origin:
+            return
+        events = [event for event in body.get('events') or [] if isinstance(event, dict)]
+        if events:
+            self._bus.publish_many(events)
+
+
+# プロセス共通インスタンス
+price_event_bus = PriceEventBus()
+price_event_relay = PriceEventRelay(price_event_bus)
@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+"""Price Outbox
+
+価格変更アウトボックス（price_outbox）の購読側ワーカー。
+購読側（notifier / cache / stats）ごとに未処理のイベントをまとめて確保し、ハンドラーで処理します。
+
+確保は PostgreSQL では FOR UPDATE SKIP LOCKED で他のワーカーが確保中の行を飛ばし、
+SQLite では書き込みが直列化されるため条件付きの UPDATE 1文で、いずれも期限付きのリースとして記録します。
+ハンドラーのDB更新と処理済みの印は同じトランザクションでコミットし、
+リースを失っていた場合はロールバックするため、各イベントの処理結果は購読側ごとに1回だけ反映されます。
+確保の上限回数（PRICE_OUTBOX_MAX_ATTEMPTS）に達したイベントはデッドレター（failed_at）とし、
+同じ内容の新しいイベントを記録できるようにします。
+"""
+
+import json
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import and_, delete, insert, or_, select, update
+from sqlalchemy.engine import Connection
+
+from models import db, Favorite, Game, Notification, NotificationType, PriceOutboxEvent
+from models.price_outbox import OUTBOX_CONSUMERS
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_LEASE_SECONDS = 60
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_RETENTION_HOURS = 24
+
+# プロセス間で共有されないキャッシュ（無効化がそのプロセスにしか効かない）
+PROCESS_LOCAL_CACHE_TYPES = ('SimpleCache', 'simple', 'NullCache', 'null')
+
+OutboxHandler = Callable[[Connection, List[Dict[str, Any]]], None]
+
+
+class LeaseLostError(Exception):
+    """処理中にリースの期限が切れ、他のワーカーに確保された"""
+    pass
+
+
+def _config(name: str, default: int) -> int:
+    return int(current_app.config.get(name, default))
+
+
+def claim_events(consumer: str, limit: int, lease_seconds: int,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    未処理のイベントを確保
+
+    Args:
+        consumer: 購読側
+        limit: 確保する最大件数
+        lease_seconds: リースの期限（秒）
+        max_attempts: これ以上確保されたイベントは確保しない
+
+    Returns:
+        Tuple[str, List[Dict[str, Any]]]: 確保トークンと、確保したイベント（id 付きのイベント内容、ID順）
+    """
+    table = PriceOutboxEvent.__table__
+    now = datetime.now(timezone.utc)
+    token = uuid.uuid4().hex
+    lease = {'lease_token': token, 'leased_until': now + timedelta(seconds=lease_seconds),
+             'attempts': table.c.attempts + 1}
+    candidates = select(table.c.id).where(
+        table.c.consumer == consumer,
+        table.c.processed_at.is_(None),
+        table.c.failed_at.is_(None),
+        table.c.attempts < max_attempts,
+        or_(table.c.leased_until.is_(None), table.c.leased_until < now),
+    ).order_by(table.c.id).limit(limit)
+
+    with db.engine.begin() as connection:
+        if connection.dialect.name == 'postgresql':
+            # 他のワーカーが確保中の行は待たずに飛ばす
+            ids = connection.execute(candidates.with_for_update(skip_locked=True)).scalars().all()
+            if ids:
+                connection.execute(update(table).where(table.c.id.in_(ids)).values(**lease))
+        else:
+            connection.execute(update(table).where(table.c.id.in_(candidates)).values(**lease))
+        rows = connection.execute(
+            select(table.c.id, table.c.payload).where(table.c.lease_token == token).order_by(table.c.id)
+        ).all()
+
+    events = [dict(json.loads(row.payload), id=row.id) for row in rows]
+    return token, events
+
+
+def dead_letter_exhausted_events(consumer: str, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> int:
+    """
+    確保の上限回数に達し、リースも切れたイベントをデッドレターにする
+
+    デッドレターは未処理の一意制約の対象外となるため、同じ内容の新しいイベントは記録されます。
+
+    Args:
+        consumer: 購読側
+        max_attempts: 確保の上限回数
+
+    Returns:
+        int: デッドレターにしたイベント数
+    """
+    table = PriceOutboxEvent.__table__
+    now = datetime.now(timezone.utc)
+    with db.engine.begin() as connection:
+        return connection.execute(
+            update(table)
+            .where(
+                table.c.consumer == consumer,
+                table.c.processed_at.is_(None),
+                table.c.failed_at.is_(None),
+                table.c.attempts >= max_attempts,
+                or_(table.c.leased_until.is_(None), table.c.leased_until < now),
+            )
+            .values(failed_at=now, lease_token=None, leased_until=None)
+        ).rowcount
+
+
+def _complete(connection: Connection, token: str, ids: List[int]) -> None:
+    """確保したイベントを処理済みにする（リースを失っていた場合は LeaseLostError）"""
+    table = PriceOutboxEvent.__table__
+    result = connection.execute(
+        update(table)
+        .where(table.c.id.in_(ids), table.c.lease_token == token)
+        .values(processed_at=datetime.now(timezone.utc), lease_token=None, leased_until=None, last_error=None)
+    )
+    if result.rowcount != len(ids):
+        raise LeaseLostError(f"リースを失ったイベントがあります: {len(ids) - result.rowcount}件")
+
+
+def _release(token: str, ids: List[int], error: Exception, retry_seconds: int) -> None:
+    """処理に失敗したイベントを一定時間後に再確保できるよう戻す"""
+    table = PriceOutboxEvent.__table__
+    with db.engine.begin() as connection:
+        connection.execute(
+            update(table)
+            .where(table.c.id.in_(ids), table.c.lease_token == token)
+            .values(lease_token=None,
+                    leased_until=datetime.now(timezone.utc) + timedelta(seconds=retry_seconds),
+                    last_error=str(error)[:1000])
+        )
+
+
+def notify_price_thresholds(connection: Connection, events: List[Dict[str, Any]]) -> None:
+    """
+    お気に入りの通知閾値を下回ったユーザーに通知を作成
+
+    変更前の価格が既に閾値以下だった場合は通知しません。
+
+    Args:
+        connection: DB接続
+        events: 価格変更イベント
+    """
+    crossed: Dict[int, Dict[str, Any]] = {}
+    for event in events:
+        if event['price'] is None:
+            continue
+        best = crossed.get(event['game_id'])
+        if best is None or event['price'] < best['price']:
+            crossed[event['game_id']] = event
+    if not crossed:
+        return
+
+    favorites = connection.execute(
+        select(Favorite.user_id, Favorite.game_id, Favorite.price_threshold, Game.title)
+        .join(Game, Game.id == Favorite.game_id)
+        .where(
+            Favorite.game_id.in_(list(crossed)),
+            Favorite.notification_enabled == True,
+            Favorite.price_threshold.isnot(None),
+        )
+    ).all()
+
+    now = datetime.now(timezone.utc)
+    notifications = []
+    for favorite in favorites:
+        event = crossed[favorite.game_id]
+        threshold = float(favorite.price_threshold)
+        previous = event.get('previous_price')
+        if event['price'] > threshold or (previous is not None and previous <= threshold):
+            continue
+        notifications.append({
+            'user_id': favorite.user_id,
+            'game_id': favorite.game_id,
+            'notification_type': NotificationType.THRESHOLD_MET.value,
+            'title': f"目標価格になりました: {favorite.title}",
+            'message': f"{event['store']}で ¥{int(event['price']):,}（目標 ¥{int(threshold):,}）",
+            'priority': 3,
+            'created_at': now,
+            'updated_at': now,
+        })
+    if notifications:
+        connection.execute(insert(Notification.__table__), notifications)
+
+
+def invalidate_price_caches(connection: Connection, events: List[Dict[str, Any]]) -> None:
+    """
+    価格が変わったゲームのカタログスナップショットと、価格に依存する検索キャッシュを無効化
+
+    無効化は共有キャッシュ上のバージョンを進めるため、他のプロセスに反映されるのは
+    CACHE_TYPE が共有キャッシュ（RedisCache など）の場合のみです。
+    プロセス内キャッシュ（SimpleCache）ではこのワーカー自身のキャッシュしか無効化できないため警告します。
+
+    Args:
+        connection: DB接続（未使用）
+        events: 価格変更イベント
+    """
+    from repositories.search_cache import search_result_cache
+    from services.catalog_snapshot import get_catalog_snapshot_manager
+
+    cache_type = current_app.config.get('CACHE_TYPE')
+    if cache_type in PROCESS_LOCAL_CACHE_TYPES:
+        logger.warning(
+            f"CACHE_TYPE={cache_type} はプロセス内キャッシュのため、価格変更による無効化は他のプロセスに反映されません"
+        )
+
+    get_catalog_snapshot_manager().record_changes(False, {event['game_id'] for event in events})
+    search_result_cache.invalidate_prices()
+
+
+def refresh_price_rollups(connection: Connection, events: List[Dict[str, Any]]) -> None:
+    """
+    価格が変わったゲームの価格統計と、そのゲームをお気に入りにしているユーザーの統計を再集計
+
+    Args:
+        connection: DB接続
+        events: 価格変更イベント
+    """
+    from services.price_stats import refresh_price_stats
+    from services.user_stats import refresh_user_stats_for_games
+
+    game_ids = sorted({event['game_id'] for event in events})
+    refresh_price_stats(connection, game_ids)
+    refresh_user_stats_for_games(connection, game_ids)
+
+
+OUTBOX_HANDLERS: Dict[str, OutboxHandler] = {
+    'notifier': notify_price_thresholds,
+    'cache': invalidate_price_caches,
+    'stats': refresh_price_rollups,
+}
+
+
+def process_outbox(consumer: str, batch_size: Optional[int] = None,
+                   handler: Optional[OutboxHandler] = None) -> Dict[str, int]:
+    """
+    購読側の未処理イベントを1バッチ確保して処理
+
+    Args:
+        consumer: 購読側（OUTBOX_CONSUMERS のいずれか）
+        batch_size: 確保する最大件数（省略時は PRICE_OUTBOX_BATCH_SIZE）
+        handler: ハンドラー（省略時は OUTBOX_HANDLERS の購読側のもの）
+
+    Returns:
+        Dict[str, int]: claimed（確保数）/ processed（処理数）/ failed（失敗で戻した数）/ lost（リースを失った数）/
+            dead（デッドレターにした数）
+    """
+    if consumer not in OUTBOX_CONSUMERS:
+        raise ValueError(f"不明な購読側です: {consumer}")
+    handler = handler or OUTBOX_HANDLERS[consumer]
+    lease_seconds = _config('PRICE_OUTBOX_LEASE_SECONDS', DEFAULT_LEASE_SECONDS)
+    max_attempts = _config('PRICE_OUTBOX_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)
+    dead = dead_letter_exhausted_events(consumer, max_attempts)
+    if dead:
+        logger.warning(f"アウトボックスのイベントをデッドレターにしました ({consumer}): {dead}件（{max_attempts}回失敗）")
+    token, events = claim_events(
+        consumer,
+        batch_size or _config('PRICE_OUTBOX_BATCH_SIZE', DEFAULT_BATCH_SIZE),
+        lease_seconds,
+        max_attempts,
+    )
+    stats = {'claimed': len(events), 'processed': 0, 'failed': 0, 'lost': 0, 'dead': dead}
+    if not events:
+        return stats
+
+    ids = [event['id'] for event in events]
+    try:
+        with db.engine.begin() as connection:
+            handler(connection, events)
+            _complete(connection, token, ids)
+        stats['processed'] = len(ids)
+    except LeaseLostError as e:
+        logger.warning(f"アウトボックス処理を取り消しました ({consumer}): {e}")
+        stats['lost'] = len(ids)
+    except Exception as e:
+        logger.error(f"アウトボックス処理エラー ({consumer}): {e}")
+        _release(token, ids, e, lease_seconds)
+        stats['failed'] = len(ids)
+    return stats
+
+
+def drain_outbox(consumer: str, batch_size: Optional[int] = None) -> Dict[str, int]:
+    """
+    購読側の未処理イベントがなくなる（または失敗する）までバッチ処理を繰り返す
+
+    Args:
+        consumer: 購読側
+        batch_size: 1バッチの最大件数
+
+    Returns:
+        Dict[str, int]: process_outbox の集計の合計
+    """
+    started = time.monotonic()
+    totals = {'claimed': 0, 'processed': 0, 'failed': 0, 'lost': 0, 'dead': 0}
+    while True:
+        stats = process_outbox(consumer, batch_size)
+        for key, value in stats.items():
+            totals[key] += value
+        if not stats['processed']:
+            break
+    if totals['claimed'] or totals['dead']:
+        logger.info(
+            f"アウトボックスを処理しました ({consumer}): 処理 {totals['processed']}件, 失敗 {totals['failed']}件, "
+            f"デッドレター {totals['dead']}件 ({time.monotonic() - started:.1f}秒)"
+        )
+    return totals
+
+
+def purge_processed_events(retention_hours: Optional[int] = None) -> int:
+    """
+    保持期間を過ぎた処理済みイベントとデッドレターを削除
+
+    Args:
+        retention_hours: 保持期間（時間、省略時は PRICE_OUTBOX_RETENTION_HOURS）
+
+    Returns:
+        int: 削除した行数
+    """
+    hours = retention_hours if retention_hours is not None else _config('PRICE_OUTBOX_RETENTION_HOURS',
+                                                                        DEFAULT_RETENTION_HOURS)
+    table = PriceOutboxEvent.__table__
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=hours)
+    with db.engine.begin() as connection:
+        return connection.execute(
+            delete(table).where(or_(
+                and_(table.c.processed_at.isnot(None), table.c.processed_at < cutoff),
+                and_(table.c.failed_at.isnot(None), table.c.failed_at < cutoff),
+            ))
+        ).rowcount
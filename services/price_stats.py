@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""Price Stats
+
+価格履歴からゲーム・ストアごとの価格統計を集計するバッチ処理。
+ゲームID順に一定数ずつ履歴を pandas に読み込み、グループ単位のシフト・集約で
+過去最安値、平均・最大割引率、最後のセール、セール頻度をまとめて計算し、
+game_price_stats に書き込みます。
+"""
+
+import logging
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.engine import Connection
+
+from models import db, GamePriceStats, PriceHistory
+from services.job_checkpoint import JobCheckpoint
+
+logger = logging.getLogger(__name__)
+
+
+JOB_NAME = 'compute-price-stats'
+DEFAULT_BATCH_SIZE = 500
+
+# セール頻度を年換算する際の最短観測期間（観測開始直後の過大評価を防ぐ）
+MIN_FREQUENCY_SPAN_DAYS = 30
+
+_KEYS = ['game_id', 'store']
+_HISTORY_COLUMNS = (
+    PriceHistory.game_id, PriceHistory.store, PriceHistory.regular_price, PriceHistory.sale_price,
+    PriceHistory.discount_rate, PriceHistory.is_on_sale, PriceHistory.recorded_at,
+)
+
+
+def _prepare(history: pd.DataFrame) -> pd.DataFrame:
+    """履歴を型変換し、実際の販売価格を付けてゲーム・ストア・日時順に並べる"""
+    df = history.copy()
+    df['regular_price'] = pd.to_numeric(df['regular_price'], errors='coerce').astype('float64')
+    df['sale_price'] = pd.to_numeric(df['sale_price'], errors='coerce').astype('float64')
+    df['discount_rate'] = pd.to_numeric(df['discount_rate'], errors='coerce').fillna(0).astype('float64')
+    df['is_on_sale'] = df['is_on_sale'].fillna(False).astype(bool)
+    df['recorded_at'] = pd.to_datetime(df['recorded_at'], utc=True)
+    df['price'] = np.where(df['is_on_sale'] & df['sale_price'].notna(), df['sale_price'], df['regular_price'])
+    return df.sort_values([*_KEYS, 'recorded_at'], kind='stable').reset_index(drop=True)
+
+
+def compute_stats_frame(history: pd.DataFrame, now: Optional[datetime] = None) -> pd.DataFrame:
+    """
+    価格履歴からゲーム・ストアごとの統計を計算
+
+    Args:
+        history: 価格履歴（game_id, store, regular_price, sale_price, discount_rate, is_on_sale, recorded_at）
+        now: 集計基準日時（省略時は現在）
+
+    Returns:
+        pd.DataFrame: ゲーム・ストアごとの統計（game_price_stats の列）
+    """
+    now_ts = pd.Timestamp(now or datetime.now(timezone.utc))
+    now_ts = now_ts.tz_localize('UTC') if now_ts.tzinfo is None else now_ts.tz_convert('UTC')
+
+    df = _prepare(history)
+    groups = df.groupby(_KEYS, sort=False)
+
+    # 各状態が次の履歴（最後の行は集計時点）まで続いたとみなした期間
+    next_at = groups['recorded_at'].shift(-1).fillna(now_ts)
+    duration = (next_at - df['recorded_at']).dt.total_seconds().clip(lower=0)
+    is_last = groups.cumcount(ascending=False).eq(0)
+
+    previous_on_sale = groups['is_on_sale'].shift(1, fill_value=False).astype(bool)
+    sale_started = df['is_on_sale'] & ~previous_on_sale
+    sale_ended = ~df['is_on_sale'] & previous_on_sale
+
+    # 最後にセール中だった日時（セール終了の記録時点、現在もセール中なら集計時点）
+    on_sale_seen = df['recorded_at'].where(sale_ended)
+    on_sale_seen = on_sale_seen.mask(is_last & df['is_on_sale'], now_ts)
+
+    work = pd.DataFrame({
+        'game_id': df['game_id'],
+        'store': df['store'],
+        'weighted_discount': df['discount_rate'] * duration,
+        'duration': duration,
+        'discount_rate': df['discount_rate'],
+        'sale_started': sale_started.astype('int64'),
+        'on_sale_seen': on_sale_seen,
+        'recorded_at': df['recorded_at'],
+    })
+    stats = work.groupby(_KEYS, sort=False).agg(
+        weighted_discount=('weighted_discount', 'sum'),
+        duration=('duration', 'sum'),
+        mean_plain=('discount_rate', 'mean'),
+        max_discount=('discount_rate', 'max'),
+        sale_count=('sale_started', 'sum'),
+        last_on_sale_at=('on_sale_seen', 'max'),
+        observation_count=('recorded_at', 'size'),
+        first_observed_at=('recorded_at', 'min'),
+    )
+
+    # 期間がない（全履歴が同時刻）場合は単純平均
+    stats['mean_discount'] = (stats['weighted_discount'] / stats['duration']).where(
+        stats['duration'] > 0, stats['mean_plain']
+    )
+    span_days = ((now_ts - stats['first_observed_at']).dt.total_seconds() / 86400).clip(lower=MIN_FREQUENCY_SPAN_DAYS)
+    stats['sales_per_year'] = stats['sale_count'] / span_days * 365.25
+
+    # 過去最安値とそれを最初に記録した日時
+    lowest = (
+        df.loc[df['price'].notna(), [*_KEYS, 'price', 'recorded_at']]
+        .sort_values([*_KEYS, 'price', 'recorded_at'], kind='stable')
+        .drop_duplicates(_KEYS)
+        .set_index(_KEYS)
+        .rename(columns={'price': 'lowest_price', 'recorded_at': 'lowest_price_at'})
+    )
+    stats = stats.join(lowest)
+
+    return stats.reset_index()[[
+        'game_id', 'store', 'lowest_price', 'lowest_price_at', 'mean_discount', 'max_discount',
+        'last_on_sale_at', 'sale_count', 'sales_per_year', 'observation_count', 'first_observed_at',
+    ]]
+
+
+def _to_datetime(value: Any) -> Optional[datetime]:
+    return None if pd.isna(value) else value.to_pydatetime()
+
+
+def _to_records(stats: pd.DataFrame, computed_at: datetime) -> List[Dict[str, Any]]:
+    """統計のDataFrameを挿入用の行に変換"""
+    records = []
+    for row in stats.itertuples(index=False):
+        records.append({
+            'game_id': int(row.game_id),
+            'store': row.store,
+            'lowest_price': None if pd.isna(row.lowest_price) else Decimal(str(round(row.lowest_price, 2))),
+            'lowest_price_at': _to_datetime(row.lowest_price_at),
+            'mean_discount': float(row.mean_discount),
+            'max_discount': int(row.max_discount),
+            'last_on_sale_at': _to_datetime(row.last_on_sale_at),
+            'sale_count': int(row.sale_count),
+            'sales_per_year': float(row.sales_per_year),
+            'observation_count': int(row.observation_count),
+            'first_observed_at': _to_datetime(row.first_observed_at),
+            'computed_at': computed_at,
+        })
+    return records
+
+
+def refresh_price_stats(connection: Connection, game_ids: List[int], computed_at: Optional[datetime] = None) -> int:
+    """
+    指定ゲームの価格統計を履歴から再集計して置き換える（呼び出し側のトランザクション内で実行）
+
+    Args:
+        connection: DB接続
+        game_ids: 再集計するゲームID
+        computed_at: 集計日時（省略時は現在）
+
+    Returns:
+        int: 書き込んだ統計の行数
+    """
+    computed_at = computed_at or datetime.now(timezone.utc)
+    stats_table = GamePriceStats.__table__
+    history = pd.read_sql(select(*_HISTORY_COLUMNS).where(PriceHistory.game_id.in_(game_ids)), connection)
+    records = _to_records(compute_stats_frame(history, computed_at), computed_at)
+
+    connection.execute(stats_table.delete().where(stats_table.c.game_id.in_(game_ids)))
+    if records:
+        connection.execute(stats_table.insert(), records)
+    return len(records)
+
+
+def compute_price_stats(batch_size: int = DEFAULT_BATCH_SIZE, resume: bool = False) -> int:
+    """
+    全ゲームの価格統計を再集計して game_price_stats に書き込む
+
+    ゲームIDで区切ったバッチごとに履歴を読み込み、バッチ単位で置き換えます。
+    バッチごとにチェックポイントを記録し、resume=True の場合は中断したバッチから再開します。
+
+    Args:
+        batch_size: 1回に読み込むゲーム数
+        resume: 前回中断した実行のチェックポイントから再開する場合True
+
+    Returns:
+        int: 書き込んだ統計の行数（ゲーム・ストアの組の数、再開前の実行分を含む）
+    """
+    started = time.monotonic()
+    computed_at = datetime.now(timezone.utc)
+    checkpoint = JobCheckpoint.start(JOB_NAME, resume=resume)
+    written = checkpoint.counters.get('written', 0)
+    last_id = int(checkpoint.cursor or 0)
+
+    try:
+        while True:
+            with db.engine.begin() as connection:
+                game_ids = connection.execute(
+                    select(PriceHistory.game_id).distinct()
+                    .where(PriceHistory.game_id > last_id)
+                    .order_by(PriceHistory.game_id)
+                    .limit(batch_size)
+                ).scalars().all()
+                if not game_ids:
+                    break
+
+                written += refresh_price_stats(connection, game_ids, computed_at)
+                last_id = game_ids[-1]
+                checkpoint.save(connection, last_id, written=written)
+    except Exception as e:
+        checkpoint.fail(e)
+        raise
+    checkpoint.complete()
+
+    logger.info(f"価格統計を集計しました: {written}件 ({time.monotonic() - started:.1f}秒)")
+    return written
@@ -0,0 +1,381 @@
+# -*- coding: utf-8 -*-
+"""Price Sweep
+
+Steam 価格の分散巡回。
+Steam App ID のハッシュ値（乗算ハッシュ、32ビット）の範囲でカタログをシャードに分け、
+各ワーカーはシャードごとに price_sweep_shards の行に期限付きのリースを取って巡回します。
+
+リースは条件付きの UPDATE 1文（期限切れの場合のみ取得）で取るため、同じシャードを2つのワーカーが
+同時に巡回することはありません。ゲームのバッチごとに価格の書き込みと同じトランザクションで
+リースを延長し、処理済みのゲームID（カーソル）を記録するため、ワーカーが停止しても
+他のワーカーが期限切れ後にカーソルの続きから引き継ぎ、Steam への問い合わせは重複しません。
+ワーカー（プロセス・ノード）を増やすと、同時に巡回するシャード数がそのまま増えます。
+"""
+
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import BigInteger, and_, case, cast, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.engine import Connection
+
+from models import db, Game, Price, PriceSweepShard
+from repositories.price_repository import PriceRepository
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_SHARDS = 64
+DEFAULT_LEASE_SECONDS = 120
+DEFAULT_BATCH_SIZE = 50
+
+# App ID のハッシュ（Knuthの乗算ハッシュ）。SQLite・PostgreSQL のどちらでも整数演算だけで計算できる
+HASH_SPACE = 2 ** 32
+HASH_MULTIPLIER = 2654435761
+# 数値として扱える App ID（BIGINT に収まる桁数まで）。それ以外の App ID はどのシャードにも属さず巡回しない
+NUMERIC_APPID_PATTERN = r'^[0-9]{1,18}$'
+
+PriceFetcher = Callable[[str], Optional[Dict[str, Any]]]
+
+
+class LeaseLostError(Exception):
+    """リースの期限が切れ、シャードが他のワーカーに引き継がれた"""
+    pass
+
+
+class ShardLease:
+    """ワーカーが取得したシャードのリース"""
+
+    def __init__(self, shard: int, token: str, hash_start: int, hash_end: int, cursor_game_id: int):
+        self.shard = shard
+        self.token = token
+        self.hash_start = hash_start
+        self.hash_end = hash_end
+        self.cursor_game_id = cursor_game_id
+
+    def __repr__(self) -> str:
+        return f'<ShardLease {self.shard} cursor={self.cursor_game_id}>'
+
+
+def appid_hash(appid: Any) -> int:
+    """
+    App ID のハッシュ値（appid_hash_expression と同じ値）
+
+    Args:
+        appid: Steam App ID
+
+    Returns:
+        int: 0 以上 HASH_SPACE 未満のハッシュ値
+    """
+    return int(appid) * HASH_MULTIPLIER % HASH_SPACE
+
+
+def appid_hash_expression():
+    """
+    SQL上の App ID のハッシュ値（数値でない App ID は NULL）
+
+    CAST の失敗で巡回全体が止まらないよう、CASE で数値の App ID だけを変換します
+    （WHERE の AND では評価順が保証されないため）。
+    """
+    return case(
+        (Game.steam_appid.regexp_match(NUMERIC_APPID_PATTERN), cast(Game.steam_appid, BigInteger) * HASH_MULTIPLIER % HASH_SPACE),
+        else_=None,
+    )
+
+
+def shard_ranges(count: int) -> List[Tuple[int, int, int]]:
+    """
+    ハッシュ空間を count 個の連続した範囲に分割
+
+    Args:
+        count: シャード数
+
+    Returns:
+        List[Tuple[int, int, int]]: (シャード番号, 下限, 上限) のリスト
+    """
+    return [(shard, shard * HASH_SPACE // count, (shard + 1) * HASH_SPACE // count) for shard in range(count)]
+
+
+def default_worker_id() -> str:
+    """ホスト名とプロセスIDからワーカーIDを作成"""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def ensure_shards(count: int) -> None:
+    """
+    シャードの行を作成（シャード数が変わった場合は作り直す）
+
+    シャード数の変更は全ワーカーを停止してから行ってください（巡回中のリースとカーソルは破棄されます）。
+
+    Args:
+        count: シャード数
+    """
+    table = PriceSweepShard.__table__
+    expected = shard_ranges(count)
+    try:
+        with db.engine.begin() as connection:
+            existing = connection.execute(
+                select(table.c.shard, table.c.hash_start, table.c.hash_end).order_by(table.c.shard)
+            ).all()
+            if [tuple(row) for row in existing] == expected:
+                return
+            if existing:
+                logger.warning(f"価格巡回のシャード数を変更します: {len(existing)} -> {count}")
+                connection.execute(table.delete())
+            now = datetime.now(timezone.utc)
+            connection.execute(table.insert(), [
+                {'shard': shard, 'hash_start': start, 'hash_end': end, 'cursor_game_id': 0,
+                 'games_swept': 0, 'updated_at': now}
+                for shard, start, end in expected
+            ])
+    except IntegrityError:
+        # 同時に起動した他のワーカーが作成済み
+        pass
+
+
+def acquire_shard(worker_id: str, lease_seconds: int, interval_seconds: int) -> Optional[ShardLease]:
+    """
+    巡回時期に達した（または巡回途中で放棄された）シャードのリースを取得
+
+    Args:
+        worker_id: ワーカーID
+        lease_seconds: リースの期限（秒）
+        interval_seconds: 同じシャードを再び巡回するまでの間隔（秒）
+
+    Returns:
+        Optional[ShardLease]: 取得したリース（対象のシャードがない場合はNone）
+    """
+    table = PriceSweepShard.__table__
+    now = datetime.now(timezone.utc)
+    lease_free = or_(table.c.leased_until.is_(None), table.c.leased_until < now)
+    due = or_(
+        table.c.cursor_game_id > 0,
+        table.c.last_swept_at.is_(None),
+        table.c.last_swept_at < now - timedelta(seconds=interval_seconds),
+    )
+
+    with db.engine.begin() as connection:
+        candidates = connection.execute(
+            select(table.c.shard).where(lease_free, due)
+            .order_by(table.c.last_swept_at.isnot(None), table.c.last_swept_at, table.c.shard)
+        ).scalars().all()
+
+    for shard in candidates:
+        token = uuid.uuid4().hex
+        with db.engine.begin() as connection:
+            # 取得できるのは期限切れを確認した1ワーカーだけ（候補の取得後に他のワーカーが巡回を終えた場合も除く）
+            acquired = connection.execute(
+                update(table)
+                .where(table.c.shard == shard, lease_free, due)
+                .values(lease_owner=worker_id, lease_token=token,
+                        leased_until=now + timedelta(seconds=lease_seconds), updated_at=now)
+            ).rowcount
+            if not acquired:
+                continue
+            row = connection.execute(
+                select(table.c.hash_start, table.c.hash_end, table.c.cursor_game_id).where(table.c.shard == shard)
+            ).one()
+        return ShardLease(shard, token, row.hash_start, row.hash_end, row.cursor_game_id)
+    return None
+
+
+def renew_lease(connection: Connection, lease: ShardLease, lease_seconds: int,
+                cursor_game_id: Optional[int] = None) -> None:
+    """
+    リースを延長し、カーソルを進める（呼び出し側のトランザクション内で実行）
+
+    Args:
+        connection: DB接続
+        lease: リース
+        lease_seconds: 延長後の期限（秒）
+        cursor_game_id: 処理済みの最大ゲームID
+
+    Raises:
+        LeaseLostError: リースを失っていた場合
+    """
+    table = PriceSweepShard.__table__
+    now = datetime.now(timezone.utc)
+    values: Dict[str, Any] = {'leased_until': now + timedelta(seconds=lease_seconds), 'updated_at': now}
+    if cursor_game_id is not None:
+        values['cursor_game_id'] = cursor_game_id
+    renewed = connection.execute(
+        update(table).where(table.c.shard == lease.shard, table.c.lease_token == lease.token).values(**values)
+    ).rowcount
+    if not renewed:
+        raise LeaseLostError(f"シャード {lease.shard} のリースを失いました")
+    if cursor_game_id is not None:
+        lease.cursor_game_id = cursor_game_id
+
+
+def _finish_shard(lease: ShardLease, games_swept: int, error: Optional[str] = None) -> None:
+    """巡回を完了（または中断）してリースを返す"""
+    table = PriceSweepShard.__table__
+    now = datetime.now(timezone.utc)
+    values: Dict[str, Any] = {'lease_owner': None, 'lease_token': None, 'leased_until': None,
+                              'last_error': error, 'updated_at': now}
+    if error is None:
+        values.update(cursor_game_id=0, last_swept_at=now, games_swept=games_swept)
+    with db.engine.begin() as connection:
+        connection.execute(
+            update(table).where(table.c.shard == lease.shard, table.c.lease_token == lease.token).values(**values)
+        )
+
+
+def _apply_steam_price(repository: PriceRepository, game_id: int, price: Optional[Price],
+                       data: Dict[str, Any], now: datetime) -> bool:
+    """取得したSteam価格を反映（価格が変わった場合はTrue）"""
+    discount_rate = int(data.get('discount_percent', 0) or 0)
+    regular_price = Decimal(str(data.get('original_price', data['price'])))
+    sale_price = Decimal(str(data['price'])) if discount_rate > 0 else None
+    is_on_sale = discount_rate > 0
+
+    if price is not None and (price.regular_price, price.sale_price, price.discount_rate, bool(price.is_on_sale)) \
+            == (regular_price, sale_price, discount_rate, is_on_sale):
+        # 確認日時は _touch_unchanged_prices でまとめて更新する（ORMの行は変更しない）
+        return False
+
+    if price is None:
+        price = Price()
+        setattr(price, 'game_id', game_id)
+        setattr(price, 'store', 'steam')
+        setattr(price, 'currency', data.get('currency') or 'JPY')
+    price.update_price(regular_price, sale_price, discount_rate, is_on_sale)
+    price.updated_at = now
+    repository.save(price)
+    return True
+
+
+def _touch_unchanged_prices(connection: Connection, price_ids: List[int], now: datetime) -> None:
+    """
+    価格が変わらなかった行の確認日時を更新（表示時の再取得を省くため）
+
+    ORMの行を変更すると価格の変更としてカタログスナップショットの無効化などが走るため、
+    確認日時だけを Core の UPDATE 1文で書き込みます。
+    """
+    if price_ids:
+        table = Price.__table__
+        connection.execute(update(table).where(table.c.id.in_(price_ids)).values(updated_at=now))
+
+
+def sweep_shard(lease: ShardLease, fetch_price: PriceFetcher, batch_size: int, lease_seconds: int) -> Dict[str, int]:
+    """
+    シャードのゲームの価格をカーソルの続きから巡回
+
+    Args:
+        lease: 取得済みのリース
+        fetch_price: App ID から価格情報を取得する関数（SteamAPIService.get_game_price と同じ形式）
+        batch_size: 1回のコミットで処理するゲーム数
+        lease_seconds: リースの期限（秒、1バッチの処理時間より十分長くすること）
+
+    Returns:
+        Dict[str, int]: games（問い合わせたゲーム数）/ updated（価格が変わった数）
+
+    Raises:
+        LeaseLostError: 巡回中にリースを失った場合（そのバッチの書き込みは取り消し）
+    """
+    repository = PriceRepository()
+    hashed = appid_hash_expression()
+    stats = {'games': 0, 'updated': 0}
+
+    while True:
+        games = db.session.query(Game.id, Game.steam_appid).filter(
+            Game.is_active == True,
+            Game.steam_appid.isnot(None),
+            Game.id > lease.cursor_game_id,
+            and_(hashed >= lease.hash_start, hashed < lease.hash_end),
+        ).order_by(Game.id).limit(batch_size).all()
+        if not games:
+            return stats
+
+        fetched = {game.id: fetch_price(game.steam_appid) for game in games}
+        existing = {
+            price.game_id: price
+            for price in Price.query.filter(Price.game_id.in_(list(fetched)), Price.store == 'steam')
+        }
+        now = datetime.now(timezone.utc)
+        unchanged: List[int] = []
+        try:
+            for game_id, data in fetched.items():
+                if data and data.get('price') is not None:
+                    price = existing.get(game_id)
+                    if _apply_steam_price(repository, game_id, price, data, now):
+                        stats['updated'] += 1
+                    elif price is not None:
+                        unchanged.append(price.id)
+            _touch_unchanged_prices(db.session.connection(), unchanged, now)
+            # 価格と同じトランザクションでカーソルを進める（引き継いだワーカーが同じゲームを問い合わせないため）
+            renew_lease(db.session.connection(), lease, lease_seconds, cursor_game_id=games[-1].id)
+            repository.commit()
+        except Exception:
+            repository.rollback()
+            raise
+        stats['games'] += len(games)
+
+
+def run_price_sweep(worker_id: Optional[str] = None, max_shards: Optional[int] = None,
+                    fetch_price: Optional[PriceFetcher] = None) -> Dict[str, int]:
+    """
+    巡回時期に達したシャードがなくなるまで、リースを取得して巡回する
+
+    完了したシャードで価格が変わった場合は、最後にセールランキングを再作成します。
+
+    Args:
+        worker_id: ワーカーID（省略時はホスト名とプロセスID）
+        max_shards: 巡回する最大シャード数
+        fetch_price: 価格の取得関数（省略時は SteamAPIService.get_game_price）
+
+    Returns:
+        Dict[str, int]: shards（完了したシャード数）/ lost（リースを失った数）/ games / updated
+    """
+    started = time.monotonic()
+    config = current_app.config
+    worker_id = worker_id or default_worker_id()
+    lease_seconds = int(config.get('PRICE_SWEEP_LEASE_SECONDS', DEFAULT_LEASE_SECONDS))
+    interval_seconds = int(config.get('PRICE_UPDATE_INTERVAL', 3600))
+    batch_size = int(config.get('PRICE_SWEEP_BATCH_SIZE', DEFAULT_BATCH_SIZE))
+    if fetch_price is None:
+        from services.steam_service import SteamAPIService
+        fetch_price = SteamAPIService().get_game_price
+
+    ensure_shards(int(config.get('PRICE_SWEEP_SHARDS', DEFAULT_SHARDS)))
+    stats = {'shards': 0, 'lost': 0, 'games': 0, 'updated': 0}
+
+    while max_shards is None or stats['shards'] + stats['lost'] < max_shards:
+        lease = acquire_shard(worker_id, lease_seconds, interval_seconds)
+        if lease is None:
+            break
+        try:
+            result = sweep_shard(lease, fetch_price, batch_size, lease_seconds)
+        except LeaseLostError as e:
+            logger.warning(f"価格巡回を中断しました ({worker_id}): {e}")
+            stats['lost'] += 1
+            continue
+        except Exception as e:
+            logger.error(f"価格巡回エラー (シャード {lease.shard}): {e}")
+            _finish_shard(lease, 0, error=str(e)[:1000])
+            raise
+        stats['games'] += result['games']
+        stats['updated'] += result['updated']
+        _finish_shard(lease, result['games'])
+        stats['shards'] += 1
+
+    # 更新後の価格でセールランキングを再作成
+    if stats['updated']:
+        from services.deal_ranking import rebuild_deal_rankings
+        try:
+            rebuild_deal_rankings()
+        except Exception as e:
+            logger.error(f"セールランキング作成エラー: {e}")
+
+    logger.info(
+        f"価格巡回を完了しました ({worker_id}): シャード {stats['shards']}件, ゲーム {stats['games']}件, "
+        f"価格変更 {stats['updated']}件 ({time.monotonic() - started:.1f}秒)"
+    )
+    return stats
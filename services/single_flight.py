@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Single Flight
+
+同一キーで同時に実行される処理を1回にまとめるユーティリティ。
+先に到着した呼び出し（リーダー）だけが処理を実行し、
+実行中に到着した呼び出しはその結果を待って共有します。
+"""
+
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class _Call:
+    """実行中の呼び出し"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """プロセス内の重複呼び出しを統合するクラス"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        """
+        キー単位で処理を1回だけ実行
+
+        Args:
+            key: 統合キー
+            fn: 実行する処理
+            timeout: 他の呼び出しの完了を待つ最大秒数
+
+        Returns:
+            Tuple[Any, bool]: (処理結果, 他の呼び出しの結果を共有した場合True)
+
+        Raises:
+            TimeoutError: 待機がタイムアウトした場合
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not is_leader:
+            if not call.done.wait(timeout):
+                raise TimeoutError(f"single flight wait timed out: {key}")
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+        return call.result, False
+
+    def in_flight(self, key: str) -> bool:
+        """
+        指定キーの処理が実行中か
+
+        Args:
+            key: 統合キー
+
+        Returns:
+            bool: 実行中の場合True
+        """
+        with self._lock:
+            return key in self._calls
@@ -5,13 +5,14 @@ Steam Web APIを使用してゲーム情報を取得するサービス。
 APIキーなしで利用可能なエンドポイントを使用します。
 """
 
-import requests
 import logging
 import time
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 import json
 
+from services.http_client import get_http_client, CircuitOpenError
+
 logger = logging.getLogger(__name__)
 
 
@@ -27,10 +28,8 @@ class SteamAPIService:
     
     def __init__(self):
         """Steam API サービスの初期化"""
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'GameBargain/1.0'
-        })
+        # プロセス共通のHTTPクライアント（コネクションプール・リトライ・サーキットブレーカー）
+        self.session = get_http_client()
         self._app_list_cache = None
         self._cache_timestamp = None
         
@@ -87,6 +86,15 @@ class SteamAPIService:
             logger.error(f"Steam API アプリ一覧取得エラー: {e}")
             return self._app_list_cache or []
     
+    def is_available(self) -> bool:
+        """
+        Steam Store APIが呼び出し可能か（サーキットブレーカーが開いていないか）
+        
+        Returns:
+            bool: 呼び出し可能な場合True
+        """
+        return self.session.is_available(self.STORE_BASE_URL)
+    
     def search_games(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
         """
         ゲーム検索
@@ -101,6 +109,10 @@ class SteamAPIService:
         try:
             logger.info(f"Steam でゲーム検索: '{query}'")
             
+            if not self.is_available():
+                logger.warning("Steam APIが利用できないため検索をスキップします")
+                return []
+            
             # アプリ一覧から検索
             app_list = self.get_app_list()
             if not app_list:
@@ -120,6 +132,11 @@ class SteamAPIService:
             # 詳細情報を取得
             detailed_games = []
             for app in matches[:limit * 2]:
+                # 途中でサーキットが開いた場合は残りの詳細取得を打ち切る
+                if not self.is_available():
+                    logger.warning("Steam APIが利用できなくなったため詳細取得を中断します")
+                    break
+                
                 detail = self.get_app_details(app['appid'])
                 if detail and detail.get('success'):
                     game_data = detail.get('data', {})
@@ -134,6 +151,7 @@ class SteamAPIService:
                             'publisher': ', '.join(game_data.get('publishers', [])),
                             'release_date': self._parse_release_date(game_data.get('release_date', {})),
                             'genres': [genre['description'] for genre in game_data.get('genres', [])],
+                            'platforms': [name for name, supported in game_data.get('platforms', {}).items() if supported],
                             'image_url': game_data.get('header_image'),
                             'steam_url': f"https://store.steampowered.com/app/{app['appid']}/",
                             'price_info': self._extract_price_info(game_data),
@@ -217,6 +235,9 @@ class SteamAPIService:
             
             return app_data
             
+        except CircuitOpenError as e:
+            logger.warning(f"Steam アプリ詳細取得スキップ (appid: {appid}): {e}")
+            return None
         except Exception as e:
             logger.error(f"Steam アプリ詳細取得エラー (appid: {appid}): {e}")
             return None
@@ -253,6 +274,11 @@ class SteamAPIService:
             for app in selected_apps:
                 if len(recent_games) >= limit:
                     break
+                
+                # 途中でサーキットが開いた場合は残りの詳細取得を打ち切る
+                if not self.is_available():
+                    logger.warning("Steam APIが利用できなくなったため詳細取得を中断します")
+                    break
 
                 # 詳細情報を取得
                 detail = self.get_app_details(app['appid'])
@@ -269,6 +295,7 @@ class SteamAPIService:
                                 'publisher': ', '.join(game_data.get('publishers', [])),
                                 'release_date': self._parse_release_date(game_data.get('release_date', {})),
                                 'genres': [genre['description'] for genre in game_data.get('genres', [])],
+                                'platforms': [name for name, supported in game_data.get('platforms', {}).items() if supported],
                                 'image_url': game_data.get('header_image'),
                                 'steam_url': f"https://store.steampowered.com/app/{app['appid']}/",
                                 'price_info': self._extract_price_info(game_data),
@@ -490,6 +517,9 @@ class SteamAPIService:
                 'is_on_sale': discount_percent > 0
             }
             
+        except CircuitOpenError as e:
+            logger.warning(f"Steam価格取得スキップ (App ID: {app_id}): {e}")
+            return None
         except Exception as e:
             logger.error(f"Steam価格取得エラー (App ID: {app_id}): {e}")
             return None
@@ -5,14 +5,14 @@
 お気に入り機能、通知設定などの機能を提供します。
 """
 
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Optional
 from datetime import datetime, timedelta, timezone
 from sqlalchemy import desc, func, and_
 from sqlalchemy.orm import joinedload
 
 from services import BaseService, ValidationError, BusinessLogicError, create_pagination_info
-from models import User, Favorite, Notification, Game, Price
-from repositories.user_repository import UserRepository
+from models import db, User, Favorite, Notification, Game, Price
+from repositories.user_repository import UserRepository, price_change_percent
 
 
 class UserService(BaseService):
@@ -56,9 +56,8 @@ class UserService(BaseService):
             if not user:
                 raise ValidationError("ユーザーが見つかりません", "user_id")
             
-            # お気に入り数の取得
-            favorites = self.user_repository.get_user_favorites(user_id)
-            favorites_count = len(favorites)
+            # お気に入り数・節約額などは集計済みの user_stats から1行で取得
+            stats = self.user_repository.get_user_stats(user_id)
             
             # アラート数の取得
             alerts_count = self.Notification.query.filter_by(
@@ -67,16 +66,13 @@ class UserService(BaseService):
                 is_active=True
             ).count()
             
-            # 統計情報の計算
-            stats = self._calculate_user_stats(user_id)
-            
             return self._create_success_response({
                 'user': self._serialize_user(user),
                 'stats': {
-                    'favorites_count': favorites_count,
+                    'favorites_count': stats.favorites_count or 0,
                     'alerts_count': alerts_count,
-                    'total_savings': stats['total_savings'],
-                    'deals_found': stats['deals_found']
+                    'total_savings': float(stats.total_savings or 0),
+                    'deals_found': stats.deals_found or 0
                 }
             })
             
@@ -103,22 +99,16 @@ class UserService(BaseService):
             Dict[str, Any]: お気に入り一覧とページネーション情報
         """
         try:
-            # お気に入り一覧の取得（リポジトリから取得）
-            all_favorites = self.user_repository.get_user_favorites(user_id)
-            
-            # ページネーション処理
-            total = len(all_favorites)
-            start_index = (page - 1) * per_page
-            end_index = start_index + per_page
-            favorites = all_favorites[start_index:end_index]
-            
-            # 各お気に入りゲームの最新価格情報を取得
-            favorites_with_prices = self._add_price_info_to_favorites(favorites)
+            # お気に入りと価格情報を1回のクエリで取得（ページ分のみ）
+            total = self.user_repository.count_user_favorites(user_id)
+            favorites = self.user_repository.get_favorites_with_prices(
+                user_id, limit=per_page, offset=(page - 1) * per_page
+            )
             
             pagination = create_pagination_info(page, per_page, total)
             
             return self._create_success_response({
-                'favorites': [self._serialize_favorite(fav) for fav in favorites_with_prices],
+                'favorites': [self._serialize_favorite(row) for row in favorites],
                 'pagination': pagination
             })
             
@@ -298,8 +288,11 @@ class UserService(BaseService):
                     priority=2  # 通常の優先度
                 )
                 db.session.add(alert)
+                db.session.flush()
+                # 最終アクティビティに反映（同じトランザクション内）
+                self.user_repository.refresh_user_stats(user_id)
                 message = "価格アラートを設定しました"
-                alert_id = getattr(alert, 'id', None)
+                alert_id = alert.id
             
             db.session.commit()
             
@@ -450,11 +443,15 @@ class UserService(BaseService):
         try:
             start_date = datetime.now(timezone.utc) - timedelta(days=days)
             
-            # お気に入り追加のアクティビティ（リポジトリから取得）
-            all_favorites = self.user_repository.get_user_favorites(user_id)
-            # 日付でフィルタリング（リポジトリに日付フィルタ機能を追加することを推奨）
-            recent_favorites = [f for f in all_favorites if hasattr(f, 'added_at') and f.added_at >= start_date]
-            favorites = sorted(recent_favorites, key=lambda x: x.added_at, reverse=True)[:limit // 2]
+            # 期間内に登録がなければ一覧を読まずに返す
+            last_activity_at = self.user_repository.get_user_stats(user_id).last_activity_at
+            if last_activity_at is not None and last_activity_at.tzinfo is None:
+                last_activity_at = last_activity_at.replace(tzinfo=timezone.utc)
+            if last_activity_at is not None and last_activity_at < start_date:
+                return self._create_success_response({'activities': []})
+            
+            # お気に入り追加のアクティビティ（期間と件数はDB側で絞り込む）
+            favorites = self.user_repository.get_recent_favorites(user_id, start_date, limit // 2)
             
             # 価格アラート作成のアクティビティ
             alerts = (self.Notification.query
@@ -474,8 +471,8 @@ class UserService(BaseService):
             for favorite in favorites:
                 activities.append({
                     'type': 'favorite_added',
-                    'game': self._serialize_game_basic(favorite),
-                    'created_at': favorite.added_at.isoformat()
+                    'game': self._serialize_game_basic(favorite.game),
+                    'created_at': favorite.created_at.isoformat()
                 })
             
             # 価格アラート作成のアクティビティを追加
@@ -497,79 +494,6 @@ class UserService(BaseService):
         except Exception as e:
             return self._handle_error(e, "ユーザーアクティビティ取得")
     
-    def _calculate_user_stats(self, user_id: int) -> Dict[str, Any]:
-        """
-        ユーザー統計情報の計算
-        
-        Args:
-            user_id (int): ユーザーID
-            
-        Returns:
-            Dict[str, Any]: 統計情報
-        """
-        # 簡単な統計計算（実際の実装では複雑な計算が必要）
-        stats = {
-            'total_savings': 0.0,  # 節約金額の合計
-            'deals_found': 0       # 発見したセール数
-        }
-        
-        # お気に入りゲームの価格変動から節約金額を計算（リポジトリから取得）
-        favorites = self.user_repository.get_user_favorites(user_id)
-        
-        for favorite in favorites:
-            # 価格履歴から節約金額を算出
-            prices = (self.Price.query
-                     .filter_by(game_id=favorite.id)
-                     .order_by(self.Price.updated_at)
-                     .all())
-            
-            if len(prices) >= 2:
-                initial_price = prices[0].price
-                current_price = prices[-1].price
-                if current_price < initial_price:
-                    stats['total_savings'] += initial_price - current_price
-                    stats['deals_found'] += 1
-        
-        return stats
-    
-    def _add_price_info_to_favorites(self, favorites: List) -> List:
-        """
-        お気に入り一覧に価格情報を付与
-        
-        Args:
-            favorites (List): お気に入り一覧
-            
-        Returns:
-            List: 価格情報付きお気に入り一覧
-        """
-        for favorite in favorites:
-            # 最新の価格情報を取得
-            latest_price = (self.Price.query
-                           .filter_by(game_id=favorite.game_id)
-                           .order_by(desc(self.Price.updated_at))
-                           .first())
-            
-            favorite.latest_price = latest_price
-            
-            # 価格変動の計算（簡単な例）
-            favorite.price_change = None
-            if latest_price:
-                # 1週間前の価格と比較
-                week_ago = datetime.now(timezone.utc) - timedelta(days=7)
-                old_price = (self.Price.query
-                           .filter(
-                               self.Price.game_id == favorite.game_id,
-                               self.Price.updated_at <= week_ago
-                           )
-                           .order_by(desc(self.Price.updated_at))
-                           .first())
-                
-                if old_price and old_price.price != latest_price.price:
-                    change_percent = ((latest_price.price - old_price.price) / old_price.price) * 100
-                    favorite.price_change = round(change_percent, 1)
-        
-        return favorites
-    
     def _serialize_user(self, user) -> Dict[str, Any]:
         """
         ユーザーオブジェクトをシリアライズ
@@ -594,33 +518,36 @@ class UserService(BaseService):
             'updated_at': user.updated_at.isoformat()
         }
     
-    def _serialize_favorite(self, favorite) -> Dict[str, Any]:
+    def _serialize_favorite(self, row) -> Dict[str, Any]:
         """
-        お気に入りオブジェクトをシリアライズ
+        お気に入り（価格情報付きの行）をシリアライズ
         
         Args:
-            favorite: お気に入りオブジェクト
+            row: UserRepository.get_favorites_with_prices の行
             
         Returns:
             Dict[str, Any]: シリアライズされたお気に入り情報
         """
+        favorite = row.Favorite
         data = {
             'id': favorite.id,
-            'game': self._serialize_game_basic(favorite.game),
-            'added_at': favorite.added_at.isoformat()
+            'game': self._serialize_game_basic(row.Game),
+            'added_at': favorite.created_at.isoformat()
         }
         
         # 価格情報があれば追加
-        if hasattr(favorite, 'latest_price') and favorite.latest_price:
+        if row.lowest_price is not None:
             data['latest_price'] = {
-                'price': float(favorite.latest_price.price),
-                'store': favorite.latest_price.store,
-                'updated_at': favorite.latest_price.updated_at.isoformat()
+                'price': float(row.lowest_price),
+                'store': row.lowest_store,
+                'regular_price': float(row.regular_price) if row.regular_price is not None else None,
+                'discount_rate': row.discount_rate or 0
             }
         
         # 価格変動があれば追加
-        if hasattr(favorite, 'price_change') and favorite.price_change is not None:
-            data['price_change'] = favorite.price_change
+        price_change = price_change_percent(row.lowest_price, row.previous_price)
+        if price_change is not None:
+            data['price_change'] = price_change
         
         return data
     
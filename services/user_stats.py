@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""User Stats
+
+ユーザーごとの節約額・セール発見数・最終アクティビティの集計（user_stats）。
+価格のコミット時は変わったゲームをお気に入りにしているユーザーだけ、
+お気に入りの追加・削除時はそのユーザーだけを、呼び出し側のトランザクション内で
+1回の DELETE と INSERT ... SELECT により再集計します。
+全ユーザー分の再作成は `flask backfill-user-stats`（backfill_user_stats）で行います。
+"""
+
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Iterable, Union
+
+from sqlalchemy import DateTime, and_, case, func, literal, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import Select
+
+from models import db, Favorite, Notification, Price, User, UserStats
+from models.price import current_price_expression
+from services.job_checkpoint import JobCheckpoint
+
+logger = logging.getLogger(__name__)
+
+
+JOB_NAME = 'backfill-user-stats'
+DEFAULT_BATCH_SIZE = 1000
+
+# 最終アクティビティに含める通知タイプ（価格アラートの登録）
+ALERT_NOTIFICATION_TYPE = 'price_alert'
+
+UserIds = Union[Iterable[int], Select]
+
+
+def _later(first, second):
+    """NULLを除いた2つの日時の遅い方を返す式（GREATESTはSQLiteとPostgreSQLでNULLの扱いが異なるため）"""
+    return case(
+        (first.is_(None), second),
+        (second.is_(None), first),
+        (first >= second, first),
+        else_=second,
+    )
+
+
+def _stats_query(user_ids: UserIds, updated_at: datetime) -> Select:
+    """指定ユーザーの user_stats の行を集計するクエリ"""
+    # お気に入りゲームごとの現在の最安値とそのストアの通常価格
+    current_price = current_price_expression(Price)
+    lowest = select(
+        Price.game_id,
+        Price.regular_price,
+        current_price.label('price'),
+        func.row_number().over(
+            partition_by=Price.game_id, order_by=(current_price.asc(), Price.store)
+        ).label('position'),
+    ).where(
+        Price.game_id.in_(select(Favorite.game_id).where(Favorite.user_id.in_(user_ids))),
+        current_price.isnot(None),
+    ).subquery()
+
+    is_deal = and_(lowest.c.price.isnot(None), lowest.c.price < lowest.c.regular_price)
+    favorites = select(
+        Favorite.user_id,
+        func.count(Favorite.id).label('favorites_count'),
+        func.sum(case((is_deal, lowest.c.regular_price - lowest.c.price), else_=0)).label('total_savings'),
+        func.sum(case((is_deal, 1), else_=0)).label('deals_found'),
+        func.max(Favorite.created_at).label('last_favorited_at'),
+    ).outerjoin(
+        lowest, and_(lowest.c.game_id == Favorite.game_id, lowest.c.position == 1)
+    ).where(Favorite.user_id.in_(user_ids)).group_by(Favorite.user_id).subquery()
+
+    alerts = select(
+        Notification.user_id, func.max(Notification.created_at).label('last_alert_at')
+    ).where(
+        Notification.user_id.in_(user_ids), Notification.notification_type == ALERT_NOTIFICATION_TYPE
+    ).group_by(Notification.user_id).subquery()
+
+    return select(
+        User.id,
+        func.coalesce(favorites.c.favorites_count, 0),
+        func.coalesce(favorites.c.total_savings, 0),
+        func.coalesce(favorites.c.deals_found, 0),
+        _later(favorites.c.last_favorited_at, alerts.c.last_alert_at),
+        literal(updated_at, DateTime(timezone=True)),
+    ).outerjoin(
+        favorites, favorites.c.user_id == User.id
+    ).outerjoin(
+        alerts, alerts.c.user_id == User.id
+    ).where(User.id.in_(user_ids))
+
+
+def refresh_user_stats(connection: Connection, user_ids: UserIds) -> None:
+    """
+    指定ユーザーの統計を再集計（呼び出し側のトランザクション内で実行）
+
+    Args:
+        connection: DB接続
+        user_ids: ユーザーIDの一覧、またはユーザーIDを返すサブクエリ
+    """
+    if not isinstance(user_ids, Select):
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+
+    table = UserStats.__table__
+    connection.execute(table.delete().where(table.c.user_id.in_(user_ids)))
+    connection.execute(table.insert().from_select(
+        ['user_id', 'favorites_count', 'total_savings', 'deals_found', 'last_activity_at', 'updated_at'],
+        _stats_query(user_ids, datetime.now(timezone.utc)),
+    ))
+
+
+def refresh_user_stats_for_games(connection: Connection, game_ids: Union[Iterable[int], Select]) -> None:
+    """
+    価格が変わったゲームをお気に入りにしているユーザーの統計を再集計
+
+    Args:
+        connection: DB接続
+        game_ids: 価格が変わったゲームIDの一覧、またはゲームIDを返すサブクエリ
+    """
+    if not isinstance(game_ids, Select):
+        game_ids = list(game_ids)
+        if not game_ids:
+            return
+    refresh_user_stats(
+        connection, select(Favorite.user_id).where(Favorite.game_id.in_(game_ids)).distinct()
+    )
+
+
+def backfill_user_stats(batch_size: int = DEFAULT_BATCH_SIZE, resume: bool = False) -> int:
+    """
+    全ユーザーの統計を再作成
+
+    ユーザーID順に batch_size 件ずつ、バッチごとのトランザクションで置き換えます。
+    バッチごとにチェックポイントを記録し、resume=True の場合は中断したバッチから再開します。
+
+    Args:
+        batch_size: 1回に再集計するユーザー数
+        resume: 前回中断した実行のチェックポイントから再開する場合True
+
+    Returns:
+        int: 再集計したユーザー数（再開前の実行分を含む）
+    """
+    started = time.monotonic()
+    checkpoint = JobCheckpoint.start(JOB_NAME, resume=resume)
+    written = checkpoint.counters.get('written', 0)
+    last_id = int(checkpoint.cursor or 0)
+
+    try:
+        while True:
+            with db.engine.begin() as connection:
+                user_ids = connection.execute(
+                    select(User.id).where(User.id > last_id).order_by(User.id).limit(batch_size)
+                ).scalars().all()
+                if not user_ids:
+                    break
+                refresh_user_stats(connection, user_ids)
+                written += len(user_ids)
+                last_id = user_ids[-1]
+                checkpoint.save(connection, last_id, written=written)
+    except Exception as e:
+        checkpoint.fail(e)
+        raise
+    checkpoint.complete()
+
+    logger.info(f"ユーザー統計を再作成しました: {written}件 ({time.monotonic() - started:.1f}秒)")
+    return written
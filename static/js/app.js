@@ -11,7 +11,10 @@ const GameBargain = {
         apiBaseUrl: '/api',
         searchDelay: 300,
         toastDuration: 5000,
-        maxRetries: 3
+        maxRetries: 3,
+        enrichmentPollInterval: 2000,
+        enrichmentMaxPolls: 30,
+        enrichmentMaxUnknownPolls: 5
     },
     
     // 初期化
@@ -19,6 +22,8 @@ const GameBargain = {
         this.initEventListeners();
         this.initTooltips();
         this.initSearchSuggestions();
+        this.initSearchEnrichment();
+        this.initPriceStream();
         this.initFavoriteButtons();
         this.initPriceAlerts();
         console.log('GameBargain frontend initialized');
@@ -155,9 +160,110 @@ const GameBargain = {
         }
     },
 
+    // Steam追加検索（バックグラウンド）の結果反映
+    initSearchEnrichment() {
+        const indicator = document.getElementById('search-enrichment');
+        if (!indicator) return;
+
+        let polls = 0;
+        let unknownPolls = 0;
+        const poll = async () => {
+            polls += 1;
+            try {
+                const response = await fetch(`${this.config.apiBaseUrl}/search/enrichment${window.location.search}`);
+                const data = await response.json();
+
+                // none は状態を共有していない別プロセスで実行中の可能性があるため、数回までは待ち続ける
+                if (data.status === 'none') {
+                    unknownPolls += 1;
+                } else {
+                    unknownPolls = 0;
+                }
+                const waiting = data.status === 'pending'
+                    || (data.status === 'none' && unknownPolls < this.config.enrichmentMaxUnknownPolls);
+                if (waiting && polls < this.config.enrichmentMaxPolls) {
+                    setTimeout(poll, this.config.enrichmentPollInterval);
+                    return;
+                }
+
+                if (data.status === 'done' && data.new_count > 0) {
+                    this.applySearchEnrichment(data);
+                }
+            } catch (error) {
+                console.error('Search enrichment error:', error);
+            }
+            indicator.remove();
+        };
+
+        setTimeout(poll, this.config.enrichmentPollInterval);
+    },
+
+    // 追加検索結果のカードを検索結果に反映
+    applySearchEnrichment(data) {
+        const grid = document.querySelector('#grid-results .grid');
+        const list = document.querySelector('#list-results .space-y-4');
+
+        if (grid && list) {
+            grid.innerHTML = data.grid_html;
+            list.innerHTML = data.list_html;
+            this.initFavoriteButtons(grid);
+            this.initFavoriteButtons(list);
+            this.showToast(`Steamから${data.new_count}件のゲームを追加しました`, 'success');
+        } else {
+            // 検索結果なしの画面からは結果一覧のレイアウトごと再描画する
+            window.location.reload();
+        }
+    },
+
+    // 価格のライブ更新（Server-Sent Events）
+    initPriceStream() {
+        const root = document.querySelector('[data-price-stream]');
+        if (!root || !window.EventSource) return;
+
+        const gameId = root.dataset.priceStream;
+        const source = new EventSource(`${this.config.apiBaseUrl}/prices/stream?game_ids=${encodeURIComponent(gameId)}`);
+
+        source.addEventListener('price', (e) => {
+            const event = JSON.parse(e.data);
+            if (String(event.game_id) === String(gameId)) {
+                this.applyPriceEvent(root, event);
+            }
+        });
+
+        window.addEventListener('beforeunload', () => source.close());
+    },
+
+    // 価格変更イベントを価格比較表と最安値表示に反映
+    applyPriceEvent(root, event) {
+        if (event.price === null || event.price === undefined) return;
+
+        const row = root.querySelector(`[data-price-store="${event.store}"]`);
+        if (row) {
+            row.dataset.price = event.price;
+            row.querySelector('[data-price-field="price"]').textContent = this.formatPrice(event.price);
+            row.querySelector('[data-price-field="discount"]').innerHTML = event.discount_percent > 0
+                ? `<span class="bg-red-600 text-white px-2 py-1 rounded text-sm">${event.discount_percent}% OFF</span>`
+                : '<span class="text-gray-400">-</span>';
+            row.querySelector('[data-price-field="updated_at"]').textContent = new Date(event.updated_at)
+                .toLocaleString('ja-JP', { month: '2-digit', day: '2-digit', hour: '2-digit', minute: '2-digit' });
+        }
+
+        // 最安値を再計算
+        const rows = Array.from(root.querySelectorAll('[data-price-store]'));
+        const lowest = rows.reduce((min, r) => (!min || parseFloat(r.dataset.price) < parseFloat(min.dataset.price) ? r : min), null);
+        const lowestPrice = root.querySelector('[data-lowest-field="price"]');
+        if (lowestPrice) {
+            const price = lowest ? parseFloat(lowest.dataset.price) : event.price;
+            const store = lowest ? lowest.dataset.priceStore : event.store;
+            lowestPrice.textContent = this.formatPrice(price);
+            root.querySelector('[data-lowest-field="store"]').textContent = store.toUpperCase();
+            root.querySelector('[data-lowest-field="updated_at"]').textContent = this.formatDate(event.updated_at);
+        }
+    },
+
     // お気に入りボタンの初期化
-    initFavoriteButtons() {
-        const favoriteButtons = document.querySelectorAll('.favorite-btn');
+    initFavoriteButtons(root = document) {
+        const favoriteButtons = root.querySelectorAll('.favorite-btn');
         
         favoriteButtons.forEach(button => {
             button.addEventListener('click', (e) => {
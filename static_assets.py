@@ -0,0 +1,183 @@
+"""
+Static Assets
+
+静的ファイルのビルドと配信
+ビルド時にファイル名へ内容のハッシュを付けたコピーと gzip / brotli の圧縮版を
+static/dist/ に書き出し、元のパスからの対応表（manifest.json）を作成します。
+
+アプリケーションは対応表を読み込み、url_for('static', filename=...) をハッシュ付きのパスに
+置き換えます。ハッシュ付きのファイルは内容が変わるとURLも変わるため、
+クライアントが受け付ける圧縮版を選んで immutable なキャッシュヘッダー付きで返します。
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+from typing import Dict, Optional
+
+from flask import Flask, current_app, request, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # brotli は任意（なければ gzip のみ作成）
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+
+# ビルド成果物の出力先（static フォルダからの相対パス）
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+
+# 1年（ハッシュ付きファイルは内容が変わらない）
+DEFAULT_IMMUTABLE_MAX_AGE = 31536000
+
+# 圧縮版を作成する拡張子
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.svg', '.json', '.txt', '.html', '.xml', '.map'}
+
+# 優先順位順（Content-Encoding, ファイル拡張子）
+_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _fingerprinted_name(path: str, content: bytes) -> str:
+    """ファイル名の拡張子の前に内容のハッシュを付ける（例: css/style.3f2a9b1c0d4e.css）"""
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    stem, ext = os.path.splitext(path)
+    return f'{stem}.{digest}{ext}'
+
+
+def _write(path: str, content: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+
+
+def build_assets(static_folder: str) -> Dict[str, str]:
+    """
+    静的ファイルのハッシュ付きコピー・圧縮版・対応表を作成
+
+    Args:
+        static_folder: static フォルダのパス
+
+    Returns:
+        Dict[str, str]: 元のパスからハッシュ付きのパス（static フォルダからの相対パス）への対応表
+    """
+    dist_folder = os.path.join(static_folder, DIST_DIR)
+    manifest: Dict[str, str] = {}
+
+    for root, dirs, files in os.walk(static_folder):
+        # 出力先自体はビルド対象外
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != dist_folder)
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            relative = os.path.relpath(source, static_folder).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                content = f.read()
+
+            target = f'{DIST_DIR}/{_fingerprinted_name(relative, content)}'
+            target_path = os.path.join(static_folder, target)
+            _write(target_path, content)
+
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                # mtime=0 でビルドごとに同じ内容になるようにする
+                _write(target_path + '.gz', gzip.compress(content, compresslevel=9, mtime=0))
+                if brotli is not None:
+                    _write(target_path + '.br', brotli.compress(content, quality=11))
+
+            manifest[relative] = target
+
+    _write(os.path.join(dist_folder, MANIFEST_NAME),
+           json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    if brotli is None:
+        logger.warning("brotli がインストールされていないため、gzip の圧縮版のみ作成しました")
+    return manifest
+
+
+def load_manifest(static_folder: str) -> Dict[str, str]:
+    """
+    ビルド済みの対応表を読み込む
+
+    Args:
+        static_folder: static フォルダのパス
+
+    Returns:
+        Dict[str, str]: 対応表（ビルドしていない場合は空）
+    """
+    path = os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        logger.error(f"静的ファイルの対応表を読み込めません: {path}: {e}")
+        return {}
+
+
+def _accepted_encodings() -> set:
+    """Accept-Encoding で受け付ける圧縮形式（q=0 は除外）"""
+    return {
+        encoding.lower() for encoding, quality in request.accept_encodings
+        if quality > 0 and encoding != '*'
+    }
+
+
+def init_static_assets(app: Flask) -> None:
+    """
+    ハッシュ付き静的ファイルの URL 置き換えと配信を設定
+
+    対応表がない場合（ビルドしていない開発環境など）は Flask 標準の配信のままです。
+
+    Args:
+        app: Flaskアプリケーションインスタンス
+    """
+    if not app.static_folder or not app.config.get('STATIC_ASSETS_ENABLED', True):
+        return
+
+    manifest = load_manifest(app.static_folder)
+    app.extensions['static_assets'] = manifest
+    if not manifest:
+        return
+
+    fingerprinted = set(manifest.values())
+    default_static = app.view_functions['static']
+
+    @app.url_defaults
+    def fingerprint_static_url(endpoint: str, values: dict) -> None:
+        """url_for('static', filename=...) をハッシュ付きのパスに置き換える"""
+        if endpoint == 'static':
+            filename = values.get('filename')
+            if filename in manifest:
+                values['filename'] = manifest[filename]
+
+    def serve_static(filename: str):
+        """ハッシュ付きファイルは圧縮版を選び、immutable なキャッシュヘッダーを付けて返す"""
+        if filename not in fingerprinted:
+            return default_static(filename=filename)
+
+        static_folder = current_app.static_folder
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        max_age = current_app.config.get('STATIC_IMMUTABLE_MAX_AGE', DEFAULT_IMMUTABLE_MAX_AGE)
+
+        accepted = _accepted_encodings()
+        encoding: Optional[str] = None
+        path = filename
+        for candidate, suffix in _ENCODINGS:
+            if candidate in accepted and os.path.isfile(os.path.join(static_folder, filename + suffix)):
+                encoding, path = candidate, filename + suffix
+                break
+
+        response = send_from_directory(static_folder, path, mimetype=mimetype, max_age=max_age)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if os.path.splitext(filename)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+            response.headers['Vary'] = 'Accept-Encoding'
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    app.view_functions['static'] = serve_static
+    app.logger.info(f"ハッシュ付き静的ファイルを使用します: {len(manifest)}件")
@@ -0,0 +1,104 @@
+"""
+Local fake of the Discord webhook endpoint
+
+Serves POST /api/webhooks/<id>/<token> on 127.0.0.1 with a fixed-window
+rate limit per webhook, returning Discord's X-RateLimit-* headers and a
+429 body once the window is exhausted. Every accepted message and every
+rejected request is recorded for assertions.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+
+class FakeDiscordServer:
+    """Threaded fake Discord webhook server."""
+
+    def __init__(self, limit: int = 5, window: float = 2.0):
+        self.limit = limit
+        self.window = window
+        self.messages: List[Dict[str, Any]] = []
+        self.rejected = 0
+        self._windows: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def webhook_url(self, webhook_id: str) -> str:
+        return f'{self.base_url}/api/webhooks/{webhook_id}/token-{webhook_id}'
+
+    def messages_for(self, webhook_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [message for message in self.messages if message['webhook_id'] == webhook_id]
+
+    def __enter__(self) -> 'FakeDiscordServer':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _take(self, webhook_id: str) -> Dict[str, Any]:
+        """Consume one request from the webhook's window (window starts at its first request)."""
+        now = time.monotonic()
+        with self._lock:
+            started, count = self._windows.get(webhook_id, (now, 0))
+            if now - started >= self.window:
+                started, count = now, 0
+            reset_after = max(0.0, self.window - (now - started))
+            if count >= self.limit:
+                self.rejected += 1
+                return {'ok': False, 'remaining': 0, 'reset_after': reset_after}
+            self._windows[webhook_id] = (started, count + 1)
+            return {'ok': True, 'remaining': self.limit - count - 1, 'reset_after': reset_after, 'at': now}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+            def do_POST(self) -> None:
+                parts = [part for part in self.path.split('?')[0].split('/') if part]
+                if parts[:2] != ['api', 'webhooks'] or len(parts) != 4:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                webhook_id = parts[2]
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+                slot = server._take(webhook_id)
+
+                headers = {
+                    'X-RateLimit-Limit': str(server.limit),
+                    'X-RateLimit-Remaining': str(slot['remaining']),
+                    'X-RateLimit-Reset-After': f"{slot['reset_after']:.3f}",
+                    'X-RateLimit-Bucket': f'webhook-{webhook_id}',
+                }
+                if not slot['ok']:
+                    body = json.dumps({'message': 'You are being rate limited.',
+                                       'retry_after': slot['reset_after'], 'global': False}).encode()
+                    self.send_response(429)
+                    headers['Retry-After'] = str(max(1, round(slot['reset_after'])))
+                    headers['Content-Type'] = 'application/json'
+                else:
+                    with server._lock:
+                        server.messages.append({'webhook_id': webhook_id, 'at': slot['at'], 'payload': payload})
+                    body = b''
+                    self.send_response(204)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
@@ -0,0 +1,83 @@
+"""
+Streaming NDJSON catalog export tests
+"""
+
+import gzip
+import json
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from models import Game, Price
+
+TOKEN = 'export-secret'
+AUTH = {'Authorization': f'Bearer {TOKEN}'}
+
+
+def _add_game(database, title, prices=(), updated_at=None, active=True):
+    old = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    game = Game(title=title, genres='アクション,RPG', is_active=active, updated_at=updated_at or old)
+    database.session.add(game)
+    database.session.flush()
+    for store, regular, sale in prices:
+        database.session.add(Price(
+            game_id=game.id, store=store, regular_price=Decimal(regular),
+            sale_price=Decimal(sale) if sale else None, is_on_sale=bool(sale),
+            updated_at=updated_at or old,
+        ))
+    return game
+
+
+def test_export_streams_gzip_ndjson_with_prices(app, database, client):
+    """Test that the export streams one gzip-compressed NDJSON line per active game."""
+    _add_game(database, 'Alpha', prices=[('steam', '3000', '1500'), ('epic', '2000', None)])
+    _add_game(database, 'Beta')
+    _add_game(database, 'Retired', prices=[('steam', '100', None)], active=False)
+    database.session.commit()
+    app.config['EXPORT_API_TOKEN'] = TOKEN
+
+    response = client.get('/api/export/catalog', headers={'Accept-Encoding': 'gzip', **AUTH})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.headers['Content-Encoding'] == 'gzip'
+
+    records = [json.loads(line) for line in gzip.decompress(response.data).splitlines()]
+    assert [record['title'] for record in records] == ['Alpha', 'Beta']
+    alpha, beta = records
+    assert alpha['lowest_price'] == 1500.0 and alpha['lowest_store'] == 'steam'
+    assert {price['store'] for price in alpha['prices']} == {'steam', 'epic'}
+    assert alpha['genres'] == ['アクション', 'RPG']
+    assert beta['prices'] == [] and beta['lowest_price'] is None
+
+
+def test_export_updated_since_returns_changed_games(app, database, client):
+    """Test that updated_since selects games whose row or any price changed after the cut-off."""
+    recent = datetime.now(timezone.utc) - timedelta(minutes=5)
+    _add_game(database, 'Unchanged', prices=[('steam', '1000', None)])
+    game = _add_game(database, 'Repriced', prices=[('steam', '1000', None)])
+    _add_game(database, 'Renamed', updated_at=recent)
+    database.session.commit()
+    price = Price.query.filter_by(game_id=game.id).one()
+    price.regular_price = Decimal('800')
+    database.session.commit()
+
+    app.config['EXPORT_API_TOKEN'] = TOKEN
+
+    since = (recent - timedelta(minutes=1)).isoformat()
+    response = client.get('/api/export/catalog', query_string={'updated_since': since},
+                          headers={'Accept-Encoding': 'identity', **AUTH})
+    assert 'Content-Encoding' not in response.headers
+    titles = [json.loads(line)['title'] for line in response.data.splitlines()]
+    assert titles == ['Repriced', 'Renamed']
+
+    assert client.get('/api/export/catalog?updated_since=yesterday', headers=AUTH).status_code == 400
+
+
+def test_export_requires_a_configured_token(app, database, client):
+    """Test that the export is disabled without EXPORT_API_TOKEN and rejects wrong or non-ASCII tokens."""
+    app.config['EXPORT_API_TOKEN'] = None
+    assert client.get('/api/export/catalog', headers=AUTH).status_code == 403
+
+    app.config['EXPORT_API_TOKEN'] = TOKEN
+    assert client.get('/api/export/catalog').status_code == 401
+    assert client.get('/api/export/catalog', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    assert client.get('/api/export/catalog', headers={'Authorization': 'Bearer ト'}).status_code == 401
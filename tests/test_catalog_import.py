@@ -0,0 +1,98 @@
+"""
+Bulk Steam catalog import tests
+"""
+
+import gzip
+import json
+from decimal import Decimal
+
+from models import Game, Price, PriceHistory
+from repositories.game_repository import GameRepository
+from services.catalog_import import import_catalog
+
+
+def _appdetails(appid, name, final=None, initial=None, discount=0, **extra):
+    data = {
+        'type': 'game', 'steam_appid': appid, 'name': name,
+        'genres': [{'id': '1', 'description': 'Action'}],
+        'platforms': {'windows': True, 'mac': False, 'linux': True},
+        'developers': ['Studio'], 'release_date': {'date': '10 Dec, 2020'},
+    }
+    if final is not None:
+        data['price_overview'] = {'currency': 'JPY', 'initial': initial or final, 'final': final,
+                                  'discount_percent': discount}
+    data.update(extra)
+    return {str(appid): {'success': True, 'data': data}}
+
+
+def test_import_ndjson_upserts_games_and_prices(app, database, tmp_path):
+    """Test that an NDJSON dump is merged into games/prices and a re-import updates rows in place."""
+    path = tmp_path / 'appdetails.ndjson.gz'
+    lines = [
+        _appdetails(10, 'Counter-Strike', final=98000),
+        _appdetails(20, 'ドラゴン クエスト', final=300000, initial=600000, discount=50),
+        {'30': {'success': False}},
+        _appdetails(40, 'Soundtrack', type='dlc'),
+        _appdetails(10, 'Duplicate'),
+    ]
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        f.write('\n'.join(json.dumps(line, ensure_ascii=False) for line in lines) + '\nnot json\n')
+
+    stats = import_catalog(str(path), batch_size=2)
+    assert (stats['staged'], stats['skipped'], stats['duplicates']) == (2, 3, 1)
+    assert (stats['games_inserted'], stats['prices_inserted']) == (2, 2)
+
+    game = Game.query.filter_by(steam_appid='20').one()
+    assert game.genre_mask and game.platforms == 'windows,linux'
+    assert game.release_date.isoformat() == '2020-12-10'
+    price = Price.query.filter_by(game_id=game.id, store='steam').one()
+    assert price.regular_price == Decimal('6000') and price.sale_price == Decimal('3000')
+    assert price.is_on_sale and price.discount_rate == 50
+
+    results, total = GameRepository().search_games('ドラゴン')
+    assert total == 1 and results[0].steam_appid == '20'
+
+    path.write_bytes(gzip.compress(
+        (json.dumps(_appdetails(20, 'ドラゴン クエスト', final=600000)) + '\n').encode('utf-8')
+    ))
+    stats = import_catalog(str(path))
+    assert (stats['games_inserted'], stats['games_updated']) == (0, 0)
+    assert (stats['prices_inserted'], stats['prices_updated']) == (0, 1)
+    database.session.expire_all()
+    assert Price.query.filter_by(game_id=game.id).count() == 1
+    assert not Price.query.filter_by(game_id=game.id).one().is_on_sale
+    assert PriceHistory.query.filter_by(game_id=game.id).count() == 2
+
+
+def test_import_csv_with_process_pool(app, database, tmp_path):
+    """Test that a CSV dump parsed on a process pool updates existing games by steam_appid."""
+    existing = Game(title='Old Title', steam_appid='570', is_active=True)
+    database.session.add(existing)
+    database.session.commit()
+
+    path = tmp_path / 'appdetails.csv'
+    path.write_text(
+        'steam_appid,name,genres,platforms,release_date,initial,final,discount_percent,is_free\n'
+        '570,Dota 2,"Action,Strategy",windows,"9 Jul, 2013",,,,true\n'
+        '730,Counter-Strike 2,Action,"windows,linux",2012-08-21,150000,150000,0,false\n',
+        encoding='utf-8',
+    )
+    stats = import_catalog(str(path), workers=2, chunk_size=1)
+    assert (stats['games_inserted'], stats['games_updated']) == (1, 1)
+
+    database.session.expire_all()
+    dota = Game.query.filter_by(steam_appid='570').one()
+    assert dota.id == existing.id and dota.title == 'Dota 2'
+    assert Price.query.filter_by(game_id=dota.id).one().regular_price == Decimal('0')
+    assert GameRepository().search_games('dota')[1] == 1
+
+
+def test_import_catalog_command_fails_with_nonzero_exit(app, database, runner, tmp_path):
+    """Test that a failed import is reported with a non-zero exit code."""
+    path = tmp_path / 'catalog.ndjson.gz'
+    path.write_text('not gzip\n', encoding='utf-8')
+
+    result = runner.invoke(args=['import-catalog', str(path)])
+
+    assert result.exit_code == 1
+    assert 'カタログの取り込みエラー' in result.output
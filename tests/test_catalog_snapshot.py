@@ -0,0 +1,78 @@
+"""
+Columnar catalog snapshot tests
+"""
+
+from datetime import date
+from decimal import Decimal
+
+from models import Game, Price
+from repositories.game_repository import GameRepository
+from services.catalog_snapshot import get_catalog_snapshot, get_catalog_snapshot_manager
+
+
+def _add_game(database, title, genres='', platforms='', rating=None, released=None, price=None, active=True):
+    game = Game(title=title, genres=genres, platforms=platforms, steam_rating=rating,
+                release_date=released, is_active=active)
+    database.session.add(game)
+    database.session.flush()
+    if price is not None:
+        database.session.add(Price(game_id=game.id, store='steam', regular_price=Decimal(price)))
+    return game
+
+
+def _seed(database):
+    _add_game(database, 'Delta', 'アクション', 'windows', rating=Decimal('8.5'), released=date(2020, 1, 1), price='3000')
+    _add_game(database, 'Alpha', 'RPG', 'windows,mac', rating=Decimal('9.1'), released=date(2022, 5, 1), price='500')
+    _add_game(database, 'Charlie', 'アクション,RPG', 'linux', rating=None, released=None, price='7800')
+    _add_game(database, 'Bravo', 'パズル', 'windows', rating=Decimal('7.0'), released=date(2021, 3, 1))
+    _add_game(database, 'Retired', 'アクション', 'windows', rating=Decimal('9.9'), price='100', active=False)
+    database.session.commit()
+
+
+def test_snapshot_matches_database_filters_and_sorts(app, database):
+    """Test that snapshot filtering/sorting agrees with the repository query on active games."""
+    _seed(database)
+    repository = GameRepository()
+    snapshot = get_catalog_snapshot()
+
+    assert len(snapshot) == 4
+    for filters in ({'sort': 'price_asc'}, {'sort': 'price_desc'}, {'sort': 'title'},
+                    {'sort': 'release_date'}, {'sort': 'relevance'}, {'genre': 'action', 'sort': 'title'},
+                    {'platform': 'windows', 'max_price': '3000', 'sort': 'title'},
+                    {'genre': 'no-such-genre'}):
+        games, total = repository.search_games(filters=filters, per_page=10)
+        ids, snapshot_total = snapshot.select(filters, filters.get('sort'), page=1, per_page=10)
+        assert ids == [game.id for game in games], filters
+        assert snapshot_total == total
+
+    assert snapshot.facets({'genre': 'action'})['price_band'] == {
+        'free': 0, 'under_1000': 0, '1000_3000': 0, '3000_5000': 1, 'over_5000': 1
+    }
+
+
+def test_api_games_pages_from_snapshot_and_patches_prices(app, database, client):
+    """Test that /api/games sorts from the snapshot and picks up committed price changes by patching."""
+    _seed(database)
+
+    response = client.get('/api/games?sort=price_asc&limit=2')
+    data = response.get_json()
+    assert [game['title'] for game in data['games']] == ['Alpha', 'Delta']
+    assert data['pagination']['total_count'] == 4
+
+    snapshot = get_catalog_snapshot()
+    price = Price.query.join(Game).filter(Game.title == 'Charlie').one()
+    price.regular_price = Decimal('100')
+    database.session.commit()
+
+    response = client.get('/api/games?sort=price_asc&limit=2')
+    assert [game['title'] for game in response.get_json()['games']] == ['Charlie', 'Alpha']
+    patched = get_catalog_snapshot()
+    assert patched is not snapshot
+    assert patched.ids is snapshot.ids  # 価格列のみ差し替え
+
+    # ゲームの追加は再構築
+    _add_game(database, 'Echo', price='50')
+    database.session.commit()
+    response = client.get('/api/games?sort=price_asc&limit=1')
+    assert [game['title'] for game in response.get_json()['games']] == ['Echo']
+    assert len(get_catalog_snapshot_manager().get()) == 5
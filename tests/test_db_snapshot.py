@@ -0,0 +1,57 @@
+"""
+Parquet database snapshot tests
+"""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from models import Game, Price, GameTitleBigram
+from services.db_snapshot import export_snapshot, import_snapshot
+
+pytest.importorskip('pyarrow.parquet', exc_type=ImportError)
+
+
+def test_snapshot_round_trip_keeps_ids(app, database, tmp_path):
+    """Test that exporting and importing a snapshot restores rows with their original IDs."""
+    for title in ('Placeholder', 'Dragon Quest'):
+        database.session.add(Game(title=title, genres='RPG', release_date=date(2020, 12, 10)))
+    database.session.commit()
+    database.session.delete(Game.query.filter_by(title='Placeholder').one())
+    game = Game.query.filter_by(title='Dragon Quest').one()
+    database.session.add(Price(game_id=game.id, store='steam', regular_price=Decimal('6000'),
+                               sale_price=Decimal('2999.50'), discount_rate=50, is_on_sale=True))
+    database.session.commit()
+    game_id = game.id
+
+    counts = export_snapshot(str(tmp_path / 'snapshot'), batch_size=1)
+    assert counts['games'] == 1 and counts['prices'] == 1
+
+    database.session.add(Game(title='Added Later'))
+    database.session.commit()
+
+    counts = import_snapshot(str(tmp_path / 'snapshot'), batch_size=1)
+    assert counts['games'] == 1
+    database.session.expire_all()
+
+    restored = Game.query.one()
+    assert (restored.id, restored.title, restored.release_date) == (game_id, 'Dragon Quest', date(2020, 12, 10))
+    price = Price.query.one()
+    assert price.game_id == game_id and price.sale_price == Decimal('2999.50') and price.is_on_sale
+    assert GameTitleBigram.query.filter_by(game_id=game_id).count() > 0
+
+
+def test_snapshot_commands_fail_with_nonzero_exit(app, database, runner, tmp_path):
+    """Test that failed snapshot export and restore are reported with a non-zero exit code."""
+    blocker = tmp_path / 'blocker'
+    blocker.write_text('', encoding='utf-8')
+    result = runner.invoke(args=['export-snapshot', str(blocker / 'snapshot')])
+    assert result.exit_code == 1
+    assert 'スナップショットの書き出しエラー' in result.output
+
+    empty = tmp_path / 'empty'
+    empty.mkdir()
+    result = runner.invoke(args=['import-snapshot', str(empty), '--yes'])
+    assert result.exit_code == 1
+    assert 'スナップショットの復元エラー' in result.output
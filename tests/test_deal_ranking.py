@@ -0,0 +1,56 @@
+"""
+Deal ranking pipeline tests
+"""
+
+from decimal import Decimal
+
+from extensions import cache
+from models import Game, Price, GamePriceStats, DealRanking
+from services.deal_ranking import rebuild_deal_rankings
+
+
+def _add_sale(database, title, genres, regular, sale, discount, lowest=None, metacritic=None):
+    game = Game(title=title, genres=genres, metacritic_score=metacritic, is_active=True, description='desc')
+    database.session.add(game)
+    database.session.flush()
+    database.session.add(Price(game_id=game.id, store='steam', regular_price=Decimal(regular),
+                               sale_price=Decimal(sale) if sale else None, discount_rate=discount,
+                               is_on_sale=bool(sale)))
+    if lowest:
+        database.session.add(GamePriceStats(game_id=game.id, store='steam', lowest_price=Decimal(lowest)))
+    return game
+
+
+def test_rankings_are_materialized_overall_and_per_genre(app, database):
+    """Test that on-sale games are scored and written per scope in rank order."""
+    at_low = _add_sale(database, 'At Low', 'RPG', '4000', '1000', 75, lowest='1000', metacritic=90)
+    above_low = _add_sale(database, 'Above Low', 'アクション', '4000', '1000', 75, lowest='500', metacritic=90)
+    small = _add_sale(database, 'Small Discount', 'RPG', '4000', '3600', 10)
+    _add_sale(database, 'Full Price', 'RPG', '4000', None, 0)
+    database.session.commit()
+
+    counts = rebuild_deal_rankings(size=2)
+    assert counts == {'all': 2, 'action': 1, 'rpg': 2}
+
+    overall = DealRanking.query.filter_by(scope='all').order_by(DealRanking.rank).all()
+    assert [ranking.game_id for ranking in overall] == [at_low.id, above_low.id]
+    assert overall[0].current_price == Decimal('1000') and overall[0].discount_rate == 75
+    rpg = DealRanking.query.filter_by(scope='rpg').order_by(DealRanking.rank).all()
+    assert [ranking.game_id for ranking in rpg] == [at_low.id, small.id]
+
+
+def test_home_sale_section_reads_rankings(app, database, client):
+    """Test that the home page sale section lists ranked games, falling back to the discount index."""
+    cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
+    cache.clear()
+    _add_sale(database, 'Indexed Deal', 'RPG', '2000', '1000', 50)
+    database.session.commit()
+
+    response = client.get('/')
+    assert 'セール中のゲーム' in response.get_data(as_text=True)
+    assert 'Indexed Deal' in response.get_data(as_text=True)
+
+    rebuild_deal_rankings()
+    deals = client.get('/api/deals?genre=rpg').get_json()['deals']
+    assert [deal['title'] for deal in deals] == ['Indexed Deal']
+    assert client.get('/api/deals?genre=unknown').status_code == 400
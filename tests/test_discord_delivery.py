@@ -0,0 +1,120 @@
+"""
+Discord webhook delivery tests
+"""
+
+import pytest
+
+from models import Notification, User
+from services.discord_delivery import (
+    Destination, DiscordDeliveryEngine, WebhookMessage, deliver_pending_notifications, pack_embeds,
+)
+from tests.fake_discord import FakeDiscordServer
+
+
+def test_pack_embeds_respects_count_and_size_limits():
+    """Test that embeds are packed up to 10 per message and 6000 characters per message."""
+    small = [(index, {'title': 't', 'description': 'd'}) for index in range(25)]
+    assert [len(message) for message in pack_embeds(small)] == [10, 10, 5]
+
+    large = [(index, {'title': 'x' * 2500}) for index in range(3)]
+    assert [len(message) for message in pack_embeds(large)] == [2, 1]
+
+
+def test_sale_fan_out_follows_rate_limits_concurrently(app, database):
+    """Test that a sale fan-out packs embeds, never hits 429, and sends to channels in parallel."""
+    with FakeDiscordServer(limit=2, window=0.4) as server:
+        channels = {f'10{index}': server.webhook_url(f'hook{index}') for index in range(3)}
+        app.config.update({
+            'DISCORD_CHANNEL_WEBHOOKS': ','.join(f'{channel}={url}' for channel, url in channels.items()),
+            'DISCORD_WEBHOOK_URL': server.webhook_url('direct'),
+        })
+        user = User(discord_id='555', username='fan')
+        database.session.add(user)
+        database.session.flush()
+        for channel in channels:
+            for index in range(25):
+                database.session.add(Notification('sale_start', f'Sale {index}', 'big sale', discord_channel_id=channel))
+        database.session.add(Notification('price_drop', 'Direct', 'dropped', user_id=user.id))
+        database.session.add(Notification('price_drop', 'Nowhere', 'no route', discord_channel_id='999'))
+        database.session.commit()
+
+        stats = deliver_pending_notifications(engine=DiscordDeliveryEngine(workers=4))
+
+    assert stats['sent'] == 76 and stats['failed'] == 0 and stats['unroutable'] == 1
+    assert server.rejected == 0 and stats['rate_limited'] == 0
+    for index in range(3):
+        messages = server.messages_for(f'hook{index}')
+        assert [len(message['payload']['embeds']) for message in messages] == [10, 10, 5]
+        # 3rd message had to wait for the window to reset
+        assert messages[2]['at'] - messages[0]['at'] >= 0.35
+    assert server.messages_for('direct')[0]['payload']['content'] == '<@555>'
+    # Channels are sent in parallel: every channel starts before any channel finishes
+    hooks = [server.messages_for(f'hook{index}') for index in range(3)]
+    assert max(messages[0]['at'] for messages in hooks) < min(messages[-1]['at'] for messages in hooks)
+    unroutable = Notification.query.filter_by(is_sent=False).one()
+    assert unroutable.title == 'Nowhere' and not unroutable.can_retry(app.config['NOTIFICATION_MAX_RETRIES'])
+    # Unroutable notifications are not selected again and cannot starve routable ones
+    assert deliver_pending_notifications(engine=DiscordDeliveryEngine(workers=4))['unroutable'] == 0
+
+
+class _Response:
+    def __init__(self, status_code, headers=None, body=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = ''
+        self._body = body
+
+    def json(self):
+        return self._body
+
+
+class _Session:
+    """Fake HTTP session: 'boom' raises a non-requests error, 'odd' answers with malformed rate-limit data once."""
+
+    def __init__(self):
+        self.calls = {}
+
+    def post(self, url, json=None, timeout=None):
+        name = url.rsplit('/', 2)[-2]
+        self.calls[name] = self.calls.get(name, 0) + 1
+        if name == 'boom':
+            raise RuntimeError('unexpected failure')
+        if name == 'odd' and self.calls[name] == 1:
+            return _Response(429, {'X-RateLimit-Limit': 'many', 'X-RateLimit-Remaining': '0',
+                                   'X-RateLimit-Reset-After': '0', 'Retry-After': '0'}, body=['not', 'a', 'dict'])
+        return _Response(204)
+
+
+def test_unexpected_errors_fail_only_their_message_and_release_the_bucket():
+    """Test that non-requests errors and malformed 429 data neither leak rate-limit slots nor lose other results."""
+    session = _Session()
+    engine = DiscordDeliveryEngine(workers=3, session=session)
+    destinations = [
+        Destination(name, f'http://discord.invalid/api/webhooks/{name}/token',
+                    [WebhookMessage({'embeds': []}, [index * 10 + part]) for part in range(2)])
+        for index, name in enumerate(('ok', 'odd', 'boom'))
+    ]
+
+    result = engine.deliver(destinations)
+
+    # 'boom' got to try both messages, so its slot was released after the first error
+    assert session.calls == {'ok': 2, 'odd': 3, 'boom': 2}
+    assert sorted(result.sent) == [0, 1, 10, 11] and sorted(result.failed) == [20, 21]
+    assert result.rate_limited == 1
+
+
+def test_sent_results_are_recorded_when_delivery_is_interrupted(app, database):
+    """Test that notifications already sent are marked even if the engine raises midway."""
+    class InterruptedEngine(DiscordDeliveryEngine):
+        def deliver(self, destinations, result=None):
+            result.record(destinations[0].messages[0], True, 0)
+            raise RuntimeError('worker crashed')
+
+    app.config.update({'DISCORD_CHANNEL_WEBHOOKS': '100=http://discord.invalid/api/webhooks/1/token'})
+    database.session.add(Notification('price_drop', 'Sent', 'sent', discord_channel_id='100'))
+    database.session.commit()
+
+    with pytest.raises(RuntimeError):
+        deliver_pending_notifications(engine=InterruptedEngine())
+
+    assert Notification.query.filter_by(title='Sent').one().is_sent
@@ -0,0 +1,93 @@
+"""
+Favorites listing query tests
+"""
+
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from flask import g
+from sqlalchemy import event
+
+from models import db, Game, Price, PriceHistory, Favorite, User
+from repositories.user_repository import UserRepository
+
+
+def _add_favorite(database, user, title, prices, week_ago_prices=()):
+    game = Game(title=title, is_active=True, description='desc')
+    database.session.add(game)
+    database.session.flush()
+    for store, regular, sale in prices:
+        database.session.add(Price(game_id=game.id, store=store, regular_price=Decimal(regular),
+                                   sale_price=Decimal(sale) if sale else None, is_on_sale=bool(sale),
+                                   discount_rate=50 if sale else 0))
+    recorded_at = datetime.now(timezone.utc) - timedelta(days=10)
+    for store, regular in week_ago_prices:
+        database.session.add(PriceHistory(game_id=game.id, store=store, regular_price=Decimal(regular),
+                                          recorded_at=recorded_at))
+    database.session.add(Favorite(user_id=user.id, game_id=game.id))
+    database.session.flush()
+    return game
+
+
+def _count_queries(callback):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        result = callback()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return result, len(statements)
+
+
+def test_favorites_are_listed_with_lowest_price_and_delta(app, database):
+    """Test that each favorite carries the lowest current price and the week-ago price."""
+    user = User(discord_id='1', username='player')
+    database.session.add(user)
+    database.session.flush()
+    dropped = _add_favorite(database, user, 'Dropped', [('steam', '4000', '2000'), ('epic', '3000', None)],
+                            week_ago_prices=[('steam', '4000'), ('epic', '3000')])
+    _add_favorite(database, user, 'No Prices', [])
+    user_id, dropped_id = user.id, dropped.id
+    database.session.commit()
+    database.session.expunge_all()
+
+    rows, queries = _count_queries(lambda: UserRepository().get_favorites_with_prices(user_id))
+    assert queries == 1
+    by_title = {row.Game.title: row for row in rows}
+    assert by_title['Dropped'].Favorite.game_id == dropped_id
+    assert by_title['Dropped'].lowest_price == Decimal('2000')
+    assert by_title['Dropped'].lowest_store == 'steam'
+    assert by_title['Dropped'].previous_price == Decimal('3000')
+    assert by_title['No Prices'].lowest_price is None
+
+
+def test_favorites_api_uses_constant_queries(app, database, client):
+    """Test that the favorites API issues the same number of queries regardless of list size."""
+    user = User(discord_id='1', username='player')
+    database.session.add(user)
+    database.session.flush()
+    _add_favorite(database, user, 'First', [('steam', '1000', None)])
+    database.session.commit()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user.id)
+        session['_fresh'] = True
+
+    database.session.expire_all()
+    g.pop('_login_user', None)
+    _, single = _count_queries(lambda: client.get('/api/favorites'))
+    for index in range(5):
+        _add_favorite(database, user, f'Game {index}', [('steam', '1000', '500')],
+                      week_ago_prices=[('steam', '1000')])
+    database.session.commit()
+    database.session.expire_all()
+    g.pop('_login_user', None)
+    response, many = _count_queries(lambda: client.get('/api/favorites'))
+
+    favorites = response.get_json()['favorites']
+    assert len(favorites) == 6
+    assert many == single
+    assert {favorite['price_change'] for favorite in favorites} == {None, -50.0}
@@ -0,0 +1,70 @@
+"""
+Rendered fragment caching and background home seeding tests
+"""
+
+from decimal import Decimal
+
+from extensions import cache
+from models import Game, Price
+from repositories.game_repository import GameRepository
+import services.home_seed as home_seed
+from web.fragments import render_game_cards
+
+
+def _enable_cache(app):
+    cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
+    cache.clear()
+
+
+def test_game_cards_rerender_only_when_version_changes(app, database, monkeypatch):
+    """Test that cards are cached per game and price version."""
+    _enable_cache(app)
+    games = []
+    for title, price in (('Alpha', '1000'), ('Beta', '2000')):
+        game = Game(title=title, description='desc', is_active=True)
+        database.session.add(game)
+        database.session.flush()
+        database.session.add(Price(game_id=game.id, store='steam', regular_price=Decimal(price)))
+        games.append({'id': game.id, 'title': title, 'description': 'desc'})
+    database.session.commit()
+
+    formatted = []
+    original = GameRepository.format_game_for_web_template
+
+    def counting_format(self, game_data, price_repository=None):
+        formatted.append(game_data['id'])
+        return original(self, game_data, None)
+
+    monkeypatch.setattr(GameRepository, 'format_game_for_web_template', counting_format)
+
+    with app.test_request_context('/search'):
+        first = render_game_cards(games)
+        assert 'Alpha' in first['grid'] and 'Beta' in first['list']
+        assert formatted == [games[0]['id'], games[1]['id']]
+
+        formatted.clear()
+        assert render_game_cards(games) == first
+        assert formatted == []
+
+        price = Price.query.filter_by(game_id=games[1]['id']).one()
+        price.regular_price = Decimal('1500')
+        database.session.commit()
+        render_game_cards(games)
+        assert formatted == [games[1]['id']]
+
+
+def test_home_page_seeds_in_background(app, database, client, monkeypatch):
+    """Test that an empty home page schedules the Steam seed job instead of calling Steam inline."""
+    _enable_cache(app)
+    app.config['HOME_SEED_ENABLED'] = True
+    submitted = []
+    monkeypatch.setattr(home_seed, 'submit_background_task', lambda fn, *args, **kwargs: submitted.append(fn))
+
+    def fail(*args, **kwargs):
+        raise AssertionError('Steam API must not be called during the request')
+
+    monkeypatch.setattr('services.steam_service.SteamAPIService.get_recent_games', fail)
+
+    assert client.get('/').status_code == 200
+    assert client.get('/').status_code == 200
+    assert submitted == [home_seed.seed_home_games]
@@ -0,0 +1,43 @@
+"""
+HTTP client and circuit breaker tests
+"""
+
+import pytest
+
+from services.http_client import CircuitBreaker, CircuitOpenError, HTTPClient
+
+
+def test_circuit_opens_after_threshold():
+    """Test that consecutive failures open the circuit and calls fail fast."""
+    breaker = CircuitBreaker('store.steampowered.com', failure_threshold=3, reset_timeout=60)
+
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_circuit_half_open_allows_single_probe():
+    """Test that a half-open circuit lets one probe through and closes on success."""
+    breaker = CircuitBreaker('store.steampowered.com', failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_client_shares_breaker_per_host():
+    """Test that breakers are keyed by upstream host."""
+    client = HTTPClient()
+    steam = client.get_breaker('https://store.steampowered.com/api/appdetails')
+
+    assert steam is client.get_breaker('https://store.steampowered.com/app/10/')
+    assert steam is not client.get_breaker('https://discord.com/api/users/@me')
@@ -0,0 +1,66 @@
+"""
+Identity cache tests
+"""
+
+from flask import g
+from sqlalchemy import event
+
+from extensions import cache
+from models import db, User
+from services.identity_cache import CachedUser, load_identity
+
+
+def _count_user_queries(callback):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM users' in statement:
+            statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        result = callback()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return result, len(statements)
+
+
+def test_authenticated_requests_skip_users_query_once_cached(app, database, client):
+    """Test that the user loader serves the identity from the cache after the first request."""
+    cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
+    cache.clear()
+    user = User(discord_id='42', username='player', preferences='{"currency": "JPY"}')
+    database.session.add(user)
+    database.session.commit()
+    user_id = user.id
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+    database.session.expire_all()
+    g.pop('_login_user', None)
+    _, first = _count_user_queries(lambda: client.get('/api/favorites'))
+    database.session.expire_all()
+    g.pop('_login_user', None)
+    response, second = _count_user_queries(lambda: client.get('/api/favorites'))
+    assert response.status_code == 200
+    assert first == 1 and second == 0
+
+    identity = load_identity(str(user_id))
+    assert isinstance(identity, CachedUser)
+    assert identity.get_preferences() == {'currency': 'JPY'}
+
+
+def test_user_writes_invalidate_cached_identity(app, database):
+    """Test that committing a user change drops the cached snapshot."""
+    cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
+    cache.clear()
+    user = User(discord_id='42', username='before')
+    database.session.add(user)
+    database.session.commit()
+    assert load_identity(str(user.id)).username == 'before'
+
+    user.username = 'after'
+    database.session.commit()
+    assert load_identity(str(user.id)).username == 'after'
+    assert load_identity('999') is None
@@ -0,0 +1,103 @@
+"""
+Checkpointed batch job tests
+"""
+
+import pytest
+from sqlalchemy import event
+
+from models import Game, JobRun, JobStatus, Price
+from services.job_checkpoint import JobCheckpoint
+from services.price_change_detector import DETECT_JOB_NAME, PriceChangeDetector
+
+
+class Killed(BaseException):
+    """Simulates the process dying (not handled by the job's error handling)."""
+
+
+class FakeSteam:
+    def __init__(self, die_at=None, missing=()):
+        self.calls = []
+        self.die_at = die_at
+        self.missing = set(missing)
+
+    def get_game_price(self, appid):
+        self.calls.append(appid)
+        if len(self.calls) == self.die_at:
+            raise Killed()
+        if appid in self.missing:
+            return None
+        return {'price': 1000, 'original_price': 1000, 'discount_percent': 0}
+
+
+def test_detect_price_changes_resumes_after_the_last_committed_chunk(app, database):
+    """Test that a crash keeps the committed chunks and --resume skips every game already checked."""
+    games = [Game(title=f'Game {i}', steam_appid=str(100 + i), is_active=True) for i in range(7)]
+    database.session.add_all(games)
+    database.session.commit()
+
+    detector = PriceChangeDetector()
+    detector.steam_service = FakeSteam(die_at=5, missing={'101'})
+    with pytest.raises(Killed):
+        detector.process_price_changes(chunk_size=2)
+    database.session.rollback()
+
+    run = JobRun.query.filter_by(job_name=DETECT_JOB_NAME).one()
+    assert run.status == JobStatus.RUNNING and run.cursor == str(games[3].id)
+    assert run.get_counters() == {'games': 4, 'prices': 3, 'last_appid': '103'}
+    assert Price.query.count() == 3
+
+    detector = PriceChangeDetector()
+    detector.steam_service = FakeSteam()
+    counters = detector.process_price_changes(chunk_size=2, resume=True)
+
+    # The game Steam had no price for is not asked about again
+    assert detector.steam_service.calls == ['104', '105', '106']
+    assert counters == {'games': 7, 'prices': 6}
+    database.session.expire_all()
+    run = JobRun.query.filter_by(job_name=DETECT_JOB_NAME).one()
+    assert run.status == JobStatus.COMPLETED and run.finished_at is not None
+
+
+def test_resume_only_continues_unfinished_runs(app, database):
+    """Test that --resume reuses a failed run's checkpoint but starts over after a completed run."""
+    first = JobCheckpoint.start('sample-job')
+    with database.engine.begin() as connection:
+        first.save(connection, 42, written=10)
+    first.fail(RuntimeError('boom'))
+
+    resumed = JobCheckpoint.start('sample-job', resume=True)
+    assert (resumed.run_id, resumed.cursor, resumed.counters, resumed.resumed) == (first.run_id, '42', {'written': 10}, True)
+    resumed.complete()
+
+    fresh = JobCheckpoint.start('sample-job', resume=True)
+    assert fresh.run_id != first.run_id and fresh.cursor is None and fresh.counters == {}
+    assert JobCheckpoint.start('sample-job').run_id not in (first.run_id, fresh.run_id)
+
+
+
+def test_database_error_marks_the_run_failed(app, database):
+    """Test that a failing game query is recorded as a failed run that --resume can continue."""
+    games = [Game(title=f'Game {i}', steam_appid=str(100 + i), is_active=True) for i in range(4)]
+    database.session.add_all(games)
+    database.session.commit()
+
+    queries = []
+
+    def fail_second_chunk(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM games' in statement and 'NOT IN' in statement:
+            queries.append(statement)
+            if len(queries) == 2:
+                raise RuntimeError('database went away')
+
+    detector = PriceChangeDetector()
+    detector.steam_service = FakeSteam()
+    event.listen(database.engine, 'before_cursor_execute', fail_second_chunk)
+    try:
+        detector.process_price_changes(chunk_size=2)
+    finally:
+        event.remove(database.engine, 'before_cursor_execute', fail_second_chunk)
+    database.session.rollback()
+
+    run = JobRun.query.filter_by(job_name=DETECT_JOB_NAME).one()
+    assert run.status == JobStatus.FAILED and run.cursor == str(games[1].id)
+    assert 'database went away' in run.error
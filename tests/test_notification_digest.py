@@ -0,0 +1,115 @@
+"""
+Price digest tests
+"""
+
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from models import Favorite, Game, Notification, PriceHistory, User
+from services.price_digest import build_price_digests
+
+
+NOW = datetime(2026, 6, 30, 12, 0, tzinfo=timezone.utc)
+
+
+def _history(game, store, regular, sale, discount, at):
+    return PriceHistory(
+        game_id=game.id, store=store, regular_price=Decimal(regular),
+        sale_price=Decimal(sale) if sale else None, discount_rate=discount,
+        is_on_sale=bool(sale), recorded_at=at,
+    )
+
+
+def _digests(user):
+    return Notification.query.filter_by(user_id=user.id, notification_type='price_digest').all()
+
+
+def test_sale_sweep_becomes_one_ranked_digest_per_user(app, database):
+    """Test that many price events in the window collapse into one notification ranked by discount."""
+    app.config['DIGEST_MAX_ITEMS'] = 3
+    fan = User(discord_id='1', username='fan')
+    database.session.add(fan)
+    games = [Game(title=f'Game {i}', is_active=True) for i in range(5)]
+    database.session.add_all(games)
+    database.session.flush()
+    for game in games:
+        database.session.add(Favorite(user_id=fan.id, game_id=game.id))
+
+    before = NOW - timedelta(days=3)
+    for game in games:
+        database.session.add(_history(game, 'steam', '4000', None, 0, before))
+    # Game 0..3 go on sale at increasing discounts; Game 0 drops twice, Game 4 does not change
+    for i, game in enumerate(games[:4]):
+        discount = 20 * (i + 1)
+        sale = str(4000 * (100 - discount) // 100)
+        database.session.add(_history(game, 'steam', '4000', sale, discount, NOW - timedelta(hours=6)))
+    database.session.add(_history(games[0], 'steam', '4000', '3000', 25, NOW - timedelta(hours=1)))
+    # A cheaper second store wins for Game 1
+    database.session.add(_history(games[1], 'epic', '4000', None, 0, before))
+    database.session.add(_history(games[1], 'epic', '4000', '1000', 75, NOW - timedelta(hours=2)))
+    database.session.commit()
+
+    stats = build_price_digests(now=NOW)
+
+    assert stats == {'users': 1, 'digests': 1, 'items': 4}
+    digest = _digests(fan)[0]
+    lines = digest.message.split('\n')
+    assert lines[0].startswith('• Game 3: ¥4,000 → ¥800 -80%')
+    assert lines[1].startswith('• Game 1: ¥4,000 → ¥1,000 -75% (epic)')
+    assert lines[2].startswith('• Game 2')
+    assert lines[3] == 'ほか 1件'
+    assert digest.game_id == games[3].id and not digest.is_sent
+
+
+def test_frequency_preference_controls_when_digests_are_due(app, database):
+    """Test that hourly users get a digest again an hour later, daily users wait, and 'off' users never do."""
+    hourly = User(discord_id='1', username='hourly')
+    hourly.set_preferences({'notification_frequency': 'hourly'})
+    daily = User(discord_id='2', username='daily')
+    muted = User(discord_id='3', username='muted')
+    muted.set_preferences({'notification_frequency': 'off'})
+    game = Game(title='Shared', is_active=True)
+    database.session.add_all([hourly, daily, muted, game])
+    database.session.flush()
+    for user in (hourly, daily, muted):
+        database.session.add(Favorite(user_id=user.id, game_id=game.id))
+    database.session.add(_history(game, 'steam', '2000', None, 0, NOW - timedelta(days=2)))
+    database.session.add(_history(game, 'steam', '2000', '1500', 25, NOW - timedelta(minutes=30)))
+    database.session.commit()
+
+    assert build_price_digests(now=NOW)['digests'] == 2
+    assert len(_digests(hourly)) == 1 and len(_digests(daily)) == 1 and not _digests(muted)
+
+    later = NOW + timedelta(hours=1)
+    database.session.add(_history(game, 'steam', '2000', '1000', 50, later - timedelta(minutes=10)))
+    database.session.commit()
+    stats = build_price_digests(now=later)
+
+    assert stats['users'] == 1 and stats['digests'] == 1
+    assert len(_digests(hourly)) == 2 and len(_digests(daily)) == 1
+    assert '¥1,500 → ¥1,000' in _digests(hourly)[-1].message
+
+
+def test_watermark_advances_without_a_digest_and_bounds_the_history_read(app, database):
+    """Test that a run with no drops still advances the watermark, and older history only seeds the previous price."""
+    fan = User(discord_id='1', username='fan')
+    game = Game(title='Steady', is_active=True)
+    database.session.add_all([fan, game])
+    database.session.flush()
+    database.session.add(Favorite(user_id=fan.id, game_id=game.id))
+    database.session.add(_history(game, 'steam', '2000', '500', 75, NOW - timedelta(days=30)))
+    database.session.add(_history(game, 'steam', '2000', None, 0, NOW - timedelta(days=3)))
+    database.session.commit()
+
+    assert build_price_digests(now=NOW) == {'users': 1, 'digests': 0, 'items': 0}
+    database.session.expire_all()
+    assert database.session.get(User, fan.id).last_digest_at is not None
+
+    # Not due again within the window even though no digest was sent
+    assert build_price_digests(now=NOW + timedelta(hours=1))['users'] == 0
+
+    later = NOW + timedelta(days=1)
+    database.session.add(_history(game, 'steam', '2000', '1500', 25, later - timedelta(hours=1)))
+    database.session.commit()
+    assert build_price_digests(now=later)['digests'] == 1
+    assert '¥2,000 → ¥1,500' in _digests(fan)[0].message
@@ -0,0 +1,100 @@
+"""
+Price event pub/sub and live stream tests
+"""
+
+import threading
+from decimal import Decimal
+from unittest.mock import patch
+
+from models import Game, Price
+from repositories.price_repository import PriceRepository
+from services.price_events import PriceEventBus, PriceEventRelay, price_event_bus
+
+
+def test_wait_for_filters_by_game_and_wakes_on_publish():
+    """Test that a waiting subscriber only receives events for its games."""
+    bus = PriceEventBus()
+    received = []
+
+    waiter = threading.Thread(target=lambda: received.extend(bus.wait_for({2}, after_seq=0, timeout=2)))
+    waiter.start()
+    bus.publish({'game_id': 1, 'price': 100.0})
+    bus.publish({'game_id': 2, 'price': 200.0})
+    waiter.join()
+
+    assert [event['game_id'] for event in received] == [2]
+    assert bus.wait_for({2}, after_seq=received[-1]['seq'], timeout=0) == []
+
+
+def test_resume_ignores_event_ids_from_other_processes():
+    """Test that a Last-Event-ID from another process or ahead of this one resumes from the current seq."""
+    bus = PriceEventBus()
+    bus.publish({'game_id': 1, 'price': 100.0})
+    bus.publish({'game_id': 1, 'price': 90.0})
+
+    assert bus.resume_seq(bus.event_id(1)) == 1
+    assert bus.resume_seq(bus.event_id(50)) == 2
+    assert bus.resume_seq('otherepoch-1') == 2
+    assert bus.resume_seq(None) == 2
+
+    # A stale seq ahead of this process still receives new events
+    waiter_events = []
+    waiter = threading.Thread(target=lambda: waiter_events.extend(bus.wait_for({1}, after_seq=50, timeout=2)))
+    waiter.start()
+    bus.publish({'game_id': 1, 'price': 80.0})
+    waiter.join()
+    assert [event['price'] for event in waiter_events] == [80.0]
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.published = []
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+
+
+def test_relay_forwards_events_between_processes(app):
+    """Test that events published in one process reach another process's bus once, and not back to the sender."""
+    app.config['PRICE_EVENTS_REDIS_URL'] = 'redis://relay-test/0'
+    redis = _FakeRedis()
+    sweeper_bus, web_bus = PriceEventBus(), PriceEventBus()
+    sweeper, web = PriceEventRelay(sweeper_bus), PriceEventRelay(web_bus)
+
+    with app.app_context():
+        with patch('redis.Redis.from_url', return_value=redis):
+            sweeper.publish([{'game_id': 7, 'price': 500.0}])
+
+    assert sweeper_bus.last_seq == 1 and len(redis.published) == 1
+    _, message = redis.published[0]
+    sweeper.receive(message)
+    web.receive(message)
+    assert sweeper_bus.last_seq == 1
+    assert [event['price'] for event in web_bus.wait_for({7}, after_seq=0, timeout=0)] == [500.0]
+
+
+def test_price_repository_publishes_only_after_commit(app, database):
+    """Test that price writes reach subscribers on commit and are dropped on rollback."""
+    game = Game(title='Stream Test', steam_appid='555')
+    database.session.add(game)
+    database.session.commit()
+
+    repository = PriceRepository()
+    start = price_event_bus.last_seq
+
+    repository.save(Price(game_id=game.id, store='steam', regular_price=Decimal('1000')))
+    repository.rollback()
+    assert price_event_bus.last_seq == start
+
+    repository.save(Price(game_id=game.id, store='steam', regular_price=Decimal('800')))
+    repository.commit()
+
+    events = price_event_bus.wait_for({game.id}, after_seq=start, timeout=0)
+    assert [(event['store'], event['price']) for event in events] == [('steam', 800.0)]
+
+
+def test_price_stream_rejects_missing_game_ids(client):
+    """Test that the stream endpoint requires at least one game ID."""
+    response = client.get('/api/prices/stream')
+
+    assert response.status_code == 400
@@ -0,0 +1,156 @@
+"""
+Price change outbox tests
+"""
+
+import threading
+from decimal import Decimal
+
+from models import Favorite, Game, Notification, Price, PriceOutboxEvent, User
+from models.price_outbox import OUTBOX_CONSUMERS
+from repositories.price_repository import PriceRepository
+from services.price_outbox import claim_events, drain_outbox, process_outbox, purge_processed_events
+
+
+def _pending(consumer):
+    return PriceOutboxEvent.query.filter_by(consumer=consumer, processed_at=None, failed_at=None).all()
+
+
+def test_price_writes_enqueue_events_in_the_same_transaction(app, database):
+    """Test that committed price changes fan out to every consumer, rolled back ones leave nothing, and duplicates collapse."""
+    game = Game(title='Outbox Game', is_active=True)
+    database.session.add(game)
+    database.session.commit()
+    repository = PriceRepository()
+
+    repository.save(Price(game_id=game.id, store='steam', regular_price=Decimal('3000')))
+    repository.rollback()
+    assert PriceOutboxEvent.query.count() == 0
+
+    price = repository.save(Price(game_id=game.id, store='steam', regular_price=Decimal('3000')))
+    repository.commit()
+    price.update_price(Decimal('3000'), Decimal('1500'), 50, True)
+    repository.save(price)
+    repository.commit()
+    # Same transition again while the first one is still pending
+    price.update_price(Decimal('3000'), None, 0, False)
+    repository.save(price)
+    price.update_price(Decimal('3000'), Decimal('1500'), 50, True)
+    repository.save(price)
+    repository.commit()
+
+    for consumer in OUTBOX_CONSUMERS:
+        payloads = [event.get_payload() for event in _pending(consumer)]
+        assert [(p['previous_price'], p['price']) for p in payloads] == [(None, 3000.0), (3000.0, 1500.0), (1500.0, 3000.0)]
+
+
+def test_concurrent_workers_process_each_event_exactly_once(app, database):
+    """Test that parallel workers split the pending events without overlap and the notifier alerts once."""
+    user = User(discord_id='1', username='watcher')
+    games = [Game(title=f'Game {i}', is_active=True) for i in range(40)]
+    database.session.add_all([user, *games])
+    database.session.flush()
+    database.session.add(Favorite(user_id=user.id, game_id=games[0].id, price_threshold=Decimal('2000')))
+    database.session.add_all(Price(game_id=game.id, store='steam', regular_price=Decimal('5000')) for game in games)
+    database.session.commit()
+    Price.query.filter_by(game_id=games[0].id).one().update_price(Decimal('5000'), Decimal('1800'), 64, True)
+    database.session.commit()
+
+    seen = []
+    lock = threading.Lock()
+
+    def record(connection, events):
+        with lock:
+            seen.extend(event['id'] for event in events)
+
+    def worker():
+        with app.app_context():
+            while process_outbox('stats', batch_size=3, handler=record)['claimed']:
+                pass
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(seen) == len(set(seen)) == 41
+    assert not _pending('stats')
+
+    assert drain_outbox('notifier')['processed'] == 41
+    assert drain_outbox('notifier')['claimed'] == 0
+    alerts = Notification.query.filter_by(user_id=user.id, notification_type='threshold_met').all()
+    assert len(alerts) == 1 and alerts[0].game_id == games[0].id
+
+
+def test_expired_lease_rolls_back_the_slow_worker(app, database):
+    """Test that a worker whose lease was taken over commits nothing, so the event is applied only once."""
+    game = Game(title='Slow', is_active=True)
+    database.session.add(game)
+    database.session.flush()
+    database.session.add(Price(game_id=game.id, store='steam', regular_price=Decimal('1000')))
+    database.session.commit()
+
+    def slow_handler(connection, events):
+        # Another worker takes the event over while this one is still working
+        token, taken = claim_events('stats', limit=10, lease_seconds=60)
+        assert [event['id'] for event in taken] == [event['id'] for event in events]
+        connection.execute(Game.__table__.update().values(description='written by slow worker'))
+
+    app.config['PRICE_OUTBOX_LEASE_SECONDS'] = 0
+    stats = process_outbox('stats', handler=slow_handler)
+
+    assert stats['lost'] == 1 and stats['processed'] == 0
+    database.session.expire_all()
+    assert database.session.get(Game, game.id).description is None
+    assert len(_pending('stats')) == 1
+
+
+def test_exhausted_events_become_dead_letters(app, database):
+    """Test that an event failing PRICE_OUTBOX_MAX_ATTEMPTS times is dead-lettered and no longer blocks new events."""
+    game = Game(title='Poison', is_active=True)
+    database.session.add(game)
+    database.session.flush()
+    price = Price(game_id=game.id, store='steam', regular_price=Decimal('1000'))
+    database.session.add(price)
+    database.session.commit()
+
+    def failing(connection, events):
+        raise RuntimeError('handler bug')
+
+    app.config.update(PRICE_OUTBOX_MAX_ATTEMPTS=2, PRICE_OUTBOX_LEASE_SECONDS=0)
+    assert process_outbox('stats', handler=failing)['failed'] == 1
+    assert process_outbox('stats', handler=failing)['failed'] == 1
+    stats = process_outbox('stats', handler=failing)
+    assert stats['dead'] == 1 and stats['claimed'] == 0
+    dead = PriceOutboxEvent.query.filter(PriceOutboxEvent.failed_at.isnot(None)).one()
+    assert dead.consumer == 'stats' and dead.last_error == 'handler bug'
+
+    # The same event can be recorded again once the old one is dead-lettered
+    database.session.delete(price)
+    database.session.commit()
+    database.session.add(Price(game_id=game.id, store='steam', regular_price=Decimal('1000')))
+    database.session.commit()
+    assert [event.dedup_key for event in _pending('stats')] == [dead.dedup_key]
+    assert purge_processed_events(retention_hours=0) == 1
+
+
+def test_cache_consumer_bumps_search_price_version_and_warns_on_local_cache(app, database, caplog):
+    """Test that the cache consumer invalidates price-dependent search entries and flags a process-local cache."""
+    from extensions import cache
+    from repositories.search_cache import _PRICE_VERSION_KEY
+
+    cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
+    cache.clear()
+    app.config['CACHE_TYPE'] = 'SimpleCache'
+    game = Game(title='Outbox Cache Game', is_active=True)
+    database.session.add(game)
+    database.session.commit()
+    repository = PriceRepository()
+    repository.save(Price(game_id=game.id, store='steam', regular_price=Decimal('3000')))
+    repository.commit()
+    before = cache.get(_PRICE_VERSION_KEY) or 0
+
+    with caplog.at_level('WARNING', logger='services.price_outbox'):
+        assert drain_outbox('cache')['processed'] == 1
+    assert cache.get(_PRICE_VERSION_KEY) == before + 1
+    assert 'プロセス内キャッシュ' in caplog.text
@@ -0,0 +1,77 @@
+"""
+Price history and per-game price statistics tests
+"""
+
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pandas as pd
+import pytest
+
+from models import Game, Price, PriceHistory, GamePriceStats
+from services.price_stats import compute_price_stats, compute_stats_frame
+
+
+def test_price_changes_are_recorded_in_history(app, database, client):
+    """Test that inserting a price and changing its amount or sale state appends history rows served by the detail API."""
+    game = Game(title='Portal')
+    database.session.add(game)
+    database.session.flush()
+    price = Price(game_id=game.id, store='steam', regular_price=Decimal('1000'))
+    database.session.add(price)
+    database.session.commit()
+
+    price.currency = 'USD'
+    database.session.commit()
+    assert PriceHistory.query.count() == 1
+
+    price.update_price(Decimal('1000'), Decimal('250'), discount_rate=75, is_on_sale=True)
+    database.session.commit()
+    history = PriceHistory.query.order_by(PriceHistory.id).all()
+    assert [(row.sale_price, row.is_on_sale) for row in history] == [(None, False), (Decimal('250'), True)]
+
+    served = client.get(f'/api/games/{game.id}').get_json()['price_history']
+    assert [(item['store'], item['price'], item['is_on_sale']) for item in served] == [
+        ('steam', 1000.0, False), ('steam', 250.0, True)
+    ]
+
+
+def test_compute_price_stats_from_history(app, database, client):
+    """Test that stats are time-weighted per store and written to game_price_stats."""
+    game = Game(title='Half-Life')
+    database.session.add(game)
+    database.session.flush()
+    rows = [
+        ('steam', '1000', None, 0, False, datetime(2026, 1, 1, tzinfo=timezone.utc)),
+        ('steam', '1000', '500', 50, True, datetime(2026, 1, 11, tzinfo=timezone.utc)),
+        ('steam', '1000', None, 0, False, datetime(2026, 1, 21, tzinfo=timezone.utc)),
+        ('epic', '900', '450', 50, True, datetime(2026, 1, 21, tzinfo=timezone.utc)),
+    ]
+    for store, regular, sale, discount, on_sale, recorded_at in rows:
+        database.session.add(PriceHistory(
+            game_id=game.id, store=store, regular_price=Decimal(regular),
+            sale_price=Decimal(sale) if sale else None, discount_rate=discount,
+            is_on_sale=on_sale, recorded_at=recorded_at,
+        ))
+    database.session.commit()
+
+    history = pd.DataFrame(
+        [(game.id, *row) for row in rows],
+        columns=['game_id', 'store', 'regular_price', 'sale_price', 'discount_rate', 'is_on_sale', 'recorded_at'],
+    )
+    now = datetime(2026, 1, 31, tzinfo=timezone.utc)
+    stats = compute_stats_frame(history, now).set_index('store')
+    steam = stats.loc['steam']
+    assert steam['lowest_price'] == 500 and steam['lowest_price_at'] == pd.Timestamp('2026-01-11', tz='UTC')
+    assert steam['mean_discount'] == pytest.approx(50 / 3)
+    assert (steam['max_discount'], steam['sale_count']) == (50, 1)
+    assert steam['last_on_sale_at'] == pd.Timestamp('2026-01-21', tz='UTC')
+    assert steam['sales_per_year'] == pytest.approx(365.25 / 30)
+    assert stats.loc['epic', 'last_on_sale_at'] == pd.Timestamp(now)
+
+    assert compute_price_stats(batch_size=1) == 2
+    assert GamePriceStats.query.count() == 2
+    detail = client.get(f'/api/games/{game.id}').get_json()
+    assert [stat['store'] for stat in detail['price_stats']] == ['epic', 'steam']
+    assert detail['price_stats'][0]['days_since_last_sale'] == 0
+    assert detail['price_stats'][1]['lowest_price'] == 500.0
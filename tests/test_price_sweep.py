@@ -0,0 +1,148 @@
+"""
+Sharded price sweep tests
+"""
+
+import threading
+from unittest.mock import patch
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from models import DealRanking, Game, Price, PriceSweepShard
+from services.catalog_snapshot import get_catalog_snapshot_manager
+from services.price_sweep import (
+    LeaseLostError, acquire_shard, appid_hash, ensure_shards, renew_lease, run_price_sweep, sweep_shard,
+)
+
+
+def _add_games(database, count):
+    games = [Game(title=f'Game {i}', steam_appid=str(10 * (i + 1)), is_active=True) for i in range(count)]
+    database.session.add_all(games)
+    database.session.commit()
+    return games
+
+
+def _price_of(appid):
+    return {'price': 1000 + int(appid), 'original_price': 1000 + int(appid), 'discount_percent': 0}
+
+
+def test_parallel_workers_cover_every_game_once(app, database):
+    """Test that concurrent workers split the shards so each appid is fetched exactly once."""
+    app.config.update(PRICE_SWEEP_SHARDS=8, PRICE_SWEEP_BATCH_SIZE=4)
+    games = _add_games(database, 60)
+    fetched = []
+    lock = threading.Lock()
+
+    def fetch(appid):
+        with lock:
+            fetched.append(appid)
+        return _price_of(appid)
+
+    def worker(name):
+        with app.app_context():
+            run_price_sweep(worker_id=name, fetch_price=fetch)
+
+    threads = [threading.Thread(target=worker, args=(f'worker-{i}',)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(fetched, key=int) == [game.steam_appid for game in games]
+    assert Price.query.filter_by(store='steam').count() == 60
+    shards = PriceSweepShard.query.order_by(PriceSweepShard.shard).all()
+    assert all(shard.last_swept_at and shard.lease_token is None and shard.cursor_game_id == 0 for shard in shards)
+    assert sum(shard.games_swept for shard in shards) == 60
+    # Each game belongs to the shard whose hash range contains its appid hash
+    assert all(any(s.hash_start <= appid_hash(g.steam_appid) < s.hash_end for s in shards) for g in games)
+
+    # Nothing is due again until PRICE_UPDATE_INTERVAL passes
+    assert run_price_sweep(worker_id='late', fetch_price=fetch)['games'] == 0
+    assert len(fetched) == 60
+
+
+def test_expired_lease_is_resumed_from_the_cursor(app, database):
+    """Test that a worker that dies mid-shard loses its lease and a successor skips the games already swept."""
+    app.config.update(PRICE_SWEEP_SHARDS=1, PRICE_SWEEP_BATCH_SIZE=2)
+    games = _add_games(database, 5)
+    ensure_shards(1)
+    lease = acquire_shard('crashing', lease_seconds=60, interval_seconds=3600)
+    assert acquire_shard('other', lease_seconds=60, interval_seconds=3600) is None
+
+    calls = []
+
+    def crash_on_third(appid):
+        calls.append(appid)
+        if len(calls) == 3:
+            raise RuntimeError('worker killed')
+        return _price_of(appid)
+
+    with pytest.raises(RuntimeError):
+        sweep_shard(lease, crash_on_third, batch_size=2, lease_seconds=60)
+
+    # The lease runs out without being released
+    PriceSweepShard.query.update({'leased_until': datetime.now(timezone.utc) - timedelta(seconds=1)})
+    database.session.commit()
+
+    resumed = []
+    stats = run_price_sweep(worker_id='successor', fetch_price=lambda appid: resumed.append(appid) or _price_of(appid))
+
+    assert stats['shards'] == 1
+    assert resumed == [game.steam_appid for game in games[2:]]
+    assert Price.query.count() == 5
+    with pytest.raises(LeaseLostError):
+        renew_lease(database.session.connection(), lease, 60)
+
+
+def test_sweep_with_price_changes_rebuilds_deal_rankings(app, database):
+    """Test that a sweep pass that changed prices rewrites the deal rankings."""
+    app.config.update(PRICE_SWEEP_SHARDS=2)
+    games = _add_games(database, 3)
+
+    def discounted(appid):
+        return {'price': 500, 'original_price': 2000, 'discount_percent': 75}
+
+    stats = run_price_sweep(worker_id='worker', fetch_price=discounted)
+    assert stats['updated'] == 3
+    ranked = DealRanking.query.filter_by(scope='all').all()
+    assert {ranking.game_id for ranking in ranked} == {game.id for game in games}
+
+
+def test_unchanged_prices_only_touch_the_checked_time(app, database):
+    """Test that re-sweeping unchanged prices bumps updated_at without reporting a catalog price change."""
+    app.config.update(PRICE_SWEEP_SHARDS=1, PRICE_UPDATE_INTERVAL=0)
+    _add_games(database, 3)
+    run_price_sweep(worker_id='first', max_shards=1, fetch_price=_price_of)
+    checked = {price.id: price.updated_at for price in Price.query.all()}
+
+    recorded = []
+    manager = get_catalog_snapshot_manager()
+    with patch.object(manager, 'record_changes', side_effect=lambda *args: recorded.append(args)):
+        stats = run_price_sweep(worker_id='second', max_shards=1, fetch_price=_price_of)
+
+    assert stats['games'] == 3 and stats['updated'] == 0
+    assert recorded == []
+    database.session.expire_all()
+    assert all(price.updated_at > checked[price.id] for price in Price.query.all())
+
+
+def test_non_numeric_appids_are_skipped(app, database):
+    """Test that appids that cannot be cast to an integer do not break the sweep."""
+    app.config.update(PRICE_SWEEP_SHARDS=2)
+    games = _add_games(database, 3)
+    database.session.add_all([
+        Game(title='Bad appid', steam_appid='abc', is_active=True),
+        Game(title='Empty appid', steam_appid='', is_active=True),
+        Game(title='Huge appid', steam_appid='9' * 20, is_active=True),
+    ])
+    database.session.commit()
+    fetched = []
+
+    def fetch(appid):
+        fetched.append(appid)
+        return _price_of(appid)
+
+    stats = run_price_sweep(worker_id='worker', fetch_price=fetch)
+
+    assert stats['games'] == 3
+    assert sorted(fetched, key=int) == [game.steam_appid for game in games]
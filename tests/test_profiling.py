@@ -0,0 +1,54 @@
+"""
+Profiling tests
+"""
+
+import os
+import pstats
+
+from models import Game
+
+
+def test_every_cli_command_can_write_a_profile(app, database, runner, tmp_path):
+    """Test that each registered command has --profile and writes pstats, collapsed stacks and a summary."""
+    app.config['PROFILE_OUTPUT_DIR'] = str(tmp_path)
+    assert all(any(p.name == 'profile' for p in command.params) for command in app.cli.commands.values())
+
+    database.session.add(Game(title='Profiled Game', steam_appid='10', is_active=True))
+    database.session.commit()
+
+    result = runner.invoke(args=['compute-price-stats', '--profile'])
+    assert result.exit_code == 0, result.output
+
+    files = sorted(os.listdir(tmp_path))
+    assert [os.path.splitext(name)[1] for name in files] == ['.collapsed', '.pstats', '.txt']
+    assert all(name.startswith('compute-price-stats-') for name in files)
+
+    stats = pstats.Stats(str(tmp_path / files[1]))
+    assert any(func[2] == 'compute_price_stats' for func in stats.stats)
+    with open(tmp_path / files[0], encoding='utf-8') as f:
+        for line in f:
+            stack, count = line.rsplit(' ', 1)
+            assert stack and int(count) > 0
+    with open(tmp_path / files[2], encoding='utf-8') as f:
+        summary = f.read()
+    assert '== SQL' in summary and 'FROM price_history' in summary and '== cProfile' in summary
+
+
+def test_requests_are_profiled_only_with_the_token_or_sampling(app, database, client, tmp_path):
+    """Test that a request is profiled when it sends the configured token or is sampled."""
+    app.config.update(PROFILE_OUTPUT_DIR=str(tmp_path), PROFILE_REQUEST_TOKEN='secret')
+
+    assert 'X-Profile-Report' not in client.get('/api/deals', headers={'X-Profile': 'wrong'}).headers
+    response = client.get('/api/deals', headers={'X-Profile': 'シークレット'})
+    assert response.status_code == 200 and 'X-Profile-Report' not in response.headers
+    assert os.listdir(tmp_path) == []
+
+    response = client.get('/api/deals', headers={'X-Profile': 'secret'})
+    name = response.headers['X-Profile-Report']
+    assert sorted(os.listdir(tmp_path)) == [f'{name}.collapsed', f'{name}.pstats', f'{name}.txt']
+
+    # Sampled requests only take stack samples, and do not reveal the report name
+    app.config.update(PROFILE_REQUEST_TOKEN=None, PROFILE_REQUEST_SAMPLE_RATE=1.0)
+    assert 'X-Profile-Report' not in client.get('/api/deals').headers
+    assert len([f for f in os.listdir(tmp_path) if f.endswith('.pstats')]) == 1
+    assert len(os.listdir(tmp_path)) == 5
@@ -0,0 +1,78 @@
+"""
+Search result cache tests
+"""
+
+from decimal import Decimal
+
+from extensions import cache
+
+from models import Game, Price
+from repositories.game_repository import GameRepository
+from repositories.price_repository import PriceRepository
+from services.game_search_service import GameSearchService
+
+
+def _enable_cache(app):
+    cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
+    cache.clear()
+
+
+def test_search_cache_hit_and_invalidation(app, database):
+    """Test that cached IDs are reused and dropped when a matching game is saved."""
+    _enable_cache(app)
+    repository = GameRepository()
+    repository.save(Game(title='Elden Ring', normalized_title='elden ring', is_active=True))
+    repository.save(Game(title='Stardew Valley', normalized_title='stardew valley', is_active=True))
+    repository.commit()
+
+    service = GameSearchService(game_repository=repository)
+    games, total = service._search_db('elden', None, 1, 20)
+    assert [g.title for g in games] == ['Elden Ring']
+
+    # A direct insert bypassing the repository is not visible while cached
+    database.session.add(Game(title='Elden Ring Nightreign', is_active=True))
+    database.session.commit()
+    games, total = service._search_db('  ELDEN ', None, 1, 20)
+    assert total == 1
+
+    # Saving through the repository invalidates matching terms only
+    repository.save(Game(title='Elden Ring DLC', normalized_title='elden ring dlc', is_active=True))
+    repository.commit()
+    games, total = service._search_db('elden', None, 1, 20)
+    assert total == 3
+
+
+def test_get_by_ids_preserves_order(app, database):
+    """Test that hydration keeps the cached ordering."""
+    repository = GameRepository()
+    first = repository.save(Game(title='A', is_active=True))
+    second = repository.save(Game(title='B', is_active=True))
+    repository.commit()
+
+    games = repository.get_by_ids([second.id, 999, first.id])
+    assert [g.id for g in games] == [second.id, first.id]
+
+
+def test_price_changes_invalidate_price_dependent_entries(app, database):
+    """Test that a price commit drops price-filtered and price-sorted results but keeps the others."""
+    _enable_cache(app)
+    repository = GameRepository()
+    game = repository.save(Game(title='Hades', normalized_title='hades', is_active=True))
+    repository.commit()
+    price_repository = PriceRepository()
+    price = price_repository.save(Price(game_id=game.id, store='steam', regular_price=Decimal('3000')))
+    price_repository.commit()
+
+    service = GameSearchService(game_repository=repository)
+    assert service._search_db('hades', {'max_price': '2000'}, 1, 20)[1] == 0
+    assert service._search_db('hades', None, 1, 20)[1] == 1
+
+    price.update_price(Decimal('3000'), Decimal('1500'), 50, True)
+    price_repository.save(price)
+    price_repository.commit()
+    assert service._search_db('hades', {'max_price': '2000'}, 1, 20)[1] == 1
+
+    # Entries that do not depend on prices stay cached
+    database.session.add(Game(title='Hades II', is_active=True))
+    database.session.commit()
+    assert service._search_db('hades', None, 1, 20)[1] == 1
@@ -0,0 +1,61 @@
+"""
+Genre/platform bitmask filters and facet count tests
+"""
+
+from decimal import Decimal
+
+from models import Game, Price
+from models.taxonomy import genre_mask, platform_mask
+from repositories.game_repository import GameRepository
+
+
+def _add_game(database, title, genres, platforms, price=None):
+    game = Game(title=title, genres=genres, platforms=platforms, is_active=True)
+    database.session.add(game)
+    database.session.flush()
+    if price is not None:
+        database.session.add(Price(game_id=game.id, store='steam', regular_price=Decimal(price)))
+    return game
+
+
+def test_masks_accept_steam_names_and_json():
+    """Test that Japanese/English genre names and JSON text map to the same bits."""
+    assert genre_mask('アクション,RPG') == genre_mask('["Action", "rpg"]')
+    assert genre_mask('Unknown Genre') == 0
+    assert platform_mask('windows,mac') == platform_mask(['Windows', 'macOS'])
+
+
+def test_filters_use_exact_genre_and_platform(app, database):
+    """Test that genre/platform filters match whole values, not substrings."""
+    _add_game(database, 'Alpha', 'アクション', 'windows')
+    _add_game(database, 'Beta', 'アクションRPG風', 'windows,linux')
+    _add_game(database, 'Gamma', 'RPG', 'mac')
+    database.session.commit()
+    repository = GameRepository()
+
+    games, total = repository.search_games(filters={'genre': 'action'})
+    assert [game.title for game in games] == ['Alpha']
+
+    games, total = repository.search_games(filters={'platform': 'linux'})
+    assert [game.title for game in games] == ['Beta']
+
+    assert repository.search_games(filters={'genre': 'no-such-genre'})[1] == 0
+
+
+def test_search_facets_count_current_result_set(app, database):
+    """Test that facet counts cover genre, platform and price band in one pass."""
+    _add_game(database, 'Free Shooter', 'アクション,無料プレイ', 'windows', price='0')
+    _add_game(database, 'Cheap Puzzle', 'パズル', 'windows,mac', price='500')
+    _add_game(database, 'Big RPG', 'RPG,アクション', 'windows', price='7800')
+    _add_game(database, 'Unpriced', 'アクション', 'linux')
+    database.session.commit()
+
+    facets = GameRepository().get_search_facets(filters={'genre': 'action'})
+
+    assert facets['genre']['action'] == 3
+    assert facets['genre']['rpg'] == 1
+    assert facets['genre']['puzzle'] == 0
+    assert facets['platform'] == {'windows': 2, 'mac': 0, 'linux': 1, 'steam_deck': 0}
+    assert facets['price_band']['free'] == 1
+    assert facets['price_band']['over_5000'] == 1
+    assert facets['price_band']['under_1000'] == 0
@@ -0,0 +1,22 @@
+"""
+Application startup tests
+"""
+
+from profiling import LAZY_IMPORTS, measure_import_time
+
+
+def test_importing_the_app_defers_rarely_used_subsystems():
+    """Test that a worker boot (import app) loads neither pandas, alembic nor the Steam client and CLI-only services."""
+    total, modules = measure_import_time('app', runs=1)
+
+    assert total > 0 and 'cli_commands' in modules
+    assert [name for name in LAZY_IMPORTS if name in modules] == []
+
+
+def test_check_startup_fails_when_over_budget(runner):
+    """Test that check-startup exits non-zero when the import time exceeds the budget."""
+    assert runner.invoke(args=['check-startup', '--runs', '1', '--budget', '1']).exit_code == 1
+
+    result = runner.invoke(args=['check-startup', '--runs', '1', '--budget', '100000'])
+    assert result.exit_code == 0, result.output
+    assert '予算 100000ms' in result.output
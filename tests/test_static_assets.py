@@ -0,0 +1,60 @@
+"""
+Fingerprinted, precompressed static asset tests
+"""
+
+import gzip
+import shutil
+
+from flask import url_for
+
+from static_assets import build_assets, init_static_assets
+
+
+def test_build_and_serve_precompressed_assets(app, tmp_path):
+    """Test that built assets are linked by url_for and served precompressed with immutable caching."""
+    static_folder = tmp_path / 'static'
+    shutil.copytree(app.static_folder, static_folder)
+    manifest = build_assets(str(static_folder))
+
+    target = manifest['css/style.css']
+    assert target.startswith('dist/css/style.') and target.endswith('.css')
+    original = (static_folder / 'css' / 'style.css').read_bytes()
+    assert gzip.decompress((static_folder / (target + '.gz')).read_bytes()) == original
+    # 再ビルドしても同じ名前・内容になる
+    assert build_assets(str(static_folder)) == manifest
+
+    app.static_folder = str(static_folder)
+    init_static_assets(app)
+
+    with app.test_request_context():
+        assert url_for('static', filename='css/style.css') == f'/static/{target}'
+
+    client = app.test_client()
+    response = client.get(f'/static/{target}', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert response.mimetype == 'text/css'
+    assert 'immutable' in response.headers['Cache-Control']
+    assert gzip.decompress(response.data) == original
+
+    response = client.get(f'/static/{target}', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.data == original
+
+    # ハッシュなしのパスは通常どおり配信
+    response = client.get('/static/css/style.css')
+    assert response.status_code == 200
+    assert 'immutable' not in response.headers.get('Cache-Control', '')
+
+
+def test_build_assets_command_fails_with_nonzero_exit(app, runner, monkeypatch):
+    """Test that a failed build is reported with a non-zero exit code for CI and deploy scripts."""
+    def broken_build(static_folder):
+        raise OSError('disk full')
+
+    monkeypatch.setattr('static_assets.build_assets', broken_build)
+    result = runner.invoke(args=['build-assets'])
+
+    assert result.exit_code == 1
+    assert 'disk full' in result.output
@@ -0,0 +1,85 @@
+"""
+Steam search fallback tests (negative cache and single flight)
+"""
+
+import threading
+import time
+
+from extensions import cache
+from services.background import shutdown_background_tasks
+from services.game_search_service import GameSearchService
+from services.single_flight import SingleFlight
+
+
+class FakeSteamService:
+    """Steam service stub that counts search calls."""
+
+    def __init__(self, results=None):
+        self.results = results or []
+        self.calls = 0
+
+    def search_games(self, query, limit=20):
+        self.calls += 1
+        return list(self.results)
+
+    def is_available(self):
+        return True
+
+
+def test_single_flight_merges_concurrent_calls():
+    """Test that concurrent calls with the same key run the function once."""
+    flight = SingleFlight()
+    calls = []
+    results = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return 42
+
+    threads = [threading.Thread(target=lambda: results.append(flight.do('key', slow))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert all(result == 42 for result, _ in results)
+
+
+def test_empty_fallback_is_negatively_cached(app, database):
+    """Test that a fallback finding nothing is not repeated for the same query."""
+    cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
+    cache.clear()
+    steam = FakeSteamService()
+    service = GameSearchService(steam_service=steam)
+
+    with app.test_request_context():
+        service.search_games(query='Brand New Title')
+        service.search_games(query='brand new   title')
+        service.search_games(query='Brand New Title', page=2)
+
+    assert steam.calls == 1
+
+
+def test_deferred_enrichment_runs_in_background(app, database):
+    """Test that a deferred search returns DB hits at once and ingests Steam results later."""
+    cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
+    cache.clear()
+    steam = FakeSteamService(results=[{'steam_appid': 987654, 'title': 'Background Quest'}])
+    service = GameSearchService(steam_service=steam)
+
+    with app.test_request_context():
+        result = service.search_games(query='Background Quest', defer_enrichment=True)
+        assert result['enrichment_pending'] is True
+        assert result['games'] == []
+
+        shutdown_background_tasks(wait=True)
+
+        assert service.get_enrichment_status('background quest') == {'status': 'done', 'new_count': 1}
+        result = service.search_games(query='Background Quest', defer_enrichment=True)
+
+    assert result['enrichment_pending'] is False
+    assert [game['title'] for game in result['games']] == ['Background Quest']
+    assert steam.calls == 1
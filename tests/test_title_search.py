@@ -0,0 +1,87 @@
+"""
+CJK-aware title normalization and bigram index tests
+"""
+
+from models import Game, GameTitleBigram
+from repositories.game_repository import GameRepository
+from text_normalizer import normalize_text, title_bigrams
+
+
+def test_normalize_text_folds_width_and_kana():
+    """Test that full/half-width forms and katakana/hiragana normalize identically."""
+    assert normalize_text('ＦＩＮＡＬ　ﾌｧﾝﾀｼﾞｰ・ＸＩＶ') == 'final ふぁんたじー xiv'
+    assert normalize_text('ファンタジー') == normalize_text('ふぁんたじー')
+    assert title_bigrams('ふぁん x') == {'ふぁ', 'ぁん'}
+
+
+def test_title_search_matches_across_forms(app, database):
+    """Test that Japanese substring queries hit the bigram index regardless of form."""
+    repository = GameRepository()
+    repository.save(Game(title='ファイナルファンタジーXIV', is_active=True))
+    repository.save(Game(title='ドラゴンクエストXI', is_active=True))
+    repository.commit()
+
+    for query in ('ファンタジー', 'ふぁんたじー', 'ﾌｧﾝﾀｼﾞｰ', 'ｘｉｖ'):
+        games, total = repository.search_games(query=query)
+        assert [game.title for game in games] == ['ファイナルファンタジーXIV'], query
+
+    # All bigrams present but not contiguous must not match
+    games, total = repository.search_games(query='ジーフ')
+    assert total == 0
+
+
+def test_title_update_reindexes(app, database):
+    """Test that changing a title replaces its index entries."""
+    repository = GameRepository()
+    game = repository.save(Game(title='桃太郎電鉄', is_active=True))
+    repository.commit()
+
+    repository.update(game, title='桃鉄ワールド')
+    repository.commit()
+
+    grams = {row.gram for row in database.session.query(GameTitleBigram).filter_by(game_id=game.id)}
+    assert grams == title_bigrams(normalize_text('桃鉄ワールド'))
+    assert repository.search_games(query='太郎')[1] == 0
+    assert repository.search_games(query='ワールド')[1] == 1
+
+
+def test_rebuild_title_index_command(app, runner, database):
+    """Test that the rebuild command indexes rows written before the index existed."""
+    database.session.add(Game(title='ゼルダの伝説', is_active=True))
+    database.session.commit()
+    database.session.query(GameTitleBigram).delete()
+    database.session.commit()
+    assert GameRepository().search_games(query='ゼルダ')[1] == 0
+
+    result = runner.invoke(args=['rebuild-title-index'])
+
+    assert '1件' in result.output
+    assert GameRepository().search_games(query='ぜるだ')[1] == 1
+
+
+def test_search_unions_title_developer_and_publisher_matches(app, database):
+    """Test that title, developer and publisher matches are combined once per game."""
+    repository = GameRepository()
+    repository.save(Game(title='スクウェアの冒険', developer='Square Enix', is_active=True))
+    repository.save(Game(title='Chrono Trigger', developer='Square', publisher='Square Enix', is_active=True))
+    repository.save(Game(title='Unrelated', developer='Other', is_active=True))
+    repository.commit()
+
+    games, total = repository.search_games(query='square')
+    assert total == 2
+    assert {game.title for game in games} == {'スクウェアの冒険', 'Chrono Trigger'}
+    assert repository.search_games(query='スクウェア')[1] == 1
+
+
+def test_games_api_searches_publisher_too(client, database):
+    """Test that /api/games?q= goes through the same title/developer/publisher search."""
+    repository = GameRepository()
+    repository.save(Game(title='Chrono Trigger', developer='Square', publisher='Enix Corp', is_active=True))
+    repository.save(Game(title='Dragon Quest', developer='Chunsoft', publisher='Enix Corp', is_active=True))
+    repository.save(Game(title='Unrelated', developer='Other', publisher='Other', is_active=True))
+    repository.commit()
+
+    data = client.get('/api/games?q=enix&sort=name_desc').get_json()
+
+    assert data['pagination']['total_count'] == 2
+    assert [game['title'] for game in data['games']] == ['Dragon Quest', 'Chrono Trigger']
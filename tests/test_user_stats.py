@@ -0,0 +1,102 @@
+"""
+User stats rollup tests
+"""
+
+from decimal import Decimal
+
+from flask import g
+
+from models import Game, Price, User, UserStats
+from repositories.price_repository import PriceRepository
+from repositories.user_repository import UserRepository
+from services.price_outbox import drain_outbox
+from services.user_stats import backfill_user_stats
+
+
+def _add_game(database, title, regular):
+    game = Game(title=title, is_active=True, description='desc')
+    database.session.add(game)
+    database.session.flush()
+    database.session.add(Price(game_id=game.id, store='steam', regular_price=Decimal(regular), is_on_sale=False))
+    return game
+
+
+def test_price_change_refreshes_stats_of_users_favoriting_the_game(app, database):
+    """Test that the outbox stats consumer updates the rollup of users who favorite the game after a price change."""
+    fan = User(discord_id='1', username='fan')
+    other = User(discord_id='2', username='other')
+    database.session.add_all([fan, other])
+    game = _add_game(database, 'Sale Game', '4000')
+    _add_game(database, 'Unrelated', '1000')
+    database.session.flush()
+
+    user_repository = UserRepository()
+    user_repository.add_favorite(fan.id, game.id)
+    user_repository.commit()
+    stats = database.session.get(UserStats, fan.id)
+    assert stats.favorites_count == 1 and stats.deals_found == 0 and stats.last_activity_at is not None
+
+    price_repository = PriceRepository()
+    price = Price.query.filter_by(game_id=game.id).one()
+    price.update_price(Decimal('4000'), Decimal('1000'), 75, True)
+    price_repository.save(price)
+    price_repository.commit()
+    database.session.expire_all()
+    assert user_repository.get_user_stats(fan.id).deals_found == 0
+
+    drain_outbox('stats')
+    database.session.expire_all()
+    stats = user_repository.get_user_stats(fan.id)
+    assert stats.total_savings == Decimal('3000') and stats.deals_found == 1
+    assert database.session.get(UserStats, other.id) is None
+
+
+def test_backfill_rebuilds_all_users(app, database, runner):
+    """Test that the backfill command writes one row per user, including users without favorites."""
+    fan = User(discord_id='1', username='fan')
+    idle = User(discord_id='2', username='idle')
+    database.session.add_all([fan, idle])
+    game = _add_game(database, 'Discounted', '2000')
+    database.session.flush()
+    Price.query.filter_by(game_id=game.id).one().update_price(Decimal('2000'), Decimal('500'), 75, True)
+    UserRepository().add_favorite(fan.id, game.id)
+    database.session.commit()
+    UserStats.query.delete()
+    database.session.commit()
+
+    assert backfill_user_stats(batch_size=1) == 2
+    rows = {row.user_id: row for row in UserStats.query.all()}
+    assert rows[fan.id].total_savings == Decimal('1500') and rows[fan.id].favorites_count == 1
+    assert rows[idle.id].deals_found == 0 and rows[idle.id].last_activity_at is None
+
+    result = runner.invoke(args=['backfill-user-stats'])
+    assert 'ユーザー統計の再作成が完了しました: 2件' in result.output
+
+
+def test_favorites_and_alerts_api_refresh_stats(app, database, client):
+    """Test that favorites and price alerts written through the API update the rollup in the same commit."""
+    user = User(discord_id='1', username='player')
+    database.session.add(user)
+    game = _add_game(database, 'Wishlisted', '3000')
+    other = _add_game(database, 'Alerted', '2000')
+    database.session.commit()
+    user_id, game_id, other_id = user.id, game.id, other.id
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+    g.pop('_login_user', None)
+    assert client.post('/api/favorites', json={'game_id': game_id}).status_code == 200
+    database.session.expire_all()
+    assert database.session.get(UserStats, user_id).favorites_count == 1
+
+    g.pop('_login_user', None)
+    assert client.post('/api/price-alerts', json={'game_id': other_id, 'threshold_price': 1000}).status_code == 200
+    database.session.expire_all()
+    assert database.session.get(UserStats, user_id).favorites_count == 2
+
+    g.pop('_login_user', None)
+    assert client.delete('/api/favorites', json={'game_id': game_id}).status_code == 200
+    database.session.expire_all()
+    stats = database.session.get(UserStats, user_id)
+    assert stats.favorites_count == 1 and stats.last_activity_at is not None
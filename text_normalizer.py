@@ -0,0 +1,74 @@
+"""
+Text Normalizer
+
+日本語を含むゲームタイトルの検索用正規化
+NFKC正規化（全角・半角の統一）、小文字化、カタカナのひらがなへの畳み込みを行い、
+タイトルの文字バイグラム索引と検索クエリで同じ表記に揃えます。
+"""
+
+import re
+import unicodedata
+from typing import Optional, Set
+
+# カタカナ（ァ〜ヶ）とひらがな（ぁ〜ゖ）のコードポイント差
+_KANA_OFFSET = 0x60
+_KATAKANA_START = 0x30A1
+_KATAKANA_END = 0x30F6
+
+# 英数字・かな・漢字・長音記号以外（記号・句読点・アンダースコア）
+_PUNCTUATION = re.compile(r'[^\w\s]|_')
+
+
+def fold_text(text: Optional[str]) -> str:
+    """
+    表記ゆれを畳み込む（記号は残す）
+
+    NFKCで全角英数・半角カナを統一し、小文字化し、カタカナをひらがなに変換します。
+
+    Args:
+        text: 元のテキスト
+
+    Returns:
+        str: 畳み込んだテキスト
+    """
+    if not text:
+        return ''
+    folded = unicodedata.normalize('NFKC', text).lower()
+    return ''.join(
+        chr(ord(ch) - _KANA_OFFSET) if _KATAKANA_START <= ord(ch) <= _KATAKANA_END else ch
+        for ch in folded
+    )
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """
+    検索用にテキストを正規化
+
+    Args:
+        text: 元のテキスト
+
+    Returns:
+        str: 表記ゆれを畳み込み、記号を除去し、空白を1つにまとめたテキスト
+    """
+    normalized = _PUNCTUATION.sub(' ', fold_text(text))
+    return ' '.join(normalized.split())
+
+
+def title_bigrams(normalized: str) -> Set[str]:
+    """
+    正規化済みテキストの文字バイグラムを取得
+
+    空白で区切られた語ごとに作成し、語をまたぐバイグラムは作りません。
+    1文字の語はバイグラムを持ちません。
+
+    Args:
+        normalized: normalize_text で正規化したテキスト
+
+    Returns:
+        Set[str]: 文字バイグラムの集合
+    """
+    grams: Set[str] = set()
+    for token in normalized.split():
+        grams.update(token[i:i + 2] for i in range(len(token) - 1))
+    return grams
+
@@ -5,15 +5,27 @@ APIエンドポイント
 ゲーム情報、価格データ、お気に入り管理などのAPIを提供します。
 """
 
-from flask import Blueprint, jsonify, request, current_app
+from flask import Blueprint, Response, jsonify, request, current_app, stream_with_context
 from flask_login import login_required, current_user
 from datetime import datetime, timezone
 from typing import Dict, List, Any, Optional
+import hmac
 import json
+import time
 from sqlalchemy import desc, asc, func
 from sqlalchemy.orm import joinedload
 
 from models import db, Game, User, Favorite, Price, Notification
+from models.deal_ranking import OVERALL_SCOPE
+from models.taxonomy import GENRES
+from services.game_search_service import GameSearchService, ENRICHMENT_DONE
+from services.catalog_export import iter_catalog_records, iter_gzip, iter_ndjson, parse_updated_since
+from services.catalog_snapshot import get_catalog_snapshot
+from services.price_events import price_event_bus, price_event_relay
+from repositories.game_repository import GameRepository
+from repositories.price_repository import PriceRepository
+from repositories.user_repository import UserRepository, price_change_percent
+from web.fragments import render_game_cards
 
 # ブループリントの作成
 api_bp = Blueprint('api', __name__)
@@ -56,30 +68,21 @@ def games():
     sort = request.args.get('sort', 'name_asc')
     
     try:
-        # ベースクエリの作成
-        base_query = db.session.query(Game)
-        
-        # 検索フィルタリング
-        if query:
-            base_query = base_query.filter(
-                (Game.title.ilike(f'%{query}%')) |
-                (Game.developer.ilike(f'%{query}%')) |
-                (Game.normalized_title.ilike(f'%{query}%'))
+        # 検索語なしの一覧はカタログスナップショットで絞り込み・ソートし、表示ページのみDBから読み込む
+        snapshot = None if query else get_catalog_snapshot()
+        if snapshot is not None:
+            page_ids, total_count = snapshot.select(
+                sort=sort if sort in ('price_asc', 'price_desc', 'name_desc') else 'name_asc',
+                page=page,
+                per_page=limit
+            )
+            page_games = GameRepository().get_by_ids(page_ids)
+        else:
+            # 検索（タイトル・開発者・パブリッシャー）とソートは検索画面と同じリポジトリのクエリで行う
+            repository_sort = {'price_asc': 'price_asc', 'price_desc': 'price_desc', 'name_desc': 'title_desc'}.get(sort, 'title')
+            page_games, total_count = GameRepository().search_games(
+                query or None, {'sort': repository_sort}, page=page, per_page=limit
             )
-        
-        # ソート処理
-        if sort == 'price_asc':
-            base_query = base_query.order_by(asc(Game.current_price))
-        elif sort == 'price_desc':
-            base_query = base_query.order_by(desc(Game.current_price))
-        elif sort == 'name_desc':
-            base_query = base_query.order_by(desc(Game.title))
-        else:  # name_asc (default)
-            base_query = base_query.order_by(asc(Game.title))
-        
-        # ページネーション
-        total_count = base_query.count()
-        page_games = base_query.offset((page - 1) * limit).limit(limit).all()
         
         # レスポンス用にデータを変換
         games_data = []
@@ -195,8 +198,9 @@ def game_detail(game_id: int):
                 lowest_price = current_price
                 lowest_store = store
         
-        # TODO: 価格履歴の取得（実装時に追加）
-        price_history = []
+        price_repository = PriceRepository()
+        price_history = price_repository.get_price_history(game_id)
+        price_stats = price_repository.get_price_stats(game_id)
         
         release_date = getattr(game, 'release_date', None)
         steam_rating = getattr(game, 'steam_rating', None)
@@ -217,7 +221,8 @@ def game_detail(game_id: int):
             'prices': prices,
             'lowest_price': float(lowest_price) if lowest_price else None,
             'lowest_store': lowest_store,
-            'price_history': price_history
+            'price_history': price_history,
+            'price_stats': price_stats
         }
         
         return jsonify(game_data)
@@ -227,6 +232,37 @@ def game_detail(game_id: int):
         return jsonify({'error': 'Internal server error'}), 500
 
 
+@api_bp.route('/deals')
+def deals():
+    """
+    セールランキングAPI（`flask rebuild-deal-rankings` で作成済みのランキング）
+
+    Query Parameters:
+        genre: ジャンルコード（省略時は全体）
+        limit: 取得件数（デフォルト: 20、最大100）
+
+    Returns:
+        dict: ランキングデータ
+    """
+    scope = request.args.get('genre', '').strip() or OVERALL_SCOPE
+    limit = min(int(request.args.get('limit', 20)), 100)
+
+    if scope != OVERALL_SCOPE and scope not in {code for code, _, _ in GENRES}:
+        return jsonify({'error': f'Unknown genre: {scope}'}), 400
+
+    try:
+        rankings = GameRepository().get_deal_rankings(scope=scope, limit=limit)
+        deals_data = [
+            dict(ranking.to_dict(), title=game.title, image_url=game.image_url)
+            for ranking, game in rankings
+        ]
+        return jsonify({'scope': scope, 'deals': deals_data})
+
+    except Exception as e:
+        current_app.logger.error(f"セールランキングAPI エラー: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+
 @api_bp.route('/favorites', methods=['GET', 'POST', 'DELETE'])
 @login_required
 def favorites():
@@ -245,39 +281,28 @@ def favorites():
     if request.method == 'GET':
         # お気に入り一覧取得
         try:
-            favorites = db.session.query(Favorite).filter_by(user_id=user_id).all()
+            # お気に入り・ゲーム・最安値・価格変動を1回のクエリで取得
+            favorite_rows = UserRepository().get_favorites_with_prices(user_id)
             
             favorite_games = []
-            for favorite in favorites:
-                game = getattr(favorite, 'game', None)
-                if game:
-                    # 価格情報の取得
-                    game_prices = getattr(game, 'prices', [])
-                    lowest_price = None
-                    lowest_store = None
-                    
-                    for price in game_prices:
-                        current_price = price.get_current_price()
-                        store = getattr(price, 'store', '')
-                        
-                        if current_price and (lowest_price is None or current_price < lowest_price):
-                            lowest_price = current_price
-                            lowest_store = store
-                    
-                    favorite_data = {
-                        'favorite_id': getattr(favorite, 'id', None),
-                        'game_id': getattr(game, 'id', None),
-                        'title': getattr(game, 'title', ''),
-                        'developer': getattr(game, 'developer', ''),
-                        'image_url': getattr(game, 'image_url', ''),
-                        'genres': game.get_genres(),
-                        'lowest_price': float(lowest_price) if lowest_price else None,
-                        'lowest_store': lowest_store,
-                        'price_threshold': float(getattr(favorite, 'price_threshold')) if getattr(favorite, 'price_threshold', None) else None,
-                        'notification_enabled': getattr(favorite, 'notification_enabled', True),
-                        'created_at': getattr(favorite, 'created_at', None).isoformat() if getattr(favorite, 'created_at', None) and hasattr(getattr(favorite, 'created_at', None), 'isoformat') else None
-                    }
-                    favorite_games.append(favorite_data)
+            for row in favorite_rows:
+                favorite, game = row.Favorite, row.Game
+                favorite_data = {
+                    'favorite_id': favorite.id,
+                    'game_id': game.id,
+                    'title': game.title,
+                    'developer': game.developer,
+                    'image_url': game.image_url,
+                    'genres': game.get_genres(),
+                    'lowest_price': float(row.lowest_price) if row.lowest_price is not None else None,
+                    'lowest_store': row.lowest_store,
+                    'previous_price': float(row.previous_price) if row.previous_price is not None else None,
+                    'price_change': price_change_percent(row.lowest_price, row.previous_price),
+                    'price_threshold': float(favorite.price_threshold) if favorite.price_threshold else None,
+                    'notification_enabled': favorite.notification_enabled,
+                    'created_at': favorite.created_at.isoformat() if favorite.created_at else None
+                }
+                favorite_games.append(favorite_data)
             
             return jsonify({
                 'favorites': favorite_games,
@@ -303,21 +328,17 @@ def favorites():
             if not game:
                 return jsonify({'error': 'Game not found'}), 404
             
-            # 既にお気に入りに追加されているかチェック
-            existing_favorite = db.session.query(Favorite).filter_by(
-                user_id=user_id, game_id=game_id
-            ).first()
+            # お気に入りを追加（ユーザー統計も同じトランザクションで更新）
+            user_repository = UserRepository()
+            favorite = user_repository.add_favorite(int(user_id), game_id)
             
-            if existing_favorite:
+            if not favorite:
                 return jsonify({'error': 'Game already in favorites'}), 400
             
-            # お気に入りを追加
-            favorite = Favorite(user_id=int(user_id), game_id=game_id)
             if price_threshold:
                 setattr(favorite, 'price_threshold', price_threshold)
             
-            db.session.add(favorite)
-            db.session.commit()
+            user_repository.commit()
             
             current_app.logger.info(f"お気に入り追加: user_id={user_id}, game_id={game_id}")
             
@@ -341,16 +362,12 @@ def favorites():
             return jsonify({'error': 'game_id is required'}), 400
         
         try:
-            # お気に入りを削除
-            favorite = db.session.query(Favorite).filter_by(
-                user_id=user_id, game_id=game_id
-            ).first()
-            
-            if not favorite:
+            # お気に入りを削除（ユーザー統計も同じトランザクションで更新）
+            user_repository = UserRepository()
+            if not user_repository.remove_favorite(int(user_id), game_id):
                 return jsonify({'error': 'Favorite not found'}), 404
             
-            db.session.delete(favorite)
-            db.session.commit()
+            user_repository.commit()
             
             current_app.logger.info(f"お気に入り削除: user_id={user_id}, game_id={game_id}")
             
@@ -449,9 +466,8 @@ def price_alerts():
                 if not game:
                     return jsonify({'error': 'Game not found'}), 404
                 
-                # 新しいお気に入りを作成
-                favorite = Favorite(user_id=int(user_id), game_id=game_id)
-                db.session.add(favorite)
+                # 新しいお気に入りを作成（ユーザー統計も同じトランザクションで更新）
+                favorite = UserRepository().add_favorite(int(user_id), game_id)
             
             # 価格しきい値を設定
             setattr(favorite, 'price_threshold', threshold_price)
@@ -605,8 +621,7 @@ def search_suggestions():
     try:
         # データベースから検索候補を取得
         suggestions_query = db.session.query(Game.title).filter(
-            (Game.title.ilike(f'%{query}%')) |
-            (Game.normalized_title.ilike(f'%{query}%'))
+            GameRepository().title_search_condition(query)
         ).order_by(asc(Game.title)).limit(limit)
         
         suggestions = [title for (title,) in suggestions_query.all()]
@@ -618,6 +633,159 @@ def search_suggestions():
         return jsonify({'suggestions': []})
 
 
+@api_bp.route('/search/enrichment')
+def search_enrichment():
+    """
+    Steam追加検索の進捗API
+    
+    検索ページがバックグラウンドの追加検索完了をポーリングするためのエンドポイント。
+    完了して新規ゲームがある場合は、検索結果1ページ目のカードHTMLを返します。
+    
+    Query Parameters:
+        q: 検索クエリ
+        min_price, max_price, genre, platform, sort: 検索ページと同じフィルター
+        
+    Returns:
+        dict: status（pending/done/failed/none）、new_count、
+              完了時は total_count・grid_html・list_html
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Query is required'}), 400
+    
+    try:
+        search_service = GameSearchService()
+        status = search_service.get_enrichment_status(query)
+        response = {'status': status.get('status'), 'new_count': status.get('new_count', 0)}
+        
+        if status.get('status') != ENRICHMENT_DONE or not status.get('new_count'):
+            return jsonify(response)
+        
+        filters = {
+            key: request.args.get(key)
+            for key in ('min_price', 'max_price', 'genre', 'platform', 'sort')
+            if request.args.get(key)
+        }
+        # 取り込み済みマーカーがあるため、ここで再度追加検索が始まることはない
+        search_result = search_service.search_games(
+            query=query, filters=filters, page=1, per_page=20, defer_enrichment=True
+        )
+        
+        cards = render_game_cards(search_result.get('games', []))
+        
+        response.update({
+            'total_count': search_result.get('total_count', 0),
+            'grid_html': str(cards['grid']),
+            'list_html': str(cards['list'])
+        })
+        return jsonify(response)
+        
+    except Exception as e:
+        current_app.logger.error(f"追加検索進捗API エラー: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+
+@api_bp.route('/prices/stream')
+def price_stream():
+    """
+    価格変更のライブ配信API（Server-Sent Events）
+    
+    指定ゲームの価格変更イベントをコミット直後に配信します。
+    DBやSteam APIには接続せず、プロセス内Pub/Sub（他のプロセスの変更は中継スレッドが取り込む）のみを参照します。
+    一定時間で接続を閉じ、EventSourceの自動再接続（Last-Event-ID）で継続します。
+    
+    Query Parameters:
+        game_ids: ゲームID（カンマ区切り）
+        
+    Returns:
+        Response: text/event-stream
+    """
+    max_games = current_app.config.get('PRICE_STREAM_MAX_GAMES', 50)
+    try:
+        game_ids = {int(value) for value in request.args.get('game_ids', '').split(',') if value.strip()}
+    except ValueError:
+        return jsonify({'error': 'Invalid game_ids'}), 400
+    
+    if not game_ids:
+        return jsonify({'error': 'game_ids is required'}), 400
+    if len(game_ids) > max_games:
+        return jsonify({'error': f'Too many game_ids (max {max_games})'}), 400
+    
+    # 再接続時は取りこぼしたイベントから再開（他のプロセス・再起動前のIDは現在の通番から）
+    after_seq = price_event_bus.resume_seq(request.headers.get('Last-Event-ID'))
+    price_event_relay.ensure_listening()
+    
+    heartbeat = current_app.config.get('PRICE_STREAM_HEARTBEAT', 15)
+    max_duration = current_app.config.get('PRICE_STREAM_MAX_DURATION', 300)
+    
+    # ストリーム中にDB接続を保持しない
+    db.session.remove()
+    
+    def generate():
+        nonlocal after_seq
+        yield f"retry: {heartbeat * 1000}\n\n"
+        
+        deadline = time.monotonic() + max_duration
+        while time.monotonic() < deadline:
+            timeout = min(heartbeat, max(0.0, deadline - time.monotonic()))
+            events = price_event_bus.wait_for(game_ids, after_seq, timeout=timeout)
+            
+            if not events:
+                # プロキシによる切断を防ぐためのハートビート
+                yield ": keep-alive\n\n"
+                continue
+            
+            for event in events:
+                after_seq = event['seq']
+                yield f"id: {price_event_bus.event_id(event['seq'])}\nevent: price\ndata: {json.dumps(event)}\n\n"
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+@api_bp.route('/export/catalog')
+def export_catalog():
+    """
+    カタログエクスポートAPI（NDJSON、ストリーミング）
+    
+    アクティブなゲーム全件を現在価格付きで1行1ゲームのNDJSONとして返します。
+    サーバーサイドカーソルで読みながら送信するため、件数に関わらずメモリ使用量は一定です。
+    クライアントが受け付ける場合はgzip圧縮して返します。
+    Authorization: Bearer <EXPORT_API_TOKEN> が必要です（EXPORT_API_TOKEN が未設定の場合は無効）。
+    
+    Query Parameters:
+        updated_since: この日時（ISO 8601）以降にゲームまたは価格が更新されたゲームのみ返す
+        
+    Returns:
+        Response: application/x-ndjson
+    """
+    token = current_app.config.get('EXPORT_API_TOKEN')
+    if not token:
+        return jsonify({'error': 'Export API is disabled'}), 403
+    if not hmac.compare_digest(request.headers.get('Authorization', '').encode('utf-8'),
+                               f'Bearer {token}'.encode('utf-8')):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        updated_since = parse_updated_since(request.args.get('updated_since'))
+    except ValueError:
+        return jsonify({'error': 'Invalid updated_since'}), 400
+    
+    batch_size = current_app.config.get('EXPORT_BATCH_SIZE', 1000)
+    body = iter_ndjson(iter_catalog_records(updated_since, batch_size))
+    headers = {'Cache-Control': 'no-store', 'X-Accel-Buffering': 'no'}
+    
+    if 'gzip' in request.accept_encodings:
+        body = iter_gzip(body)
+        headers['Content-Encoding'] = 'gzip'
+    headers['Vary'] = 'Accept-Encoding'
+    
+    current_app.logger.info(f"カタログエクスポート開始: updated_since={updated_since}")
+    return Response(stream_with_context(body), mimetype='application/x-ndjson', headers=headers)
+
+
 # エラーハンドラー
 @api_bp.errorhandler(400)
 def bad_request(error):
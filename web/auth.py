@@ -8,10 +8,11 @@ Discord OAuth認証、ログイン・ログアウト機能を提供します。
 from flask import Blueprint, render_template, redirect, url_for, flash, session, request, current_app
 from flask_login import login_user, logout_user, login_required, current_user
 from urllib.parse import urlencode
-import requests
 from typing import Optional, Dict, Any
 from datetime import datetime, timedelta, timezone
 
+from repositories.user_repository import UserRepository
+
 # ブループリントの作成
 auth_bp = Blueprint('auth', __name__)
 
@@ -158,6 +159,10 @@ def get_discord_token(code: str) -> Optional[Dict[str, Any]]:
     Returns:
         Optional[Dict[str, Any]]: トークンデータ、失敗時はNone
     """
+    # HTTPクライアント（requests）はログイン時に読み込む（起動時間の短縮）
+    import requests
+    from services.http_client import get_http_client
+    
     token_url = 'https://discord.com/api/oauth2/token'
     
     data = {
@@ -173,7 +178,7 @@ def get_discord_token(code: str) -> Optional[Dict[str, Any]]:
     }
     
     try:
-        response = requests.post(token_url, data=data, headers=headers, timeout=10)
+        response = get_http_client().post(token_url, data=data, headers=headers, timeout=10)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
@@ -191,6 +196,9 @@ def get_discord_user_info(access_token: str) -> Optional[Dict[str, Any]]:
     Returns:
         Optional[Dict[str, Any]]: ユーザー情報、失敗時はNone
     """
+    import requests
+    from services.http_client import get_http_client
+    
     user_url = 'https://discord.com/api/users/@me'
     
     headers = {
@@ -199,7 +207,7 @@ def get_discord_user_info(access_token: str) -> Optional[Dict[str, Any]]:
     }
     
     try:
-        response = requests.get(user_url, headers=headers, timeout=10)
+        response = get_http_client().get(user_url, headers=headers, timeout=10)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
@@ -327,8 +335,13 @@ def profile():
     Returns:
         str: レンダリングされたHTMLテンプレート
     """
+    # 節約額・セール発見数は集計済みの user_stats から1行で取得
+    stats = UserRepository().get_user_stats(current_user.id)
     return render_template('auth/profile.html', 
                          user=current_user,
+                         user_stats=stats,
+                         total_savings=float(stats.total_savings or 0),
+                         total_deals=stats.deals_found or 0,
                          page_title='プロフィール')
 
 
@@ -0,0 +1,134 @@
+"""
+Fragments
+
+レンダリング済みHTMLフラグメントのキャッシュ
+ゲームカードは (ゲームID, 表示バージョン) ごとに、トップページのセクションはブロック全体をキャッシュします。
+表示バージョンはゲーム・価格の最終更新日時から作るため、更新されたカードだけが再描画されます。
+"""
+
+import hashlib
+from typing import Any, Dict, List
+
+from flask import current_app, render_template
+from flask_login import current_user  # type: ignore
+from markupsafe import Markup
+
+from extensions import cache
+from repositories.game_repository import GameRepository
+from repositories.price_repository import PriceRepository
+from services.home_seed import schedule_home_seed
+
+
+DEFAULT_CARD_TTL = 600
+DEFAULT_HOME_TTL = 300
+DEFAULT_HOME_SALE_GAMES = 6
+
+CARD_LAYOUTS = ('grid', 'list')
+
+_CARD_KEY = 'fragment:card:{layout}:{viewer}:{game_id}:{version}'
+_HOME_KEY = 'fragment:home:{viewer}:{digest}'
+
+
+def _viewer() -> str:
+    """ログイン状態（お気に入りボタンの有無）でフラグメントを分ける"""
+    return 'user' if current_user and current_user.is_authenticated else 'anon'
+
+
+def render_game_cards(games: List[Dict[str, Any]]) -> Dict[str, Markup]:
+    """
+    検索結果のゲームカードHTMLを作成（カード単位でキャッシュ）
+
+    キャッシュにないカードのみ価格情報を整形して描画します。
+
+    Args:
+        games: GameSearchServiceの検索結果（ゲーム情報の辞書）
+
+    Returns:
+        Dict[str, Markup]: レイアウト（grid / list）ごとのカードHTML
+    """
+    game_repository = GameRepository()
+    versions = game_repository.get_card_versions([game['id'] for game in games])
+    viewer = _viewer()
+
+    keys = {
+        (layout, game['id']): _CARD_KEY.format(
+            layout=layout, viewer=viewer, game_id=game['id'], version=versions.get(game['id'], '0')
+        )
+        for game in games for layout in CARD_LAYOUTS
+    }
+    key_list = list(keys.values())
+    cached = dict(zip(key_list, cache.get_many(*key_list))) if key_list else {}
+
+    price_repository = None
+    rendered = {}
+    for game in games:
+        if all(cached.get(keys[(layout, game['id'])]) is not None for layout in CARD_LAYOUTS):
+            continue
+        price_repository = price_repository or PriceRepository()
+        card = game_repository.format_game_for_web_template(game, price_repository)
+        for layout in CARD_LAYOUTS:
+            html = render_template('search_cards.html', games=[card], layout=layout)
+            rendered[keys[(layout, game['id'])]] = html
+            cached[keys[(layout, game['id'])]] = html
+
+    if rendered:
+        cache.set_many(rendered, timeout=current_app.config.get('GAME_CARD_FRAGMENT_TTL', DEFAULT_CARD_TTL))
+
+    return {
+        layout: Markup(''.join(cached[keys[(layout, game['id'])]] for game in games))
+        for layout in CARD_LAYOUTS
+    }
+
+
+def render_home_sections() -> Markup:
+    """
+    トップページのゲームセクションHTMLを作成（ブロック全体をキャッシュ）
+
+    掲載ゲームとその表示バージョンが変わらない間は、価格整形と描画を行いません。
+    ゲームが少ない場合はSteam APIからの取り込みをバックグラウンドで開始し、既存のデータで表示します。
+
+    Returns:
+        Markup: セクションHTML
+    """
+    game_repository = GameRepository()
+    featured_games = game_repository.get_recent_games(6)
+    current_app.logger.info(f"データベースから取得したゲーム数: {len(featured_games)}件")
+
+    if len(featured_games) < current_app.config.get('HOME_SEED_MIN_GAMES', 3):
+        schedule_home_seed()
+
+    # セール中のゲーム（作成済みのランキング、未作成の場合は割引率順）
+    sale_limit = current_app.config.get('HOME_SALE_GAMES', DEFAULT_HOME_SALE_GAMES)
+    sale_games_db: List[Any] = [game for _, game in game_repository.get_deal_rankings(limit=sale_limit)]
+    if not sale_games_db:
+        sale_games_db = game_repository.get_on_sale_games(sale_limit)
+
+    versions = game_repository.get_card_versions([game.id for game in featured_games + sale_games_db])
+    signature = ','.join(
+        f'{section}:{game.id}:{versions.get(game.id, "0")}'
+        for section, section_games in (('recent', featured_games), ('sale', sale_games_db))
+        for game in section_games
+    )
+    key = _HOME_KEY.format(viewer=_viewer(), digest=hashlib.sha1(signature.encode('utf-8')).hexdigest())
+
+    html = cache.get(key)
+    if html is not None:
+        return Markup(html)
+
+    price_repository = PriceRepository()
+    sections = {'recent': [], 'sale': []}
+    for section, section_games in (('recent', featured_games), ('sale', sale_games_db)):
+        for game in section_games:
+            try:
+                sections[section].append(game_repository.format_game_for_web_template(game, price_repository))
+            except Exception as format_error:
+                current_app.logger.error(f"ゲーム整形エラー (ID: {game.id}): {format_error}")
+                # エラーが発生したゲームはスキップ
+                continue
+
+    current_app.logger.info(
+        f"トップページ表示: 注目ゲーム={len(sections['recent'])}件, セール={len(sections['sale'])}件"
+    )
+    html = render_template('home_sections.html', recent_games=sections['recent'], sale_games=sections['sale'])
+    cache.set(key, html, timeout=current_app.config.get('HOME_FRAGMENT_TTL', DEFAULT_HOME_TTL))
+    return Markup(html)
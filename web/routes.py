@@ -12,11 +12,12 @@ from typing import Dict, List, Any, Optional
 
 from models import db, Game, Price, Favorite, User, Notification
 
-from services.steam_service import SteamAPIService
 from services.game_search_service import GameSearchService
 from repositories.game_repository import GameRepository
 from repositories.price_repository import PriceRepository
-from repositories.user_repository import UserRepository
+from repositories.user_repository import UserRepository, price_change_percent
+from models.taxonomy import GENRES, PLATFORMS, PRICE_BANDS
+from web.fragments import render_game_cards, render_home_sections
 
 # ブループリントの作成
 main_bp = Blueprint('main', __name__)
@@ -31,62 +32,9 @@ def index():
         str: レンダリングされたHTMLテンプレート
     """
     try:
-        # GameRepositoryを使用してデータ取得
-        game_repository = GameRepository()
-        price_repository = PriceRepository()
-        
-        # データベースから注目ゲームを取得
-        featured_games_db = game_repository.get_recent_games(6)
-        current_app.logger.info(f"データベースから取得したゲーム数: {len(featured_games_db)}件")
-        
-        # データベースに十分なゲームがない場合、Steam APIから最近のゲームを取得
-        if len(featured_games_db) < 3:
-            current_app.logger.info("データベースにゲームが少ないため、Steam APIから最近のゲームを取得中...")
-            try:
-                steam_service = SteamAPIService()
-                recent_games = steam_service.get_recent_games(10)
-                
-                # Steam APIの結果をデータベースに保存（リポジトリ層を使用）
-                if recent_games:
-                    game_repository.save_steam_games_from_api(recent_games)
-                
-                current_app.logger.info(f"Steam APIから取得したゲーム数: {len(recent_games)}件")
-                
-                # 再度データベースから取得
-                featured_games_db = game_repository.get_recent_games(6)
-                current_app.logger.info(f"最終的な注目ゲーム数: {len(featured_games_db)}件")
-            except Exception as steam_error:
-                current_app.logger.error(f"Steam API取得エラー: {steam_error}")
-                # Steam APIが失敗しても、既存のデータで続行
-        
-        # セール中のゲームを取得（リポジトリ層に追加予定、現在は空のリスト）
-        sale_games_db = []
-        
-        # レスポンス用に整形（エラーハンドリング付き）
-        featured_games = []
-        for game in featured_games_db:
-            try:
-                formatted_game = game_repository.format_game_for_web_template(game, price_repository)
-                featured_games.append(formatted_game)
-            except Exception as format_error:
-                current_app.logger.error(f"ゲーム整形エラー (ID: {game.id}): {format_error}")
-                # エラーが発生したゲームはスキップ
-                continue
-        
-        sale_games = []
-        for game in sale_games_db:
-            try:
-                formatted_game = game_repository.format_game_for_web_template(game, price_repository)
-                sale_games.append(formatted_game)
-            except Exception as format_error:
-                current_app.logger.error(f"セールゲーム整形エラー (ID: {game.id}): {format_error}")
-                continue
-        
-        current_app.logger.info(f"トップページ表示: 注目ゲーム={len(featured_games)}件, セール={len(sale_games)}件")
-        
+        # ゲームセクションはフラグメントキャッシュから取得（Steam APIからの取り込みはバックグラウンド）
         return render_template('index.html', 
-                             recent_games=featured_games,
-                             sale_games=sale_games,
+                             home_sections=render_home_sections(),
                              page_title='ホーム')
                              
     except Exception as e:
@@ -94,8 +42,7 @@ def index():
         current_app.logger.exception("詳細なエラー情報:")
         # エラー時はサンプルデータで表示
         return render_template('index.html', 
-                             recent_games=[],
-                             sale_games=[],
+                             home_sections='',
                              page_title='ホーム')
 
 
@@ -155,6 +102,7 @@ def search():
                              active_filters=active_filters,
                              popular_keywords=popular_keywords,
                              recent_games=recent_games,
+                             facet_choices=_facet_choices(None),
                              page_title='ゲーム検索')
     
     try:
@@ -166,7 +114,8 @@ def search():
             query=query,
             filters=filters,
             page=page,
-            per_page=20
+            per_page=20,
+            defer_enrichment=True
         )
         
         # 検索結果をWeb用に整形
@@ -174,9 +123,8 @@ def search():
         pagination_data = search_result.get('pagination', {})
         total_count = search_result.get('total_count', 0)
         
-        game_repository = GameRepository()
-        price_repository = PriceRepository()
-        search_results = [game_repository.format_game_for_web_template(game, price_repository) for game in games]
+        # カードHTMLはゲーム単位のフラグメントキャッシュから組み立てる
+        search_cards = render_game_cards(games)
         
         # ページネーション情報をWeb用に変換
         pagination = {
@@ -193,7 +141,7 @@ def search():
             'iter_pages': lambda: _iter_pages(pagination_data.get('page', 1), pagination_data.get('pages', 1))
         }
         
-        current_app.logger.info(f"検索完了: クエリ='{query}', 結果数={len(search_results)}")
+        current_app.logger.info(f"検索完了: クエリ='{query}', 結果数={len(games)}")
         
         # フィルター用のデフォルト値を設定
         display_filters = {
@@ -205,12 +153,15 @@ def search():
         }
         
         return render_template('search.html', 
-                             games=search_results, 
+                             games=games, 
+                             search_cards=search_cards,
                              query=query,
                              filters=display_filters,
                              has_filters=has_filters,
                              active_filters=active_filters,
                              pagination=pagination,
+                             enrichment_pending=search_result.get('enrichment_pending', False),
+                             facet_choices=_facet_choices(search_result.get('facets')),
                              popular_keywords=popular_keywords,
                              recent_games=recent_games,
                              page_title=f'検索結果: {query}' if query else 'ゲーム検索')
@@ -250,6 +201,7 @@ def search():
                              pagination=pagination,
                              popular_keywords=popular_keywords,
                              recent_games=recent_games,
+                             facet_choices=_facet_choices(None),
                              page_title=f'検索結果: {query}' if query else 'ゲーム検索',
                              error='検索中にエラーが発生しました')
 
@@ -305,6 +257,9 @@ def game_detail(game_id: int):
                                f"title={game.title}, "
                                f"価格数={len(formatted_prices)}")
 
+        # 集計済みの価格統計（過去最安値・平均割引率・セール頻度）
+        price_stats = price_repository.get_price_stats(game_id)
+
         # お気に入り状態をチェック
         is_favorited = False
         if current_user.is_authenticated:
@@ -315,6 +270,7 @@ def game_detail(game_id: int):
                              game=game_data,
                              prices=formatted_prices,
                              lowest_price=lowest_price,
+                             price_stats=price_stats,
                              is_favorited=is_favorited,
                              page_title=game.title)
 
@@ -325,6 +281,39 @@ def game_detail(game_id: int):
         return redirect(url_for('main.index'))
 
 
+def _format_favorite_for_template(game_repository: GameRepository, row) -> Dict[str, Any]:
+    """
+    お気に入りの行（UserRepository.get_favorites_with_prices）をテンプレート用に整形
+    
+    Args:
+        game_repository: GameRepositoryインスタンス
+        row: お気に入りの行
+        
+    Returns:
+        Dict[str, Any]: 整形されたゲームデータ
+    """
+    game = game_repository.format_game_for_web_template(row.Game)
+    if row.lowest_price is not None:
+        current_price = float(row.lowest_price)
+        original_price = float(row.regular_price) if row.regular_price is not None else current_price
+        discount_percent = row.discount_rate or 0
+        game.update({
+            'current_price': current_price,
+            'original_price': original_price,
+            'discount_percent': discount_percent,
+            'is_on_sale': bool(row.is_on_sale),
+            'lowest_price': {
+                'price': current_price,
+                'store': row.lowest_store,
+                'discount_percent': discount_percent,
+                'original_price': original_price
+            },
+            'lowest_store': row.lowest_store
+        })
+    game['price_change'] = price_change_percent(row.lowest_price, row.previous_price)
+    return game
+
+
 @main_bp.route('/favorites')
 @login_required
 def favorites():
@@ -335,15 +324,14 @@ def favorites():
         str: レンダリングされたHTMLテンプレート
     """
     try:
-        # UserRepositoryを使用してお気に入りを取得
+        # お気に入り・ゲーム・最安値・価格変動を1回のクエリで取得
         user_repository = UserRepository()
         game_repository = GameRepository()
-        price_repository = PriceRepository()
         
-        favorite_games_db = user_repository.get_user_favorites(current_user.user_id)
-        favorite_games = [game_repository.format_game_for_web_template(game, price_repository) for game in favorite_games_db]
+        favorite_rows = user_repository.get_favorites_with_prices(current_user.id)
+        favorite_games = [_format_favorite_for_template(game_repository, row) for row in favorite_rows]
         
-        current_app.logger.info(f"お気に入り一覧表示: user_id={current_user.user_id}, count={len(favorite_games)}")
+        current_app.logger.info(f"お気に入り一覧表示: user_id={current_user.id}, count={len(favorite_games)}")
         
         return render_template('favorites.html', 
                              games=favorite_games,
@@ -504,6 +492,37 @@ def inject_template_vars():
     }
 
 
+def _facet_choices(facets: Optional[Dict[str, Dict[str, int]]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    検索フィルターの選択肢を件数付きで作成
+    
+    Args:
+        facets: GameSearchService の検索結果に含まれるファセット件数（未検索の場合はNone）
+        
+    Returns:
+        Dict[str, List[Dict[str, Any]]]: genre / platform / price_band ごとの選択肢
+    """
+    facets = facets or {}
+    
+    def count(kind: str, code: str) -> Optional[int]:
+        return facets.get(kind, {}).get(code) if facets else None
+    
+    return {
+        'genre': [{'value': code, 'label': label, 'count': count('genre', code)} for code, label, _ in GENRES],
+        'platform': [{'value': code, 'label': label, 'count': count('platform', code)} for code, label, _ in PLATFORMS],
+        'price_band': [
+            {
+                'value': code,
+                'label': label,
+                'min_price': low,
+                'max_price': high - 1 if high is not None else None,
+                'count': count('price_band', code)
+            }
+            for code, label, low, high in PRICE_BANDS
+        ],
+    }
+
+
 def _iter_pages(current_page: int, total_pages: int, left_edge: int = 2, left_current: int = 2, right_current: int = 3, right_edge: int = 2):
     """
     ページネーション用のページ番号生成